@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import User, PasswordHistory, FailedLoginIP
+from . import lockout
 
 try:
     from requests.utils import log_event
@@ -41,6 +42,7 @@ class UserAdmin(BaseUserAdmin):
     def unlock_users(self, request, queryset):
         """Acción de admin para desbloquear usuarios seleccionados."""
         updated = queryset.update(failed_login_attempts=0, locked_until=None)
+        lockout.reset('user', *queryset.values_list('username', flat=True))
         # Registrar en SystemLog si el helper está disponible
         if log_event:
             for user in queryset:
@@ -60,3 +62,11 @@ class PasswordHistoryAdmin(admin.ModelAdmin):
 class FailedLoginIPAdmin(admin.ModelAdmin):
     list_display = ('ip_address', 'attempts', 'last_attempt', 'blocked_until')
     search_fields = ('ip_address',)
+    actions = ['unblock_ips']
+
+    def unblock_ips(self, request, queryset):
+        """Levantar el bloqueo de las IPs seleccionadas (también en el almacén de contadores)."""
+        lockout.reset('ip', *queryset.values_list('ip_address', flat=True))
+        updated = queryset.update(attempts=0, blocked_until=None)
+        self.message_user(request, f"Desbloqueadas {updated} IPs.")
+    unblock_ips.short_description = 'Desbloquear IPs seleccionadas'
@@ -0,0 +1,31 @@
+"""
+Backend de autenticación de la aplicación.
+
+Es el `ModelBackend` de Django, pero cuando la contraseña no coincide deja en
+la request el usuario que ya cargó (`request.login_user`, None si no existe):
+`handle_login_failed` (signals.py) lo usa en lugar de volver a consultarlo.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+class LoginBackend(ModelBackend):
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Calcular el hash igualmente: mismo tiempo de respuesta que con un usuario existente
+            UserModel().set_password(password)
+            user = None
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
+        if request is not None:
+            request.login_user = user
+        return None
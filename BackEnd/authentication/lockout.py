@@ -0,0 +1,90 @@
+"""
+Bloqueo por intentos de login fallidos (por usuario y por IP).
+
+Los intentos se cuentan en el almacén de contadores compartido
+(`config/counter_store.py`) con `incr_or_lock()`, atómico y en una sola
+operación del almacén por intento y dimensión (usuario, IP): una ráfaga de
+fuerza bruta no serializa `UPDATE` sobre `users` ni `failed_login_ips`. Las
+claves son:
+
+- `lockout:fails:user:<username>` / `lockout:fails:ip:<ip>`: intentos dentro
+  de la ventana `AUTH_LOCKOUT_WINDOW_MINUTES` (desde el primero).
+- `lockout:locked:user:<username>` / `lockout:locked:ip:<ip>`: instante (epoch)
+  en que termina el bloqueo; caduca con él.
+
+El intento que alcanza o supera el umbral (puede bajar en caliente, ver
+`config_registry`) bloquea; solo lo hace quien crea la clave del bloqueo, así
+que con peticiones concurrentes se bloquea (y se notifica) una sola vez. Ese bloqueo
+se refleja en la base de datos (`User.locked_until`, `FailedLoginIP`) para el
+admin; el del usuario se sigue respetando aunque se vacíe el almacén
+(`restore_lock`), acierte o no la contraseña.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+from config.counter_store import get_store
+
+FAILS_PREFIX = 'lockout:fails:'
+LOCKED_PREFIX = 'lockout:locked:'
+
+
+def client_ip(request):
+    if request is None:
+        return None
+    xff = request.META.get('HTTP_X_FORWARDED_FOR')
+    return xff.split(',')[0].strip() if xff else request.META.get('REMOTE_ADDR')
+
+
+def subject_key(kind, value):
+    return f'{kind}:{value}'
+
+
+def as_datetime(epoch):
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc) if epoch else None
+
+
+@dataclass
+class Failure:
+    """Resultado de registrar un intento fallido para un sujeto (usuario o IP)."""
+    attempts: int = 0
+    already_locked: bool = False
+    locked_until: datetime = None  # solo si este intento ha provocado el bloqueo
+
+
+def locked_until(username=None, ip=None):
+    """(fin del bloqueo del usuario, fin del bloqueo de la IP): `datetime` o None, en una lectura."""
+    subjects = [subject_key('user', username) if username else None, subject_key('ip', ip) if ip else None]
+    keys = [LOCKED_PREFIX + subject for subject in subjects if subject]
+    values = get_store().get_many(keys) if keys else {}
+    return tuple(as_datetime(values.get(LOCKED_PREFIX + subject)) if subject else None for subject in subjects)
+
+
+def register_failure(kind, value, threshold, lock_minutes, window_minutes):
+    """Sumar un intento fallido de `kind` ('user' / 'ip'); bloquear si se alcanza el umbral."""
+    subject = subject_key(kind, value)
+    attempts, until = get_store().incr_or_lock(
+        FAILS_PREFIX + subject, LOCKED_PREFIX + subject, threshold,
+        lock_value=int(time.time()) + lock_minutes * 60, ttl=window_minutes * 60, lock_ttl=lock_minutes * 60,
+    )
+    if attempts is None:
+        return Failure(already_locked=True)
+    return Failure(attempts=attempts, locked_until=as_datetime(until))
+
+
+def restore_lock(kind, value, until):
+    """Volver a anotar en el almacén un bloqueo que solo consta en la base de datos."""
+    remaining = until.timestamp() - time.time()
+    if remaining > 0:
+        get_store().set(LOCKED_PREFIX + subject_key(kind, value), int(until.timestamp()), ttl=remaining)
+
+
+def reset(kind, *values):
+    """Olvidar intentos y bloqueos (login correcto, desbloqueo desde el admin)."""
+    keys = []
+    for value in values:
+        subject = subject_key(kind, value)
+        keys += [FAILS_PREFIX + subject, LOCKED_PREFIX + subject]
+    if keys:
+        get_store().delete(*keys)
+
@@ -1,6 +1,6 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.contrib.auth.hashers import check_password
 from django.utils import timezone
 
 class User(AbstractUser):
@@ -56,22 +56,19 @@ class User(AbstractUser):
     def is_jefe(self):
         return self.role == 'jefe'
 
-    def is_password_reused(self, raw_password, history_count=5):
+    def is_password_reused(self, raw_password, history_count=None):
         """
         Comprueba si `raw_password` coincide con la contraseña actual
-        o con alguna de las últimas `history_count` contraseñas.
-        Usa `check_password` contra las contraseñas codificadas almacenadas.
+        o con alguna de las últimas `history_count` contraseñas
+        (por defecto `PASSWORD_HISTORY_COUNT`).
+        Los `check_password` se reparten en un pool de hilos (`password_history`).
         """
-        # Comprobar contra la contraseña actual
-        if check_password(raw_password, self.password):
-            return True
+        from .password_history import matches_any
 
-        # Consultar historial
-        recent = PasswordHistory.objects.filter(user=self).order_by('-created_at')[:history_count]
-        for ph in recent:
-            if check_password(raw_password, ph.password):
-                return True
-        return False
+        if history_count is None:
+            history_count = settings.PASSWORD_HISTORY_COUNT
+        recent = PasswordHistory.objects.filter(user=self).order_by('-created_at').values_list('password', flat=True)
+        return matches_any(raw_password, [self.password, *recent[:history_count]])
 
 
 class PasswordHistory(models.Model):
@@ -96,7 +93,9 @@ class FailedLoginIP(models.Model):
     """Registro de intentos fallidos por dirección IP.
 
     Esto permite bloquear temporalmente una IP que realiza intentos
-    fallidos excesivos contra múltiples cuentas.
+    fallidos excesivos contra múltiples cuentas. Los intentos se cuentan en el
+    almacén de contadores (`authentication/lockout.py`); aquí solo se registra
+    cada bloqueo.
     """
     ip_address = models.CharField(max_length=45, unique=True)
     attempts = models.IntegerField(default=0)
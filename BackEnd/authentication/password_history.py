@@ -0,0 +1,52 @@
+"""
+Comprobación de reutilización de contraseñas contra el historial.
+
+Cada `check_password` es un KDF completo (PBKDF2 con cientos de miles de
+iteraciones). `hashlib` libera el GIL mientras lo calcula, así que comparar
+la contraseña nueva con la actual y con las `PASSWORD_HISTORY_COUNT`
+anteriores se reparte en un pool de hilos acotado y compartido por el proceso
+(`PASSWORD_HISTORY_WORKERS`): la latencia pasa de N evaluaciones a unas
+N / workers. En cuanto una coincide se cancelan las que aún no han empezado.
+
+`manage.py bench_password_history` mide la latencia según la profundidad.
+"""
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool compartido del proceso (None si `PASSWORD_HISTORY_WORKERS` <= 1)."""
+    global _executor
+    if _executor is None and settings.PASSWORD_HISTORY_WORKERS > 1:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HISTORY_WORKERS, thread_name_prefix='password-history',
+                )
+    return _executor
+
+
+def matches_any(raw_password, encoded_passwords, executor=None):
+    """True si `raw_password` corresponde a alguno de los hashes (sin pool: en orden, en este hilo)."""
+    encoded_passwords = [encoded for encoded in encoded_passwords if encoded]
+    executor = executor or get_executor()
+    if executor is None or len(encoded_passwords) <= 1:
+        return any(check_password(raw_password, encoded) for encoded in encoded_passwords)
+
+    pending = {executor.submit(check_password, raw_password, encoded) for encoded in encoded_passwords}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            if any(future.result() for future in done):
+                return True
+        return False
+    finally:
+        # Coincidencia (o error): no calcular los KDF que siguen en cola
+        for future in pending:
+            future.cancel()
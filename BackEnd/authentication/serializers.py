@@ -2,10 +2,11 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from .models import User
-from .models import FailedLoginIP
+from . import lockout
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password as django_validate_password
+from config.serializers import DynamicFieldsMixin
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -97,43 +98,44 @@ class LoginSerializer(serializers.Serializer):
     """
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
-    
+
+    # Fin del bloqueo detectado al validar (la vista responde 423 sin volver a consultar)
+    locked_until = None
+
     def validate(self, attrs):
         username = attrs.get('username')
         password = attrs.get('password')
         
         if username and password:
-            # Comprobar bloqueo por intentos fallidos antes de autenticar
-            try:
-                user_obj = User.objects.filter(username=username).first()
-            except Exception:
-                user_obj = None
+            # Comprobar bloqueo por intentos fallidos antes de autenticar (sin
+            # calcular el hash): usuario e IP en una sola lectura del almacén de contadores
+            req = self.context.get('request')
+            user_locked, ip_locked = lockout.locked_until(username, lockout.client_ip(req))
+
             # Comprobar bloqueo por usuario
-            if user_obj and user_obj.locked_until and user_obj.locked_until > timezone.now():
+            if user_locked:
+                self.locked_until = user_locked
                 raise serializers.ValidationError('Cuenta temporalmente bloqueada. Intente más tarde.')
 
             # Comprobar bloqueo por IP
-            req = self.context.get('request')
-            if req is not None:
-                xff = req.META.get('HTTP_X_FORWARDED_FOR')
-                ip = xff.split(',')[0].strip() if xff else req.META.get('REMOTE_ADDR')
-                try:
-                    ip_rec = FailedLoginIP.objects.filter(ip_address=ip).first()
-                except Exception:
-                    ip_rec = None
-                if ip_rec and ip_rec.blocked_until and ip_rec.blocked_until > timezone.now():
-                    raise serializers.ValidationError('Intentos desde esta IP temporalmente bloqueados.')
-
-            user = authenticate(username=username, password=password)
+            if ip_locked:
+                raise serializers.ValidationError('Intentos desde esta IP temporalmente bloqueados.')
+
+            # `authenticate` ya envía `user_login_failed` (con la request, para contar la IP)
+            user = authenticate(req, username=username, password=password)
+
+            # Bloqueo registrado en la fila (p.ej. si se vació el almacén de
+            # contadores): el mismo mensaje acierte o no la contraseña, para no
+            # revelar que es correcta. Si falla, lo anota `handle_login_failed`
+            if user:
+                row_locked = user.locked_until
+            else:
+                row_locked = getattr(req, 'login_locked_until', None)
+            if row_locked and row_locked > timezone.now():
+                self.locked_until = row_locked
+                raise serializers.ValidationError('Cuenta temporalmente bloqueada. Intente más tarde.')
 
             if not user:
-                # Disparar señal de login fallido para que se registre
-                from django.contrib.auth.signals import user_login_failed
-                user_login_failed.send(
-                    sender=__name__,
-                    credentials={'username': username},
-                    request=req
-                )
                 raise serializers.ValidationError('Credenciales inválidas.')
 
             if not user.is_active:
@@ -167,9 +169,9 @@ class ChangePasswordSerializer(serializers.Serializer):
     
     def save(self, **kwargs):
         user = self.context['request'].user
-        # Comprobar reutilización de contraseñas (últimas 5)
+        # Comprobar reutilización de contraseñas (últimas PASSWORD_HISTORY_COUNT)
         new_pw = self.validated_data['new_password']
-        if user.is_password_reused(new_pw, history_count=5):
+        if user.is_password_reused(new_pw):
             raise serializers.ValidationError({'new_password': 'No puede reutilizar una contraseña reciente.'})
         user.set_password(self.validated_data['new_password'])
         user.save()
@@ -218,7 +220,7 @@ class ResetPasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError({'detail': 'Usuario inactivo.'})
 
         # Evitar reutilización de contraseñas
-        if user.is_password_reused(new_pw, history_count=5):
+        if user.is_password_reused(new_pw):
             raise serializers.ValidationError({'new_password': 'No puede reutilizar una contraseña reciente.'})
 
         user.set_password(new_pw)
@@ -226,9 +228,9 @@ class ResetPasswordSerializer(serializers.Serializer):
         return user
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer simplificado para listar usuarios
+    Serializer simplificado para listar usuarios (admite `?fields=` en lecturas)
     """
     full_name = serializers.SerializerMethodField()
     role_display = serializers.CharField(source='get_role_display', read_only=True)
@@ -1,8 +1,9 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_init, post_save, pre_save
 from django.dispatch import receiver
 from django.conf import settings
 from django.apps import apps
 from django.contrib.auth.signals import user_logged_in, user_login_failed
+from django.core.mail import send_mail
 from django.utils import timezone
 
 # Evitar import circular: obtener modelo dinámicamente
@@ -10,10 +11,11 @@ User = apps.get_model(settings.AUTH_USER_MODEL)
 
 from .models import PasswordHistory
 from .models import FailedLoginIP
+from . import lockout
+from requests import config_registry
 
-# Intentos por IP
-IP_THRESHOLD = getattr(settings, 'AUTH_IP_LOCKOUT_THRESHOLD', 20)
-IP_LOCK_MINUTES = getattr(settings, 'AUTH_IP_LOCKOUT_MINUTES', 60)
+# Valor no cargado (contraseña de una instancia diferida, usuario de un login fallido)
+_UNKNOWN = object()
 
 # SystemLog (auditoría) y notificaciones
 try:
@@ -24,27 +26,40 @@ except Exception:
     check_simultaneous_access = None
 
 
-# Configuración por defecto
-LOCKOUT_THRESHOLD = getattr(settings, 'AUTH_LOCKOUT_THRESHOLD', 5)
-LOCKOUT_MINUTES = getattr(settings, 'AUTH_LOCKOUT_MINUTES', 15)
+def lockout_setting(name, default):
+    """Umbral de bloqueo: `SystemConfiguration` (ajustable en caliente) o settings."""
+    return config_registry.get_int(name, getattr(settings, name, default))
+
+
+@receiver(post_init, sender=User)
+def remember_password(sender, instance, **kwargs):
+    """post_init: hash de la contraseña tal como se cargó de la BD (sin coste)."""
+    if instance.pk is None:
+        instance._loaded_password = None
+    else:
+        # Con `only()`/`defer()` sin la contraseña: se resolverá en pre_save
+        instance._loaded_password = instance.__dict__.get('password', _UNKNOWN)
 
 
 @receiver(pre_save, sender=User)
-def save_password_history(sender, instance, **kwargs):
+def save_password_history(sender, instance, raw=False, update_fields=None, **kwargs):
     """
     Antes de guardar un usuario, si la contraseña ha cambiado, guardar
     el hash anterior en PasswordHistory.
+
+    Se compara con el hash cargado (`remember_password`), así que los
+    guardados que no tocan la contraseña (p.ej. `update_fields=['last_login']`
+    en cada login) no consultan la base de datos.
     """
-    if not instance.pk:
+    if raw or instance._state.adding:
         # Usuario nuevo, no hay historial previo a guardar
         return
-
-    try:
-        old = sender.objects.get(pk=instance.pk)
-    except sender.DoesNotExist:
+    if update_fields is not None and 'password' not in update_fields:
         return
 
-    old_password = old.password
+    old_password = getattr(instance, '_loaded_password', _UNKNOWN)
+    if old_password is _UNKNOWN:
+        old_password = sender._base_manager.filter(pk=instance.pk).values_list('password', flat=True).first()
     new_password = instance.password
 
     if old_password and old_password != new_password:
@@ -52,135 +67,151 @@ def save_password_history(sender, instance, **kwargs):
         PasswordHistory.objects.create(user=instance, password=old_password)
 
 
+@receiver(post_save, sender=User)
+def refresh_loaded_password(sender, instance, update_fields=None, **kwargs):
+    """post_save: el hash guardado pasa a ser el de referencia para el siguiente cambio."""
+    if 'password' in instance.__dict__ and (update_fields is None or 'password' in update_fields):
+        instance._loaded_password = instance.password
+
+
 @receiver(user_login_failed)
 def handle_login_failed(sender, credentials, request, **kwargs):
-    """Incrementa contador de intentos fallidos y bloquea usuario si excede umbral."""
+    """
+    Cuenta el intento fallido por IP y por usuario en el almacén de contadores
+    (`authentication/lockout.py`) y bloquea al alcanzar el umbral. Solo se
+    escribe en la base de datos al bloquear.
+    """
     username = None
     if isinstance(credentials, dict):
         username = credentials.get('username') or credentials.get('email')
     if not username:
         return
 
-    print(f"[handle_login_failed] Signal recibido para username: {username}")
+    lockout_threshold = lockout_setting('AUTH_LOCKOUT_THRESHOLD', 5)
+    lockout_minutes = lockout_setting('AUTH_LOCKOUT_MINUTES', 15)
+    ip_threshold = lockout_setting('AUTH_IP_LOCKOUT_THRESHOLD', 20)
+    ip_lock_minutes = lockout_setting('AUTH_IP_LOCK_MINUTES', 60)
+    window_minutes = lockout_setting('AUTH_LOCKOUT_WINDOW_MINUTES', 60)
 
-    try:
-        user = User.objects.filter(username=username).first()
-    except Exception:
-        user = None
+    # El usuario que ya cargó `authenticate` (`LoginBackend`); sin request, se consulta
+    user = getattr(request, 'login_user', _UNKNOWN)
+    if user is _UNKNOWN:
+        try:
+            user = User.objects.filter(username=username).first()
+        except Exception:
+            user = None
 
     # Log intento fallido incluso si el usuario no existe
-    print(f"[handle_login_failed] log_event disponible: {log_event is not None}")
     if log_event:
-        result = log_event(user=user, request=request, action='login_failed', model_name='User', 
+        log_event(user=user, request=request, action='login_failed', model_name='User',
                   object_id=user.id if user else None,
                   description=f"Login fallido para username: {username}")
-        print(f"[handle_login_failed] Resultado log_event: {result}")
-    
-    # Crear notificación para intento fallido
-    if create_notification and user:
-        # Solo notificar después de 3 intentos fallidos
-        current_attempts = (user.failed_login_attempts or 0) + 1
-        if current_attempts >= 3:
-            create_notification(
-                notification_type='failed_login',
-                severity='warning' if current_attempts < LOCKOUT_THRESHOLD else 'error',
-                title=f'Múltiples intentos fallidos: {username}',
-                message=f'Se han detectado {current_attempts} intentos fallidos de login para el usuario {username}',
-                user=user,
-                request=request,
-                metadata={'attempts': current_attempts, 'threshold': LOCKOUT_THRESHOLD}
-            )
-
-    if not user:
-        return
-
-    # Obtener IP del request
-    ip = None
-    if request is not None:
-        xff = request.META.get('HTTP_X_FORWARDED_FOR')
-        ip = xff.split(',')[0].strip() if xff else request.META.get('REMOTE_ADDR')
 
-    # Primero actualizar contador por IP
+    # Primero el contador por IP (también con usuarios inexistentes: así se
+    # frena probar nombres de usuario desde una misma IP)
+    ip = lockout.client_ip(request)
     if ip:
-        ip_rec, _ = FailedLoginIP.objects.get_or_create(ip_address=ip)
-        # Si IP ya bloqueada, no hacer nada más
-        if ip_rec.blocked_until and ip_rec.blocked_until > timezone.now():
-            # Opcional: crear SystemLog para intento desde IP bloqueada
+        ip_failure = lockout.register_failure('ip', ip, ip_threshold, ip_lock_minutes, window_minutes)
+        if ip_failure.already_locked:
             if log_event:
                 log_event(user=None, request=request, action='ip_blocked_attempt', model_name='IP', object_id=None,
                           description=f"Attempt from blocked IP {ip}")
             return
-
-        ip_rec.attempts = (ip_rec.attempts or 0) + 1
-        ip_rec.last_attempt = timezone.now()
-        if ip_rec.attempts >= IP_THRESHOLD:
-            ip_rec.blocked_until = timezone.now() + timezone.timedelta(minutes=IP_LOCK_MINUTES)
-            ip_rec.attempts = 0
+        if ip_failure.locked_until:
+            # Un solo INSERT ... ON CONFLICT DO UPDATE
+            FailedLoginIP.objects.bulk_create(
+                [FailedLoginIP(ip_address=ip, attempts=ip_failure.attempts, last_attempt=timezone.now(),
+                               blocked_until=ip_failure.locked_until)],
+                update_conflicts=True, unique_fields=['ip_address'],
+                update_fields=['attempts', 'last_attempt', 'blocked_until'],
+            )
             # Log evento de bloqueo de IP
             if log_event:
                 log_event(user=None, request=request, action='ip_block', model_name='IP', object_id=None,
                           description=f"IP {ip} bloqueada por exceso de intentos")
-            
+
             # Notificación de bloqueo de IP
             if create_notification:
                 create_notification(
                     notification_type='ip_blocked',
                     severity='error',
                     title=f'IP bloqueada: {ip}',
-                    message=f'La IP {ip} ha sido bloqueada tras {IP_THRESHOLD} intentos fallidos',
+                    message=f'La IP {ip} ha sido bloqueada tras {ip_threshold} intentos fallidos',
                     user=None,
                     request=request,
-                    metadata={'ip_address': ip, 'lockout_minutes': IP_LOCK_MINUTES}
+                    metadata={'ip_address': ip, 'lockout_minutes': ip_lock_minutes}
                 )
-        ip_rec.save(update_fields=['attempts', 'last_attempt', 'blocked_until'])
 
-    # Si ya está bloqueado y aún dentro del periodo, no modificar
+    if not user:
+        return
+
+    # Si ya está bloqueado y aún dentro del periodo, no contar. El bloqueo solo
+    # consta en la fila (se vació el almacén): se anota en la request para que
+    # el login responda "bloqueada" también con contraseña incorrecta
     if user.locked_until and user.locked_until > timezone.now():
+        if request is not None:
+            request.login_locked_until = user.locked_until
+        lockout.restore_lock('user', username, user.locked_until)
+        return
+    failure = lockout.register_failure('user', username, lockout_threshold, lockout_minutes, window_minutes)
+    if failure.already_locked:
         return
 
-    user.failed_login_attempts = (user.failed_login_attempts or 0) + 1
-    if user.failed_login_attempts >= LOCKOUT_THRESHOLD:
-        user.locked_until = timezone.now() + timezone.timedelta(minutes=LOCKOUT_MINUTES)
-        user.failed_login_attempts = 0
-        # Log evento de bloqueo de usuario
-        if log_event:
-            log_event(user=user, request=request, action='user_lock', model_name='User', object_id=user.id,
-                      description=f"Usuario bloqueado por exceso de intentos")
-        
-        # Notificación crítica de bloqueo
-        if create_notification:
-            create_notification(
-                notification_type='user_locked',
-                severity='critical',
-                title=f'Usuario bloqueado: {username}',
-                message=f'El usuario {username} ha sido bloqueado automáticamente tras {LOCKOUT_THRESHOLD} intentos fallidos',
-                user=user,
-                request=request,
-                metadata={'ip_address': ip, 'lockout_minutes': LOCKOUT_MINUTES}
+    # Notificar a partir del tercer intento fallido
+    if create_notification and failure.attempts >= 3:
+        create_notification(
+            notification_type='failed_login',
+            severity='warning' if failure.attempts < lockout_threshold else 'error',
+            title=f'Múltiples intentos fallidos: {username}',
+            message=f'Se han detectado {failure.attempts} intentos fallidos de login para el usuario {username}',
+            user=user,
+            request=request,
+            metadata={'attempts': failure.attempts, 'threshold': lockout_threshold}
+        )
+
+    if not failure.locked_until:
+        return
+
+    user.failed_login_attempts = 0
+    user.locked_until = failure.locked_until
+    User.objects.filter(pk=user.pk).update(failed_login_attempts=0, locked_until=failure.locked_until)
+    # Log evento de bloqueo de usuario
+    if log_event:
+        log_event(user=user, request=request, action='user_lock', model_name='User', object_id=user.id,
+                  description=f"Usuario bloqueado por exceso de intentos")
+
+    # Notificación crítica de bloqueo
+    if create_notification:
+        create_notification(
+            notification_type='user_locked',
+            severity='critical',
+            title=f'Usuario bloqueado: {username}',
+            message=f'El usuario {username} ha sido bloqueado automáticamente tras {lockout_threshold} intentos fallidos',
+            user=user,
+            request=request,
+            metadata={'ip_address': ip, 'lockout_minutes': lockout_minutes}
+        )
+
+    # Notificar al usuario por email si tiene correo
+    try:
+        if user.email:
+            subject = 'Cuenta temporalmente bloqueada'
+            minutes = lockout_minutes
+            message = (
+                f"Su cuenta ha sido bloqueada temporalmente por exceso de intentos de inicio de sesión. "
+                f"El bloqueo durará aproximadamente {minutes} minutos. Si no reconoce esta actividad, "
+                "por favor contacte con soporte."
             )
-        
-        # Notificar al usuario por email si tiene correo
-        try:
-            if user.email:
-                subject = 'Cuenta temporalmente bloqueada'
-                minutes = LOCKOUT_MINUTES
-                message = (
-                    f"Su cuenta ha sido bloqueada temporalmente por exceso de intentos de inicio de sesión. "
-                    f"El bloqueo durará aproximadamente {minutes} minutos. Si no reconoce esta actividad, "
-                    "por favor contacte con soporte."
-                )
-                from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None) or f"no-reply@{settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'example.com'}"
-                send_mail(subject, message, from_email, [user.email], fail_silently=True)
-        except Exception:
-            # No interrumpir el flujo si el envío falla
-            pass
-    user.save(update_fields=['failed_login_attempts', 'locked_until'])
+            from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', None) or f"no-reply@{settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'example.com'}"
+            send_mail(subject, message, from_email, [user.email], fail_silently=True)
+    except Exception:
+        # No interrumpir el flujo si el envío falla
+        pass
 
 
 @receiver(user_logged_in)
 def handle_login_success(sender, request, user, **kwargs):
     """Resetear contador y lock al iniciar sesión correctamente."""
-    print(f"[handle_login_success] Signal recibido para usuario: {user.username if user else 'None'}")
     if not user:
         return
     
@@ -188,15 +219,14 @@ def handle_login_success(sender, request, user, **kwargs):
     if check_simultaneous_access and request:
         check_simultaneous_access(user, request)
     
-    user.failed_login_attempts = 0
-    user.locked_until = None
-    user.save(update_fields=['failed_login_attempts', 'locked_until'])
+    lockout.reset('user', user.username)
+    # Solo se escribe la fila si quedaba un bloqueo o un contador antiguo
+    if user.failed_login_attempts or user.locked_until:
+        user.failed_login_attempts = 0
+        user.locked_until = None
+        user.save(update_fields=['failed_login_attempts', 'locked_until'])
     
     # Log login exitoso
-    print(f"[handle_login_success] log_event disponible: {log_event is not None}")
     if log_event:
-        result = log_event(user=user, request=request, action='login_success', model_name='User', object_id=user.id,
+        log_event(user=user, request=request, action='login_success', model_name='User', object_id=user.id,
                   description=f"Login exitoso: {user.username}")
-        print(f"[handle_login_success] Resultado log_event: {result}")
-    else:
-        print("[handle_login_success] log_event is None, no se puede registrar")
@@ -1,3 +1,266 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from config.counter_store import get_store
+from requests import config_registry
+from requests.management.commands import bench_login
+from requests.models import SystemLog
+
+from . import lockout, password_history
+from .models import FailedLoginIP, PasswordHistory, User
+
+
+@override_settings(AUTH_LOCKOUT_THRESHOLD=3, AUTH_IP_LOCKOUT_THRESHOLD=5)
+class LoginLockoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alumno', password='Correcta.123', role='estudiante')
+
+    def setUp(self):
+        get_store().clear()
+        config_registry.registry.reset()
+
+    def login(self, username, password='incorrecta', ip='10.0.0.1'):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    def updates(self, queries, table, column):
+        return [q['sql'] for q in queries if q['sql'].startswith(f'UPDATE "{table}"') and f'"{column}"' in q['sql']]
+
+    def test_failures_are_counted_outside_the_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(2):
+                self.assertEqual(self.login('alumno').status_code, 400)
+        self.assertEqual(self.updates(queries, 'users', 'locked_until'), [])
+        self.assertFalse(FailedLoginIP.objects.exists())
+
+        # El intento que alcanza el umbral bloquea con un único UPDATE
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.login('alumno').status_code, 423)
+        self.assertEqual(len(self.updates(queries, 'users', 'locked_until')), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.locked_until)
+
+        response = self.login('alumno', 'Correcta.123', ip='10.0.0.2')
+        self.assertEqual(response.status_code, 423)
+        self.assertEqual(SystemLog.objects.filter(action='user_lock').count(), 1)
+
+    def test_successful_login_resets_the_counter(self):
+        self.login('alumno')
+        self.login('alumno')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.login('alumno', 'Correcta.123').status_code, 200)
+        self.assertEqual(self.updates(queries, 'users', 'locked_until'), [])
+        self.login('alumno')
+        self.login('alumno')
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.locked_until)
+
+    def test_lowering_the_threshold_mid_burst_locks(self):
+        with override_settings(AUTH_LOCKOUT_THRESHOLD=10):
+            for _ in range(4):
+                self.assertEqual(self.login('alumno').status_code, 400)
+        # Umbral rebajado en caliente (config_registry) con 4 fallos ya contados
+        self.assertEqual(self.login('alumno').status_code, 423)
+        self.assertEqual(self.login('alumno', 'Correcta.123').status_code, 423)
+        self.assertEqual(SystemLog.objects.filter(action='user_lock').count(), 1)
+
+    def test_row_lock_does_not_reveal_the_password(self):
+        # Bloqueo que solo consta en la fila (almacén de contadores vacío)
+        until = (timezone.now() + timedelta(minutes=5)).replace(microsecond=0)
+        User.objects.filter(pk=self.user.pk).update(locked_until=until)
+        correct = self.login('alumno', 'Correcta.123')
+        get_store().clear()
+        wrong = self.login('alumno', 'incorrecta')
+        self.assertEqual((correct.status_code, wrong.status_code), (423, 423))
+        self.assertEqual(correct.data, {**wrong.data, 'locked_until': correct.data['locked_until']})
+        # El bloqueo vuelve al almacén: el siguiente intento no llega a calcular el hash
+        self.assertEqual(lockout.locked_until('alumno')[0], until)
+
+    def test_ip_is_blocked_across_usernames(self):
+        for i in range(5):
+            self.login(f'inexistente{i}', ip='10.0.0.9')
+        blocked = FailedLoginIP.objects.get(ip_address='10.0.0.9')
+        self.assertIsNotNone(blocked.blocked_until)
+        response = self.login('alumno', 'Correcta.123', ip='10.0.0.9')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('IP', str(response.data))
+        self.assertEqual(self.login('alumno', 'Correcta.123', ip='10.0.0.10').status_code, 200)
+
+
+class PasswordHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alumno', password='Correcta.123', role='estudiante')
+
+    def test_saves_without_password_change_do_not_query(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            user.last_login = timezone.now()
+            user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            user.first_name = 'Ana'
+            user.save()
+        self.assertFalse(PasswordHistory.objects.exists())
+
+    def test_password_change_is_recorded(self):
+        hashes = [self.user.password]
+        user = User.objects.get(pk=self.user.pk)
+        user.set_password('Nueva.456')
+        user.save()
+        hashes.append(user.password)
+        user.set_password('Otra.789')
+        user.save(update_fields=['password'])
+        hashes.append(user.password)
+
+        # Instancia cargada sin la contraseña: se consulta el hash anterior
+        deferred = User.objects.only('username').get(pk=user.pk)
+        deferred.set_password('Ultima.000')
+        deferred.save()
+        self.assertEqual(list(PasswordHistory.objects.order_by('id').values_list('password', flat=True)), hashes)
+        self.assertTrue(deferred.is_password_reused('Nueva.456'))
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+                       PASSWORD_HISTORY_COUNT=10)
+    def test_history_is_checked_in_the_pool(self):
+        for i in range(12):
+            PasswordHistory.objects.create(user=self.user, password=make_password(f'anterior-{i}'))
+        self.user.password = make_password('Actual.123')
+        with mock.patch.object(password_history, '_executor', ThreadPoolExecutor(max_workers=3)) as executor:
+            self.addCleanup(executor.shutdown)
+            self.assertTrue(self.user.is_password_reused('anterior-5'))
+            self.assertTrue(self.user.is_password_reused('Actual.123'))
+            self.assertFalse(self.user.is_password_reused('anterior-0'))  # más allá de los 10 últimos
+            self.assertFalse(self.user.is_password_reused('nueva'))
+
+    def test_first_match_cancels_the_rest(self):
+        calls = []
+
+        def slow_check(raw_password, encoded):
+            calls.append(encoded)
+            time.sleep(0.01)
+            return encoded == 'h0'
+
+        with ThreadPoolExecutor(max_workers=1) as executor, \
+                mock.patch.object(password_history, 'check_password', slow_check):
+            self.assertTrue(password_history.matches_any('x', [f'h{i}' for i in range(6)], executor))
+        self.assertLess(len(calls), 6)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('bench_password_history', depths='2,3', repeat=1, workers=2, stdout=out)
+        self.assertIn('Benchmark terminado', out.getvalue())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginQueryBudgetTests(TestCase):
+    """Consultas por login dentro de `bench_login.QUERY_BUDGET` (auditoría síncrona)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='alumno', password='Correcta.123', role='estudiante')
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+        config_registry.registry.reset()
+        config_registry.get('WARMUP')  # la instantánea de configuración no cuenta
+
+    def test_each_path_stays_within_budget(self):
+        attempts = {
+            'success': ('Correcta.123', 200),
+            'failure': ('incorrecta', 400),
+            'locked': ('Correcta.123', 423),
+        }
+        for scenario, (password, status) in attempts.items():
+            with self.subTest(scenario):
+                if scenario == 'locked':
+                    lockout.reset('user', 'alumno')
+                    lockout.register_failure('user', 'alumno', threshold=1, lock_minutes=5, window_minutes=5)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.post('/api/auth/login/', {'username': 'alumno', 'password': password})
+                self.assertEqual(response.status_code, status)
+                self.assertLessEqual(len(queries), bench_login.QUERY_BUDGET[scenario],
+                                     [q['sql'][:80] for q in queries])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('bench_login', users=3, iterations=6, fast_hasher=True, enforce_budget=True, cleanup=True,
+                     stdout=out)
+        self.assertIn('Benchmark de login terminado', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith=bench_login.USERNAME_PREFIX).exists())
+
+
+# Hash rápido: aquí interesa la concurrencia, no el coste de PBKDF2
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConcurrentLoginFailureTests(TransactionTestCase):
+    """Logins fallidos en paralelo (un hilo y una conexión por petición)."""
+    PARALLEL = 12
+
+    def setUp(self):
+        User.objects.create_user(username='alumno', password='Correcta.123', role='estudiante')
+        config_registry.registry.reset()
+
+    def fire(self):
+        barrier = threading.Barrier(self.PARALLEL)
+        statuses = []
+
+        def attempt():
+            try:
+                barrier.wait()
+                response = Client().post('/api/auth/login/', {'username': 'alumno', 'password': 'mal'},
+                                         REMOTE_ADDR='10.0.0.1')
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(self.PARALLEL)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return statuses
+
+    def check_store(self, backend, location=''):
+        store_config = {'BACKEND': backend, 'LOCATION': location}
+        with override_settings(COUNTER_STORE=store_config, AUTH_IP_LOCKOUT_THRESHOLD=1000):
+            store = get_store()
+            with override_settings(AUTH_LOCKOUT_THRESHOLD=1000):
+                self.fire()
+            counts = store.get_many(['lockout:fails:user:alumno', 'lockout:fails:ip:10.0.0.1'])
+            self.assertEqual(counts, {'lockout:fails:user:alumno': self.PARALLEL, 'lockout:fails:ip:10.0.0.1': self.PARALLEL})
+
+            # Con el umbral dentro de la ráfaga se bloquea exactamente una vez
+            store.clear()
+            with override_settings(AUTH_LOCKOUT_THRESHOLD=5):
+                statuses = self.fire()
+            self.assertEqual(len(statuses), self.PARALLEL)
+            self.assertEqual(SystemLog.objects.filter(action='user_lock').count(), 1)
+            self.assertIsNotNone(User.objects.get(username='alumno').locked_until)
+            self.assertIsNotNone(store.get('lockout:locked:user:alumno'))
+
+    def test_database_store(self):
+        self.check_store('config.counter_store.DatabaseCounterStore')
+
+    def test_local_store(self):
+        self.check_store('config.counter_store.LocalCounterStore')
+
+    def test_sqlite_store(self):
+        # El almacén por defecto en producción (un archivo por servidor)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.check_store('config.counter_store.SQLiteCounterStore', f'{tmp.name}/counters.sqlite3')
@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import login, logout
+from . import lockout
 from .models import User
 from .serializers import (
     UserSerializer, UserCreateSerializer, UserUpdateSerializer,
@@ -13,6 +14,7 @@ from .serializers import (
 from .serializers import ResetPasswordSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from config.pagination import CreatedAtKeysetPagination
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -108,28 +110,30 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Listar solo estudiantes activos",
+        operation_description="Listar solo estudiantes activos (paginación por cursor)",
+        manual_parameters=[openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING)],
         responses={200: UserListSerializer(many=True)},
         tags=['Autenticación - Usuarios']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def estudiantes(self, request):
         """Listar solo estudiantes"""
-        estudiantes = User.objects.filter(role='estudiante', activo=True)
-        serializer = UserListSerializer(estudiantes, many=True)
-        return Response(serializer.data)
+        estudiantes = self.paginate_queryset(User.objects.filter(role='estudiante', activo=True))
+        serializer = UserListSerializer(estudiantes, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Listar solo tutores activos",
+        operation_description="Listar solo tutores activos (paginación por cursor)",
+        manual_parameters=[openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING)],
         responses={200: UserListSerializer(many=True)},
         tags=['Autenticación - Usuarios']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def tutores(self, request):
         """Listar solo tutores"""
-        tutores = User.objects.filter(role='tutor', activo=True)
-        serializer = UserListSerializer(tutores, many=True)
-        return Response(serializer.data)
+        tutores = self.paginate_queryset(User.objects.filter(role='tutor', activo=True))
+        serializer = UserListSerializer(tutores, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
         operation_description="Obtener estadísticas de usuarios",
@@ -345,20 +349,20 @@ class LoginView(generics.GenericAPIView):
         try:
             serializer.is_valid(raise_exception=True)
         except Exception:
-            # Si la validación falló, comprobar si la cuenta fue bloqueada en este momento
+            # Si la validación falló, comprobar si la cuenta está (o acaba de quedar) bloqueada:
+            # el serializer lo anota si lo detectó; si no, lo dice el almacén de contadores
             username = request.data.get('username')
             if username:
                 try:
-                    from authentication.models import User
                     from django.utils import timezone
-                    u = User.objects.filter(username=username).first()
-                    if u and u.locked_until and u.locked_until > timezone.now():
-                        remaining = (u.locked_until - timezone.now()).total_seconds()
+                    locked_until = serializer.locked_until or lockout.locked_until(username)[0]
+                    if locked_until and locked_until > timezone.now():
+                        remaining = (locked_until - timezone.now()).total_seconds()
                         minutes = int(remaining // 60) + (1 if remaining % 60 > 0 else 0)
                         return Response({
                             'detail': 'Cuenta temporalmente bloqueada.',
                             'locked_minutes': minutes,
-                            'locked_until': u.locked_until
+                            'locked_until': locked_until
                         }, status=423)
                 except Exception:
                     pass
@@ -602,60 +606,69 @@ class ProfileStatsView(generics.GenericAPIView):
         stats = {}
         
         if user.role == 'estudiante':
-            from publications.models import Publication
-            from requests.models import ECERequest
+            from requests.counters import ECE_REQUEST, PUBLICATION, total
+            from requests.models import StatusCounter
             
-            publicaciones = Publication.objects.filter(student=user)
-            solicitudes = ECERequest.objects.filter(student=user)
+            # Publicaciones y solicitudes del estudiante en una sola consulta de contadores
+            row = StatusCounter.objects.filter(student_id=user.pk).aggregate(
+                publicaciones_enviadas=total(entity=PUBLICATION),
+                publicaciones_aprobadas=total(entity=PUBLICATION, status='approved'),
+                publicaciones_rechazadas=total(entity=PUBLICATION, status='rejected'),
+                publicaciones_pendientes=total(entity=PUBLICATION, status='pending'),
+                solicitudes_enviadas=total(entity=ECE_REQUEST),
+                solicitudes_aprobadas=total(entity=ECE_REQUEST, status='aprobada'),
+                solicitudes_rechazadas=total(entity=ECE_REQUEST, status='rechazada'),
+            )
             
-            stats = {
-                'publicaciones_enviadas': publicaciones.count(),
-                'publicaciones_aprobadas': publicaciones.filter(status='approved').count(),
-                'publicaciones_rechazadas': publicaciones.filter(status='rejected').count(),
-                'publicaciones_pendientes': publicaciones.filter(status='pending').count(),
-                'solicitudes_enviadas': solicitudes.count(),
-                'solicitudes_aprobadas': solicitudes.filter(status='aprobada').count(),
-                'solicitudes_rechazadas': solicitudes.filter(status='rechazada').count(),
-                'rechazos_totales': publicaciones.filter(status='rejected').count() + solicitudes.filter(status='rechazada').count()
-            }
+            stats = dict(row)
+            stats['rechazos_totales'] = stats['publicaciones_rechazadas'] + stats['solicitudes_rechazadas']
         
         elif user.role == 'tutor':
-            from publications.models import TutorStudent, TutorOpinion, Publication
+            from publications.models import TutorStudent, TutorOpinion
+            from publications.stats import publication_counters
             
             alumnos = TutorStudent.objects.filter(tutor=user, is_active=True)
-            student_ids = alumnos.values_list('student_id', flat=True)
-            publicaciones_alumnos = Publication.objects.filter(student_id__in=student_ids)
+            publicaciones_alumnos = publication_counters(user)['by_status']
             
             stats = {
                 'total_alumnos': alumnos.count(),
                 'alumnos_activos': alumnos.filter(is_active=True).count(),
-                'solicitudes_pendientes': publicaciones_alumnos.filter(status='pending').count(),
+                'solicitudes_pendientes': publicaciones_alumnos['pending'],
                 'opiniones_emitidas': TutorOpinion.objects.filter(tutor=user).count()
             }
         
         elif user.role == 'jefe':
             from publications.models import Publication
-            from requests.models import ECERequest
+            from requests.counters import ECE_REQUEST, PUBLICATION, total
+            from requests.models import ECERequest, StatusCounter
             
+            pendientes = StatusCounter.objects.filter(status__in=['pending', 'pendiente']).aggregate(
+                publicaciones=total(entity=PUBLICATION, status='pending'),
+                solicitudes=total(entity=ECE_REQUEST, status='pendiente'),
+            )
             stats = {
-                'publicaciones_pendientes': Publication.objects.filter(status='pending').count(),
-                'solicitudes_pendientes': ECERequest.objects.filter(status='pendiente').count(),
+                'publicaciones_pendientes': pendientes['publicaciones'],
+                'solicitudes_pendientes': pendientes['solicitudes'],
                 'publicaciones_revisadas': Publication.objects.filter(reviewed_by=user).count(),
                 'solicitudes_revisadas': ECERequest.objects.filter(reviewed_by=user).count()
             }
         
         elif user.role == 'admin':
-            from publications.models import Publication
-            from requests.models import ECERequest
+            from requests.counters import ECE_REQUEST, PUBLICATION, total
+            from requests.models import StatusCounter
             
+            totales = StatusCounter.objects.aggregate(
+                publicaciones=total(entity=PUBLICATION),
+                solicitudes=total(entity=ECE_REQUEST),
+            )
             total_users = User.objects.count()
             stats = {
                 'total_usuarios': total_users,
                 'total_estudiantes': User.objects.filter(role='estudiante').count(),
                 'total_tutores': User.objects.filter(role='tutor').count(),
                 'total_jefes': User.objects.filter(role='jefe').count(),
-                'total_publicaciones': Publication.objects.count(),
-                'total_solicitudes': ECERequest.objects.count()
+                'total_publicaciones': totales['publicaciones'],
+                'total_solicitudes': totales['solicitudes']
             }
         
         return Response(stats, status=status.HTTP_200_OK)
\ No newline at end of file
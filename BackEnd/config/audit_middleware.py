@@ -12,7 +12,7 @@ class AuditMiddleware(MiddlewareMixin):
     Middleware que registra:
     - Errores del sistema (500)
     - Errores de BD
-    - Intentos de acceso no autorizado (403, 401)
+    - Intentos de acceso no autorizado (403, 401), agrupados y fuera de la petición
     """
     
     def process_exception(self, request, exception):
@@ -71,49 +71,17 @@ class AuditMiddleware(MiddlewareMixin):
         return None
     
     def process_response(self, request, response):
-        """Capturar respuestas 401/403 (acceso no autorizado)"""
+        """Capturar respuestas 401/403 (acceso no autorizado)
+
+        Solo se anotan en memoria: `requests.access_audit` agrupa las
+        repeticiones por (usuario, ruta, estado), aplica el muestreo y escribe
+        el log (y la notificación de los 403) fuera de la petición.
+        """
         if response.status_code in [401, 403]:
             try:
-                from requests.utils import log_event, create_notification
-                
-                user = getattr(request, 'user', None)
-                if user and not user.is_authenticated:
-                    user = None
-                
-                # Determinar si es acceso denegado o no autenticado
-                status_desc = {
-                    401: 'No autenticado',
-                    403: 'Acceso denegado'
-                }
-                
-                description = (
-                    f"{status_desc.get(response.status_code, 'Acceso no autorizado')}\n"
-                    f"Path: {request.path}\n"
-                    f"Method: {request.method}\n"
-                    f"User: {user.username if user else 'Anonymous'}"
-                )
-                
-                log_event(
-                    user=user,
-                    request=request,
-                    action='unauthorized_attempt',
-                    model_name='Access',
-                    object_id=None,
-                    description=description
-                )
-                
-                # Notificación para intentos no autorizados (solo 403, no 401)
-                if response.status_code == 403 and create_notification:
-                    create_notification(
-                        notification_type='unauthorized_attempt',
-                        severity='warning',
-                        title=f'Acceso denegado: {request.path}',
-                        message=f'Usuario {user.username if user else "anónimo"} intentó acceder a {request.path}',
-                        user=user,
-                        request=request,
-                        metadata={'path': request.path, 'method': request.method}
-                    )
-                
+                from requests.access_audit import get_aggregator
+
+                get_aggregator().record(request, response.status_code)
             except Exception as log_error:
                 # No interrumpir el flujo
                 print(f"Error al registrar intento no autorizado: {log_error}")
@@ -0,0 +1,460 @@
+"""
+Contadores compartidos entre workers con incremento atómico y caducidad.
+
+Sirve para estado efímero que se actualiza en ráfagas (intentos de login
+fallidos, límites de peticiones): en lugar de leer, sumar y guardar una fila
+de PostgreSQL en cada intento, `incr()` suma de forma atómica en un almacén
+compartido por todos los procesos y la clave desaparece sola al caducar.
+
+El backend se elige con `COUNTER_STORE` (como `CACHES`)::
+
+    COUNTER_STORE = {
+        'BACKEND': 'config.counter_store.SQLiteCounterStore',
+        'LOCATION': '/ruta/a/counters.sqlite3',
+    }
+
+- `RedisCounterStore`: Redis (o compatible); compartido entre servidores.
+  Necesita el paquete `redis`. `LOCATION` es la URL (`redis://...`).
+- `DatabaseCounterStore`: tabla `shared_counters` de PostgreSQL; compartido
+  entre servidores sin servicios adicionales (un `UPSERT` por operación).
+- `SQLiteCounterStore`: archivo SQLite en modo WAL; compartido entre los
+  workers de un mismo servidor.
+- `LocalCounterStore`: memoria del proceso (tests y desarrollo).
+
+Los valores son enteros; `ttl` en segundos (`None`: sin caducidad). El TTL de
+`incr()` se fija al crear la clave (ventana fija desde el primer incremento).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.utils.module_loading import import_string
+
+
+class BaseCounterStore:
+
+    def __init__(self, location='', options=None):
+        self.location = location
+        self.options = options or {}
+
+    def incr(self, key, ttl=None, delta=1):
+        """Sumar `delta` y devolver el nuevo valor (crea la clave con `ttl` si no existe)."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """`{clave: valor}` de las claves que existen y no han caducado."""
+        raise NotImplementedError
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        """Fijar `key` solo si no existe (o ha caducado). Devuelve si se fijó."""
+        raise NotImplementedError
+
+    def incr_or_lock(self, key, lock_key, threshold, lock_value, ttl=None, lock_ttl=None):
+        """
+        Sumar 1 a `key` salvo que exista `lock_key`; el incremento que llega
+        a `threshold` (o lo supera: el umbral puede bajar en caliente) fija
+        `lock_key = lock_value` y borra `key`.
+
+        Devuelve `(valor de key, valor de lock_key)`: `(None, bloqueo)` si ya
+        estaba bloqueado, `(valor, lock_value)` si este incremento bloquea y
+        `(valor, None)` en otro caso. Con incrementos concurrentes solo uno
+        bloquea: el que crea `lock_key` (`add`). Los backends pueden hacerlo
+        en una sola operación.
+        """
+        locked = self.get(lock_key)
+        if locked is not None:
+            return None, locked
+        value = self.incr(key, ttl=ttl)
+        if value < threshold:
+            return value, None
+        self.delete(key)
+        if not self.add(lock_key, lock_value, ttl=lock_ttl):
+            # Otro incremento concurrente ya bloqueó
+            return value, None
+        return value, lock_value
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class LocalCounterStore(BaseCounterStore):
+    """Diccionario en memoria con un cerrojo: atómico solo dentro del proceso."""
+
+    def __init__(self, location='', options=None):
+        super().__init__(location, options)
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def _alive(self, key, now):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def incr(self, key, ttl=None, delta=1):
+        with self._lock:
+            now = time.monotonic()
+            entry = self._alive(key, now)
+            if entry is None:
+                entry = (0, now + ttl if ttl else None)
+            value = entry[0] + delta
+            self._data[key] = (value, entry[1])
+            return value
+
+    def get_many(self, keys):
+        with self._lock:
+            now = time.monotonic()
+            return {key: entry[0] for key in keys if (entry := self._alive(key, now)) is not None}
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (int(value), time.monotonic() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            now = time.monotonic()
+            if self._alive(key, now) is not None:
+                return False
+            self._data[key] = (int(value), now + ttl if ttl else None)
+            return True
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteCounterStore(BaseCounterStore):
+    """
+    Tabla `counters(key, value, expires_at)` en un archivo SQLite.
+
+    Cada `incr()` es una sola sentencia `INSERT ... ON CONFLICT DO UPDATE ...
+    RETURNING` (SQLite >= 3.35): atómica entre procesos sin leer antes. Las
+    claves caducadas se reinician al incrementarlas y se purgan cada
+    `PURGE_EVERY` escrituras. `incr_or_lock()` va en una transacción
+    `BEGIN IMMEDIATE` (toma el cerrojo de escritura al empezar): leer el
+    bloqueo, incrementar y bloquear es un solo paso también entre procesos.
+    """
+    PURGE_EVERY = 1000
+    BUSY_TIMEOUT = 5  # segundos esperando el cerrojo de escritura
+
+    _INCR_SQL = (
+        "INSERT INTO counters (key, value, expires_at) VALUES (?1, ?2, ?3) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "value = CASE WHEN counters.expires_at <= ?4 THEN excluded.value ELSE counters.value + excluded.value END, "
+        "expires_at = CASE WHEN counters.expires_at <= ?4 THEN excluded.expires_at ELSE counters.expires_at END "
+        "RETURNING value"
+    )
+    _SET_SQL = (
+        "INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+    )
+
+    def __init__(self, location='', options=None):
+        super().__init__(location, options)
+        if not location:
+            raise ImproperlyConfigured('SQLiteCounterStore necesita LOCATION (ruta del archivo)')
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.location)), exist_ok=True)
+            # Modo autocommit: cada sentencia es su propia transacción
+            connection = sqlite3.connect(self.location, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS counters '
+                '(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def _expires_at(self, ttl):
+        # NULL no es `<= ahora`: sin caducidad
+        return time.time() + ttl if ttl else None
+
+    def _after_write(self, connection):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute('DELETE FROM counters WHERE expires_at <= ?', [time.time()])
+
+    def incr(self, key, ttl=None, delta=1):
+        connection = self._connection()
+        params = [key, delta, self._expires_at(ttl), time.time()]
+        value = connection.execute(self._INCR_SQL, params).fetchone()[0]
+        self._after_write(connection)
+        return value
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection().execute(
+            f'SELECT key, value FROM counters WHERE key IN ({placeholders}) '
+            f'AND (expires_at IS NULL OR expires_at > ?)',
+            [*keys, time.time()],
+        )
+        return dict(rows.fetchall())
+
+    def set(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute(self._SET_SQL, [key, int(value), self._expires_at(ttl)])
+        self._after_write(connection)
+
+    def add(self, key, value, ttl=None):
+        connection = self._connection()
+        row = connection.execute(
+            'INSERT INTO counters (key, value, expires_at) VALUES (?1, ?2, ?3) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at '
+            'WHERE counters.expires_at <= ?4 RETURNING 1',
+            [key, int(value), self._expires_at(ttl), time.time()],
+        ).fetchone()
+        self._after_write(connection)
+        return row is not None
+
+    def incr_or_lock(self, key, lock_key, threshold, lock_value, ttl=None, lock_ttl=None):
+        connection = self._connection()
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            locked = connection.execute(
+                'SELECT value FROM counters WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)',
+                [lock_key, now],
+            ).fetchone()
+            if locked is not None:
+                result = None, locked[0]
+            else:
+                value = connection.execute(self._INCR_SQL, [key, 1, self._expires_at(ttl), now]).fetchone()[0]
+                if value < threshold:
+                    result = value, None
+                else:
+                    connection.execute('DELETE FROM counters WHERE key = ?', [key])
+                    connection.execute(self._SET_SQL, [lock_key, int(lock_value), self._expires_at(lock_ttl)])
+                    result = value, lock_value
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._after_write(connection)
+        return result
+
+    def delete(self, *keys):
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._connection().execute(f'DELETE FROM counters WHERE key IN ({placeholders})', keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM counters')
+
+
+class DatabaseCounterStore(BaseCounterStore):
+    """
+    Tabla `shared_counters` (`requests.SharedCounter`) de la base de datos
+    `LOCATION` (alias, por defecto `default`).
+
+    Cada `incr()` es un único `INSERT ... ON CONFLICT DO UPDATE ... RETURNING`:
+    PostgreSQL serializa los incrementos concurrentes de una misma clave sobre
+    la fila, sin leer antes ni perder ninguno. Se usa `clock_timestamp()` y no
+    `now()` para que la caducidad no dependa del inicio de la transacción.
+
+    `incr_or_lock()` también es una sola sentencia (CTE): lee el bloqueo,
+    incrementa y, si se alcanza o supera el umbral, escribe el bloqueo (salvo
+    que otra sentencia concurrente acabe de escribirlo). La clave del
+    contador no se borra (no se puede modificar dos veces la misma fila en una
+    sentencia): al llegar al umbral se marca caducada, que equivale a borrarla.
+    """
+    PURGE_EVERY = 1000
+
+    _INCR_SQL = (
+        "INSERT INTO shared_counters (key, value, expires_at) "
+        "VALUES (%(key)s, %(delta)s, clock_timestamp() + make_interval(secs => %(ttl)s)) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "value = CASE WHEN shared_counters.expires_at <= clock_timestamp() "
+        "THEN EXCLUDED.value ELSE shared_counters.value + EXCLUDED.value END, "
+        "expires_at = CASE WHEN shared_counters.expires_at <= clock_timestamp() "
+        "THEN EXCLUDED.expires_at ELSE shared_counters.expires_at END "
+        "RETURNING value"
+    )
+    _SET_SQL = (
+        "INSERT INTO shared_counters (key, value, expires_at) "
+        "VALUES (%(key)s, %(value)s, clock_timestamp() + make_interval(secs => %(ttl)s)) "
+        "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at"
+    )
+    _ADD_SQL = _SET_SQL + " WHERE shared_counters.expires_at <= clock_timestamp() RETURNING 1"
+
+    _INCR_OR_LOCK_SQL = (
+        "WITH locked AS ("
+        "SELECT value FROM shared_counters WHERE key = %(lock_key)s "
+        "AND (expires_at IS NULL OR expires_at > clock_timestamp())"
+        "), counted AS ("
+        "INSERT INTO shared_counters (key, value, expires_at) "
+        "SELECT %(key)s, 1, CASE WHEN 1 >= %(threshold)s THEN clock_timestamp() "
+        "ELSE clock_timestamp() + make_interval(secs => %(ttl)s) END "
+        "WHERE NOT EXISTS (SELECT 1 FROM locked) "
+        "ON CONFLICT (key) DO UPDATE SET "
+        "value = CASE WHEN shared_counters.expires_at <= clock_timestamp() "
+        "THEN 1 ELSE shared_counters.value + 1 END, "
+        "expires_at = CASE "
+        "WHEN shared_counters.expires_at <= clock_timestamp() AND 1 >= %(threshold)s THEN clock_timestamp() "
+        "WHEN shared_counters.expires_at <= clock_timestamp() "
+        "THEN clock_timestamp() + make_interval(secs => %(ttl)s) "
+        "WHEN shared_counters.value + 1 >= %(threshold)s THEN clock_timestamp() "
+        "ELSE shared_counters.expires_at END "
+        "RETURNING value"
+        "), locking AS ("
+        "INSERT INTO shared_counters (key, value, expires_at) "
+        "SELECT %(lock_key)s, %(lock_value)s, clock_timestamp() + make_interval(secs => %(lock_ttl)s) "
+        "FROM counted WHERE value >= %(threshold)s "
+        "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, expires_at = EXCLUDED.expires_at "
+        "WHERE shared_counters.expires_at <= clock_timestamp() "
+        "RETURNING value"
+        ") "
+        "SELECT (SELECT value FROM counted), "
+        "coalesce((SELECT value FROM locked), (SELECT value FROM locking))"
+    )
+
+    def __init__(self, location='', options=None):
+        super().__init__(location or 'default', options)
+        self._writes = 0
+
+    def _execute(self, sql, params):
+        from django.db import connections
+        with connections[self.location].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._execute('DELETE FROM shared_counters WHERE expires_at <= clock_timestamp()', [])
+
+    def incr(self, key, ttl=None, delta=1):
+        # Sin `ttl`, `make_interval(NULL)` deja `expires_at` a NULL (sin caducidad)
+        value = self._execute(self._INCR_SQL, {'key': key, 'delta': delta, 'ttl': ttl})[0][0]
+        self._after_write()
+        return value
+
+    def incr_or_lock(self, key, lock_key, threshold, lock_value, ttl=None, lock_ttl=None):
+        params = {'key': key, 'lock_key': lock_key, 'threshold': threshold, 'lock_value': int(lock_value),
+                  'ttl': ttl, 'lock_ttl': lock_ttl}
+        value, locked = self._execute(self._INCR_OR_LOCK_SQL, params)[0]
+        self._after_write()
+        return value, locked
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._execute(
+            'SELECT key, value FROM shared_counters WHERE key = ANY(%s) '
+            'AND (expires_at IS NULL OR expires_at > clock_timestamp())',
+            [keys],
+        )
+        return dict(rows)
+
+    def set(self, key, value, ttl=None):
+        self._execute(self._SET_SQL, {'key': key, 'value': int(value), 'ttl': ttl})
+        self._after_write()
+
+    def add(self, key, value, ttl=None):
+        rows = self._execute(self._ADD_SQL, {'key': key, 'value': int(value), 'ttl': ttl})
+        self._after_write()
+        return bool(rows)
+
+    def delete(self, *keys):
+        if keys:
+            self._execute('DELETE FROM shared_counters WHERE key = ANY(%s)', [list(keys)])
+
+    def clear(self):
+        self._execute('DELETE FROM shared_counters', [])
+
+
+class RedisCounterStore(BaseCounterStore):
+    """`INCRBY` + `EXPIRE ... NX` en un pipeline transaccional (un viaje de red)."""
+
+    def __init__(self, location='', options=None):
+        super().__init__(location, options)
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured('RedisCounterStore necesita el paquete "redis" (pip install redis)')
+        self.prefix = self.options.get('KEY_PREFIX', 'counters:')
+        self.client = redis.Redis.from_url(location or 'redis://localhost:6379/0')
+
+    def incr(self, key, ttl=None, delta=1):
+        key = self.prefix + key
+        pipe = self.client.pipeline(transaction=True)
+        pipe.incrby(key, delta)
+        if ttl:
+            # Solo si la clave aún no tiene caducidad (la acaba de crear INCRBY)
+            pipe.expire(key, int(ttl), nx=True)
+        return pipe.execute()[0]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.client.mget([self.prefix + key for key in keys])
+        return {key: int(value) for key, value in zip(keys, values) if value is not None}
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, int(value), ex=int(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, int(value), ex=int(ttl) if ttl else None, nx=True))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Instancia (única por proceso) del backend de `COUNTER_STORE`."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                config = settings.COUNTER_STORE
+                backend = import_string(config['BACKEND'])
+                _store = backend(config.get('LOCATION', ''), config.get('OPTIONS'))
+    return _store
+
+
+def reset_store(*, setting, **kwargs):
+    global _store
+    if setting == 'COUNTER_STORE':
+        _store = None
+
+
+setting_changed.connect(reset_store, dispatch_uid='config.counter_store.reset_store')
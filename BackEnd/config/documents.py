@@ -0,0 +1,221 @@
+"""
+Extracción de texto, número de páginas y miniatura de documentos.
+
+La extracción no usa Django ni la base de datos: `manage.py
+run_document_worker` la ejecuta en un pool de procesos y guarda el resultado
+en la fila (`requests/document_jobs.py`).
+
+- PDF: texto y páginas con `pypdf`. La miniatura de la primera página se
+  renderiza con `pdftoppm` (poppler-utils) si está instalado; si no, se usa
+  la imagen incrustada más grande de esa página (PDF escaneados) y, si no hay
+  ninguna, el documento queda sin miniatura.
+- DOCX: texto de `word/document.xml`, páginas de `docProps/app.xml` y la
+  miniatura que guarda Word en `docProps/thumbnail.jpeg`, si existe.
+- DOC (Word 97-2003): no se procesa (`UnsupportedDocument`).
+"""
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+
+PREVIEW_STATUS_CHOICES = (
+    ('', 'Sin archivo'),
+    ('pending', 'Pendiente'),
+    ('ready', 'Lista'),
+    ('unavailable', 'No disponible'),
+    ('failed', 'Error'),
+)
+
+THUMBNAIL_FORMAT = 'JPEG'
+THUMBNAIL_EXTENSION = '.jpg'
+PDFTOPPM_TIMEOUT = 60  # segundos
+EXCERPT_LENGTH = 1000
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+APP_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}'
+
+
+class UnsupportedDocument(Exception):
+    """El formato no admite vista previa (no se reintenta)."""
+
+
+class DocumentPreviewMixin:
+    """
+    Modelos con archivo y vista previa (`Publication`, `ECERequest`).
+
+    Los campos de la vista previa solo los escribe el worker con `UPDATE`; un
+    `save()` que no cambia el archivo (revisión, edición de metadatos) no los
+    incluye, para no pisar con valores leídos antes un resultado recién guardado.
+    """
+    PREVIEW_FIELDS = ('preview_status', 'page_count', 'thumbnail', 'text_content')
+
+    def save(self, *args, **kwargs):
+        if (kwargs.get('update_fields') is None and not kwargs.get('force_insert')
+                and not self._state.adding and not self.file_changed()):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PREVIEW_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    def file_changed(self):
+        if 'file' in self.get_deferred_fields():
+            return False
+        return (not self.file._committed
+                or (self.file.name or '') != getattr(self, '_loaded_file_name', ''))
+
+
+def text_excerpt(obj, length=EXCERPT_LENGTH):
+    """Comienzo del texto extraído, para hojear el documento sin descargarlo."""
+    text = obj.text_content
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '…'
+
+
+def extract_document(path, text_max_chars, thumbnail_width):
+    """`{'text', 'page_count', 'thumbnail'}` del documento; `thumbnail` son bytes JPEG o None."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.pdf':
+        return extract_pdf(path, text_max_chars, thumbnail_width)
+    if extension == '.docx':
+        return extract_docx(path, text_max_chars, thumbnail_width)
+    raise UnsupportedDocument(f'Formato sin vista previa: {extension or "desconocido"}')
+
+
+# ----------------------------------------------------------------------
+# PDF
+# ----------------------------------------------------------------------
+def extract_pdf(path, text_max_chars, thumbnail_width):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError('pypdf no está instalado')
+
+    reader = PdfReader(path)
+    if reader.is_encrypted:
+        reader.decrypt('')  # muchos PDF solo tienen contraseña de propietario
+    pages = reader.pages
+
+    parts, length = [], 0
+    for page in pages:
+        if length >= text_max_chars:
+            break
+        text = (page.extract_text() or '').strip()
+        if text:
+            parts.append(text)
+            length += len(text) + 2
+
+    thumbnail = render_first_page(path, thumbnail_width)
+    if thumbnail is None and len(pages):
+        thumbnail = largest_embedded_image(pages[0], thumbnail_width)
+    return {
+        'text': clean_text('\n\n'.join(parts), text_max_chars),
+        'page_count': len(pages),
+        'thumbnail': thumbnail,
+    }
+
+
+def render_first_page(path, width):
+    """Primera página como JPEG con `pdftoppm` (None si no está disponible o falla)."""
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, 'page')
+        try:
+            subprocess.run(
+                [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-jpeg',
+                 '-scale-to-x', str(width), '-scale-to-y', '-1', path, prefix],
+                check=True, capture_output=True, timeout=PDFTOPPM_TIMEOUT,
+            )
+            with open(prefix + '.jpg', 'rb') as output:
+                return output.read()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+
+def largest_embedded_image(page, width):
+    best, best_area = None, 0
+    try:
+        for embedded in page.images:
+            image = embedded.image
+            area = image.width * image.height
+            if area > best_area:
+                best, best_area = image, area
+    except Exception:
+        # Filtros de imagen no soportados por pypdf/Pillow: sin miniatura
+        return None
+    return make_thumbnail(best, width) if best is not None else None
+
+
+# ----------------------------------------------------------------------
+# DOCX
+# ----------------------------------------------------------------------
+def extract_docx(path, text_max_chars, thumbnail_width):
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        if 'word/document.xml' not in names:
+            raise UnsupportedDocument('DOCX sin word/document.xml')
+
+        paragraphs, current, length = [], [], 0
+        with archive.open('word/document.xml') as document:
+            for _, element in ElementTree.iterparse(document):
+                if element.tag == WORD_NS + 't' and element.text:
+                    current.append(element.text)
+                elif element.tag == WORD_NS + 'p':
+                    text = ''.join(current).strip()
+                    current = []
+                    if text:
+                        paragraphs.append(text)
+                        length += len(text) + 1
+                        if length >= text_max_chars:
+                            break
+                    element.clear()
+
+        page_count = None
+        if 'docProps/app.xml' in names:
+            pages = ElementTree.fromstring(archive.read('docProps/app.xml')).find(APP_NS + 'Pages')
+            if pages is not None and (pages.text or '').isdigit():
+                page_count = int(pages.text)
+
+        thumbnail = None
+        if 'docProps/thumbnail.jpeg' in names:
+            thumbnail = thumbnail_from_bytes(archive.read('docProps/thumbnail.jpeg'), thumbnail_width)
+
+    return {
+        'text': clean_text('\n'.join(paragraphs), text_max_chars),
+        'page_count': page_count,
+        'thumbnail': thumbnail,
+    }
+
+
+# ----------------------------------------------------------------------
+# Utilidades
+# ----------------------------------------------------------------------
+def clean_text(text, max_chars):
+    # PostgreSQL no admite NUL en columnas de texto
+    return text.replace('\x00', '')[:max_chars]
+
+
+def thumbnail_from_bytes(data, width):
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return make_thumbnail(image, width)
+    except (UnidentifiedImageError, OSError):
+        return None
+
+
+def make_thumbnail(image, width):
+    """Reducir a `width` px de ancho (como mucho el doble de alto) y codificar en JPEG."""
+    image = image.convert('RGB')
+    image.thumbnail((width, width * 2))
+    output = io.BytesIO()
+    image.save(output, THUMBNAIL_FORMAT, quality=80, optimize=True)
+    return output.getvalue()
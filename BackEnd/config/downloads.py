@@ -0,0 +1,288 @@
+"""
+Descarga protegida de los archivos de publicaciones y solicitudes ECE.
+
+`file_url` ya no apunta a `/media/` sino a `/api/<recurso>/<id>/download/`
+con un `token` firmado: el serializer solo lo emite para objetos que el
+usuario puede ver (el `get_queryset` de la vista), así que el enlace sirve
+como `<a href>` sin cabecera `Authorization` y el visor PDF del navegador
+puede pedir rangos. El token caduca en `FILE_DOWNLOAD_URL_MAX_AGE` segundos
+(redondeado a ventanas fijas para que la URL sea estable y cacheable). Sin
+token la vista exige JWT y aplica el `get_queryset` del rol.
+
+El token va ligado al usuario al que se emitió: la descarga vuelve a aplicar
+el `get_queryset` con ese usuario, así que deja de valer si se desactiva la
+cuenta o pierde acceso a la fila. Aun así es un enlace al portador: quien lo
+tenga puede descargar el archivo hasta que caduque.
+
+La transferencia de bytes se delega en el proxy según `FILE_DOWNLOAD_BACKEND`:
+
+- `x-accel-redirect` (nginx)::
+
+      location /protected-media/ {
+          internal;
+          alias /ruta/a/BackEnd/media/;
+      }
+
+- `x-sendfile` (Apache mod_xsendfile, lighttpd).
+- vacío: `FileResponse` desde Python, con `Range`, `ETag` e `If-None-Match`.
+
+En producción `/media/` no debe servirse directamente.
+"""
+import base64
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import time
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import content_disposition_header, parse_etags, quote_etag
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+SIGNING_SALT = 'config.downloads.token'
+TOKEN_QUERY_PARAM = 'token'
+
+# Basename del router de cada modelo (la ruta es `<basename>-download` / `-thumbnail`)
+ROUTE_BASENAMES = {
+    'publications.publication': 'publication',
+    'requests.ecerequest': 'ece-request',
+}
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_BLOCK = 64 * 1024
+
+
+# ----------------------------------------------------------------------
+# URLs firmadas
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def _signing_key(secret_key):
+    return hashlib.sha256(f'{SIGNING_SALT}:{secret_key}'.encode()).digest()
+
+
+def _signature(label, pk, user_id, expires):
+    message = f'{label}:{pk}:{user_id}:{expires}'.encode()
+    digest = hmac.new(_signing_key(settings.SECRET_KEY), message, hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+
+def _token_expiry():
+    window = settings.FILE_DOWNLOAD_URL_MAX_AGE
+    return (int(time.time()) // window + 2) * window
+
+
+def download_token(obj, user_id, expires=None):
+    """`<caducidad hex>.<usuario hex>.<HMAC truncado>` (se firma por cada fila: debe ser barato)."""
+    expires = expires or _token_expiry()
+    return f'{expires:x}.{user_id:x}.{_signature(obj._meta.label_lower, obj.pk, user_id, expires)}'
+
+
+def token_user_id(token, label, pk):
+    """Usuario al que se emitió `token` para la fila `pk` de `label` (None si no vale o caducó)."""
+    try:
+        expires_hex, user_hex, signature = token.split('.')
+        expires, user_id = int(expires_hex, 16), int(user_hex, 16)
+    except ValueError:
+        return None
+    expected = _signature(label, pk, user_id, expires)
+    if not hmac.compare_digest(signature, expected) or expires <= time.time():
+        return None
+    return user_id
+
+
+@lru_cache(maxsize=None)
+def _download_path_parts(url_name):
+    return reverse(url_name, args=['__pk__']).split('__pk__')
+
+
+def signed_url(obj, action, request=None, expires=None, user=None):
+    user = user or getattr(request, 'user', None)
+    user_id = user.pk if user is not None and user.is_authenticated else 0
+    before, after = _download_path_parts(f'{ROUTE_BASENAMES[obj._meta.label_lower]}-{action}')
+    url = f"{before}{obj.pk}{after}?{TOKEN_QUERY_PARAM}={download_token(obj, user_id, expires)}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def download_url(obj, request=None, expires=None, user=None):
+    """URL firmada (para el usuario de `request` o `user`) del archivo de `obj` (None si no tiene)."""
+    if not obj.file:
+        return None
+    return signed_url(obj, 'download', request, expires, user)
+
+
+def thumbnail_url(obj, request=None, expires=None, user=None):
+    """URL firmada de la miniatura de la primera página (None si aún no hay)."""
+    if not obj.thumbnail:
+        return None
+    return signed_url(obj, 'thumbnail', request, expires, user)
+
+
+# ----------------------------------------------------------------------
+# Respuestas
+# ----------------------------------------------------------------------
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """(inicio, fin) inclusivos de un `Range: bytes=` simple, o None para enviar todo."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # rangos múltiples o mal formados: respuesta completa
+    first, last = match.groups()
+    if first == '':
+        if last == '':
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def read_range(handle, start, length):
+    try:
+        handle.seek(start)
+        while length > 0:
+            block = handle.read(min(STREAM_BLOCK, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        handle.close()
+
+
+def file_response(request, field_file, etag=None, as_attachment=False):
+    """Respuesta de descarga de `field_file` (proxy o Python con rangos)."""
+    try:
+        stat = os.stat(field_file.path)
+    except (OSError, NotImplementedError):
+        raise Http404('Archivo no encontrado')
+    size = stat.st_size
+    etag = quote_etag(etag or f'{size:x}-{int(stat.st_mtime):x}')
+    filename = os.path.basename(field_file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    backend = settings.FILE_DOWNLOAD_BACKEND
+    if backend == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(settings.FILE_DOWNLOAD_ACCEL_PREFIX + field_file.name)
+    elif backend == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = field_file.path
+    else:
+        response = python_file_response(request, field_file, size, etag, content_type)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    return response
+
+
+def python_file_response(request, field_file, size, etag, content_type):
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    handle = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        return FileResponse(handle, content_type=content_type)
+
+    start, end = byte_range
+    response = StreamingHttpResponse(read_range(handle, start, end - start + 1),
+                                     status=status.HTTP_206_PARTIAL_CONTENT, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+class FileDownloadMixin:
+    """
+    Acciones `download` y `thumbnail` para ViewSets de modelos con `file`
+    (y `file_sha256`, `thumbnail`).
+
+    Con `?token=` válido no exigen autenticación; sin él aplican la
+    autenticación y el `get_queryset` de la vista como cualquier detalle.
+    """
+
+    def get_signed_object(self, request, pk, field):
+        """Objeto por token firmado o, sin token, por `get_object()` (None si el token no vale)."""
+        token = request.query_params.get(TOKEN_QUERY_PARAM)
+        if token:
+            user_id = token_user_id(token, self.queryset.model._meta.label_lower, pk)
+            user = get_user_model().objects.filter(pk=user_id, is_active=True).first() if user_id else None
+            if user is None:
+                return None
+            # El enlace solo vale mientras su usuario pueda ver la fila
+            request.user = user
+            return self.get_queryset().select_related(None).only('id', field, 'file_sha256').filter(pk=pk).first()
+        if not request.user or not request.user.is_authenticated:
+            raise NotAuthenticated()
+        return self.get_object()
+
+    @swagger_auto_schema(
+        operation_description="Descargar el archivo (admite Range, ETag e If-None-Match)",
+        manual_parameters=[
+            openapi.Parameter(TOKEN_QUERY_PARAM, openapi.IN_QUERY, description="Token firmado incluido en `file_url`", type=openapi.TYPE_STRING),
+            openapi.Parameter('download', openapi.IN_QUERY, description="1 para forzar la descarga en lugar de mostrarlo", type=openapi.TYPE_BOOLEAN),
+        ],
+        responses={200: "Archivo", 206: "Rango parcial", 304: "Sin cambios", 404: "No encontrado o sin archivo"},
+    )
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def download(self, request, pk=None):
+        """Descargar el archivo adjunto"""
+        obj = self.get_signed_object(request, pk, 'file')
+        if obj is None:
+            return Response({'error': 'Enlace de descarga inválido o caducado'}, status=status.HTTP_403_FORBIDDEN)
+        if not obj.file:
+            raise Http404('Sin archivo')
+        as_attachment = request.query_params.get('download') in ('1', 'true')
+        return file_response(request, obj.file, etag=obj.file_sha256 or None, as_attachment=as_attachment)
+
+    @swagger_auto_schema(
+        operation_description="Miniatura JPEG de la primera página (la genera el worker de vistas previas)",
+        manual_parameters=[
+            openapi.Parameter(TOKEN_QUERY_PARAM, openapi.IN_QUERY, description="Token firmado incluido en `thumbnail_url`", type=openapi.TYPE_STRING),
+        ],
+        responses={200: "Imagen", 304: "Sin cambios", 404: "Sin miniatura"},
+    )
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def thumbnail(self, request, pk=None):
+        """Miniatura de la primera página"""
+        obj = self.get_signed_object(request, pk, 'thumbnail')
+        if obj is None:
+            return Response({'error': 'Enlace de descarga inválido o caducado'}, status=status.HTTP_403_FORBIDDEN)
+        if not obj.thumbnail:
+            raise Http404('Sin miniatura')
+        etag = f'{obj.file_sha256}-thumbnail' if obj.file_sha256 else None
+        return file_response(request, obj.thumbnail, etag=etag)
@@ -0,0 +1,139 @@
+"""
+Consultas incrementales y peticiones condicionales sobre colecciones.
+
+Los paneles de admin recargan periódicamente listados que casi nunca cambian
+(notificaciones, logs). `IncrementalListMixin` añade a un ViewSet:
+
+- `ETag` de la colección filtrada, calculado con un único agregado
+  (`max(id)`, `count(*)` y, si la fila puede cambiar, el máximo de sus campos
+  de fecha de cambio; ver `etag_aggregates`). Con `If-None-Match` igual se
+  responde `304 Not Modified` sin leer las filas ni serializar, y `HEAD`
+  devuelve solo el `ETag`.
+- `?since_id=<id>` (filas con id mayor) y `?since=<ISO 8601>` (filas creadas
+  o cambiadas después; campos `since_fields`). Se pueden combinar. La
+  respuesta va en orden de id ascendente, como mucho `max_delta_size` filas::
+
+      {"results": [...], "next": "<url si quedan más>", "next_since": "<ISO>"}
+
+  El cliente fusiona por `id` y en la siguiente consulta envía `next_since`
+  (ya incluye un margen de `SINCE_OVERLAP` segundos para no perder filas
+  confirmadas tarde; las repetidas se sustituyen al fusionar).
+"""
+import hashlib
+from datetime import timedelta
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+SINCE_ID_PARAM = 'since_id'
+SINCE_PARAM = 'since'
+SINCE_OVERLAP = timedelta(seconds=5)
+
+
+def collection_etag(request, state):
+    """ETag de la respuesta: estado de la colección + URL completa + rol (el queryset depende de él)."""
+    raw = f"{request.get_full_path()}|{getattr(request.user, 'role', '')}|{sorted(state.items())}"
+    return quote_etag(hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32])
+
+
+def not_modified(request, etag):
+    """Respuesta 304 si el cliente ya tiene esta versión (`If-None-Match`), si no None."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag in parse_etags(if_none_match):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    return None
+
+
+def parse_since(request):
+    """(`since_id`, `since`) de la query string; None si no vienen."""
+    since_id = request.query_params.get(SINCE_ID_PARAM)
+    since = request.query_params.get(SINCE_PARAM)
+    try:
+        since_id = int(since_id) if since_id not in (None, '') else None
+    except ValueError:
+        raise ValidationError({SINCE_ID_PARAM: 'Debe ser un entero'})
+    if since not in (None, ''):
+        # En la query string un '+' de la zona horaria llega como espacio
+        parsed = parse_datetime(since.replace(' ', '+'))
+        if parsed is None:
+            raise ValidationError({SINCE_PARAM: 'Fecha ISO 8601 inválida'})
+        since = parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    else:
+        since = None
+    return since_id, since
+
+
+class IncrementalListMixin:
+    """`ETag`/304, `HEAD` y consultas `since_id`/`since` para `list` (y acciones que lo pidan)."""
+    # Campos de fecha que marcan una fila como creada o cambiada (para `since`)
+    since_fields = ('created_at',)
+    max_delta_size = 100
+
+    def etag_aggregates(self):
+        """Agregados que cambian con cualquier alta, baja o modificación de la colección."""
+        aggregates = {'max_id': Max('id'), 'count': Count('id')}
+        for field in self.since_fields:
+            if field != 'created_at':
+                aggregates[f'max_{field}'] = Max(field)
+        return aggregates
+
+    def conditional_response(self, request, queryset, aggregates=None):
+        """
+        (respuesta 304/HEAD o None, etag, agregados) para `queryset` ya
+        filtrado. Una sola consulta; `aggregates` sustituye a los de
+        `etag_aggregates` (p.ej. para añadir contadores que la vista reutiliza).
+        """
+        state = queryset.order_by().aggregate(**(aggregates or self.etag_aggregates()))
+        response, etag = self.conditional_state(request, state)
+        return response, etag, state
+
+    def conditional_state(self, request, state):
+        """(respuesta 304/HEAD o None, etag) para un `state` ya calculado (p.ej. de las filas devueltas)."""
+        etag = collection_etag(request, state)
+        response = not_modified(request, etag)
+        if response is None and request.method == 'HEAD':
+            response = Response(headers={'ETag': etag})
+        return response, etag
+
+    def delta_queryset(self, queryset, since_id, since):
+        """Filas nuevas (`since_id`) o cambiadas (`since`) de `queryset`."""
+        if since_id is not None:
+            queryset = queryset.filter(id__gt=since_id)
+        if since is not None:
+            changed = Q()
+            for field in self.since_fields:
+                changed |= Q(**{f'{field}__gt': since})
+            queryset = queryset.filter(changed)
+        return queryset
+
+    def delta_response(self, request, queryset, since_id, since):
+        """Filas nuevas (`since_id`) o cambiadas (`since`), en orden de id ascendente."""
+        next_since = timezone.now() - SINCE_OVERLAP
+        queryset = self.delta_queryset(queryset, since_id, since)
+        rows = list(queryset.order_by('id')[:self.max_delta_size + 1])
+        has_more = len(rows) > self.max_delta_size
+        rows = rows[:self.max_delta_size]
+        next_url = None
+        if has_more:
+            next_url = replace_query_param(request.build_absolute_uri(), SINCE_ID_PARAM, rows[-1].pk)
+        serializer = self.get_serializer(rows, many=True)
+        return Response({'results': serializer.data, 'next': next_url, 'next_since': next_since.isoformat()})
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        response, etag, _ = self.conditional_response(request, queryset)
+        if response is not None:
+            return response
+        since_id, since = parse_since(request)
+        if since_id is not None or since is not None:
+            response = self.delta_response(request, queryset, since_id, since)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
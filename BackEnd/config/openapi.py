@@ -0,0 +1,187 @@
+"""
+Esquema OpenAPI precalculado.
+
+drf_yasg recorre todos los ViewSets y serializers para generar el esquema;
+hacerlo en cada visita a `/`, `/swagger/` o `/redoc/` cuesta cientos de
+milisegundos de CPU. Aquí el esquema se genera una sola vez y se sirve como
+artefacto estático:
+
+- `manage.py build_api_schema` (en cada despliegue, como `collectstatic`)
+  escribe `openapi.json` y `openapi.yaml` en `OPENAPI_SCHEMA_DIR`.
+- Cada proceso lee el artefacto la primera vez que se pide y lo conserva en
+  memoria con su `ETag` hasta que se reinicia (es decir, hasta el siguiente
+  despliegue). Si no existe, lo genera y lo escribe él mismo.
+- Con `DEBUG=True` no se usa el archivo: el esquema se genera en memoria una
+  vez por proceso (el autoreload lo renueva al cambiar el código).
+
+Las páginas de Swagger UI y ReDoc solo renderizan su plantilla y piden el
+esquema a `/swagger.json`, que responde 304 mientras no cambie.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from drf_yasg import openapi
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+logger = logging.getLogger(__name__)
+
+API_INFO = openapi.Info(
+    title="Sistema ECE - API Documentation",
+    default_version='v1',
+    description="""
+    Sistema de Gestión de Estudios Científicos Estudiantiles (ECE)
+
+    ## Descripción
+    API para la gestión de publicaciones científicas y solicitudes ECE de estudiantes.
+
+    ## Roles del Sistema:
+    - **Estudiante**: Gestionar sus publicaciones y solicitudes ECE
+    - **Tutor**: Revisar publicaciones de estudiantes asignados
+    - **Jefe de Departamento**: Aprobar/rechazar publicaciones y solicitudes
+    - **Administrador**: Gestión completa del sistema
+
+    ## Autenticación
+    El sistema utiliza JWT (JSON Web Tokens) para autenticación.
+    Utiliza el endpoint `/api/auth/login/` para obtener tus tokens.
+
+    ## Estructura de APIs:
+    - **Autenticación**: `/api/auth/`
+    - **Publicaciones**: `/api/publications/`
+    - **Solicitudes ECE**: `/api/requests/`
+    """,
+    terms_of_service="https://www.tu-universidad.com/terms/",
+    contact=openapi.Contact(email="soporte.ece@tu-universidad.com"),
+    license=openapi.License(name="BSD License"),
+)
+
+# Formato de la URL (`/swagger.json`) -> (archivo, tipo MIME, codec)
+SCHEMA_FORMATS = {
+    '.json': ('openapi.json', 'application/json', OpenAPICodecJson),
+    '.yaml': ('openapi.yaml', 'application/yaml', OpenAPICodecYaml),
+}
+
+UI_RENDERERS = {
+    'swagger': SwaggerUIRenderer,
+    'redoc': ReDocRenderer,
+}
+
+
+class SchemaArtifact:
+    def __init__(self, content, content_type):
+        self.content = content
+        self.content_type = content_type
+        self.etag = quote_etag(hashlib.sha256(content).hexdigest()[:32])
+
+
+def generate_schema():
+    """Esquema público completo (no depende del usuario ni del host)."""
+    generator = swagger_settings.DEFAULT_GENERATOR_CLASS(API_INFO)
+    return generator.get_schema(request=None, public=True)
+
+
+def encode_schema(schema):
+    return {fmt: codec(validators=[]).encode(schema) for fmt, (_, _, codec) in SCHEMA_FORMATS.items()}
+
+
+def write_schema_artifacts(directory=None, contents=None):
+    """Escribir `openapi.json` / `openapi.yaml` (generándolos si no se pasan); devuelve las rutas."""
+    directory = Path(directory or settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    contents = contents or encode_schema(generate_schema())
+    paths = []
+    for fmt, content in contents.items():
+        path = directory / SCHEMA_FORMATS[fmt][0]
+        # Escritura atómica: un worker nunca lee un archivo a medias
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.openapi-')
+        with os.fdopen(fd, 'wb') as target:
+            target.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+class SchemaCache:
+    """Artefactos en memoria del proceso (se pierden al reiniciar, es decir, al desplegar)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts = None
+
+    def get(self, fmt):
+        artifacts = self._artifacts
+        if artifacts is None:
+            with self._lock:
+                if self._artifacts is None:
+                    self._artifacts = self.load()
+                artifacts = self._artifacts
+        return artifacts[fmt]
+
+    def load(self):
+        contents = None if settings.DEBUG else self.read_files()
+        if contents is None:
+            contents = encode_schema(generate_schema())
+            if not settings.DEBUG:
+                try:
+                    write_schema_artifacts(contents=contents)
+                except OSError as exc:
+                    logger.warning("No se pudo escribir el esquema OpenAPI en %s: %s", settings.OPENAPI_SCHEMA_DIR, exc)
+        return {fmt: SchemaArtifact(content, SCHEMA_FORMATS[fmt][1]) for fmt, content in contents.items()}
+
+    def read_files(self):
+        directory = Path(settings.OPENAPI_SCHEMA_DIR)
+        try:
+            return {fmt: (directory / name).read_bytes() for fmt, (name, _, _) in SCHEMA_FORMATS.items()}
+        except FileNotFoundError:
+            logger.warning("Esquema OpenAPI no encontrado en %s: ejecute manage.py build_api_schema", directory)
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._artifacts = None
+
+
+schema_cache = SchemaCache()
+
+
+# ----------------------------------------------------------------------
+# Vistas
+# ----------------------------------------------------------------------
+def schema_response(request, fmt):
+    try:
+        artifact = schema_cache.get(fmt)
+    except KeyError:
+        raise Http404('Formato de esquema no soportado')
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and artifact.etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(artifact.content, content_type=artifact.content_type)
+    response['ETag'] = artifact.etag
+    # Público, pero revalidando siempre: cambia en cada despliegue
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def schema_document(request, format):
+    """`/swagger.json` y `/swagger.yaml`."""
+    return schema_response(request, format)
+
+
+def schema_ui(request, renderer='swagger'):
+    """Swagger UI / ReDoc: solo la plantilla; el esquema se pide a `/swagger.json`."""
+    if request.GET.get('format') == 'openapi':
+        # Compatibilidad con `?format=openapi` de drf_yasg
+        return schema_response(request, '.json')
+    placeholder = openapi.Swagger(info=API_INFO, _prefix='/', paths=openapi.Paths({}))
+    html = UI_RENDERERS[renderer]().render(placeholder, renderer_context={'request': request})
+    return HttpResponse(html, content_type='text/html; charset=utf-8')
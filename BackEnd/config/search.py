@@ -0,0 +1,89 @@
+"""
+Búsqueda de texto completo en PostgreSQL.
+
+Las tablas con búsqueda tienen una columna `search_vector` (tsvector) que
+mantiene un trigger de la base de datos y un índice GIN sobre ella. La
+configuración `spanish_unaccent` aplica stemming en español y, si la
+extensión `unaccent` está disponible, ignora tildes. Para DOI/autores se usan
+índices trigram (`pg_trgm`) sobre `UPPER(col)`, que es lo que genera Django
+para `istartswith`/`icontains`.
+
+Las búsquedas sobre otra tabla (p.ej. `student__username__icontains`) no se
+combinan con OR en la misma consulta: un OR con una columna del JOIN impide
+usar los índices GIN y obliga a recorrer la tabla entera. Se resuelven como
+`pk IN (SELECT ... UNION SELECT ...)`, una consulta por índice.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import models
+from django.db.models import F, Q
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.filters import SearchFilter
+
+SEARCH_CONFIG = 'spanish_unaccent'
+
+
+class SearchVectorDeferredManager(models.Manager):
+    """Manager que no carga `search_vector` ni, si existe, `text_content` (texto extraído)."""
+    deferred_fields = ('search_vector', 'text_content')
+
+    def get_queryset(self):
+        names = {field.name for field in self.model._meta.concrete_fields}
+        return super().get_queryset().defer(*(name for name in self.deferred_fields if name in names))
+
+
+def build_search_query(terms):
+    """Consulta estilo buscador web: `"frase exacta"`, `-excluir`, `a or b`."""
+    return SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+
+
+def _is_related_lookup(model, lookup):
+    return model._meta.get_field(lookup.split(LOOKUP_SEP, 1)[0]).is_relation
+
+
+def search_condition(model, terms, vector_field='search_vector', lookups=()):
+    """
+    Condición `vector @@ query` combinada con búsquedas por trigram (`lookups`).
+
+    Las de columnas propias van en OR (PostgreSQL une los índices con un
+    BitmapOr); las que cruzan una relación se añaden como UNION de ids.
+    """
+    condition = Q(**{vector_field: build_search_query(terms)})
+    related = [lookup for lookup in lookups if _is_related_lookup(model, lookup)]
+    for lookup in lookups:
+        if lookup not in related:
+            condition |= Q(**{lookup: terms})
+    if not related:
+        return condition
+    ids = model._base_manager.filter(condition).order_by().values('pk')
+    ids = ids.union(*(
+        model._base_manager.filter(**{lookup: terms}).order_by().values('pk') for lookup in related
+    ))
+    return Q(pk__in=ids)
+
+
+def ranked_search(queryset, terms, vector_field='search_vector', lookups=()):
+    """Filtrar por `terms` y ordenar por relevancia (`rank`) y fecha."""
+    query = build_search_query(terms)
+    return queryset.filter(search_condition(queryset.model, terms, vector_field, lookups)).annotate(
+        rank=SearchRank(F(vector_field), query)
+    ).order_by('-rank', '-created_at')
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    `?search=` sobre el índice de texto completo de la vista.
+
+    La vista define `search_vector_field` y, opcionalmente,
+    `search_trigram_lookups` (p.ej. `('doi__istartswith', 'authors__icontains')`).
+    Sin `search_vector_field` se comporta como `SearchFilter`.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        vector_field = getattr(view, 'search_vector_field', None)
+        if vector_field is None:
+            return super().filter_queryset(request, queryset, view)
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        lookups = getattr(view, 'search_trigram_lookups', ())
+        return queryset.filter(search_condition(queryset.model, terms, vector_field, lookups))
@@ -18,9 +18,14 @@ class NoCacheMiddleware(MiddlewareMixin):
         # Aplicar solo a endpoints de API (datos sensibles)
         if request.path.startswith('/api/'):
             # Headers para evitar caché en navegadores
-            response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-            response['Pragma'] = 'no-cache'
-            response['Expires'] = '0'
+            if response.has_header('ETag'):
+                # Descargas con ETag: el navegador puede guardar una copia
+                # privada pero debe revalidarla siempre (If-None-Match -> 304)
+                response['Cache-Control'] = 'private, no-cache'
+            else:
+                response['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+                response['Pragma'] = 'no-cache'
+                response['Expires'] = '0'
             
             # Headers adicionales de seguridad
             response['X-Content-Type-Options'] = 'nosniff'
@@ -0,0 +1,35 @@
+"""
+Utilidades compartidas para serializers.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+
+class DynamicFieldsMixin:
+    """
+    Permite recortar la salida de un serializer con `?fields=id,title,status`.
+
+    Solo se aplica en lecturas (GET/HEAD/OPTIONS) y al serializer raíz que
+    recibe el `request` en su contexto; los nombres desconocidos se ignoran.
+    También acepta `fields=[...]` como argumento al instanciarlo.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        requested = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if requested is None:
+            request = self.context.get('request')
+            if request is None or request.method not in SAFE_METHODS:
+                return
+            raw = request.query_params.get(self.fields_query_param)
+            if not raw:
+                return
+            requested = [name.strip() for name in raw.split(',') if name.strip()]
+
+        allowed = set(requested)
+        if not allowed & set(self.fields):
+            return  # ningún campo válido: devolver la representación completa
+        for name in list(self.fields):
+            if name not in allowed:
+                self.fields.pop(name)
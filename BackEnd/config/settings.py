@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
@@ -75,6 +76,9 @@ MIDDLEWARE = [
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
 
+# ModelBackend que conserva el usuario cargado en un login fallido (lo reutiliza la señal de bloqueo)
+AUTHENTICATION_BACKENDS = ['authentication.backends.LoginBackend']
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -157,6 +161,12 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Archivos subidos deduplicados por contenido (enlaces duros a MEDIA_ROOT/blobs/)
+STORAGES = {
+    'default': {'BACKEND': 'config.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
@@ -206,6 +216,8 @@ SWAGGER_SETTINGS = {
     'PERSIST_AUTH': True,
     'REFETCH_SCHEMA_ON_LOGOUT': True,
     'DEFAULT_MODEL_RENDERING': 'example',
+    # Las páginas de UI piden el esquema precalculado (config/openapi.py)
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
 # Redoc settings
@@ -214,8 +226,12 @@ REDOC_SETTINGS = {
     'HIDE_HOSTNAME': False,
     'EXPAND_RESPONSES': ['200', '201'],
     'PATH_IN_MIDDLE': True,
+    'SPEC_URL': ('schema-json', {'format': '.json'}),
 }
 
+# Esquema OpenAPI precalculado (manage.py build_api_schema en cada despliegue)
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', str(BASE_DIR / 'openapi'))
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -237,14 +253,83 @@ SIMPLE_JWT = {
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # File Upload Settings
-# Tamaño máximo de archivos subidos: 50MB
-DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB en bytes
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50MB en bytes
+# Los archivos se reciben en streaming (config/uploads.py): hasta
+# FILE_UPLOAD_MAX_MEMORY_SIZE en memoria y el resto en un temporal en disco.
+FILE_UPLOAD_HANDLERS = ['config.uploads.HashingUploadHandler']
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', str(1024 * 1024)))  # 1MB
+FILE_UPLOAD_TEMP_DIR = os.getenv('FILE_UPLOAD_TEMP_DIR') or None
+# Tamaño máximo de un archivo subido: 50MB (las vistas pueden fijar uno menor)
+FILE_UPLOAD_MAX_SIZE = int(os.getenv('FILE_UPLOAD_MAX_SIZE', str(50 * 1024 * 1024)))
+# Campos del formulario y cuerpos JSON (sin contar archivos)
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DATA_UPLOAD_MAX_MEMORY_SIZE', str(2621440)))  # 2.5MB
+# Subidas reanudables por fragmentos (/api/requests/uploads/)
+UPLOAD_SESSION_DIR = os.getenv('UPLOAD_SESSION_DIR', str(BASE_DIR / 'upload_sessions'))
+UPLOAD_SESSION_CHUNK_SIZE = int(os.getenv('UPLOAD_SESSION_CHUNK_SIZE', str(5 * 1024 * 1024)))  # 5MB
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv('UPLOAD_SESSION_TTL_HOURS', '24'))
+# Descargas protegidas (config/downloads.py): '' = Python, 'x-accel-redirect' (nginx) o 'x-sendfile'
+FILE_DOWNLOAD_BACKEND = os.getenv('FILE_DOWNLOAD_BACKEND', '')
+FILE_DOWNLOAD_ACCEL_PREFIX = os.getenv('FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+FILE_DOWNLOAD_URL_MAX_AGE = int(os.getenv('FILE_DOWNLOAD_URL_MAX_AGE', '3600'))  # segundos
+# Vista previa de documentos en segundo plano (manage.py run_document_worker)
+DOCUMENT_WORKER_PROCESSES = int(os.getenv('DOCUMENT_WORKER_PROCESSES', '2'))     # 0 = sin pool (en el propio proceso)
+DOCUMENT_WORKER_POLL_INTERVAL = float(os.getenv('DOCUMENT_WORKER_POLL_INTERVAL', '2.0'))  # segundos
+DOCUMENT_JOB_MAX_ATTEMPTS = int(os.getenv('DOCUMENT_JOB_MAX_ATTEMPTS', '5'))
+DOCUMENT_JOB_RETRY_SECONDS = int(os.getenv('DOCUMENT_JOB_RETRY_SECONDS', '30'))   # espera base, se duplica en cada intento
+DOCUMENT_JOB_TIMEOUT = int(os.getenv('DOCUMENT_JOB_TIMEOUT', '300'))  # segundos; luego otro worker puede reclamarlo
+DOCUMENT_TEXT_MAX_CHARS = int(os.getenv('DOCUMENT_TEXT_MAX_CHARS', '200000'))  # tsvector admite como mucho 1MB
+DOCUMENT_THUMBNAIL_WIDTH = int(os.getenv('DOCUMENT_THUMBNAIL_WIDTH', '320'))  # px
 AUTH_LOCKOUT_THRESHOLD = int(os.getenv('AUTH_LOCKOUT_THRESHOLD', '3'))  # intentos fallidos antes de bloquear (por usuario)
 AUTH_LOCKOUT_MINUTES = int(os.getenv('AUTH_LOCKOUT_MINUTES', '5'))      # minutos de bloqueo por usuario
 # Umbral y duración para bloqueo por IP
 AUTH_IP_LOCKOUT_THRESHOLD = int(os.getenv('AUTH_IP_LOCKOUT_THRESHOLD', '10'))
 AUTH_IP_LOCK_MINUTES = int(os.getenv('AUTH_IP_LOCK_MINUTES', '20'))
+# Los intentos fallidos se olvidan pasados estos minutos desde el primero
+AUTH_LOCKOUT_WINDOW_MINUTES = int(os.getenv('AUTH_LOCKOUT_WINDOW_MINUTES', '60'))
+# Contraseñas anteriores que no se pueden reutilizar, y hilos que comprueban el
+# historial en paralelo (cada comprobación es un PBKDF2 completo)
+PASSWORD_HISTORY_COUNT = int(os.getenv('PASSWORD_HISTORY_COUNT', '5'))
+PASSWORD_HISTORY_WORKERS = int(os.getenv('PASSWORD_HISTORY_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+# Auditoría (SystemLog): escritura asíncrona por lotes desde un hilo en segundo plano
+AUDIT_LOG_ASYNC = os.getenv('AUDIT_LOG_ASYNC', 'True') == 'True'
+AUDIT_LOG_QUEUE_SIZE = int(os.getenv('AUDIT_LOG_QUEUE_SIZE', '10000'))  # eventos en memoria como máximo
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', '200'))    # filas por bulk_create
+AUDIT_LOG_FLUSH_INTERVAL = float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', '1.0'))  # segundos
+# Qué hacer con la cola llena: drop (descartar), block (esperar) o spill (volcar a fichero)
+AUDIT_LOG_OVERFLOW_POLICY = os.getenv('AUDIT_LOG_OVERFLOW_POLICY', 'spill')
+AUDIT_LOG_BLOCK_TIMEOUT = float(os.getenv('AUDIT_LOG_BLOCK_TIMEOUT', '0.5'))
+AUDIT_LOG_SPILL_PATH = os.getenv('AUDIT_LOG_SPILL_PATH', str(BASE_DIR / 'logs' / 'audit_spill.jsonl'))
+
+# Respuestas 401/403 (AuditMiddleware): las repetidas con el mismo usuario, ruta y
+# estado dentro de la ventana se guardan en una sola fila con `occurrences`
+AUDIT_ACCESS_DEDUP_WINDOW = float(os.getenv('AUDIT_ACCESS_DEDUP_WINDOW', '60'))  # segundos
+# Fracción de claves nuevas que se registran por estado, p. ej. "401:0.2,403:1"
+AUDIT_ACCESS_SAMPLE_RATES = {
+    int(status): float(rate)
+    for status, rate in (item.split(':') for item in os.getenv('AUDIT_ACCESS_SAMPLE_RATES', '401:1,403:1').split(',') if item)
+}
+AUDIT_ACCESS_MAX_KEYS = int(os.getenv('AUDIT_ACCESS_MAX_KEYS', '5000'))  # claves abiertas como máximo
+
+# Notificaciones de admin: las repetidas se agrupan en una sola fila abierta y,
+# por grupo, se escribe como mucho BURST veces cada WINDOW segundos (el resto
+# de ocurrencias se suma en la siguiente escritura)
+NOTIFICATION_RATE_BURST = int(os.getenv('NOTIFICATION_RATE_BURST', '5'))
+NOTIFICATION_RATE_WINDOW = int(os.getenv('NOTIFICATION_RATE_WINDOW', '60'))  # segundos
+
+# Flujo SSE de notificaciones (requests/notification_stream.py, requiere ASGI).
+# Reparto entre workers: postgres (LISTEN/NOTIFY) o local (un solo proceso)
+NOTIFICATION_STREAM_BACKEND = os.getenv('NOTIFICATION_STREAM_BACKEND', 'postgres')
+NOTIFICATION_STREAM_CHANNEL = os.getenv('NOTIFICATION_STREAM_CHANNEL', 'admin_notifications')
+NOTIFICATION_STREAM_HEARTBEAT = int(os.getenv('NOTIFICATION_STREAM_HEARTBEAT', '15'))  # segundos entre latidos
+NOTIFICATION_STREAM_TOKEN_MAX_AGE = int(os.getenv('NOTIFICATION_STREAM_TOKEN_MAX_AGE', '60'))  # segundos
+
+# Retención de auditoría (manage.py archive_system_logs, diario por cron).
+# Los valores por defecto se pueden cambiar en caliente con las claves de
+# SystemConfiguration del mismo nombre; 0 desactiva el archivado.
+SYSTEM_LOG_RETENTION_MONTHS = int(os.getenv('SYSTEM_LOG_RETENTION_MONTHS', '12'))  # particiones mensuales que se conservan
+SYSTEM_LOG_PARTITIONS_AHEAD = int(os.getenv('SYSTEM_LOG_PARTITIONS_AHEAD', '2'))    # meses creados por adelantado
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', '180'))  # notificaciones resueltas
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR', str(BASE_DIR / 'logs' / 'archive'))
 
 # Lista blanca de IPs (o coma-separadas) que pueden acceder a /admin
 # Ejemplo en .env: ALLOW_ADMIN_IPS=127.0.0.1,::1,192.168.0.0
@@ -263,13 +348,20 @@ X_FRAME_OPTIONS = 'DENY'
 # SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 # SECURE_HSTS_PRELOAD = True
 
-# Cache settings - desactivar caché para vistas sensibles
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
+# Caché y contadores compartidos entre workers (versión de SystemConfiguration,
+# intentos de login fallidos). Con REDIS_URL se comparten entre servidores; si no,
+# se usan archivos locales compartidos por los workers del mismo servidor.
+REDIS_URL = os.getenv('REDIS_URL', '')
+CACHE_DIR = os.getenv('CACHE_DIR', str(BASE_DIR / 'cache'))
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+    COUNTER_STORE = {'BACKEND': 'config.counter_store.RedisCounterStore', 'LOCATION': REDIS_URL}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_DIR}}
+    COUNTER_STORE = {'BACKEND': 'config.counter_store.SQLiteCounterStore', 'LOCATION': os.path.join(CACHE_DIR, 'counters.sqlite3')}
+# Varios servidores sin Redis: COUNTER_STORE_BACKEND=config.counter_store.DatabaseCounterStore
+if os.getenv('COUNTER_STORE_BACKEND'):
+    COUNTER_STORE = {'BACKEND': os.getenv('COUNTER_STORE_BACKEND')}
 
 # No cachear respuestas de API con datos sensibles
 CACHE_MIDDLEWARE_SECONDS = 0
@@ -0,0 +1,154 @@
+"""
+Almacenamiento de archivos direccionado por contenido.
+
+Cada contenido distinto se guarda una sola vez como blob en
+`MEDIA_ROOT/blobs/ab/cd/<sha256>`; el nombre que guarda el `FileField`
+(`publications/%Y/%m/archivo.pdf`, `ece_requests/...`) es un enlace duro a
+ese blob. Así los `FileField` y sus `upload_to` siguen funcionando igual
+(`.url`, `.open()`, `.path`), pero subir el mismo PDF en varias publicaciones
+o solicitudes no duplica bytes en disco ni en las copias de seguridad
+(`rsync -H`, `tar` conservan los enlaces duros).
+
+El contador de referencias es el propio `st_nlink` del blob: cada archivo
+que lo enlaza suma 1. Al borrar una fila (o sustituir su archivo) se borra su
+enlace; `manage.py gc_media_blobs` elimina los blobs que ya no enlaza nadie.
+
+Si el contenido trae `sha256` (`HashedUploadedFile`, subidas por fragmentos)
+y el blob ya existe, no se vuelve a escribir: el guardado es instantáneo.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+
+BLOB_DIR = 'blobs'
+
+
+def content_sha256(content):
+    """SHA-256 de un `File` (reutiliza el calculado durante la subida si existe)."""
+    digest = getattr(content, 'sha256', None)
+    if not digest:
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        digest = hasher.hexdigest()
+        content.sha256 = digest
+    return digest
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def blob_name(self, digest):
+        return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}'
+
+    def blob_path(self, digest):
+        return self.path(self.blob_name(digest))
+
+    def has_blob(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def refcount(self, digest):
+        """Número de archivos que enlazan el blob (0 si no existe)."""
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None)
+        if not digest or not self.has_blob(digest):
+            digest = self.store_blob(content)
+        content.sha256 = digest
+        return self._link(self.blob_path(digest), name)
+
+    def store_blob(self, content):
+        """Escribir el contenido en un temporal y publicarlo como blob (sin pisar uno existente)."""
+        tmp_dir = self.path(f'{BLOB_DIR}/tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            hasher = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as target:
+                for chunk in content.chunks():
+                    hasher.update(chunk)
+                    target.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            digest = hasher.hexdigest()
+            blob = self.blob_path(digest)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                pass  # otro proceso guardó el mismo contenido a la vez
+        finally:
+            os.unlink(tmp_path)
+        return digest
+
+    def _link(self, blob, name):
+        while True:
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(blob, full_path)
+            except FileExistsError:
+                name = self.get_available_name(name)
+                continue
+            except OSError:
+                # Sistema de archivos sin enlaces duros: copia normal
+                with open(blob, 'rb') as source:
+                    return super()._save(name, File(source))
+            return str(name).replace('\\', '/')
+
+
+# ----------------------------------------------------------------------
+# Señales de los modelos con archivo (Publication, ECERequest)
+# ----------------------------------------------------------------------
+def remember_file(sender, instance, **kwargs):
+    """post_init: nombre del archivo tal como se cargó de la BD."""
+    instance._loaded_file_name = '' if instance.pk is None else str(instance.__dict__.get('file') or '')
+
+
+def track_file_hash(sender, instance, raw=False, **kwargs):
+    """pre_save: `file_sha256` del archivo nuevo (antes de que el storage lo guarde)."""
+    if raw:
+        return
+    upload = instance.file
+    if not upload:
+        instance.file_sha256 = ''
+    elif not upload._committed:
+        instance.file_sha256 = content_sha256(upload.file)
+
+
+def release_replaced_file(sender, instance, raw=False, **kwargs):
+    """post_save: borrar el enlace del archivo anterior si se ha sustituido."""
+    old_name = getattr(instance, '_loaded_file_name', '')
+    new_name = instance.file.name or ''
+    instance._loaded_file_name = new_name
+    if raw or not old_name or old_name == new_name:
+        return
+    transaction.on_commit(lambda: release_file(old_name))
+
+
+def release_deleted_file(sender, instance, **kwargs):
+    """post_delete: borrar el enlace del archivo de la fila eliminada."""
+    name = instance.file.name if instance.file else ''
+    if name:
+        transaction.on_commit(lambda: release_file(name))
+
+
+def file_in_use(name):
+    from publications.models import Publication
+    from requests.models import ECERequest
+    return (Publication._base_manager.filter(file=name).exists()
+            or ECERequest._base_manager.filter(file=name).exists())
+
+
+def release_file(name):
+    """Borrar un archivo si ninguna fila lo referencia (el blob queda para el GC)."""
+    if not file_in_use(name):
+        default_storage.delete(name)
@@ -0,0 +1,20 @@
+"""
+Configuración para los tests (`manage.py test` la usa por defecto; con
+pytest-django, `pytest.ini`).
+
+Sustituye los servicios compartidos entre procesos por equivalentes en memoria
+y hace síncronas las escrituras en segundo plano, para que todo lo que genera
+un caso de prueba quede dentro de su transacción.
+"""
+from .settings import *  # noqa: F401,F403
+
+# Caché y contadores en memoria del proceso
+CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'unique-snowflake'}}
+COUNTER_STORE = {'BACKEND': 'config.counter_store.LocalCounterStore'}
+
+# Auditoría síncrona y sin agrupar respuestas 401/403 repetidas
+AUDIT_LOG_ASYNC = False
+AUDIT_ACCESS_DEDUP_WINDOW = 0
+
+# Flujo SSE dentro del proceso (sin LISTEN/NOTIFY)
+NOTIFICATION_STREAM_BACKEND = 'local'
@@ -0,0 +1,164 @@
+"""
+Subida de documentos en streaming.
+
+`HashingUploadHandler` sustituye a los manejadores por defecto de Django:
+escribe cada archivo en un `SpooledTemporaryFile` (memoria hasta
+`FILE_UPLOAD_MAX_MEMORY_SIZE`, disco a partir de ahí), calcula SHA-256 y
+tamaño mientras llegan los fragmentos y corta la subida en cuanto el archivo
+supera el límite o sus primeros bytes no son de un PDF/DOC/DOCX, sin esperar a
+leer el resto del cuerpo. El archivo resultante expone `sha256`.
+
+El límite por defecto es `FILE_UPLOAD_MAX_SIZE`; un ViewSet puede bajarlo con
+el atributo `upload_max_size` si usa `DocumentMultiPartParser`::
+
+    class ECERequestViewSet(viewsets.ModelViewSet):
+        parser_classes = [DocumentMultiPartParser, FormParser, JSONParser]
+        upload_max_size = 10 * 1024 * 1024
+
+Los errores llegan al cliente como 400 (`ParseError` de DRF).
+"""
+import hashlib
+import os
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from rest_framework import serializers
+from rest_framework.parsers import MultiPartParser
+
+# Firma (magic bytes) aceptada para cada extensión
+SIGNATURES = {
+    '.pdf': b'%PDF-',
+    '.doc': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',  # OLE2 (Word 97-2003)
+    '.docx': b'PK\x03\x04',                      # contenedor ZIP (OOXML)
+}
+ALLOWED_EXTENSIONS = tuple(SIGNATURES)
+SIGNATURE_LENGTH = max(len(signature) for signature in SIGNATURES.values())
+
+TYPE_ERROR = "Solo se permiten archivos PDF, DOC o DOCX."
+CONTENT_ERROR = "El contenido del archivo no corresponde a un PDF, DOC o DOCX."
+
+
+class UploadRejected(MultiPartParserError):
+    pass
+
+
+def extension_of(name):
+    return os.path.splitext(name or '')[1].lower()
+
+
+def signature_error(name, head):
+    """Mensaje de error si `name`/`head` no es un documento permitido (None si lo es)."""
+    extension = extension_of(name)
+    if extension not in SIGNATURES:
+        return TYPE_ERROR
+    if not head.startswith(SIGNATURES[extension]):
+        return CONTENT_ERROR
+    return None
+
+
+def size_label(max_size):
+    return f"{max_size // (1024 * 1024)}MB"
+
+
+def validate_document(upload, max_size):
+    """Validación común de los serializers: tamaño, extensión y magic bytes."""
+    if upload.size > max_size:
+        raise serializers.ValidationError(f"El archivo no puede superar los {size_label(max_size)}.")
+    position = upload.tell()
+    upload.seek(0)
+    head = upload.read(SIGNATURE_LENGTH)
+    upload.seek(position)
+    error = signature_error(upload.name, head)
+    if error:
+        raise serializers.ValidationError(error)
+    return upload
+
+
+class HashedUploadedFile(UploadedFile):
+    """Archivo subido (en memoria o en disco según su tamaño) con su SHA-256."""
+
+    def __init__(self, file, name, content_type, size, charset, content_type_extra=None, sha256=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = sha256
+
+
+class HashingUploadHandler(FileUploadHandler):
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.FILE_UPLOAD_MAX_SIZE
+        self.file = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Rechazo inmediato si el cuerpo completo ya excede el límite
+        # (más el margen de los campos de texto del formulario)
+        if content_length and content_length > self.max_size + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            raise UploadRejected(f"El archivo no puede superar los {size_label(self.max_size)}.")
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if content_length and content_length > self.max_size:
+            self.reject(f"El archivo no puede superar los {size_label(self.max_size)}.")
+        self.file = SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR,
+        )
+        self.hasher = hashlib.sha256()
+        self.head = b''
+        self.checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject(f"El archivo no puede superar los {size_label(self.max_size)}.")
+        if not self.checked:
+            self.head += raw_data[:SIGNATURE_LENGTH - len(self.head)]
+            if len(self.head) >= SIGNATURE_LENGTH:
+                self.check_signature()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            self.check_signature()
+        self.file.seek(0)
+        return HashedUploadedFile(
+            file=self.file,
+            name=self.file_name,
+            content_type=self.content_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+            sha256=self.hasher.hexdigest(),
+        )
+
+    def upload_interrupted(self):
+        if self.file is not None:
+            self.file.close()
+
+    def check_signature(self):
+        error = signature_error(self.file_name, self.head)
+        if error:
+            self.reject(error)
+        self.checked = True
+
+    def reject(self, message):
+        self.upload_interrupted()
+        raise UploadRejected(message)
+
+
+class DocumentMultiPartParser(MultiPartParser):
+    """`MultiPartParser` que aplica el `upload_max_size` de la vista al manejador."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        max_size = getattr(parser_context.get('view'), 'upload_max_size', None)
+        if max_size:
+            for handler in parser_context['request'].upload_handlers:
+                if isinstance(handler, HashingUploadHandler):
+                    handler.max_size = max_size
+        return super().parse(stream, media_type, parser_context)
@@ -6,9 +6,7 @@ from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
+from config import openapi as openapi_views
 import importlib
 from django.apps import apps as dj_apps
 
@@ -25,40 +23,6 @@ try:
 except Exception:
     SystemLogViewSet = None
 
-# Swagger Schema View
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Sistema ECE - API Documentation",
-        default_version='v1',
-        description="""
-        Sistema de Gestión de Estudios Científicos Estudiantiles (ECE)
-        
-        ## Descripción
-        API para la gestión de publicaciones científicas y solicitudes ECE de estudiantes.
-        
-        ## Roles del Sistema:
-        - **Estudiante**: Gestionar sus publicaciones y solicitudes ECE
-        - **Tutor**: Revisar publicaciones de estudiantes asignados
-        - **Jefe de Departamento**: Aprobar/rechazar publicaciones y solicitudes
-        - **Administrador**: Gestión completa del sistema
-        
-        ## Autenticación
-        El sistema utiliza JWT (JSON Web Tokens) para autenticación.
-        Utiliza el endpoint `/api/auth/login/` para obtener tus tokens.
-        
-        ## Estructura de APIs:
-        - **Autenticación**: `/api/auth/`
-        - **Publicaciones**: `/api/publications/`
-        - **Solicitudes ECE**: `/api/requests/`
-        """,
-        terms_of_service="https://www.tu-universidad.com/terms/",
-        contact=openapi.Contact(email="soporte.ece@tu-universidad.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
 urlpatterns = [
     # Django Admin
     path('admin/', admin.site.urls),
@@ -99,13 +63,15 @@ else:
     # Si no se pudo cargar dinámicamente, no agregamos rutas adicionales.
     pass
 
-# Añadimos las rutas de documentación Swagger y la raíz de la API
+# Añadimos las rutas de documentación Swagger y la raíz de la API.
+# El esquema se genera una vez (manage.py build_api_schema) y se sirve con ETag
+# desde config/openapi.py; las páginas de UI solo renderizan su plantilla.
 urlpatterns += [
-    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('swagger<format>/', openapi_views.schema_document, name='schema-json'),
+    path('swagger/', openapi_views.schema_ui, {'renderer': 'swagger'}, name='schema-swagger-ui'),
+    path('redoc/', openapi_views.schema_ui, {'renderer': 'redoc'}, name='schema-redoc'),
     # API Root - Redirige a Swagger
-    path('', schema_view.with_ui('swagger', cache_timeout=0), name='api-root'),
+    path('', openapi_views.schema_ui, {'renderer': 'swagger'}, name='api-root'),
 ]
 
 # Personalizar encabezados del admin
@@ -11,6 +11,9 @@ if sys.platform == "win32":
 
 def main():
     """Run administrative tasks."""
+    # `manage.py test` usa la configuración de pruebas salvo que se indique otra
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.test_settings')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
     try:
         from django.core.management import execute_from_command_line
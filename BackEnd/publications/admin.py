@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from requests.counters import set_status
 from .models import Publication, TutorOpinion, TutorStudent
 
 
@@ -15,18 +17,22 @@ class PublicationAdmin(admin.ModelAdmin):
     list_per_page = 30
     actions = ['mark_as_pending', 'mark_as_approved', 'mark_as_rejected']
 
+    def _set_status(self, queryset, status):
+        # `update()` no dispara señales: `set_status` aplica las diferencias a los contadores
+        return set_status(queryset, status)
+
     def mark_as_pending(self, request, queryset):
-        updated = queryset.update(status='pending')
+        updated = self._set_status(queryset, 'pending')
         self.message_user(request, f"{updated} publicaciones marcadas como 'pending'.")
     mark_as_pending.short_description = "Marcar seleccionadas como 'pending'"
 
     def mark_as_approved(self, request, queryset):
-        updated = queryset.update(status='approved')
+        updated = self._set_status(queryset, 'approved')
         self.message_user(request, f"{updated} publicaciones marcadas como 'approved'.")
     mark_as_approved.short_description = "Marcar seleccionadas como 'approved'"
 
     def mark_as_rejected(self, request, queryset):
-        updated = queryset.update(status='rejected')
+        updated = self._set_status(queryset, 'rejected')
         self.message_user(request, f"{updated} publicaciones marcadas como 'rejected'.")
     mark_as_rejected.short_description = "Marcar seleccionadas como 'rejected'"
 
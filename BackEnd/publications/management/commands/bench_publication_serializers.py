@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from authentication.models import User
+from publications.models import Publication
+from publications.serializers import PublicationCompactSerializer, PublicationSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara filas/segundo y tamaño JSON de la representación completa y la compacta de publicaciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000, help='Filas sintéticas por pasada')
+        parser.add_argument('--repeat', type=int, default=5, help='Pasadas por serializer (se toma la mejor)')
+        parser.add_argument('--from-db', action='store_true',
+                            help='Usar publicaciones reales (incluye el coste de la consulta)')
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/publications/', HTTP_HOST='localhost:8000'))
+        renderer = JSONRenderer()
+
+        if options['from_db']:
+            def rows_full():
+                return list(Publication.objects.select_related('student', 'tutor', 'reviewed_by')[:options['rows']])
+
+            def rows_compact():
+                return list(Publication.objects.select_related('student')
+                            .only(*PublicationCompactSerializer.only_fields)[:options['rows']])
+        else:
+            synthetic = self.synthetic_rows(options['rows'])
+            rows_full = rows_compact = lambda: synthetic
+
+        results = {}
+        for label, serializer_class, loader in (
+            ('completo', PublicationSerializer, rows_full),
+            ('compacto', PublicationCompactSerializer, rows_compact),
+        ):
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                rows = loader()
+                data = serializer_class(rows, many=True, context={'request': request}).data
+                payload = renderer.render(data)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            count = len(rows)
+            results[label] = (count / best if best else 0, len(payload) / max(count, 1))
+            self.stdout.write(f'{label:>9}: {count} filas en {best * 1000:.1f} ms -> '
+                              f'{results[label][0]:,.0f} filas/s, {results[label][1]:,.0f} bytes/fila')
+
+        full, compact = results['completo'], results['compacto']
+        if full[0] and compact[1]:
+            self.stdout.write(self.style.SUCCESS(
+                f'compacto: x{compact[0] / full[0]:.1f} más rápido, x{full[1] / compact[1]:.1f} menos bytes'
+            ))
+
+    def synthetic_rows(self, count):
+        now = timezone.now()
+        student = User(id=1, username='bench', first_name='Ana', last_name='Pérez')
+        tutor = User(id=2, username='tutor', first_name='Luis', last_name='García')
+        rows = []
+        for i in range(count):
+            publication = Publication(
+                id=i + 1, student=student, tutor=tutor, title=f'Publicación de prueba {i}',
+                authors='Ana Pérez; Luis García', journal='Revista Cubana de Ciencias', volume='12',
+                pages='1-10', doi=f'10.1234/bench.{i}', abstract='Resumen ' * 60,
+                file=f'publications/2024/01/articulo_{i}.pdf', nivel=str(i % 3 + 1),
+                status=('en_proceso', 'pending', 'approved', 'rejected')[i % 4],
+                review_comments='Comentario de revisión ' * 10,
+            )
+            publication.publication_date = now.date()
+            publication.created_at = publication.updated_at = now
+            rows.append(publication)
+        return rows
@@ -0,0 +1,116 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:14
+
+import logging
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+logger = logging.getLogger(__name__)
+
+
+def available_extensions(cursor):
+    cursor.execute(
+        "SELECT name FROM pg_available_extensions WHERE name IN ('unaccent', 'pg_trgm')"
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_search_config(apps, schema_editor):
+    """Extensiones y configuración `spanish_unaccent` (stemming español sin tildes).
+
+    `unaccent` y `pg_trgm` vienen en el paquete contrib de PostgreSQL; si el
+    servidor no los tiene, se crea la configuración solo con stemming y se
+    omiten los índices trigram (avisando en el log).
+    """
+    with schema_editor.connection.cursor() as cursor:
+        extensions = available_extensions(cursor)
+        for name in sorted(extensions):
+            cursor.execute(f"CREATE EXTENSION IF NOT EXISTS {name}")
+        for name in {"unaccent", "pg_trgm"} - extensions:
+            logger.warning("Extensión PostgreSQL '%s' no disponible: instale postgresql-contrib", name)
+
+        cursor.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = 'spanish_unaccent'")
+        if cursor.fetchone() is None:
+            cursor.execute("CREATE TEXT SEARCH CONFIGURATION spanish_unaccent (COPY = pg_catalog.spanish)")
+            if "unaccent" in extensions:
+                cursor.execute(
+                    "ALTER TEXT SEARCH CONFIGURATION spanish_unaccent "
+                    "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem"
+                )
+
+
+def drop_search_config(apps, schema_editor):
+    schema_editor.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS spanish_unaccent")
+
+
+PUBLICATION_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION publications_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.authors, '')), 'B') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.journal, '')), 'C') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.abstract, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER publications_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, authors, journal, abstract ON publications
+    FOR EACH ROW EXECUTE FUNCTION publications_search_vector_update();
+
+UPDATE publications SET title = title;
+"""
+
+DROP_PUBLICATION_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS publications_search_vector_trigger ON publications;
+DROP FUNCTION IF EXISTS publications_search_vector_update();
+"""
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Índices trigram sobre `UPPER(col)`: los usa `istartswith`/`icontains` de Django."""
+    with schema_editor.connection.cursor() as cursor:
+        if "pg_trgm" not in available_extensions(cursor):
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS publications_doi_trgm "
+            "ON publications USING gin (UPPER(doi) gin_trgm_ops)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS publications_authors_trgm "
+            "ON publications USING gin (UPPER(authors) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    schema_editor.execute("DROP INDEX IF EXISTS publications_doi_trgm")
+    schema_editor.execute("DROP INDEX IF EXISTS publications_authors_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("publications", "0003_alter_publication_file"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_config, drop_search_config),
+        migrations.AddField(
+            model_name="publication",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="publication",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="publications_search_gin"
+            ),
+        ),
+        migrations.RunSQL(PUBLICATION_TRIGGER_SQL, DROP_PUBLICATION_TRIGGER_SQL),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:15
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ("publications", "0004_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(fields=["-created_at", "-id"], name="pub_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(
+                fields=["student", "-created_at", "-id"], name="pub_student_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(
+                fields=["student", "status"], name="pub_student_status_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(
+                fields=["status", "-created_at"], name="pub_status_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["-created_at", "-id"],
+                name="pub_pending_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="publication",
+            index=models.Index(
+                fields=["reviewed_by", "-review_date"], name="pub_reviewer_date_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="tutoropinion",
+            index=models.Index(
+                fields=["tutor", "-created_at"], name="opinion_tutor_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="tutorstudent",
+            index=models.Index(
+                fields=["tutor", "is_active", "student"], name="ts_tutor_active_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="tutorstudent",
+            index=models.Index(
+                fields=["student", "is_active"], name="ts_student_active_idx"
+            ),
+        ),
+    ]
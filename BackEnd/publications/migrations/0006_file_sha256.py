@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("publications", "0005_role_scoped_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="publication",
+            name="file_sha256",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=64,
+                verbose_name="SHA-256 del archivo",
+            ),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+# El texto extraído del documento entra en la búsqueda con el peso del resumen
+PUBLICATION_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION publications_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.authors, '')), 'B') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.journal, '')), 'C') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.abstract, '')), 'D') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.text_content, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS publications_search_vector_trigger ON publications;
+CREATE TRIGGER publications_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, authors, journal, abstract, text_content ON publications
+    FOR EACH ROW EXECUTE FUNCTION publications_search_vector_update();
+"""
+
+PREVIOUS_PUBLICATION_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION publications_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.authors, '')), 'B') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.journal, '')), 'C') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.abstract, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS publications_search_vector_trigger ON publications;
+CREATE TRIGGER publications_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, authors, journal, abstract ON publications
+    FOR EACH ROW EXECUTE FUNCTION publications_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("publications", "0006_file_sha256"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="publication",
+            name="page_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Número de páginas"
+            ),
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="preview_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "Sin archivo"),
+                    ("pending", "Pendiente"),
+                    ("ready", "Lista"),
+                    ("unavailable", "No disponible"),
+                    ("failed", "Error"),
+                ],
+                default="",
+                editable=False,
+                max_length=20,
+                verbose_name="Estado de la vista previa",
+            ),
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="text_content",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="Texto extraído"
+            ),
+        ),
+        migrations.AddField(
+            model_name="publication",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True,
+                default="",
+                editable=False,
+                upload_to="previews/",
+                verbose_name="Miniatura",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="publication",
+            index=models.Index(
+                condition=models.Q(("file_sha256", ""), _negated=True),
+                fields=["file_sha256"],
+                name="pub_file_sha_idx",
+            ),
+        ),
+        migrations.RunSQL(PUBLICATION_TRIGGER_SQL, PREVIOUS_PUBLICATION_TRIGGER_SQL),
+    ]
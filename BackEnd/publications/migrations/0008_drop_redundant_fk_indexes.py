@@ -0,0 +1,98 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_fk_index(name, table, column):
+    """
+    Quitar el índice propio de un FK que ya cubre un índice compuesto que empieza
+    por esa columna (ver `Meta.indexes`). Solo se toca el índice: `AlterField`
+    borraría y volvería a validar también la restricción del FK.
+    """
+    return migrations.RunSQL(
+        f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ("{column}")',
+    )
+
+
+class Migration(migrations.Migration):
+    # DROP/CREATE INDEX CONCURRENTLY no admiten transacción
+    atomic = False
+
+    dependencies = [
+        ("publications", "0007_document_preview"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="publication",
+                    name="reviewed_by",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        limit_choices_to={"role": "jefe"},
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="publications_reviewed",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="publication",
+                    name="student",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        limit_choices_to={"role": "estudiante"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="publications",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="tutoropinion",
+                    name="tutor",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        limit_choices_to={"role": "tutor"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="opinions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="tutorstudent",
+                    name="student",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        limit_choices_to={"role": "estudiante"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tutors_assigned",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="tutorstudent",
+                    name="tutor",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        limit_choices_to={"role": "tutor"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="students_assigned",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            database_operations=[
+                drop_fk_index("publications_reviewed_by_id_61b3c179", "publications", "reviewed_by_id"),
+                drop_fk_index("publications_student_id_44e06f10", "publications", "student_id"),
+                drop_fk_index("tutor_opinions_tutor_id_cdaf14a1", "tutor_opinions", "tutor_id"),
+                drop_fk_index("tutor_students_student_id_90363069", "tutor_students", "student_id"),
+                drop_fk_index("tutor_students_tutor_id_8b272078", "tutor_students", "tutor_id"),
+            ],
+        ),
+    ]
@@ -1,8 +1,14 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import FileExtensionValidator
 
-class Publication(models.Model):
+from config.documents import PREVIEW_STATUS_CHOICES, DocumentPreviewMixin
+from config.search import SearchVectorDeferredManager
+from requests.counters import CountedModelMixin
+
+class Publication(CountedModelMixin, DocumentPreviewMixin, models.Model):
     """
     Modelo para gestionar publicaciones científicas de estudiantes
     """
@@ -23,6 +29,7 @@ class Publication(models.Model):
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='publications',
         limit_choices_to={'role': 'estudiante'}
     )
@@ -53,6 +60,16 @@ class Publication(models.Model):
         null=True,
         blank=True
     )
+    # Huella del contenido (almacenamiento deduplicado, config/storage.py)
+    file_sha256 = models.CharField('SHA-256 del archivo', max_length=64, blank=True, default='', editable=False)
+
+    # Vista previa generada en segundo plano (requests/document_jobs.py): texto
+    # para la búsqueda, número de páginas y miniatura de la primera página
+    preview_status = models.CharField('Estado de la vista previa', max_length=20, choices=PREVIEW_STATUS_CHOICES,
+                                      blank=True, default='', editable=False)
+    page_count = models.PositiveIntegerField('Número de páginas', null=True, blank=True, editable=False)
+    thumbnail = models.ImageField('Miniatura', upload_to='previews/', blank=True, default='', editable=False)
+    text_content = models.TextField('Texto extraído', blank=True, default='', editable=False)
     
     # Nivel y estado
     nivel = models.CharField('Nivel', max_length=1, choices=NIVEL_CHOICES)
@@ -62,6 +79,7 @@ class Publication(models.Model):
     reviewed_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
+        db_index=False,
         null=True,
         blank=True,
         related_name='publications_reviewed',
@@ -74,11 +92,32 @@ class Publication(models.Model):
     created_at = models.DateTimeField('Fecha de Registro', auto_now_add=True)
     updated_at = models.DateTimeField('Última Actualización', auto_now=True)
     
+    # Búsqueda de texto completo (título, autores, revista, resumen y texto extraído).
+    # La mantiene el trigger `publications_search_vector_trigger` (migraciones 0004 y 0007).
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = SearchVectorDeferredManager()
+    
     class Meta:
         db_table = 'publications'
         verbose_name = 'Publicación'
         verbose_name_plural = 'Publicaciones'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='publications_search_gin'),
+            # Listados por rol y paginación por cursor (created_at, id). Los que
+            # empiezan por `student`/`reviewed_by` sirven también de índice del FK
+            # (por eso los campos llevan db_index=False)
+            models.Index(fields=['-created_at', '-id'], name='pub_created_idx'),
+            models.Index(fields=['student', '-created_at', '-id'], name='pub_student_created_idx'),
+            models.Index(fields=['student', 'status'], name='pub_student_status_idx'),
+            models.Index(fields=['status', '-created_at'], name='pub_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status='pending'),
+                         name='pub_pending_created_idx'),
+            models.Index(fields=['reviewed_by', '-review_date'], name='pub_reviewer_date_idx'),
+            # Mismo contenido en otra fila (vista previa reutilizable, deduplicación)
+            models.Index(fields=['file_sha256'], condition=~models.Q(file_sha256=''), name='pub_file_sha_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.student.get_full_name()}"
@@ -102,6 +141,7 @@ class TutorOpinion(models.Model):
     tutor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='opinions',
         limit_choices_to={'role': 'tutor'}
     )
@@ -122,11 +162,29 @@ class TutorOpinion(models.Model):
         verbose_name_plural = 'Opiniones de Tutores'
         ordering = ['-created_at']
         unique_together = ['publication', 'tutor']
+        indexes = [
+            # También es el índice del FK `tutor`
+            models.Index(fields=['tutor', '-created_at'], name='opinion_tutor_created_idx'),
+        ]
     
     def __str__(self):
         return f"Opinión de {self.tutor.get_full_name()} - {self.publication.title[:50]}"
 
 
+class TutorStudentQuerySet(models.QuerySet):
+    def with_relations(self):
+        """Cargar tutor/estudiante y los contadores de publicaciones del estudiante
+        en la misma consulta (evita un COUNT por fila al serializar)."""
+        publications = 'student__publications'
+        return self.select_related('tutor', 'student').annotate(
+            total_publications=models.Count(publications),
+            pending_publications_count=models.Count(publications, filter=models.Q(**{f'{publications}__status': 'pending'})),
+            approved_publications_count=models.Count(publications, filter=models.Q(**{f'{publications}__status': 'approved'})),
+            rejected_publications_count=models.Count(publications, filter=models.Q(**{f'{publications}__status': 'rejected'})),
+            last_publication_at=models.Max(f'{publications}__created_at'),
+        )
+
+
 class TutorStudent(models.Model):
     """
     Modelo para relación Tutor-Estudiante
@@ -134,12 +192,14 @@ class TutorStudent(models.Model):
     tutor = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='students_assigned',
         limit_choices_to={'role': 'tutor'}
     )
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='tutors_assigned',
         limit_choices_to={'role': 'estudiante'}
     )
@@ -151,11 +211,19 @@ class TutorStudent(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = TutorStudentQuerySet.as_manager()
+    
     class Meta:
         db_table = 'tutor_students'
         verbose_name = 'Relación Tutor-Estudiante'
         verbose_name_plural = 'Relaciones Tutor-Estudiante'
         unique_together = ['tutor', 'student']
+        indexes = [
+            # Subconsulta de alumnos activos del tutor (index-only scan); junto con
+            # el siguiente cubren los FK `tutor` y `student`
+            models.Index(fields=['tutor', 'is_active', 'student'], name='ts_tutor_active_idx'),
+            models.Index(fields=['student', 'is_active'], name='ts_student_active_idx'),
+        ]
     
     def __str__(self):
         return f"{self.tutor.get_full_name()} -> {self.student.get_full_name()}"
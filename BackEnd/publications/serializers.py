@@ -1,11 +1,16 @@
 from rest_framework import serializers
 from .models import Publication, TutorOpinion, TutorStudent
 from authentication.serializers import UserListSerializer
+from config.documents import text_excerpt
+from config.downloads import download_url, thumbnail_url
+from config.serializers import DynamicFieldsMixin
+from config.uploads import validate_document
+from requests.serializers import UploadSessionFileMixin
 
 
-class PublicationSerializer(serializers.ModelSerializer):
+class PublicationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer principal para publicaciones
+    Serializer principal para publicaciones (admite `?fields=` en lecturas)
     """
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     student_matricula = serializers.CharField(source='student.matricula', read_only=True)
@@ -14,6 +19,7 @@ class PublicationSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     nivel_display = serializers.CharField(source='get_nivel_display', read_only=True)
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     # Aliases en español para compatibilidad con frontend
     titulo = serializers.CharField(source='title', read_only=True)
@@ -23,32 +29,98 @@ class PublicationSerializer(serializers.ModelSerializer):
     volumen = serializers.CharField(source='volume', read_only=True)
     paginas = serializers.CharField(source='pages', read_only=True)
     resumen = serializers.CharField(source='abstract', read_only=True)
-    archivo = serializers.FileField(source='file', read_only=True)
+    archivo = serializers.SerializerMethodField()
     
     class Meta:
         model = Publication
         fields = [
             'id', 'student', 'student_name', 'student_matricula', 'tutor', 'tutor_name',
             'title', 'authors', 'publication_date', 'journal', 'volume', 'pages',
-            'doi', 'abstract', 'file', 'file_url', 'nivel', 'nivel_display',
-            'status', 'status_display', 'reviewed_by', 'reviewed_by_name',
+            'doi', 'abstract', 'file', 'file_url', 'thumbnail_url', 'page_count', 'preview_status',
+            'nivel', 'nivel_display', 'status', 'status_display', 'reviewed_by', 'reviewed_by_name',
             'review_comments', 'review_date', 'created_at', 'updated_at',
             # Campos en español
             'titulo', 'autores', 'fecha_publicacion', 'revista', 'volumen',
             'paginas', 'resumen', 'archivo'
         ]
         read_only_fields = ['id', 'student', 'reviewed_by', 'review_date', 'created_at', 'updated_at']
+        # La ruta en /media/ no se publica: se descarga por `file_url`
+        extra_kwargs = {'file': {'write_only': True}}
     
     def get_file_url(self, obj):
-        if obj.file:
+        return download_url(obj, self.context.get('request'))
+
+    def get_thumbnail_url(self, obj):
+        return thumbnail_url(obj, self.context.get('request'))
+
+    def get_archivo(self, obj):
+        return self.get_file_url(obj)
+
+
+class PublicationCompactSerializer(serializers.BaseSerializer):
+    """
+    Representación compacta de solo lectura para listados.
+
+    Sin alias en español, sin resumen ni comentarios de revisión y con un único
+    enlace al archivo. `to_representation` está escrito a mano (no recorre los
+    campos de DRF) y la URL base del archivo se calcula una vez por respuesta.
+    Se selecciona con `?view=compact` o `Accept: application/json; version=compact`.
+    """
+    # Columnas que necesita; usar con `.only(*PublicationCompactSerializer.only_fields)`
+    only_fields = (
+        'id', 'title', 'authors', 'journal', 'publication_date', 'doi', 'file',
+        'thumbnail', 'page_count', 'preview_status', 'nivel', 'status', 'student_id', 'tutor_id', 'created_at', 'updated_at',
+        'student__first_name', 'student__last_name',
+    )
+    status_labels = dict(Publication.STATUS_CHOICES)
+    nivel_labels = dict(Publication.NIVEL_CHOICES)
+    datetime_field = serializers.DateTimeField()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._url_prefix = None
+
+    def request_user(self):
+        return getattr(self.context.get('request'), 'user', None)
+
+    def url_prefix(self):
+        if self._url_prefix is None:
             request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+            self._url_prefix = request.build_absolute_uri('/')[:-1] if request else ''
+        return self._url_prefix
+
+    def to_representation(self, obj):
+        student = obj.student
+        file_url = preview_url = None
+        user = self.request_user()
+        if obj.file:
+            file_url = self.url_prefix() + download_url(obj, user=user)
+        if obj.thumbnail:
+            preview_url = self.url_prefix() + thumbnail_url(obj, user=user)
+        return {
+            'id': obj.pk,
+            'title': obj.title,
+            'authors': obj.authors,
+            'journal': obj.journal,
+            'publication_date': obj.publication_date.isoformat() if obj.publication_date else None,
+            'doi': obj.doi,
+            'nivel': obj.nivel,
+            'nivel_display': self.nivel_labels.get(obj.nivel, obj.nivel),
+            'status': obj.status,
+            'status_display': self.status_labels.get(obj.status, obj.status),
+            'student': obj.student_id,
+            'student_name': f'{student.first_name} {student.last_name}'.strip(),
+            'tutor': obj.tutor_id,
+            'file_url': file_url,
+            'thumbnail_url': preview_url,
+            'page_count': obj.page_count,
+            'preview_status': obj.preview_status,
+            'created_at': self.datetime_field.to_representation(obj.created_at),
+            'updated_at': self.datetime_field.to_representation(obj.updated_at),
+        }
 
 
-class PublicationCreateSerializer(serializers.ModelSerializer):
+class PublicationCreateSerializer(UploadSessionFileMixin, serializers.ModelSerializer):
     """
     Serializer para crear publicaciones
     """
@@ -61,6 +133,7 @@ class PublicationCreateSerializer(serializers.ModelSerializer):
     paginas = serializers.CharField(source='pages', required=False, allow_blank=True, default='')
     resumen = serializers.CharField(source='abstract', required=False, allow_blank=True, default='')
     archivo = serializers.FileField(source='file', required=False, allow_null=True)
+    upload_file_fields = ('file', 'archivo')
     
     class Meta:
         model = Publication
@@ -69,7 +142,9 @@ class PublicationCreateSerializer(serializers.ModelSerializer):
             'paginas', 'doi', 'resumen', 'archivo', 'nivel',
             # Campos originales para compatibilidad
             'title', 'authors', 'publication_date', 'journal', 'volume',
-            'pages', 'abstract', 'file'
+            'pages', 'abstract', 'file',
+            # Subida por fragmentos ya completada (/api/requests/uploads/)
+            'upload_id'
         ]
         extra_kwargs = {
             'title': {'write_only': True, 'required': False},
@@ -115,15 +190,8 @@ class PublicationCreateSerializer(serializers.ModelSerializer):
     
     def validate_archivo(self, value):
         if value:
-            # Validar tamaño del archivo (max 50MB)
-            if value.size > 50 * 1024 * 1024:
-                raise serializers.ValidationError("El archivo no puede superar los 50MB.")
-            
-            # Validar extensión (permitir PDF, DOC, DOCX)
-            allowed_extensions = ['.pdf', '.doc', '.docx']
-            file_ext = value.name.lower()
-            if not any(file_ext.endswith(ext) for ext in allowed_extensions):
-                raise serializers.ValidationError("Solo se permiten archivos PDF, DOC o DOCX.")
+            # Validar tamaño (max 50MB), extensión y contenido real del archivo
+            validate_document(value, self.upload_max_size)
         return value
     
     def validate_file(self, value):
@@ -141,6 +209,7 @@ class PublicationUpdateSerializer(serializers.ModelSerializer):
             'title', 'authors', 'publication_date', 'journal', 'volume',
             'pages', 'doi', 'abstract', 'file', 'nivel', 'status'
         ]
+        extra_kwargs = {'file': {'write_only': True}}
     
     def validate_status(self, value):
         # Solo el estudiante puede cambiar a 'pending' para enviar a revisión
@@ -201,19 +270,38 @@ class TutorStudentSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     student_matricula = serializers.CharField(source='student.matricula', read_only=True)
     student_carrera = serializers.CharField(source='student.carrera', read_only=True)
+    student_email = serializers.EmailField(source='student.email', read_only=True)
     pending_publications = serializers.SerializerMethodField()
+    approved_publications = serializers.SerializerMethodField()
+    rejected_publications = serializers.SerializerMethodField()
+    total_publications = serializers.IntegerField(read_only=True, default=None)
+    last_publication_at = serializers.DateTimeField(read_only=True, default=None)
     
     class Meta:
         model = TutorStudent
         fields = [
             'id', 'tutor', 'tutor_name', 'student', 'student_name',
-            'student_matricula', 'student_carrera', 'assigned_date',
-            'is_active', 'progress', 'pending_publications', 'created_at'
+            'student_matricula', 'student_carrera', 'student_email', 'assigned_date',
+            'is_active', 'progress', 'pending_publications', 'approved_publications',
+            'rejected_publications', 'total_publications', 'last_publication_at', 'created_at'
         ]
         read_only_fields = ['id', 'assigned_date', 'created_at']
     
+    def _publication_count(self, obj, status):
+        # Usar la anotación de `TutorStudent.objects.with_relations()` si existe
+        annotated = getattr(obj, f'{status}_publications_count', None)
+        if annotated is not None:
+            return annotated
+        return obj.student.publications.filter(status=status).count()
+    
     def get_pending_publications(self, obj):
-        return obj.student.publications.filter(status='pending').count()
+        return self._publication_count(obj, 'pending')
+    
+    def get_approved_publications(self, obj):
+        return self._publication_count(obj, 'approved')
+    
+    def get_rejected_publications(self, obj):
+        return self._publication_count(obj, 'rejected')
 
 
 class PublicationDetailSerializer(serializers.ModelSerializer):
@@ -227,20 +315,23 @@ class PublicationDetailSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     nivel_display = serializers.CharField(source='get_nivel_display', read_only=True)
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    text_excerpt = serializers.SerializerMethodField()
     
     class Meta:
         model = Publication
         fields = [
             'id', 'student', 'tutor', 'title', 'authors', 'publication_date',
-            'journal', 'volume', 'pages', 'doi', 'abstract', 'file', 'file_url',
-            'nivel', 'nivel_display', 'status', 'status_display', 'reviewed_by',
+            'journal', 'volume', 'pages', 'doi', 'abstract', 'file_url',
+            'thumbnail_url', 'page_count', 'preview_status', 'text_excerpt', 'nivel', 'nivel_display', 'status', 'status_display', 'reviewed_by',
             'review_comments', 'review_date', 'tutor_opinions', 'created_at', 'updated_at'
         ]
     
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return download_url(obj, self.context.get('request'))
+
+    def get_thumbnail_url(self, obj):
+        return thumbnail_url(obj, self.context.get('request'))
+
+    def get_text_excerpt(self, obj):
+        return text_excerpt(obj)
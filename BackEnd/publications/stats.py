@@ -0,0 +1,50 @@
+"""
+Servicio de estadísticas de publicaciones.
+
+Lee los contadores materializados (`requests.StatusCounter`), que se mantienen
+de forma incremental al guardar/borrar publicaciones. Todos los contadores que
+usan los paneles (total, por estado, por nivel y aprobadas por nivel) salen de
+una única consulta con agregación condicional sobre esas filas, sin recorrer
+la tabla `publications`.
+"""
+from requests.counters import PUBLICATION, scoped_counters, total
+
+from .models import Publication
+
+STATUSES = [value for value, _ in Publication.STATUS_CHOICES]
+NIVELES = [value for value, _ in Publication.NIVEL_CHOICES]
+
+
+def publication_counters(user=None):
+    """Devuelve los contadores visibles para `user` con una sola consulta.
+
+    El ámbito depende del rol (ver `requests.counters.scoped_counters`):
+    estudiante -> las suyas, tutor -> sus alumnos activos, resto -> todas.
+
+    Estructura::
+
+        {
+            'total': int,
+            'by_status': {'en_proceso': int, 'pending': int, 'approved': int, 'rejected': int},
+            'by_nivel': {'1': int, '2': int, '3': int},
+            'approved_by_nivel': {'1': int, '2': int, '3': int},
+        }
+    """
+    aggregates = {'total': total()}
+    for value in STATUSES:
+        aggregates[f'status__{value}'] = total(status=value)
+    for nivel in NIVELES:
+        aggregates[f'nivel__{nivel}'] = total(nivel=nivel)
+        aggregates[f'approved_nivel__{nivel}'] = total(nivel=nivel, status='approved')
+
+    row = scoped_counters(PUBLICATION, user).aggregate(**aggregates)
+    return {
+        'total': row['total'],
+        'by_status': {value: row[f'status__{value}'] for value in STATUSES},
+        'by_nivel': {nivel: row[f'nivel__{nivel}'] for nivel in NIVELES},
+        'approved_by_nivel': {nivel: row[f'approved_nivel__{nivel}'] for nivel in NIVELES},
+    }
+
+
+def approval_rate(approved, total):
+    return round((approved / total * 100) if total > 0 else 0, 2)
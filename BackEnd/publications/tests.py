@@ -1,3 +1,214 @@
+from django.db import connection
 from django.test import TestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from authentication.models import User
+from .models import Publication, TutorStudent
+
+
+def make_user(username, role):
+    return User.objects.create_user(username=username, password=None, role=role,
+                                    first_name=username.title(), last_name='Test')
+
+
+def auth_header(user):
+    # Nota: `rest_framework.test` no es importable aquí porque la app local
+    # `requests` oculta la librería homónima; usamos el cliente de Django + JWT.
+    return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+
+class PublicationStatsQueryCountTests(TestCase):
+    """Cada endpoint de estadísticas debe resolverse en un único round trip.
+
+    `assertNumQueries(2)`: la primera consulta es la carga del usuario que hace
+    `JWTAuthentication`; la segunda es el agregado de estadísticas.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = make_user('jefe', 'jefe')
+        cls.tutor = make_user('tutor', 'tutor')
+        cls.alumno = make_user('alumno', 'estudiante')
+        cls.otro = make_user('otro', 'estudiante')
+        TutorStudent.objects.create(tutor=cls.tutor, student=cls.alumno)
+
+        rows = [
+            (cls.alumno, 'approved', '1'), (cls.alumno, 'approved', '2'), (cls.alumno, 'pending', '1'),
+            (cls.alumno, 'rejected', '3'), (cls.otro, 'approved', '1'), (cls.otro, 'en_proceso', '2'),
+        ]
+        for student, status, nivel in rows:
+            Publication.objects.create(student=student, title='T', authors='A', nivel=nivel, status=status)
+
+    def get(self, user, url):
+        with self.assertNumQueries(2):
+            response = self.client.get(url, **auth_header(user))
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stats_department_scope(self):
+        data = self.get(self.jefe, '/api/publications/stats/')
+        self.assertEqual(data['total'], 6)
+        self.assertEqual(data['aprobadas'], 3)
+        self.assertEqual(data['pendientes'], 1)
+        self.assertEqual(data['rechazadas'], 1)
+        self.assertEqual(data['en_proceso'], 1)
+        self.assertEqual(data['por_nivel'], {'1': 3, '2': 2, '3': 1})
+        self.assertEqual(data['tasa_aprobacion'], 50.0)
+
+    def test_stats_student_scope(self):
+        data = self.get(self.otro, '/api/publications/stats/')
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['aprobadas'], 1)
+
+    def test_stats_tutor_scope(self):
+        data = self.get(self.tutor, '/api/publications/stats/')
+        self.assertEqual(data['total'], 4)
+        self.assertEqual(data['pendientes'], 1)
+
+    def test_by_level(self):
+        data = self.get(self.jefe, '/api/publications/by_level/')
+        self.assertEqual([(item['nivel'], item['cantidad']) for item in data], [('Nivel 1', 2), ('Nivel 2', 1)])
+        self.assertEqual(data[0]['color'], '#ef4444')
+
+
+class TutorStudentQueryCountTests(TestCase):
+    """Las pantallas del tutor no deben lanzar un COUNT por alumno."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tutor = make_user('tutor', 'tutor')
+        for i in range(5):
+            alumno = make_user(f'alumno{i}', 'estudiante')
+            TutorStudent.objects.create(tutor=cls.tutor, student=alumno)
+            for status in ('pending', 'approved', 'pending')[:i % 3 + 1]:
+                Publication.objects.create(student=alumno, title='T', authors='A', nivel='1', status=status)
+
+    def test_my_students_constant_queries(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/publications/tutor-students/my_students/', **auth_header(self.tutor))
+        data = {item['student_name']: item for item in response.json()}
+        self.assertEqual(data['Alumno2 Test']['pending_publications'], 2)
+        self.assertEqual(data['Alumno2 Test']['approved_publications'], 1)
+        self.assertEqual(data['Alumno2 Test']['total_publications'], 3)
+        self.assertEqual(data['Alumno0 Test']['rejected_publications'], 0)
+
+    def test_list_constant_queries(self):
+        # usuario JWT + COUNT de la paginación + página anotada
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/publications/tutor-students/', **auth_header(self.tutor))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 5)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno = make_user('alumno', 'estudiante')
+        cls.ids = [
+            Publication.objects.create(student=cls.alumno, title=f'T{i}', authors='A', nivel='1').pk
+            for i in range(5)
+        ]
+        # Misma fecha para todas: el desempate por id debe mantener el orden
+        Publication.objects.update(created_at=Publication.objects.first().created_at)
+
+    def test_walks_forward_and_back(self):
+        url = '/api/publications/my_publications/?page_size=2'
+        seen = []
+        pages = []
+        while url:
+            data = self.client.get(url, **auth_header(self.alumno)).json()
+            pages.append(data)
+            seen += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(seen, sorted(self.ids, reverse=True))
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self.client.get(pages[2]['previous'], **auth_header(self.alumno)).json()
+        self.assertEqual(back['results'], pages[1]['results'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/publications/my_publications/?cursor=zzz', **auth_header(self.alumno))
+        self.assertEqual(response.status_code, 404)
+
+    def test_fields_projection(self):
+        data = self.client.get('/api/publications/my_publications/?fields=id,title,status',
+                               **auth_header(self.alumno)).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'title', 'status'})
+
+
+class CompactRepresentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno = make_user('alumno', 'estudiante')
+        for i in range(3):
+            Publication.objects.create(student=cls.alumno, title=f'T{i}', authors='A', nivel='2',
+                                       abstract='largo', file=f'publications/2024/01/p{i}.pdf')
+
+    def test_query_param_selects_compact(self):
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/publications/my_publications/?view=compact',
+                                   **auth_header(self.alumno)).json()
+        item = data['results'][0]
+        self.assertNotIn('titulo', item)
+        self.assertNotIn('abstract', item)
+        self.assertEqual(item['student_name'], 'Alumno Test')
+        self.assertEqual(item['nivel_display'], 'Nivel 2')
+        self.assertTrue(item['file_url'].startswith(f"http://testserver/api/publications/{item['id']}/download/?token="))
+
+    def test_accept_version_selects_compact(self):
+        data = self.client.get('/api/publications/', HTTP_ACCEPT='application/json; version=compact',
+                               **auth_header(self.alumno)).json()
+        self.assertNotIn('resumen', data['results'][0])
+
+    def test_default_representation_unchanged(self):
+        data = self.client.get('/api/publications/', **auth_header(self.alumno)).json()
+        self.assertIn('titulo', data['results'][0])
+
+
+def has_extension(name):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = %s", [name])
+        return cursor.fetchone() is not None
+
+
+class FullTextSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = make_user('jefe', 'jefe')
+        alumno = make_user('alumno', 'estudiante')
+        cls.in_title = Publication.objects.create(
+            student=alumno, title='Educación ambiental en escuelas rurales', authors='Pérez, A.', nivel='1',
+            doi='10.1234/edu.2024')
+        cls.in_abstract = Publication.objects.create(
+            student=alumno, title='Otro trabajo', authors='García, L.', nivel='2',
+            abstract='Un estudio sobre la escuela primaria')
+        Publication.objects.create(student=alumno, title='Redes neuronales', authors='López, M.', nivel='3')
+
+    def search(self, terms):
+        response = self.client.get('/api/publications/search/', {'q': terms}, **auth_header(self.jefe))
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_stemming_and_rank(self):
+        # "escuela" encuentra "escuelas" y pesa más el título que el resumen
+        self.assertEqual(self.search('escuela'), [self.in_title.pk, self.in_abstract.pk])
+
+    def test_vector_follows_updates(self):
+        self.in_abstract.title = 'Biología marina'
+        self.in_abstract.save()
+        self.assertIn(self.in_abstract.pk, self.search('biología'))
+
+    def test_doi_prefix(self):
+        self.assertEqual(self.search('10.1234'), [self.in_title.pk])
+
+    def test_list_search_param(self):
+        response = self.client.get('/api/publications/', {'search': 'neuronal'}, **auth_header(self.jefe))
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_accent_insensitive(self):
+        if not has_extension('unaccent'):
+            self.skipTest('extensión unaccent no disponible en este servidor')
+        self.assertEqual(self.search('educacion'), [self.in_title.pk])
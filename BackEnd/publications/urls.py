@@ -9,9 +9,10 @@ router = DefaultRouter()
 # included under `/api/publications/` the endpoints become:
 #   - /api/publications/            -> PublicationViewSet
 #   - /api/publications/{pk}/       -> Publication detail
-# Additional resources remain as subpaths.
-router.register(r'', PublicationViewSet, basename='publication')
+# Additional resources remain as subpaths; they are registered first so that
+# `/tutor-students/` is not captured by the publication detail route.
 router.register(r'tutor-opinions', TutorOpinionViewSet, basename='tutor-opinion')
 router.register(r'tutor-students', TutorStudentViewSet, basename='tutor-student')
+router.register(r'', PublicationViewSet, basename='publication')
 
 urlpatterns = router.urls
\ No newline at end of file
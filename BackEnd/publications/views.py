@@ -2,17 +2,23 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import FormParser, JSONParser
+from rest_framework.versioning import AcceptHeaderVersioning
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from .models import Publication, TutorOpinion, TutorStudent
+from .stats import approval_rate, publication_counters
 from .serializers import (
-    PublicationSerializer, PublicationCreateSerializer, PublicationUpdateSerializer,
-    PublicationReviewSerializer, PublicationDetailSerializer,
+    PublicationSerializer, PublicationCompactSerializer, PublicationCreateSerializer,
+    PublicationUpdateSerializer, PublicationReviewSerializer, PublicationDetailSerializer,
     TutorOpinionSerializer, TutorStudentSerializer
 )
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from config.downloads import FileDownloadMixin
+from config.pagination import CreatedAtKeysetPagination
+from config.uploads import DocumentMultiPartParser
+from config.search import FullTextSearchFilter, ranked_search
 from django.apps import apps as dj_apps
 from django.db import transaction
 
@@ -31,18 +37,38 @@ def _load_log_event():
 log_event = _load_log_event()
 
 
-class PublicationViewSet(viewsets.ModelViewSet):
+class PublicationViewSet(FileDownloadMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD de publicaciones
     """
     queryset = Publication.objects.all()
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    parser_classes = [DocumentMultiPartParser, FormParser, JSONParser]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_fields = ['status', 'nivel', 'student', 'tutor']
-    search_fields = ['title', 'authors', 'journal', 'doi']
+    # `?search=` usa el índice de texto completo y los índices trigram de DOI/autores
+    search_vector_field = 'search_vector'
+    search_trigram_lookups = ('doi__istartswith', 'authors__icontains')
     ordering_fields = ['created_at', 'publication_date', 'title']
     ordering = ['-created_at']
+    # `Accept: application/json; version=compact` -> request.version == 'compact'
+    versioning_class = AcceptHeaderVersioning
+    list_actions = ('list', 'my_publications', 'pending_review', 'search')
+    
+    def wants_compact(self):
+        """¿El cliente pidió la representación compacta de listados?"""
+        request = self.request
+        if request is None or self.action not in self.list_actions:
+            return False
+        return request.query_params.get('view') == 'compact' or getattr(request, 'version', None) == 'compact'
+    
+    def list_queryset(self, queryset):
+        """Limitar columnas cuando se usa la representación compacta"""
+        if self.wants_compact():
+            return queryset.select_related(None).select_related('student').only(
+                *PublicationCompactSerializer.only_fields
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -51,6 +77,8 @@ class PublicationViewSet(viewsets.ModelViewSet):
             return PublicationUpdateSerializer
         elif self.action == 'retrieve':
             return PublicationDetailSerializer
+        elif self.wants_compact():
+            return PublicationCompactSerializer
         return PublicationSerializer
     
     @swagger_auto_schema(
@@ -61,6 +89,7 @@ class PublicationViewSet(viewsets.ModelViewSet):
             openapi.Parameter('student', openapi.IN_QUERY, description="Filtrar por estudiante", type=openapi.TYPE_INTEGER),
             openapi.Parameter('tutor', openapi.IN_QUERY, description="Filtrar por tutor", type=openapi.TYPE_INTEGER),
             openapi.Parameter('search', openapi.IN_QUERY, description="Búsqueda en título, autores, journal, DOI", type=openapi.TYPE_STRING),
+            openapi.Parameter('view', openapi.IN_QUERY, description="'compact' para la representación compacta de listados", type=openapi.TYPE_STRING),
         ],
         tags=['Publicaciones']
     )
@@ -76,37 +105,67 @@ class PublicationViewSet(viewsets.ModelViewSet):
             student_ids = TutorStudent.objects.filter(tutor=user, is_active=True).values_list('student_id', flat=True)
             queryset = queryset.filter(student_id__in=student_ids)
         
-        return queryset
+        return self.list_queryset(queryset)
+    
+    @swagger_auto_schema(
+        operation_description="Búsqueda de texto completo ordenada por relevancia (stemming en español, sin tildes)",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Términos de búsqueda (admite \"frase\", -excluir, or)", type=openapi.TYPE_STRING, required=True),
+        ],
+        responses={200: PublicationSerializer(many=True), 400: "Falta el parámetro q"},
+        tags=['Publicaciones']
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Buscar publicaciones visibles para el usuario, ordenadas por relevancia"""
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            return Response({'error': 'El parámetro q es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Solo los filtros de campo: el orden lo fija la relevancia
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        queryset = ranked_search(queryset, terms, lookups=self.search_trigram_lookups)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Obtener publicaciones del estudiante actual",
+        operation_description="Obtener publicaciones del estudiante actual (paginación por cursor)",
+        manual_parameters=[
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING),
+            openapi.Parameter('view', openapi.IN_QUERY, description="'compact' para la representación compacta de listados", type=openapi.TYPE_STRING),
+        ],
         responses={200: PublicationSerializer(many=True)},
         tags=['Publicaciones - Estudiantes']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def my_publications(self, request):
         """Obtener publicaciones del estudiante actual"""
         if request.user.role != 'estudiante':
             return Response({'error': 'Solo estudiantes pueden acceder'}, status=status.HTTP_403_FORBIDDEN)
         
-        publications = self.get_queryset().filter(student=request.user)
-        serializer = PublicationSerializer(publications, many=True, context={'request': request})
-        return Response(serializer.data)
+        publications = self.paginate_queryset(self.get_queryset().filter(student=request.user))
+        serializer = self.get_serializer(publications, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Obtener publicaciones pendientes de revisión (para jefe)",
+        operation_description="Obtener publicaciones pendientes de revisión (para jefe, paginación por cursor)",
+        manual_parameters=[
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING),
+            openapi.Parameter('view', openapi.IN_QUERY, description="'compact' para la representación compacta de listados", type=openapi.TYPE_STRING),
+        ],
         responses={200: PublicationSerializer(many=True)},
         tags=['Publicaciones - Jefes']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def pending_review(self, request):
         """Obtener publicaciones pendientes de revisión (para jefe)"""
         if request.user.role != 'jefe':
             return Response({'error': 'Solo jefes pueden acceder'}, status=status.HTTP_403_FORBIDDEN)
         
-        publications = Publication.objects.filter(status='pending')
-        serializer = PublicationSerializer(publications, many=True, context={'request': request})
-        return Response(serializer.data)
+        publications = self.paginate_queryset(self.get_queryset().filter(status='pending'))
+        serializer = self.get_serializer(publications, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
         operation_description="Revisar una publicación (para jefe de departamento)",
@@ -203,29 +262,19 @@ class PublicationViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Obtener estadísticas de publicaciones"""
-        from django.db.models import Count
-        
-        # Estadísticas generales
-        total = Publication.objects.count()
-        pendientes = Publication.objects.filter(status='pending').count()
-        aprobadas = Publication.objects.filter(status='approved').count()
-        rechazadas = Publication.objects.filter(status='rejected').count()
-        en_proceso = Publication.objects.filter(status='en_proceso').count()
-        
-        # Por nivel
-        por_nivel = Publication.objects.values('nivel').annotate(
-            count=Count('id')
-        ).order_by('nivel')
+        """Obtener estadísticas de publicaciones (una sola consulta, acotada por rol)"""
+        counters = publication_counters(request.user)
+        total = counters['total']
+        by_status = counters['by_status']
         
         return Response({
             'total': total,
-            'pendientes': pendientes,
-            'aprobadas': aprobadas,
-            'rechazadas': rechazadas,
-            'en_proceso': en_proceso,
-            'por_nivel': {item['nivel']: item['count'] for item in por_nivel},
-            'tasa_aprobacion': round((aprobadas / total * 100) if total > 0 else 0, 2)
+            'pendientes': by_status['pending'],
+            'aprobadas': by_status['approved'],
+            'rechazadas': by_status['rejected'],
+            'en_proceso': by_status['en_proceso'],
+            'por_nivel': {nivel: count for nivel, count in counters['by_nivel'].items() if count},
+            'tasa_aprobacion': approval_rate(by_status['approved'], total)
         })
     
     @swagger_auto_schema(
@@ -251,28 +300,23 @@ class PublicationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def by_level(self, request):
         """Obtener publicaciones agrupadas por nivel con detalles"""
-        from django.db.models import Count
-        
-        por_nivel = Publication.objects.filter(
-            status='approved'
-        ).values('nivel').annotate(
-            cantidad=Count('id')
-        ).order_by('nivel')
+        counters = publication_counters(request.user)
         
         # Formatear con colores
         colores = {
-            1: '#ef4444',  # Rojo
-            2: '#f59e0b',  # Naranja
-            3: '#10b981',  # Verde
-            4: '#3b82f6',  # Azul
+            '1': '#ef4444',  # Rojo
+            '2': '#f59e0b',  # Naranja
+            '3': '#10b981',  # Verde
+            '4': '#3b82f6',  # Azul
         }
         
         data = []
-        for item in por_nivel:
-            nivel = item['nivel']
+        for nivel, cantidad in counters['approved_by_nivel'].items():
+            if not cantidad:
+                continue
             data.append({
                 'nivel': f'Nivel {nivel}',
-                'cantidad': item['cantidad'],
+                'cantidad': cantidad,
                 'color': colores.get(nivel, '#6b7280')
             })
         
@@ -423,7 +467,7 @@ class TutorStudentViewSet(viewsets.ModelViewSet):
     )
     def get_queryset(self):
         user = self.request.user
-        queryset = TutorStudent.objects.select_related('tutor', 'student').all()
+        queryset = TutorStudent.objects.with_relations()
         
         if user.role == 'tutor':
             queryset = queryset.filter(tutor=user)
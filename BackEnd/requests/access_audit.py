@@ -0,0 +1,281 @@
+"""
+Agregación de respuestas 401/403 fuera de la petición.
+
+Un frontend con el JWT caducado que sondea cada 30 s (`useNotifications.js`)
+genera una ráfaga de 401 idénticos; escribir un `SystemLog` (y, en los 403, una
+`AdminNotification`) por cada uno pone uno o dos INSERT en el camino de la
+respuesta. `AuditMiddleware` solo llama a `record()`, que trabaja en memoria:
+
+- Deduplicación: los eventos con la misma clave (usuario, ruta, estado) dentro
+  de la ventana `AUDIT_ACCESS_DEDUP_WINDOW` (segundos, desde el primero) se
+  acumulan en una sola fila con `occurrences = N`.
+- Muestreo: `AUDIT_ACCESS_SAMPLE_RATES` (`{estado: fracción}`) decide si se
+  abre una clave nueva; las repeticiones de una clave ya abierta siempre se
+  cuentan. La fracción aplicada queda en la descripción para poder extrapolar.
+- Un hilo en segundo plano emite las claves cuya ventana ha terminado:
+  `log_event` (que a su vez encola en el escritor por lotes de `audit.py`) y
+  la notificación de los 403. Sin escritor asíncrono (tests) no hay hilo: las
+  claves vencidas se emiten en el siguiente `record()` o con `flush()`. El
+  mismo hilo suma a su notificación las ocurrencias que retuvo el límite de
+  escritura de `notifications` al cerrarse su ventana.
+
+Como mucho se guardan `AUDIT_ACCESS_MAX_KEYS` claves abiertas; al llegar al
+límite se emiten todas. Al salir del proceso (`atexit`) se vacía lo pendiente.
+"""
+import atexit
+import logging
+import os
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .audit import get_writer, is_async_enabled
+
+logger = logging.getLogger(__name__)
+
+STATUS_TEXT = {
+    401: 'No autenticado',
+    403: 'Acceso denegado',
+}
+
+
+class AccessEventAggregator:
+    """Ventanas de deduplicación por (usuario, ruta, estado) y muestreo por estado."""
+
+    def __init__(self, window=60.0, sample_rates=None, max_keys=5000, background=True):
+        self.window = window
+        self.sample_rates = sample_rates or {}
+        self.max_keys = max_keys
+        self.background = background
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._next_due = None
+        self._pid = None
+        self._thread = None
+        self._kick = threading.Event()
+        self._stopping = False
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self._counters = {'recorded': 0, 'deduplicated': 0, 'sampled_out': 0, 'emitted': 0}
+
+    def ensure_started(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    # Hijo tras fork: las claves abiertas son del padre
+                    self._buckets = {}
+                    self._next_due = None
+                    self._reset_counters()
+                    self._thread = None
+                    self._pid = pid
+        if self.background and (self._thread is None or not self._thread.is_alive()):
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stopping = False
+                    self._thread = threading.Thread(target=self._run, name='access-audit', daemon=True)
+                    self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Productor (camino de la respuesta)
+    # ------------------------------------------------------------------
+    def record(self, request, status_code):
+        """Anotar una respuesta 401/403. Devuelve False si el muestreo la descartó."""
+        self.ensure_started()
+        user = getattr(request, 'user', None)
+        if user is not None and not user.is_authenticated:
+            user = None
+        key = (getattr(user, 'pk', None), request.path, status_code)
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            self._counters['recorded'] += 1
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket['occurrences'] += 1
+                bucket['last_seen'] = timezone.now()
+                self._counters['deduplicated'] += 1
+            else:
+                rate = self.sample_rates.get(status_code, 1.0)
+                if rate < 1.0 and random.random() >= rate:
+                    self._counters['sampled_out'] += 1
+                    return False
+                xff = request.META.get('HTTP_X_FORWARDED_FOR')
+                self._buckets[key] = {
+                    'user': user,
+                    'path': request.path,
+                    'method': request.method,
+                    'status': status_code,
+                    'ip_address': xff.split(',')[0].strip() if xff else request.META.get('REMOTE_ADDR'),
+                    'user_agent': request.META.get('HTTP_USER_AGENT'),
+                    'sample_rate': rate,
+                    'occurrences': 1,
+                    'first_seen': timezone.now(),
+                    'last_seen': timezone.now(),
+                    'due': now + self.window,
+                }
+                if self._next_due is None or now + self.window < self._next_due:
+                    self._next_due = now + self.window
+            if len(self._buckets) >= self.max_keys:
+                due = self._overflow(now)
+            elif not self.background and self._next_due is not None and self._next_due <= now:
+                due = self._take(lambda bucket: bucket['due'] <= now)
+        self._emit(due)
+        return True
+
+    def flush(self, due_only=False):
+        """Emitir las claves abiertas (solo las de ventana vencida con `due_only`)."""
+        now = time.monotonic()
+        with self._lock:
+            if due_only and (self._next_due is None or self._next_due > now):
+                return 0
+            buckets = self._take(lambda bucket: not due_only or bucket['due'] <= now)
+        self._emit(buckets)
+        return len(buckets)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._counters)
+            data['pending'] = len(self._buckets)
+        data['window'] = self.window
+        data['sample_rates'] = {str(status): rate for status, rate in self.sample_rates.items()}
+        return data
+
+    def shutdown(self, timeout=5.0):
+        """Detener el hilo y emitir lo pendiente. Se registra con `atexit`."""
+        if self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._kick.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self.flush() and is_async_enabled():
+            # El escritor pudo cerrarse antes (atexit es LIFO): volcar lo recién encolado
+            get_writer().shutdown(timeout)
+
+    # ------------------------------------------------------------------
+    # Emisión (fuera de la petición)
+    # ------------------------------------------------------------------
+    def _take(self, predicate):
+        """Sacar las claves que cumplen `predicate` (con `_lock` tomado)."""
+        taken = [key for key, bucket in self._buckets.items() if predicate(bucket)]
+        buckets = [self._buckets.pop(key) for key in taken]
+        self._next_due = min((bucket['due'] for bucket in self._buckets.values()), default=None)
+        return buckets
+
+    def _overflow(self, now):
+        """Demasiadas claves abiertas: vencerlas todas (las emite el hilo si lo hay)."""
+        if not self.background:
+            return self._take(lambda bucket: True)
+        for bucket in self._buckets.values():
+            bucket['due'] = now
+        self._next_due = now
+        self._kick.set()
+        return []
+
+    def _run(self):
+        tick = min(max(self.window / 4, 0.05), 5.0)
+        while True:
+            self._kick.wait(tick)
+            self._kick.clear()
+            if self._stopping:
+                break
+            try:
+                from .utils import flush_held_notifications
+
+                # También las notificaciones retenidas por el límite de escritura (`notifications`)
+                if self.flush(due_only=True) + flush_held_notifications():
+                    close_old_connections()
+            except Exception:
+                logger.exception("[access_audit] Error emitiendo eventos de acceso")
+
+    def _emit(self, buckets):
+        if not buckets:
+            return
+        from .utils import create_notification, log_event
+
+        for bucket in buckets:
+            try:
+                self._emit_one(bucket, log_event, create_notification)
+            except Exception:
+                logger.exception("[access_audit] Error emitiendo %s %s", bucket['status'], bucket['path'])
+        with self._lock:
+            self._counters['emitted'] += len(buckets)
+
+    def _emit_one(self, bucket, log_event, create_notification):
+        user = bucket['user']
+        username = user.username if user else None
+        occurrences = bucket['occurrences']
+        lines = [
+            STATUS_TEXT.get(bucket['status'], 'Acceso no autorizado'),
+            f"Path: {bucket['path']}",
+            f"Method: {bucket['method']}",
+            f"User: {username or 'Anonymous'}",
+        ]
+        if occurrences > 1:
+            lines.append(f"Ocurrencias: {occurrences} (de {local_time(bucket['first_seen'])} "
+                         f"a {local_time(bucket['last_seen'])})")
+        if bucket['sample_rate'] < 1.0:
+            lines.append(f"Muestreo: {bucket['sample_rate']:.0%}")
+
+        log_event(
+            user=user,
+            action='unauthorized_attempt',
+            model_name='Access',
+            object_id=None,
+            description='\n'.join(lines),
+            ip_address=bucket['ip_address'],
+            user_agent=bucket['user_agent'],
+            occurrences=occurrences,
+            created_at=bucket['first_seen'],
+        )
+
+        # Notificación para intentos no autorizados (solo 403, no 401)
+        if bucket['status'] == 403:
+            create_notification(
+                notification_type='unauthorized_attempt',
+                severity='warning',
+                title=f"Acceso denegado: {bucket['path']}",
+                message=f"Usuario {username or 'anónimo'} intentó acceder a {bucket['path']}",
+                user=user,
+                ip_address=bucket['ip_address'],
+                occurrences=occurrences,
+                metadata={
+                    'path': bucket['path'],
+                    'method': bucket['method'],
+                    'user_agent': bucket['user_agent'] or '',
+                    'first_seen': bucket['first_seen'].isoformat(),
+                    'last_seen': bucket['last_seen'].isoformat(),
+                },
+            )
+
+
+def local_time(value):
+    return timezone.localtime(value).strftime('%H:%M:%S')
+
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator():
+    """Instancia única del agregador, configurada desde `settings.AUDIT_ACCESS_*`."""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                _aggregator = AccessEventAggregator(
+                    window=getattr(settings, 'AUDIT_ACCESS_DEDUP_WINDOW', 60.0),
+                    sample_rates=getattr(settings, 'AUDIT_ACCESS_SAMPLE_RATES', {}),
+                    max_keys=getattr(settings, 'AUDIT_ACCESS_MAX_KEYS', 5000),
+                    background=is_async_enabled(),
+                )
+                atexit.register(_aggregator.shutdown)
+    return _aggregator
@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import ECERequest, SystemLog, SystemConfiguration
+from . import config_registry
+from .models import DocumentJob, ECERequest, SystemLog, SystemConfiguration
 
 
 @admin.register(ECERequest)
 class ECERequestAdmin(admin.ModelAdmin):
-    list_display = ('student', 'status', 'created_at', 'review_date')
-    list_filter = ('status', 'created_at', 'review_date')
+    list_display = ('student', 'status', 'preview_status', 'created_at', 'review_date')
+    list_filter = ('status', 'preview_status', 'created_at', 'review_date')
     search_fields = ('student__username', 'student__matricula', 'description')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
@@ -13,7 +14,7 @@ class ECERequestAdmin(admin.ModelAdmin):
 
 @admin.register(SystemLog)
 class SystemLogAdmin(admin.ModelAdmin):
-    list_display = ('user', 'action', 'model_name', 'created_at')
+    list_display = ('user', 'action', 'model_name', 'occurrences', 'created_at')
     list_filter = ('action', 'model_name', 'created_at')
     search_fields = ('user__username', 'description', 'model_name')
     readonly_fields = ('created_at',)
@@ -27,3 +28,24 @@ class SystemConfigurationAdmin(admin.ModelAdmin):
     search_fields = ('key', 'description')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('key',)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        config_registry.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        config_registry.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        config_registry.invalidate()
+
+
+@admin.register(DocumentJob)
+class DocumentJobAdmin(admin.ModelAdmin):
+    list_display = ('entity', 'object_id', 'status', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('entity', 'status')
+    search_fields = ('object_id', 'file_sha256', 'last_error')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'locked_by', 'last_error')
+    ordering = ('-updated_at',)
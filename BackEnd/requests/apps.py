@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class RequestsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'requests'
+
+    def ready(self):
+        """Registrar señales (contadores materializados, etc.)"""
+        from . import signals  # noqa: F401
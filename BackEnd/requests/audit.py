@@ -0,0 +1,302 @@
+"""
+Escritor asíncrono y por lotes para el registro de auditoría (SystemLog).
+
+`log_event` se invoca desde las señales de login, `AuditMiddleware`, los hooks
+`perform_*` de los ViewSets y el middleware de IPs de admin. Para no pagar un
+INSERT por petición, los eventos se encolan en una cola acotada en memoria y un
+hilo en segundo plano los persiste con `bulk_create` cuando se alcanza un
+tamaño de lote o un intervalo de tiempo.
+
+Política de desbordamiento (`AUDIT_LOG_OVERFLOW_POLICY`):
+- `drop`:  descartar el evento y contarlo.
+- `block`: esperar hasta `AUDIT_LOG_BLOCK_TIMEOUT` segundos a que haya hueco.
+- `spill`: volcar el evento a un fichero JSONL local (`AUDIT_LOG_SPILL_PATH`)
+  que puede reinyectarse con `manage.py replay_audit_spill`.
+
+`created_at` se fija en `log_event` y viaja en el evento (también en el
+fichero de volcado): la fila guarda el momento del evento aunque se escriba
+tras un reintento o se reinyecte días después, y cae en su partición mensual.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_DROP = 'drop'
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_SPILL = 'spill'
+OVERFLOW_POLICIES = (OVERFLOW_DROP, OVERFLOW_BLOCK, OVERFLOW_SPILL)
+
+# Campos de SystemLog que viajan en cada evento encolado
+ENTRY_FIELDS = ('user_id', 'action', 'model_name', 'object_id', 'description', 'ip_address', 'user_agent',
+                'occurrences', 'created_at')
+
+_STOP = object()
+
+
+class AuditLogWriter:
+    """Cola acotada + hilo de volcado por lotes para SystemLog.
+
+    El hilo se arranca de forma perezosa en el primer evento y se vuelve a
+    crear si el proceso ha hecho fork (workers de gunicorn con preload).
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=200, flush_interval=1.0,
+                 overflow_policy=OVERFLOW_SPILL, spill_path=None, block_timeout=0.5):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de desbordamiento desconocida: {overflow_policy}")
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.block_timeout = block_timeout
+
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._counters_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._reset_counters()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def _reset_counters(self):
+        self._counters = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'spilled': 0,
+            'failed': 0,
+            'flushes': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'last_batch_size': 0,
+        }
+
+    def _incr(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != pid:
+                # Proceso nuevo (o hijo tras fork): no heredar cola ni contadores
+                self._queue = queue.Queue(maxsize=self.max_queue_size)
+                self._reset_counters()
+                self._pid = pid
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def shutdown(self, timeout=5.0):
+        """Vaciar la cola y detener el hilo. Se registra con `atexit`."""
+        if self._pid != os.getpid() or self._thread is None:
+            return
+        thread = self._thread
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        # Si el hilo no terminó a tiempo, volcar lo que quede desde aquí
+        remaining = self._drain_nowait()
+        if remaining:
+            self._flush(remaining)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Productor
+    # ------------------------------------------------------------------
+    def enqueue(self, entry):
+        """Encolar un evento (dict con `ENTRY_FIELDS`). Devuelve True si se aceptó."""
+        self._ensure_started()
+        try:
+            if self.overflow_policy == OVERFLOW_BLOCK:
+                self._queue.put(entry, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            if self.overflow_policy == OVERFLOW_SPILL and self._spill(entry):
+                return True
+            self._incr('dropped')
+            return False
+        self._incr('enqueued')
+        return True
+
+    def flush(self, timeout=5.0):
+        """Esperar a que la cola quede vacía (útil en tests y comandos)."""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stats(self):
+        """Contadores de la tubería: profundidad de cola y latencia de volcado."""
+        with self._counters_lock:
+            data = dict(self._counters)
+        flushes = data['flushes']
+        data['avg_flush_ms'] = round(data.pop('total_flush_ms') / flushes, 3) if flushes else 0.0
+        data['queue_depth'] = self._queue.qsize() if self._queue is not None else 0
+        data['queue_capacity'] = self.max_queue_size
+        data['overflow_policy'] = self.overflow_policy
+        data['running'] = bool(self._thread and self._thread.is_alive())
+        return data
+
+    # ------------------------------------------------------------------
+    # Consumidor
+    # ------------------------------------------------------------------
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect_batch()
+            if batch:
+                try:
+                    self._flush(batch)
+                except Exception:
+                    logger.exception("[audit] Error inesperado volcando %s eventos", len(batch))
+                    for entry in batch:
+                        self._record_failure(entry)
+            for _ in range(len(batch) + (1 if stopping else 0)):
+                self._queue.task_done()
+        connection.close()
+
+    def _collect_batch(self):
+        """Bloquear hasta el primer evento y acumular hasta `batch_size` o `flush_interval`."""
+        batch = []
+        try:
+            item = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, False
+        if item is _STOP:
+            return batch, True
+        batch.append(item)
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _drain_nowait(self):
+        items = []
+        if self._queue is None:
+            return items
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+            if item is not _STOP:
+                items.append(item)
+        return items
+
+    def _flush(self, batch):
+        started = time.perf_counter()
+        SystemLog = apps.get_model('requests', 'SystemLog')
+        try:
+            SystemLog.objects.bulk_create([SystemLog(**entry) for entry in batch])
+            self._incr('written', len(batch))
+        except DatabaseError:
+            logger.exception("[audit] Falló bulk_create de %s eventos; reintentando uno a uno", len(batch))
+            connection.close()
+            self._flush_one_by_one(SystemLog, batch)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._counters_lock:
+            c = self._counters
+            c['flushes'] += 1
+            c['last_batch_size'] = len(batch)
+            c['last_flush_ms'] = round(elapsed_ms, 3)
+            c['max_flush_ms'] = max(c['max_flush_ms'], c['last_flush_ms'])
+            c['total_flush_ms'] += elapsed_ms
+
+    def _flush_one_by_one(self, SystemLog, batch):
+        for entry in batch:
+            try:
+                SystemLog.objects.create(**entry)
+            except IntegrityError:
+                # El usuario pudo eliminarse antes del volcado: conservar el evento sin FK
+                try:
+                    SystemLog.objects.create(**{**entry, 'user_id': None})
+                except DatabaseError:
+                    self._record_failure(entry)
+                    continue
+            except DatabaseError:
+                self._record_failure(entry)
+                connection.close()
+                continue
+            self._incr('written')
+
+    def _record_failure(self, entry):
+        self._incr('failed')
+        if not self._spill(entry):
+            logger.error("[audit] Evento de auditoría perdido: %s", entry.get('action'))
+
+    def _spill(self, entry):
+        if self.spill_path is None:
+            return False
+        try:
+            with self._spill_lock:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.spill_path, 'a', encoding='utf-8') as fh:
+                    fh.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        except OSError:
+            logger.exception("[audit] No se pudo escribir en %s", self.spill_path)
+            return False
+        self._incr('spilled')
+        return True
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_writer():
+    """Instancia única del escritor, configurada desde `settings.AUDIT_LOG_*`."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditLogWriter(
+                    max_queue_size=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 10000),
+                    batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 200),
+                    flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', 1.0),
+                    overflow_policy=getattr(settings, 'AUDIT_LOG_OVERFLOW_POLICY', OVERFLOW_SPILL),
+                    spill_path=getattr(settings, 'AUDIT_LOG_SPILL_PATH', None),
+                    block_timeout=getattr(settings, 'AUDIT_LOG_BLOCK_TIMEOUT', 0.5),
+                )
+                atexit.register(_writer.shutdown)
+    return _writer
+
+
+def is_async_enabled():
+    return getattr(settings, 'AUDIT_LOG_ASYNC', False)
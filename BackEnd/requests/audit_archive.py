@@ -0,0 +1,415 @@
+"""
+Archivo columnar comprimido de logs del sistema (`.alog`).
+
+`archive_system_logs` vuelca cada partición mensual vencida de `system_logs` a
+`AUDIT_ARCHIVE_DIR/system_logs_pAAAAMM.alog`, y `query_audit_archive` (o
+`query_archives` desde código) la consulta sin volver a cargarla en
+PostgreSQL. Solo usa la biblioteca estándar (zlib, array, mmap).
+
+Un archivo nunca se sobrescribe: si llegan filas tardías de un mes ya
+archivado (se vuelve a crear su partición desde la DEFAULT), van a
+`system_logs_pAAAAMM.1.alog`, `.2.alog`, ... (`archive_path`) y las consultas
+leen todos los archivos del mes.
+
+Formato::
+
+    MAGIC | bloques comprimidos ... | pie (JSON, zlib) | longitud del pie (u64) | MAGIC
+
+Las filas (ordenadas por `created_at`) se agrupan de `GROUP_ROWS` en
+`GROUP_ROWS`. Dentro de cada grupo cada columna es un bloque zlib propio:
+
+- `int` (`id`, `created_at` en µs UTC, `user_id`, `object_id`,
+  `occurrences`): array int64 little-endian; `NULL_INT` representa NULL.
+- `dict` (`action`, `model_name`, `ip_address`, `user_agent`): lista JSON de
+  valores distintos y array uint32 de códigos, en dos bloques.
+- `text` (`description`): lista JSON.
+
+El pie guarda, por grupo, el número de filas, la posición de cada bloque y
+el mínimo y el máximo de `id`, `created_at` y `user_id`.
+
+La lectura proyecta el archivo en memoria (mmap) y descomprime solo lo que
+necesita. Primero descarta grupos enteros con las estadísticas del pie y con
+los diccionarios (acción o IP que no aparecen en el grupo). Después filtra
+columna a columna (fecha, usuario, acción, IP) y decodifica las demás
+columnas solo si queda alguna fila.
+"""
+import ipaddress
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+MAGIC = b'ECEALOG1'
+FOOTER_LEN = struct.Struct('<Q')
+GROUP_ROWS = 16384
+NULL_INT = -2 ** 63
+SUFFIX = '.alog'
+# `system_logs_p202503`, o `system_logs_p202503.2` para filas tardías del mes
+ARCHIVE_STEM_RE = re.compile(r'_p(\d{4})(\d{2})(?:\.(\d+))?$')
+
+INT_COLUMNS = ('id', 'created_at', 'user_id', 'object_id', 'occurrences')
+DICT_COLUMNS = ('action', 'model_name', 'ip_address', 'user_agent')
+TEXT_COLUMNS = ('description',)
+COLUMNS = (
+    'id', 'created_at', 'user_id', 'action', 'model_name', 'object_id',
+    'description', 'ip_address', 'user_agent', 'occurrences',
+)
+STATS_COLUMNS = ('id', 'created_at', 'user_id')
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_SWAP = sys.byteorder != 'little'
+
+
+class ArchiveError(Exception):
+    """Archivo truncado o que no es un `.alog`."""
+
+
+def to_micros(moment):
+    delta = moment - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_micros(value):
+    seconds, micros = divmod(value, 1_000_000)
+    return datetime.fromtimestamp(seconds, dt_timezone.utc).replace(microsecond=micros)
+
+
+def _pack(typecode, values):
+    data = array(typecode, values)
+    if _SWAP:
+        data.byteswap()
+    return data.tobytes()
+
+
+def _unpack(typecode, raw):
+    data = array(typecode)
+    data.frombytes(raw)
+    if _SWAP:
+        data.byteswap()
+    return data
+
+
+# ----------------------------------------------------------------------
+# Escritura
+# ----------------------------------------------------------------------
+class ArchiveWriter:
+    """Escribe filas (dicts con `COLUMNS`) por grupos; `close()` añade el pie."""
+
+    def __init__(self, fh, group_rows=GROUP_ROWS):
+        self._fh = fh
+        self._group_rows = group_rows
+        self._pending = []
+        self._groups = []
+        self.rows = 0
+        self._offset = len(MAGIC)
+        fh.write(MAGIC)
+
+    def write(self, row):
+        self._pending.append(row)
+        if len(self._pending) >= self._group_rows:
+            self._flush_group()
+
+    def close(self):
+        if self._pending:
+            self._flush_group()
+        footer = zlib.compress(json.dumps({
+            'version': 1, 'rows': self.rows, 'group_rows': self._group_rows, 'groups': self._groups,
+        }, separators=(',', ':')).encode('utf-8'))
+        self._fh.write(footer)
+        self._fh.write(FOOTER_LEN.pack(len(footer)))
+        self._fh.write(MAGIC)
+
+    def _chunk(self, raw):
+        data = zlib.compress(raw, 6)
+        self._fh.write(data)
+        position = [self._offset, len(data)]
+        self._offset += len(data)
+        return position
+
+    def _flush_group(self):
+        rows, self._pending = self._pending, []
+        columns, stats = {}, {}
+        for name in INT_COLUMNS:
+            values = [_int_value(name, row[name]) for row in rows]
+            columns[name] = self._chunk(_pack('q', values))
+            if name in STATS_COLUMNS:
+                present = [value for value in values if value != NULL_INT]
+                stats[name] = [min(present), max(present)] if present else None
+        for name in DICT_COLUMNS:
+            codes, index = [], {}
+            for row in rows:
+                value = row[name]
+                value = None if value is None else str(value)
+                codes.append(index.setdefault(value, len(index)))
+            columns[name] = {
+                'values': self._chunk(json.dumps(list(index), ensure_ascii=False).encode('utf-8')),
+                'codes': self._chunk(_pack('I', codes)),
+            }
+        for name in TEXT_COLUMNS:
+            columns[name] = self._chunk(json.dumps([row[name] for row in rows], ensure_ascii=False).encode('utf-8'))
+        self._groups.append({'rows': len(rows), 'stats': stats, 'columns': columns})
+        self.rows += len(rows)
+
+
+def _int_value(name, value):
+    if value is None:
+        return NULL_INT
+    if name == 'created_at':
+        return to_micros(value)
+    return int(value)
+
+
+def archive_path(directory, name):
+    """Primer nombre libre para archivar `name`: `name.alog`, `name.1.alog`, `name.2.alog`, ..."""
+    directory = Path(directory)
+    path = directory / f'{name}{SUFFIX}'
+    sequence = 0
+    while path.exists():
+        sequence += 1
+        path = directory / f'{name}.{sequence}{SUFFIX}'
+    return path
+
+
+def find_archive(directory, name, rows, id_range):
+    """
+    Archivo ya escrito de `name` (`name.alog` o `name.N.alog`) con `rows` filas
+    y ese `(id mínimo, id máximo)`, o None: la misma tabla ya está archivada.
+    """
+    for path in sorted(Path(directory).glob(f'{name}*{SUFFIX}')):
+        stem = path.name[:-len(SUFFIX)]
+        if stem != name and not (stem.startswith(f'{name}.') and stem[len(name) + 1:].isdigit()):
+            continue
+        try:
+            with ArchiveReader(path) as reader:
+                if reader.rows == rows and reader.id_range() == tuple(id_range):
+                    return path
+        except (OSError, ArchiveError):
+            continue
+    return None
+
+
+def write_archive(path, rows, group_rows=GROUP_ROWS):
+    """
+    Escribir `rows` en `path`. Se escribe en un temporal y se enlaza con el
+    nombre final: un archivo con ese nombre siempre está completo y, si ya
+    existe, no se sobrescribe (`FileExistsError`). Devuelve las filas escritas.
+    """
+    path = Path(path)
+    partial = path.with_name(path.name + '.partial')
+    try:
+        with open(partial, 'wb') as fh:
+            writer = ArchiveWriter(fh, group_rows=group_rows)
+            for row in rows:
+                writer.write(row)
+            writer.close()
+            fh.flush()
+            os.fsync(fh.fileno())
+        # `link` falla si el destino existe (`replace` lo pisaría)
+        os.link(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return writer.rows
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+class LogFilter:
+    """Predicados de una consulta; None significa sin filtro."""
+
+    def __init__(self, user_id=None, actions=None, ip=None, start=None, end=None):
+        self.user_id = user_id
+        self.actions = set(actions) if actions else None
+        # Dirección exacta o red ("10.0.0.0/8")
+        self.network = ipaddress.ip_network(ip, strict=False) if ip else None
+        self.start = to_micros(start) if start else None
+        self.end = to_micros(end) if end else None
+
+    def group_may_match(self, stats):
+        created = stats.get('created_at')
+        if created and self.start is not None and created[1] < self.start:
+            return False
+        if created and self.end is not None and created[0] >= self.end:
+            return False
+        if self.user_id is not None:
+            users = stats.get('user_id')
+            if users is None or not users[0] <= self.user_id <= users[1]:
+                return False
+        return True
+
+    def ip_matches(self, value):
+        if value is None:
+            return False
+        try:
+            return ipaddress.ip_address(value) in self.network
+        except ValueError:
+            return False
+
+
+class ArchiveReader:
+    """Lector de un `.alog` proyectado en memoria. Usar como context manager."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fh = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._fh.close()
+            raise ArchiveError(f'{self.path}: archivo vacío')
+        self.footer = self._read_footer()
+        # Grupos leídos y descartados por la última consulta
+        self.groups_read = 0
+        self.groups_skipped = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._fh.close()
+
+    @property
+    def rows(self):
+        return self.footer['rows']
+
+    def id_range(self):
+        """(id mínimo, id máximo) del archivo, de las estadísticas del pie; (None, None) si está vacío."""
+        ranges = [group['stats']['id'] for group in self.footer['groups'] if group['stats'].get('id')]
+        if not ranges:
+            return None, None
+        return min(low for low, _ in ranges), max(high for _, high in ranges)
+
+    def _read_footer(self):
+        size = len(self._map)
+        tail = len(MAGIC) + FOOTER_LEN.size
+        if size < len(MAGIC) + tail or self._map[:len(MAGIC)] != MAGIC or self._map[size - len(MAGIC):] != MAGIC:
+            raise ArchiveError(f'{self.path}: no es un archivo de logs o está incompleto')
+        (length,) = FOOTER_LEN.unpack_from(self._map, size - tail)
+        start = size - tail - length
+        return json.loads(zlib.decompress(self._map[start:start + length]))
+
+    def _chunk(self, position):
+        offset, length = position
+        return zlib.decompress(memoryview(self._map)[offset:offset + length])
+
+    def _ints(self, group, name):
+        return _unpack('q', self._chunk(group['columns'][name]))
+
+    def _dict_values(self, group, name):
+        return json.loads(self._chunk(group['columns'][name]['values']))
+
+    def _dict_codes(self, group, name):
+        return _unpack('I', self._chunk(group['columns'][name]['codes']))
+
+    def _column(self, group, name, selected):
+        """Valores de la columna `name` solo para las filas `selected`."""
+        if name in INT_COLUMNS:
+            values = self._ints(group, name)
+            if name == 'created_at':
+                return [from_micros(values[i]) for i in selected]
+            return [None if values[i] == NULL_INT else values[i] for i in selected]
+        if name in DICT_COLUMNS:
+            values = self._dict_values(group, name)
+            codes = self._dict_codes(group, name)
+            return [values[codes[i]] for i in selected]
+        values = json.loads(self._chunk(group['columns'][name]))
+        return [values[i] for i in selected]
+
+    def query(self, log_filter=None, columns=COLUMNS):
+        """Filas (dicts con `columns`) que cumplen `log_filter`, en orden de `created_at`."""
+        log_filter = log_filter or LogFilter()
+        self.groups_read = self.groups_skipped = 0
+        for group in self.footer['groups']:
+            selected = self._select(group, log_filter)
+            if selected is None:
+                self.groups_skipped += 1
+                continue
+            self.groups_read += 1
+            if not selected:
+                continue
+            data = [self._column(group, name, selected) for name in columns]
+            for values in zip(*data):
+                yield dict(zip(columns, values))
+
+    def _select(self, group, log_filter):
+        """Índices de las filas del grupo que cumplen el filtro; None si se descarta sin leerlo."""
+        if not log_filter.group_may_match(group['stats']):
+            return None
+        # Diccionarios primero: pequeños, y descartan el grupo sin leer códigos
+        wanted_codes = {}
+        if log_filter.actions is not None:
+            values = self._dict_values(group, 'action')
+            wanted_codes['action'] = {code for code, value in enumerate(values) if value in log_filter.actions}
+        if log_filter.network is not None:
+            values = self._dict_values(group, 'ip_address')
+            wanted_codes['ip_address'] = {code for code, value in enumerate(values) if log_filter.ip_matches(value)}
+        if any(not codes for codes in wanted_codes.values()):
+            return None
+
+        selected = range(group['rows'])
+        if log_filter.start is not None or log_filter.end is not None:
+            created = self._ints(group, 'created_at')
+            start = log_filter.start if log_filter.start is not None else NULL_INT
+            end = log_filter.end if log_filter.end is not None else 2 ** 63 - 1
+            selected = [i for i in selected if start <= created[i] < end]
+        if log_filter.user_id is not None and selected:
+            users = self._ints(group, 'user_id')
+            selected = [i for i in selected if users[i] == log_filter.user_id]
+        for name, codes in wanted_codes.items():
+            if not selected:
+                break
+            column = self._dict_codes(group, name)
+            selected = [i for i in selected if column[i] in codes]
+        return list(selected)
+
+
+def archive_month(path):
+    """Mes (UTC) de un archivo `system_logs_pAAAAMM[.N].alog`, o None."""
+    match = ARCHIVE_STEM_RE.search(Path(path).stem)
+    try:
+        return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _archive_order(path):
+    # Por mes y, dentro del mes, el archivo original antes que los de filas tardías
+    match = ARCHIVE_STEM_RE.search(path.stem)
+    if match is None:
+        return path.name, 0
+    return path.stem[:match.start()] + match.group(1) + match.group(2), int(match.group(3) or 0)
+
+
+def archive_files(directory, start=None, end=None):
+    """Archivos del directorio cuyo mes se solapa con [start, end), en orden."""
+    files = []
+    for path in sorted(Path(directory).glob(f'*{SUFFIX}'), key=_archive_order):
+        month = archive_month(path)
+        if month is not None:
+            next_month = (month + timedelta(days=32)).replace(day=1)
+            if start is not None and next_month <= start:
+                continue
+            if end is not None and month >= end:
+                continue
+        files.append(path)
+    return files
+
+
+def query_archives(directory, log_filter=None, columns=COLUMNS):
+    """Consultar todos los archivos de `directory` (descarta por nombre los meses fuera de rango)."""
+    log_filter = log_filter or LogFilter()
+    start = from_micros(log_filter.start) if log_filter.start is not None else None
+    end = from_micros(log_filter.end) if log_filter.end is not None else None
+    for path in archive_files(directory, start, end):
+        with ArchiveReader(path) as reader:
+            yield from reader.query(log_filter, columns)
@@ -0,0 +1,151 @@
+"""
+Registro de configuración en tiempo de ejecución (`SystemConfiguration`).
+
+Cada worker guarda en memoria una instantánea `{clave: valor}` de las
+configuraciones activas y la reutiliza mientras no cambie el número de versión
+guardado en la caché compartida (`VERSION_KEY`). Al crear, editar, borrar o
+activar/desactivar una configuración se incrementa esa versión (tras el commit)
+y cada worker recarga la tabla completa en su siguiente lectura: una sola
+consulta por cambio y por worker, ninguna por lectura.
+
+Uso::
+
+    from requests import config_registry
+
+    threshold = config_registry.get_int('AUTH_LOCKOUT_THRESHOLD', settings.AUTH_LOCKOUT_THRESHOLD)
+    enabled = config_registry.get_bool('MAINTENANCE_MODE', False)
+
+Los valores mal formados se registran en el log y devuelven el `default`.
+La versión vive en `CACHES['default']`, compartida entre workers (Redis o
+archivos, ver settings); con `LocMemCache` solo alcanzaría al propio proceso.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.dateparse import parse_duration
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'system_config:version'
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on', 'si', 'sí'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', ''}
+
+# "90s", "15m", "2h", "1d" (además de los formatos de `parse_duration`)
+DURATION_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd])\s*$', re.IGNORECASE)
+DURATION_UNITS = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+class ConfigRegistry:
+    """Instantánea por proceso de las configuraciones activas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._version = None
+
+    def current_version(self):
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            # Caché vacía (arranque, reinicio o expulsión): sembrar un valor
+            # que no pueda coincidir con el de una instantánea anterior
+            cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(VERSION_KEY)
+        return version
+
+    def snapshot(self):
+        version = self.current_version()
+        values = self._values
+        if values is not None and version == self._version:
+            return values
+        with self._lock:
+            if self._values is None or version != self._version:
+                self._values = self.load()
+                self._version = version
+            return self._values
+
+    def load(self):
+        from .models import SystemConfiguration
+        return dict(SystemConfiguration.objects.filter(is_active=True).values_list('key', 'value'))
+
+    def bump_version(self):
+        try:
+            cache.incr(VERSION_KEY)
+        except ValueError:
+            cache.set(VERSION_KEY, time.time_ns(), timeout=None)
+
+    def invalidate(self):
+        """Incrementar la versión cuando se confirme la transacción en curso."""
+        transaction.on_commit(self.bump_version)
+
+    def reset(self):
+        """Olvidar la instantánea local (tests)."""
+        with self._lock:
+            self._values = None
+            self._version = None
+
+    # ------------------------------------------------------------------
+    # Lectura tipada
+    # ------------------------------------------------------------------
+    def get(self, key, default=None):
+        return self.snapshot().get(key, default)
+
+    def _parse(self, key, default, parser):
+        raw = self.snapshot().get(key)
+        if raw is None:
+            return default
+        try:
+            return parser(raw)
+        except (TypeError, ValueError) as exc:
+            logger.warning("Configuración '%s' inválida (%r): %s", key, raw, exc)
+            return default
+
+    def get_int(self, key, default=None):
+        return self._parse(key, default, lambda raw: int(raw.strip()))
+
+    def get_bool(self, key, default=None):
+        return self._parse(key, default, parse_bool)
+
+    def get_json(self, key, default=None):
+        return self._parse(key, default, json.loads)
+
+    def get_duration(self, key, default=None):
+        return self._parse(key, default, parse_duration_value)
+
+
+def parse_bool(raw):
+    value = raw.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('se esperaba un booleano')
+
+
+def parse_duration_value(raw):
+    """`timedelta` a partir de "15m", "2h", "30" (segundos), "00:15:00" o ISO 8601."""
+    value = raw.strip()
+    match = DURATION_RE.match(value)
+    if match:
+        amount, unit = match.groups()
+        return timedelta(**{DURATION_UNITS[unit.lower()]: float(amount)})
+    parsed = parse_duration(value)
+    if parsed is None:
+        raise ValueError('se esperaba una duración')
+    return parsed
+
+
+registry = ConfigRegistry()
+
+get = registry.get
+get_int = registry.get_int
+get_bool = registry.get_bool
+get_json = registry.get_json
+get_duration = registry.get_duration
+invalidate = registry.invalidate
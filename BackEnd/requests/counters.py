@@ -0,0 +1,220 @@
+"""
+Mantenimiento y lectura de los contadores materializados (`StatusCounter`).
+
+Cada `Publication` / `ECERequest` aporta +1 a la fila de su clave
+(entidad, estado, nivel, estudiante, tutor, mes). `save()` y `delete()` de
+estos modelos (`CountedModelMixin`) corren en una transacción: `pre_save` /
+`pre_delete` leen la clave actual de la fila con `SELECT ... FOR UPDATE` y
+`post_save` / `post_delete` mueven la unidad antes de soltar el bloqueo, así
+que dos transiciones concurrentes de la misma fila no descuadran los contadores.
+
+Los cambios de estado masivos van por `set_status`, que aplica solo las
+diferencias. Otras operaciones masivas (`QuerySet.update`, `bulk_create`) no
+disparan señales: tras usarlas hay que ejecutar `manage.py rebuild_status_counters`.
+"""
+from collections import Counter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+PUBLICATION = 'publication'
+ECE_REQUEST = 'ece_request'
+
+# Campos de cada modelo que forman parte de la clave del contador
+KEY_FIELDS = {
+    PUBLICATION: ('status', 'nivel', 'student_id', 'tutor_id', 'created_at'),
+    ECE_REQUEST: ('status', 'student_id', 'created_at'),
+}
+
+ENTITY_TABLES = {
+    PUBLICATION: ('publications', 'nivel', 'COALESCE(tutor_id, 0)'),
+    ECE_REQUEST: ('ece_requests', "''", '0'),
+}
+
+_UPSERT_SQL = (
+    "INSERT INTO status_counters (entity, status, nivel, student_id, tutor_id, month, count) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s) "
+    "ON CONFLICT (entity, status, nivel, student_id, tutor_id, month) "
+    "DO UPDATE SET count = status_counters.count + EXCLUDED.count"
+)
+
+
+def month_of(value):
+    """Primer día del mes de `value` en la zona horaria del proyecto (como el rebuild)."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value, timezone.get_default_timezone())
+    return value.date().replace(day=1)
+
+
+def counter_key(entity, instance):
+    """Clave del contador para una instancia (o None si aún no tiene fecha de creación)."""
+    if instance.created_at is None:
+        return None
+    return (
+        entity,
+        instance.status,
+        getattr(instance, 'nivel', '') or '',
+        instance.student_id,
+        getattr(instance, 'tutor_id', None) or 0,
+        month_of(instance.created_at),
+    )
+
+
+def apply_delta(key, delta):
+    if key is None or not delta:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL, [*key, delta])
+
+
+def move(old_key, new_key):
+    """Restar 1 a `old_key` y sumar 1 a `new_key` de forma atómica."""
+    if old_key == new_key:
+        return
+    with transaction.atomic(savepoint=False):
+        apply_delta(old_key, -1)
+        apply_delta(new_key, 1)
+
+
+class CountedModelMixin:
+    """`save()` y `delete()` en una transacción: el bloqueo de `pre_save`/`pre_delete` dura hasta mover el contador."""
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+def set_status(queryset, status):
+    """
+    `queryset.update(status=status)` aplicando a los contadores solo las
+    diferencias de las filas que cambian (una fila de contador por clave).
+    """
+    model = queryset.model
+    entity = _entity_for(model)
+    fields = KEY_FIELDS[entity]
+    with transaction.atomic():
+        rows = list(
+            model._base_manager.filter(pk__in=queryset.values('pk'))
+            .select_for_update().values('pk', *fields)
+        )
+        deltas = Counter()
+        for row in rows:
+            old_key = counter_key(entity, SimpleNamespace(**row))
+            new_key = counter_key(entity, SimpleNamespace(**dict(row, status=status)))
+            if old_key != new_key:
+                deltas[old_key] -= 1
+                deltas[new_key] += 1
+        updated = model._base_manager.filter(pk__in=[row['pk'] for row in rows]).update(status=status)
+        for key, delta in deltas.items():
+            apply_delta(key, delta)
+    return updated
+
+
+# ----------------------------------------------------------------------
+# Señales
+# ----------------------------------------------------------------------
+def _entity_for(sender):
+    return PUBLICATION if sender._meta.label == 'publications.Publication' else ECE_REQUEST
+
+
+def _locked_key(sender, pk):
+    """Clave actual de la fila `pk`, bloqueándola hasta el final de la transacción."""
+    entity = _entity_for(sender)
+    row = sender._base_manager.select_for_update().filter(pk=pk).values(*KEY_FIELDS[entity]).first()
+    return None if row is None else counter_key(entity, SimpleNamespace(**row))
+
+
+def lock_previous_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: clave anterior leída de la BD (no de la instancia, que puede estar desfasada)."""
+    instance._counter_skip = False
+    instance._counter_key = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None:
+        updated = {sender._meta.get_field(name).attname for name in update_fields}
+        if not updated & set(KEY_FIELDS[_entity_for(sender)]):
+            # Guardado parcial que no toca la clave (p.ej. la vista previa)
+            instance._counter_skip = True
+            return
+    instance._counter_key = _locked_key(sender, instance.pk)
+
+
+def update_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or getattr(instance, '_counter_skip', False):
+        return
+    entity = _entity_for(sender)
+    old_key = None if created else getattr(instance, '_counter_key', None)
+    move(old_key, counter_key(entity, instance))
+
+
+def lock_deleted_key(sender, instance, **kwargs):
+    """pre_delete: clave con la que la fila cuenta ahora mismo."""
+    instance._counter_key = _locked_key(sender, instance.pk)
+
+
+def update_on_delete(sender, instance, **kwargs):
+    key = getattr(instance, '_counter_key', None)
+    if key is None:
+        key = counter_key(_entity_for(sender), instance)
+    apply_delta(key, -1)
+    instance._counter_key = None
+
+
+# ----------------------------------------------------------------------
+# Reconstrucción
+# ----------------------------------------------------------------------
+def rebuild(entities=(PUBLICATION, ECE_REQUEST)):
+    """Recalcular los contadores desde cero con un INSERT ... SELECT por entidad."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for entity in entities:
+            table, nivel_expr, tutor_expr = ENTITY_TABLES[entity]
+            cursor.execute("DELETE FROM status_counters WHERE entity = %s", [entity])
+            cursor.execute(
+                "INSERT INTO status_counters (entity, status, nivel, student_id, tutor_id, month, count) "
+                f"SELECT %s, status, {nivel_expr}, student_id, {tutor_expr}, "
+                "date_trunc('month', created_at AT TIME ZONE %s)::date, COUNT(*) "
+                f"FROM {table} GROUP BY 2, 3, 4, 5, 6",
+                [entity, settings.TIME_ZONE],
+            )
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+def scoped_counters(entity, user=None):
+    """Filas de contadores de `entity` visibles para el rol de `user`.
+
+    - estudiante: solo las suyas
+    - tutor: las de sus estudiantes asignados activos (subconsulta)
+    - jefe/admin o sin usuario: todo el departamento
+    """
+    from .models import StatusCounter
+
+    queryset = StatusCounter.objects.filter(entity=entity)
+    role = getattr(user, 'role', None)
+    if role == 'estudiante':
+        return queryset.filter(student_id=user.pk)
+    if role == 'tutor':
+        from publications.models import TutorStudent
+        student_ids = TutorStudent.objects.filter(tutor=user, is_active=True).values('student_id')
+        return queryset.filter(student_id__in=student_ids)
+    return queryset
+
+
+def total(**filters):
+    """Expresión `SUM(count)` (0 si no hay filas) restringida a `filters`."""
+    condition = Q(**filters) if filters else None
+    return Coalesce(Sum('count', filter=condition), 0)
+
+
+def students_with_rows(**filters):
+    """Número de estudiantes distintos con al menos un elemento que cumpla `filters`."""
+    return Count('student_id', distinct=True, filter=Q(count__gt=0, **filters))
@@ -0,0 +1,271 @@
+"""
+Cola local de vistas previas de documentos (`DocumentJob`), sin broker externo.
+
+Al subir o sustituir el archivo de una publicación o solicitud ECE, las
+señales ponen la fila en `preview_status='pending'` y, tras el commit, encolan
+un trabajo (entidad, id, sha256) con `INSERT ... ON CONFLICT`: encolar dos
+veces el mismo contenido no duplica trabajo, y volver a un contenido ya
+procesado reactiva su trabajo.
+
+`manage.py run_document_worker` reclama lotes con `SELECT ... FOR UPDATE SKIP
+LOCKED` (varios workers pueden convivir), extrae texto, páginas y miniatura en
+un pool de procesos (`config/documents.py`) y guarda el resultado con un
+`UPDATE` condicionado al `file_sha256`: el trabajo de un archivo que ya se ha
+sustituido no pisa la vista previa del nuevo. Si otra fila ya tiene lista la
+vista previa del mismo contenido (almacenamiento deduplicado), se copia sin
+volver a abrir el documento.
+
+Los errores se reintentan con espera exponencial (`DOCUMENT_JOB_RETRY_SECONDS`,
+doblando en cada intento) hasta `DOCUMENT_JOB_MAX_ATTEMPTS`; después la fila
+queda en `preview_status='failed'` y `manage.py enqueue_document_jobs
+--retry-failed` vuelve a intentarlo.
+"""
+import logging
+import multiprocessing
+import os
+import socket
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from config.documents import THUMBNAIL_EXTENSION, UnsupportedDocument, extract_document
+
+from .counters import ECE_REQUEST, PUBLICATION
+from .models import DocumentJob
+
+logger = logging.getLogger(__name__)
+
+ENTITY_MODELS = {
+    PUBLICATION: 'publications.Publication',
+    ECE_REQUEST: 'requests.ECERequest',
+}
+PREVIEW_DIR = 'previews'
+MAX_TASKS_PER_CHILD = 100  # reciclar procesos: pypdf/Pillow pueden acumular memoria
+ERROR_MAX_LENGTH = 2000
+
+_ENQUEUE_SQL = (
+    "INSERT INTO document_jobs "
+    "(entity, object_id, file_sha256, status, attempts, run_after, locked_by, last_error, created_at, updated_at) "
+    "VALUES (%s, %s, %s, 'pending', 0, now(), '', '', now(), now()) "
+    "ON CONFLICT (entity, object_id, file_sha256) DO UPDATE "
+    "SET status = 'pending', attempts = 0, run_after = EXCLUDED.run_after, "
+    "locked_at = NULL, locked_by = '', last_error = '', updated_at = EXCLUDED.updated_at "
+    "WHERE document_jobs.status IN ('done', 'failed')"
+)
+
+
+def model_for(entity):
+    return apps.get_model(ENTITY_MODELS[entity])
+
+
+def entity_of(model):
+    return PUBLICATION if model._meta.label == 'publications.Publication' else ECE_REQUEST
+
+
+def enqueue(entity, object_id, digest):
+    """Encolar (o reactivar si ya terminó) el trabajo de este contenido."""
+    with connection.cursor() as cursor:
+        cursor.execute(_ENQUEUE_SQL, [entity, object_id, digest])
+
+
+# ----------------------------------------------------------------------
+# Señales de Publication y ECERequest
+# ----------------------------------------------------------------------
+def mark_preview_pending(sender, instance, raw=False, update_fields=None, **kwargs):
+    """pre_save: archivo nuevo o sustituido -> vista previa pendiente."""
+    instance._queue_preview = False
+    if raw or (update_fields is not None and 'file' not in update_fields) or not instance.file_changed():
+        return
+    instance._queue_preview = bool(instance.file)
+    instance.preview_status = 'pending' if instance.file else ''
+    instance.page_count = None
+    instance.thumbnail = ''
+
+
+def queue_preview(sender, instance, raw=False, **kwargs):
+    """post_save: encolar el trabajo cuando se confirme la transacción."""
+    if raw or not getattr(instance, '_queue_preview', False):
+        return
+    instance._queue_preview = False
+    entity, pk, digest = entity_of(sender), instance.pk, instance.file_sha256
+    if digest:
+        transaction.on_commit(lambda: enqueue(entity, pk, digest))
+
+
+# ----------------------------------------------------------------------
+# Worker
+# ----------------------------------------------------------------------
+def claim_jobs(worker, limit):
+    """Reclamar hasta `limit` trabajos listos (o abandonados por un worker caído)."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.DOCUMENT_JOB_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            DocumentJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending', run_after__lte=now) | Q(status='running', locked_at__lt=stale))
+            .order_by('run_after')[:limit]
+        )
+        for job in jobs:
+            job.status = 'running'
+            job.attempts += 1
+            job.locked_at = now
+            job.locked_by = worker
+            job.updated_at = now
+        DocumentJob.objects.bulk_update(jobs, ['status', 'attempts', 'locked_at', 'locked_by', 'updated_at'])
+    return jobs
+
+
+def save_preview(job, preview_status, page_count=None, thumbnail='', text_content=''):
+    """Guardar la vista previa solo si la fila sigue teniendo el mismo contenido."""
+    return model_for(job.entity).objects.filter(pk=job.object_id, file_sha256=job.file_sha256).update(
+        preview_status=preview_status, page_count=page_count, thumbnail=thumbnail, text_content=text_content,
+    )
+
+
+def finish(job, status, error=''):
+    job.status = status
+    job.last_error = error[:ERROR_MAX_LENGTH]
+    job.locked_at = None
+    job.locked_by = ''
+    job.save(update_fields=['status', 'last_error', 'locked_at', 'locked_by', 'run_after', 'updated_at'])
+
+
+def retry_or_fail(job, exc):
+    error = f'{type(exc).__name__}: {exc}'
+    if job.attempts >= settings.DOCUMENT_JOB_MAX_ATTEMPTS:
+        logger.error("Vista previa de %s #%s fallida tras %s intentos: %s", job.entity, job.object_id, job.attempts, error)
+        save_preview(job, 'failed')
+        finish(job, 'failed', error)
+        return
+    delay = settings.DOCUMENT_JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+    logger.warning("Vista previa de %s #%s: %s (reintento en %ss)", job.entity, job.object_id, error, delay)
+    job.run_after = timezone.now() + timedelta(seconds=delay)
+    finish(job, 'pending', error)
+
+
+def copy_existing_preview(job):
+    """Reutilizar la vista previa de otra fila con el mismo contenido, si la hay."""
+    for entity in ENTITY_MODELS:
+        candidates = model_for(entity).objects.filter(
+            file_sha256=job.file_sha256, preview_status__in=('ready', 'unavailable'),
+        )
+        if entity == job.entity:
+            candidates = candidates.exclude(pk=job.object_id)
+        source = candidates.values('preview_status', 'page_count', 'thumbnail', 'text_content').first()
+        if source:
+            save_preview(job, **source)
+            return True
+    return False
+
+
+def prepare(job):
+    """Ruta del documento a procesar, o None si el trabajo ya quedó resuelto."""
+    row = model_for(job.entity)._base_manager.only('id', 'file', 'file_sha256').filter(pk=job.object_id).first()
+    if row is None or not row.file or row.file_sha256 != job.file_sha256:
+        finish(job, 'done', 'Obsoleto: la fila ya no tiene este archivo')
+        return None
+    if job.attempts > settings.DOCUMENT_JOB_MAX_ATTEMPTS:
+        # Reclamado de nuevo tras dejar colgado a un worker demasiadas veces
+        retry_or_fail(job, TimeoutError('el procesamiento no terminó'))
+        return None
+    if copy_existing_preview(job):
+        finish(job, 'done')
+        return None
+    return row.file.path
+
+
+def store_thumbnail(digest, data):
+    """Miniatura direccionada por el contenido del documento (compartida entre filas)."""
+    name = f'{PREVIEW_DIR}/{digest[:2]}/{digest}{THUMBNAIL_EXTENSION}'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, ContentFile(data))
+
+
+def complete(job, result):
+    """Guardar el resultado de `extract_document` (`result()` devuelve o lanza)."""
+    try:
+        preview = result()
+    except UnsupportedDocument as exc:
+        save_preview(job, 'unavailable')
+        finish(job, 'done', str(exc))
+        return
+    except BrokenProcessPool:
+        raise
+    except Exception as exc:
+        retry_or_fail(job, exc)
+        return
+    thumbnail = store_thumbnail(job.file_sha256, preview['thumbnail']) if preview['thumbnail'] else ''
+    save_preview(job, 'ready', preview['page_count'], thumbnail, preview['text'])
+    finish(job, 'done')
+
+
+class DocumentWorker:
+    """
+    Procesa lotes de `DocumentJob` en un pool de procesos.
+
+    Con `processes=0` extrae en el propio proceso (depuración y tests).
+    """
+
+    def __init__(self, processes=None, batch_size=None):
+        self.processes = settings.DOCUMENT_WORKER_PROCESSES if processes is None else processes
+        self.batch_size = batch_size or max(self.processes, 1) * 4
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def get_pool(self):
+        if self.pool is None:
+            # `spawn`: los hijos no heredan las conexiones a la base de datos
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=MAX_TASKS_PER_CHILD,
+            )
+        return self.pool
+
+    def run_once(self):
+        """Reclamar y procesar un lote; devuelve cuántos trabajos reclamó."""
+        jobs = claim_jobs(self.name, self.batch_size)
+        args = (settings.DOCUMENT_TEXT_MAX_CHARS, settings.DOCUMENT_THUMBNAIL_WIDTH)
+        futures = {}
+        for job in jobs:
+            try:
+                path = prepare(job)
+            except Exception as exc:
+                retry_or_fail(job, exc)
+                continue
+            if path is None:
+                continue
+            if not self.processes:
+                complete(job, lambda: extract_document(path, *args))
+            else:
+                futures[self.get_pool().submit(extract_document, path, *args)] = job
+
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                complete(job, future.result)
+            except BrokenProcessPool as exc:
+                # Un hijo murió (memoria, señal): nuevo pool y reintento
+                retry_or_fail(job, exc)
+                self.close()
+        return len(jobs)
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from requests import config_registry, partitions
+from requests.models import AdminNotification
+
+
+class Command(BaseCommand):
+    help = (
+        'Mantiene las particiones mensuales de system_logs: crea las de los próximos meses '
+        'y archiva (archivo columnar .alog, se consulta con query_audit_archive) y borra las vencidas; '
+        'archiva (JSONL gzip) y purga las notificaciones resueltas antiguas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-months', type=int, default=None,
+                            help='Meses de logs que se conservan (por defecto SYSTEM_LOG_RETENTION_MONTHS)')
+        parser.add_argument('--notification-retention-days', type=int, default=None,
+                            help='Días que se conservan las notificaciones resueltas (por defecto NOTIFICATION_RETENTION_DAYS)')
+        parser.add_argument('--months-ahead', type=int, default=settings.SYSTEM_LOG_PARTITIONS_AHEAD,
+                            help='Meses futuros con partición creada')
+        parser.add_argument('--output-dir', default=settings.AUDIT_ARCHIVE_DIR,
+                            help='Directorio de los archivos (por defecto AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Mostrar qué se archivaría sin tocar nada')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        retention = options['retention_months']
+        if retention is None:
+            retention = config_registry.get_int('SYSTEM_LOG_RETENTION_MONTHS', settings.SYSTEM_LOG_RETENTION_MONTHS)
+        notification_days = options['notification_retention_days']
+        if notification_days is None:
+            notification_days = config_registry.get_int('NOTIFICATION_RETENTION_DAYS', settings.NOTIFICATION_RETENTION_DAYS)
+        output_dir = Path(options['output_dir'])
+        dry_run = options['dry_run']
+
+        if not dry_run:
+            created = partitions.adopt_default_rows() + partitions.ensure_partitions(now, options['months_ahead'])
+            for name in created:
+                self.stdout.write(f'Partición creada: {name}')
+
+        if retention > 0:
+            # Se conservan el mes en curso y los `retention - 1` anteriores completos
+            cutoff = partitions.add_months(partitions.month_start(now), 1 - retention)
+            # Primero las que quedaron desconectadas por una ejecución interrumpida
+            pending = [(name, False) for name in partitions.detached_partitions()]
+            pending += [(name, True) for name in partitions.expired_partitions(cutoff)]
+            if dry_run:
+                # Sin `adopt_default_rows`, los meses vencidos aún en la DEFAULT no tienen partición
+                pending += [
+                    (partitions.partition_name(month), True) for month in partitions.default_months()
+                    if partitions.add_months(month, 1) <= cutoff
+                ]
+            for name, attached in pending:
+                if dry_run:
+                    self.stdout.write(f'Se archivaría {name}')
+                    continue
+                path = partitions.archive_partition(name, output_dir, attached=attached)
+                self.stdout.write(f'{name} archivada en {path}')
+
+        if notification_days > 0:
+            cutoff = now - timedelta(days=notification_days)
+            expired = AdminNotification.objects.filter(is_resolved=True, resolved_at__lt=cutoff)
+            if dry_run:
+                self.stdout.write(f'Se archivarían {expired.count()} notificaciones resueltas')
+            else:
+                archived = self.archive_notifications(expired, output_dir, now)
+                self.stdout.write(f'{archived} notificaciones resueltas archivadas')
+
+        self.stdout.write(self.style.SUCCESS('Archivado completado'))
+
+    def archive_notifications(self, queryset, output_dir, now):
+        """Volcar `queryset` a un JSONL comprimido y borrar las filas volcadas (en la misma transacción)."""
+        with transaction.atomic():
+            rows = list(queryset.select_for_update().order_by('id').values())
+            if not rows:
+                return 0
+            output_dir.mkdir(parents=True, exist_ok=True)
+            path = output_dir / f'admin_notifications_{now:%Y%m%d%H%M%S}.jsonl.gz'
+            partial = path.with_name(path.name + '.partial')
+            with open(partial, 'wb') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as fh:
+                    for row in rows:
+                        fh.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n')
+                raw.flush()
+                os.fsync(raw.fileno())
+            partial.replace(path)
+            AdminNotification.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        return len(rows)
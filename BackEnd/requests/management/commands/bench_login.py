@@ -0,0 +1,157 @@
+import cProfile
+import io
+import pstats
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from authentication import lockout
+from authentication.models import User
+from requests.audit import get_writer, is_async_enabled
+from requests.models import AdminNotification, SystemLog
+
+USERNAME_PREFIX = 'bench_login_'
+PASSWORD = 'Bench.login.2024'
+LOGIN_URL = '/api/auth/login/'
+SCENARIOS = ('success', 'failure', 'locked')
+
+# Consultas por login como máximo, con la auditoría síncrona (AUDIT_LOG_ASYNC=False;
+# con el escritor asíncrono el INSERT de SystemLog sale del hilo de la petición).
+# - success: usuario (authenticate), last_login, sesiones activas, SystemLog
+# - failure: usuario (authenticate; la señal reutiliza el de `LoginBackend`), SystemLog
+# - locked: ninguna (el bloqueo se lee del almacén de contadores)
+# Con DatabaseCounterStore se suma una sentencia por cada operación del almacén.
+QUERY_BUDGET = {'success': 4, 'failure': 2, 'locked': 0}
+
+
+def client_ip(i):
+    """Una IP distinta por petición: el bloqueo por IP no interfiere en la medida."""
+    return f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}'
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = ('Mide el login (éxito, fallo y cuenta bloqueada) contra usuarios sembrados en la BD: '
+            'latencia p50/p95/p99 y consultas por petición, con perfil opcional')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Usuarios sembrados (por defecto 200)')
+        parser.add_argument('--iterations', type=int, default=200, help='Logins por escenario (por defecto 200)')
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                            help=f'Escenarios, separados por comas (por defecto {",".join(SCENARIOS)})')
+        parser.add_argument('--fast-hasher', action='store_true',
+                            help='Hash MD5 en lugar de PBKDF2: mide solo el coste de la aplicación y la BD')
+        parser.add_argument('--profile', action='store_true', help='cProfile de cada escenario (20 funciones más costosas)')
+        parser.add_argument('--enforce-budget', action='store_true',
+                            help='Terminar con error si algún login supera QUERY_BUDGET')
+        parser.add_argument('--cleanup', action='store_true',
+                            help='Borrar al terminar los usuarios sembrados y sus logs y notificaciones')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(unknown))}')
+
+        hashers = ['django.contrib.auth.hashers.MD5PasswordHasher'] if options['fast_hasher'] else None
+        overrides = {'ALLOWED_HOSTS': ['testserver']}
+        if hashers:
+            overrides['PASSWORD_HASHERS'] = hashers
+
+        with override_settings(**overrides):
+            usernames = self.seed(options['users'])
+            over_budget = []
+            self.stdout.write(f'{"escenario":<10} {"n":>5} {"p50":>8} {"p95":>8} {"p99":>8} '
+                              f'{"consultas":>10} {"máx":>4} {"logins/min":>11}')
+            try:
+                for scenario in scenarios:
+                    timings, queries = self.run_scenario(scenario, usernames, options['iterations'], options['profile'])
+                    self.report(scenario, timings, queries)
+                    if max(queries) > QUERY_BUDGET[scenario]:
+                        over_budget.append(f'{scenario}: {max(queries)} > {QUERY_BUDGET[scenario]}')
+            finally:
+                lockout.reset('user', *usernames)
+                if options['cleanup']:
+                    self.cleanup()
+
+        if over_budget:
+            message = 'Presupuesto de consultas superado (' + '; '.join(over_budget) + ')'
+            if options['enforce_budget']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        self.stdout.write(self.style.SUCCESS('Benchmark de login terminado'))
+
+    def seed(self, count):
+        usernames = [f'{USERNAME_PREFIX}{i}' for i in range(count)]
+        existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        encoded = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=username, email=f'{username}@bench.invalid', role='estudiante', password=encoded)
+            for username in usernames if username not in existing
+        ])
+        # El hash depende del hasher elegido en esta ejecución
+        User.objects.filter(username__in=usernames).update(password=encoded, locked_until=None, failed_login_attempts=0)
+        lockout.reset('user', *usernames)
+        return usernames
+
+    def prepare(self, scenario, username):
+        """Estado previo de cada login (fuera de la medida)."""
+        lockout.reset('user', username)
+        if scenario == 'locked':
+            lockout.register_failure('user', username, threshold=1, lock_minutes=5, window_minutes=5)
+
+    def run_scenario(self, scenario, usernames, iterations, profile):
+        client = Client()
+        password = PASSWORD if scenario == 'success' else 'incorrecta'
+        profiler = cProfile.Profile() if profile else None
+        timings, queries = [], []
+        # Calentamiento sin medir (instantánea de SystemConfiguration, conexiones, imports)
+        self.prepare(scenario, usernames[0])
+        client.post(LOGIN_URL, {'username': usernames[0], 'password': password}, REMOTE_ADDR=client_ip(iterations))
+        for i in range(iterations):
+            username = usernames[i % len(usernames)]
+            self.prepare(scenario, username)
+            with CaptureQueriesContext(connection) as captured:
+                if profiler:
+                    profiler.enable()
+                start = time.perf_counter()
+                client.post(LOGIN_URL, {'username': username, 'password': password}, REMOTE_ADDR=client_ip(i))
+                timings.append((time.perf_counter() - start) * 1000)
+                if profiler:
+                    profiler.disable()
+            queries.append(len(captured))
+            if len(captured) > QUERY_BUDGET[scenario] and self.verbosity > 1:
+                self.stdout.write(f'{scenario} #{i}: ' + ' | '.join(q['sql'][:80] for q in captured))
+        if profiler:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(20)
+            self.stdout.write(f'--- perfil: {scenario} ---\n{output.getvalue()}')
+        return timings, queries
+
+    def report(self, scenario, timings, queries):
+        mean = statistics.mean(timings)
+        self.stdout.write(
+            f'{scenario:<10} {len(timings):>5} {percentile(timings, .5):>6.1f}ms {percentile(timings, .95):>6.1f}ms '
+            f'{percentile(timings, .99):>6.1f}ms {statistics.mean(queries):>10.1f} {max(queries):>4} '
+            f'{60000 / mean:>11.0f}'
+        )
+
+    def cleanup(self):
+        # Que el escritor asíncrono de auditoría no inserte logs de usuarios ya borrados
+        if is_async_enabled():
+            get_writer().flush()
+        users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        SystemLog.objects.filter(user__in=users).delete()
+        AdminNotification.objects.filter(user__in=users).delete()
+        deleted, _ = users.delete()
+        self.stdout.write(f'Usuarios de prueba borrados ({deleted} filas)')
@@ -0,0 +1,53 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.management.base import BaseCommand
+
+from authentication.password_history import matches_any
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+class Command(BaseCommand):
+    help = ('Mide la latencia de comprobar la reutilización de contraseñas según la profundidad del '
+            'historial: en serie y con el pool de hilos de PASSWORD_HISTORY_WORKERS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depths', default='5,10,24',
+                            help='Profundidades del historial, separadas por comas (por defecto 5,10,24)')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hilos del pool (por defecto PASSWORD_HISTORY_WORKERS)')
+        parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por medida (se toma la mediana)')
+
+    def handle(self, *args, **options):
+        depths = sorted({int(depth) for depth in options['depths'].split(',') if depth.strip()})
+        workers = options['workers'] or settings.PASSWORD_HISTORY_WORKERS
+        repeat = max(options['repeat'], 1)
+
+        hasher = get_hasher()
+        self.stdout.write(f'Hasher: {hasher.algorithm} ({getattr(hasher, "iterations", "-")} iteraciones), '
+                          f'{workers} hilos, mediana de {repeat}')
+        # Contraseña actual + historial; la nueva no coincide con ninguna (peor caso)
+        encoded = [make_password(f'anterior-{i}') for i in range(max(depths) + 1)]
+
+        self.stdout.write(f'{"profundidad":>11} {"en serie":>10} {"pool":>10} {"aceleración":>12} {"coincide 1ª":>12}')
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for depth in depths:
+                hashes = encoded[:depth + 1]
+                serial = timed(lambda: any(check_password('nueva', h) for h in hashes), repeat)
+                pooled = timed(lambda: matches_any('nueva', hashes, executor), repeat)
+                # Coincide con la actual: se cancela el resto de la cola
+                early = timed(lambda: matches_any('anterior-0', hashes, executor), repeat)
+                self.stdout.write(f'{depth:>11} {serial:>8.0f}ms {pooled:>8.0f}ms {serial / pooled:>11.1f}x {early:>10.0f}ms')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark terminado'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from config.openapi import write_schema_artifacts
+
+
+class Command(BaseCommand):
+    help = 'Genera el esquema OpenAPI (openapi.json / openapi.yaml) que sirven /swagger/, /redoc/ y /'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default=None,
+                            help='Directorio de salida (por defecto OPENAPI_SCHEMA_DIR)')
+
+    def handle(self, *args, **options):
+        paths = write_schema_artifacts(options['output_dir'])
+        for path in paths:
+            self.stdout.write(f'  {path} ({path.stat().st_size} bytes)')
+        self.stdout.write(self.style.SUCCESS(
+            'Esquema OpenAPI generado; los workers lo cargan al reiniciarse'
+        ))
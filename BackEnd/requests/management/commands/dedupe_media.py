@@ -0,0 +1,44 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from config.storage import content_sha256
+from publications.models import Publication
+from requests.models import ECERequest
+
+
+class Command(BaseCommand):
+    help = ('Migra los archivos existentes al almacenamiento deduplicado: calcula su SHA-256 '
+            'y sustituye cada copia por un enlace duro al blob común')
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'blob_path'):
+            raise CommandError('El almacenamiento por defecto no es ContentAddressedStorage')
+
+        adopted = missing = saved = 0
+        for model in (Publication, ECERequest):
+            rows = model._base_manager.exclude(file='').exclude(file__isnull=True).filter(file_sha256='')
+            for pk, name in rows.values_list('pk', 'file').iterator():
+                path = default_storage.path(name)
+                if not os.path.exists(path):
+                    missing += 1
+                    continue
+                with default_storage.open(name) as content:
+                    digest = content_sha256(content)
+                    if not default_storage.has_blob(digest):
+                        default_storage.store_blob(content)
+                    else:
+                        saved += content.size
+                blob = default_storage.blob_path(digest)
+                if not os.path.samefile(path, blob):
+                    tmp_path = f'{path}.dedupe'
+                    os.link(blob, tmp_path)
+                    os.replace(tmp_path, path)
+                model._base_manager.filter(pk=pk).update(file_sha256=digest)
+                adopted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{adopted} archivos enlazados a blobs ({saved / (1024 * 1024):.1f} MB duplicados liberados); '
+            f'{missing} archivos no encontrados'
+        ))
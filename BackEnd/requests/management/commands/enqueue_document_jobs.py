@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from requests.document_jobs import ENTITY_MODELS, enqueue, model_for
+
+
+class Command(BaseCommand):
+    help = 'Encola la vista previa de los documentos que aún no la tienen (o de todos con --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerar todas las vistas previas (p.ej. tras instalar pdftoppm)')
+        parser.add_argument('--retry-failed', action='store_true',
+                            help='Reintentar también los documentos cuya vista previa falló')
+
+    def handle(self, *args, **options):
+        statuses = [''] + (['failed'] if options['retry_failed'] else [])
+        queued = missing_hash = 0
+        for entity in ENTITY_MODELS:
+            model = model_for(entity)
+            rows = model._base_manager.exclude(file='').exclude(file__isnull=True)
+            if not options['all']:
+                rows = rows.filter(preview_status__in=statuses)
+            missing_hash += rows.filter(file_sha256='').count()
+            for pk, digest in rows.exclude(file_sha256='').values_list('pk', 'file_sha256').iterator():
+                with transaction.atomic():
+                    model._base_manager.filter(pk=pk).update(preview_status='pending')
+                    enqueue(entity, pk, digest)
+                queued += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{queued} documentos encolados'))
+        if missing_hash:
+            self.stdout.write(self.style.WARNING(
+                f'{missing_hash} documentos sin file_sha256: ejecute antes manage.py dedupe_media'
+            ))
@@ -0,0 +1,140 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from authentication.models import User
+from publications.views import PublicationViewSet, TutorOpinionViewSet, TutorStudentViewSet
+from requests.counters import ECE_REQUEST, PUBLICATION, scoped_counters
+from requests.notification_views import AdminNotificationViewSet
+from requests.views import ECERequestViewSet, SystemLogViewSet
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+# Tamaño de página de los listados (PageNumberPagination) y de la paginación
+# por cursor (keyset pide page_size + 1 filas)
+PAGE = 20
+KEYSET_PAGE = PAGE + 1
+
+
+def sample_users():
+    """Un usuario real de cada rol para parametrizar las consultas (sin guardar si no hay)."""
+    users = {}
+    for role in ('estudiante', 'tutor', 'jefe', 'admin'):
+        users[role] = User.objects.filter(role=role).first() or User(id=0, role=role)
+    return users
+
+
+def view_queryset(viewset, action, user, params=None):
+    """
+    Queryset de `viewset.get_queryset()` para `action`, con el usuario y los
+    parámetros `params` de la petición. En `list` se aplican además los
+    filtros de la vista (filterset, `?search=`, ordenación), como en DRF.
+    """
+    request = Request(RequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset(action=action, request=request, args=(), kwargs={}, format_kwarg=None)
+    queryset = view.get_queryset()
+    if action == 'list':
+        queryset = view.filter_queryset(queryset)
+    return queryset
+
+
+def keyset(queryset):
+    """Primera página de `CreatedAtKeysetPagination`."""
+    return queryset.order_by('-created_at', '-id')[:KEYSET_PAGE]
+
+
+def catalogue(users):
+    """Consultas de las vistas, tal y como las construyen (nombre -> queryset)."""
+    student, tutor, jefe, admin = users['estudiante'], users['tutor'], users['jefe'], users['admin']
+    return {
+        'publications.list (jefe)': view_queryset(PublicationViewSet, 'list', jefe)[:PAGE],
+        'publications.my_publications': keyset(
+            view_queryset(PublicationViewSet, 'my_publications', student).filter(student=student)
+        ),
+        'publications.list (tutor)': view_queryset(PublicationViewSet, 'list', tutor)[:PAGE],
+        'publications.pending_review': keyset(
+            view_queryset(PublicationViewSet, 'pending_review', jefe).filter(status='pending')
+        ),
+        'publications.list ?status=approved': view_queryset(PublicationViewSet, 'list', jefe, {'status': 'approved'})[:PAGE],
+        'tutor_opinions.my_opinions': view_queryset(TutorOpinionViewSet, 'my_opinions', tutor).filter(tutor=tutor),
+        'tutor_students.my_students': view_queryset(TutorStudentViewSet, 'my_students', tutor).filter(
+            tutor=tutor, is_active=True
+        ),
+        'tutor_students.my_tutors': view_queryset(TutorStudentViewSet, 'my_tutors', student).filter(
+            student=student, is_active=True
+        ),
+        'requests.my_requests': keyset(view_queryset(ECERequestViewSet, 'my_requests', student).filter(student=student)),
+        'requests.pending_review': keyset(
+            view_queryset(ECERequestViewSet, 'pending_review', jefe).filter(status__in=['en_proceso', 'pendiente'])
+        ),
+        'requests.list (jefe)': view_queryset(ECERequestViewSet, 'list', jefe)[:PAGE],
+        # ?reviewed_by= se valida contra los usuarios existentes: el filtro va aparte
+        'requests.reviewed_by (perfil jefe)': view_queryset(
+            ECERequestViewSet, 'list', jefe, {'ordering': '-review_date'}
+        ).filter(reviewed_by=jefe.pk)[:PAGE],
+        'system_logs.list': view_queryset(SystemLogViewSet, 'list', admin)[:PAGE],
+        'system_logs.by_user': keyset(view_queryset(SystemLogViewSet, 'by_user', admin).filter(user_id=admin.pk)),
+        'system_logs.list ?action=login_failed': view_queryset(
+            SystemLogViewSet, 'list', admin, {'action': 'login_failed'}
+        )[:PAGE],
+        'notifications.list': keyset(view_queryset(AdminNotificationViewSet, 'list', admin)),
+        'notifications.unread': keyset(view_queryset(AdminNotificationViewSet, 'list', admin, {'is_read': 'false'})),
+        'stats.publicaciones (tutor)': scoped_counters(PUBLICATION, tutor),
+        'stats.solicitudes (estudiante)': scoped_counters(ECE_REQUEST, student),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN (ANALYZE, BUFFERS) sobre las consultas de las vistas y señala los Seq Scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-analyze', action='store_true',
+                            help='Solo EXPLAIN (no ejecuta las consultas)')
+        parser.add_argument('--disable-seqscan', action='store_true',
+                            help='SET enable_seqscan = off: con pocos datos el planificador prefiere '
+                                 'Seq Scan aunque haya índice; así solo quedan los que no tienen índice usable')
+        parser.add_argument('--only', help='Ejecutar solo las consultas cuyo nombre contenga este texto')
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help='Terminar con error si alguna consulta usa Seq Scan')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('explain_queries requiere PostgreSQL')
+
+        explain_options = {} if options['no_analyze'] else {'analyze': True, 'buffers': True}
+        queries = catalogue(sample_users())
+        flagged = {}
+
+        for name, queryset in queries.items():
+            if options['only'] and options['only'] not in name:
+                continue
+            with transaction.atomic():
+                if options['disable_seqscan']:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET LOCAL enable_seqscan = off')
+                plan = queryset.explain(**explain_options)
+            tables = sorted(set(SEQ_SCAN.findall(plan)))
+            first_line = plan.splitlines()[0] if plan else ''
+
+            if tables:
+                flagged[name] = tables
+                self.stdout.write(self.style.WARNING(f'✗ {name}: Seq Scan en {", ".join(tables)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+            self.stdout.write(f'    {first_line}')
+            if options['verbosity'] > 1:
+                for line in plan.splitlines()[1:]:
+                    self.stdout.write(f'    {line}')
+
+        self.stdout.write('')
+        if flagged:
+            summary = f'{len(flagged)} de {len(queries)} consultas usan Seq Scan'
+            if options['fail_on_seq_scan']:
+                raise CommandError(summary)
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todas las consultas usan índices'))
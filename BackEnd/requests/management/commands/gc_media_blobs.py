@@ -0,0 +1,50 @@
+import time
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from config.storage import BLOB_DIR
+from requests.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Elimina los blobs del almacenamiento deduplicado que ya no enlaza ningún archivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='No tocar blobs más recientes (un guardado puede estar enlazándolos)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo informar')
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'blob_path'):
+            raise CommandError('El almacenamiento por defecto no es ContentAddressedStorage')
+
+        root = Path(default_storage.path(BLOB_DIR))
+        cutoff = time.time() - options['grace_minutes'] * 60
+        # Sesiones completadas por deduplicación que aún no se han usado: su archivo es el blob
+        sessions = set(UploadSession.objects.filter(status='complete', expires_at__gt=timezone.now())
+                       .exclude(sha256='').values_list('sha256', flat=True))
+        removed = freed = kept = 0
+        for path in root.glob('??/??/*'):
+            stat = path.stat()
+            # `st_ctime` y no `st_mtime`: enlazar un blob (un guardado que lo
+            # reutiliza) no cambia su contenido pero sí su ctime
+            if stat.st_nlink > 1 or stat.st_ctime > cutoff or path.name in sessions:
+                kept += 1
+                continue
+            if not options['dry_run']:
+                path.unlink(missing_ok=True)
+            removed += 1
+            freed += stat.st_size
+
+        # Temporales abandonados por guardados interrumpidos
+        for path in root.glob('tmp/*'):
+            if path.stat().st_mtime <= cutoff and not options['dry_run']:
+                path.unlink(missing_ok=True)
+
+        verb = 'se eliminarían' if options['dry_run'] else 'eliminados'
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} blobs sin referencias {verb} ({freed / (1024 * 1024):.1f} MB); {kept} en uso'
+        ))
@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from requests.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Borra las subidas por fragmentos caducadas y los archivos parciales huérfanos'
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+        removed = 0
+        for session in expired.iterator():
+            session.discard()
+            removed += 1
+
+        orphans = 0
+        directory = Path(settings.UPLOAD_SESSION_DIR)
+        if directory.is_dir():
+            known = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+            for path in directory.glob('*.part'):
+                if path.stem not in known:
+                    path.unlink(missing_ok=True)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{removed} sesiones caducadas y {orphans} archivos huérfanos eliminados'
+        ))
@@ -0,0 +1,94 @@
+import csv
+import json
+from datetime import datetime, time, timezone as dt_timezone
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from requests import audit_archive
+
+
+def parse_moment(value):
+    """Fecha ("2025-03-01") o fecha y hora ISO 8601; sin zona se toma UTC."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Fecha inválida: {value}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Busca en los logs archivados (.alog de archive_system_logs) sin cargarlos en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.AUDIT_ARCHIVE_DIR,
+                            help='Directorio de los archivos (por defecto AUDIT_ARCHIVE_DIR)')
+        parser.add_argument('--file', action='append', default=[], help='Archivo concreto (se puede repetir)')
+        parser.add_argument('--user', type=int, help='ID del usuario')
+        parser.add_argument('--action', action='append', default=[], help='Acción (se puede repetir)')
+        parser.add_argument('--ip', help='IP o red en notación CIDR (10.0.0.0/8)')
+        parser.add_argument('--since', help='Desde esta fecha (incluida)')
+        parser.add_argument('--until', help='Hasta esta fecha (excluida)')
+        parser.add_argument('--limit', type=int, default=None, help='Máximo de filas')
+        parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl')
+
+    def handle(self, *args, **options):
+        try:
+            log_filter = audit_archive.LogFilter(
+                user_id=options['user'],
+                actions=options['action'],
+                ip=options['ip'],
+                start=parse_moment(options['since']) if options['since'] else None,
+                end=parse_moment(options['until']) if options['until'] else None,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options['file']:
+            files = [Path(path) for path in options['file']]
+        else:
+            start = audit_archive.from_micros(log_filter.start) if log_filter.start is not None else None
+            end = audit_archive.from_micros(log_filter.end) if log_filter.end is not None else None
+            files = audit_archive.archive_files(options['dir'], start, end)
+
+        writer = None
+        if options['format'] == 'csv':
+            writer = csv.DictWriter(self.stdout, fieldnames=audit_archive.COLUMNS)
+            writer.writeheader()
+
+        remaining = options['limit']
+        matched = read = skipped = 0
+        for path in files:
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                reader = audit_archive.ArchiveReader(path)
+            except (OSError, audit_archive.ArchiveError) as exc:
+                raise CommandError(str(exc))
+            with reader:
+                rows = reader.query(log_filter)
+                if remaining is not None:
+                    rows = islice(rows, remaining)
+                for row in rows:
+                    row['created_at'] = row['created_at'].isoformat()
+                    if writer:
+                        writer.writerow(row)
+                    else:
+                        self.stdout.write(json.dumps(row, ensure_ascii=False))
+                    matched += 1
+                    if remaining is not None:
+                        remaining -= 1
+                read += reader.groups_read
+                skipped += reader.groups_skipped
+
+        self.stderr.write(
+            f'{matched} filas en {len(files)} archivos ({read} grupos leídos, {skipped} descartados)'
+        )
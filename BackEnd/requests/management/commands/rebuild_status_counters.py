@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from requests.counters import ECE_REQUEST, PUBLICATION, rebuild
+from requests.models import StatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero los contadores materializados de publicaciones y solicitudes ECE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entity', choices=[PUBLICATION, ECE_REQUEST], action='append',
+                            help='Entidad a reconstruir (por defecto todas)')
+
+    def handle(self, *args, **options):
+        entities = options['entity'] or [PUBLICATION, ECE_REQUEST]
+        rebuild(entities)
+        for entity in entities:
+            rows = StatusCounter.objects.filter(entity=entity).count()
+            self.stdout.write(self.style.SUCCESS(f'{entity}: {rows} filas de contadores reconstruidas'))
@@ -0,0 +1,98 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from requests.audit import ENTRY_FIELDS
+from requests.models import SystemLog
+
+
+class Command(BaseCommand):
+    help = 'Reinyecta en SystemLog los eventos de auditoría volcados a fichero por desbordamiento de la cola'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=getattr(settings, 'AUDIT_LOG_SPILL_PATH', None),
+                            help='Fichero JSONL de volcado (por defecto AUDIT_LOG_SPILL_PATH)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options['path']:
+            self.stdout.write(self.style.WARNING('No hay fichero de volcado configurado.'))
+            return
+        path = Path(options['path'])
+        rejected = path.with_suffix(path.suffix + '.rejected')
+        slots = [path.with_suffix(path.suffix + suffix) for suffix in ('.processing', '.processing.1')]
+
+        # Un `.processing` que sigue ahí es de una ejecución interrumpida: su
+        # transacción no se confirmó, así que se reinyecta entero (y antes que el volcado nuevo)
+        pending = [slot for slot in slots if slot.exists()]
+        if path.exists():
+            free = [slot for slot in slots if not slot.exists()]
+            if free:
+                # Renombrar antes de leer para no competir con los workers que siguen escribiendo
+                path.rename(free[0])
+                pending.append(free[0])
+            else:
+                self.stdout.write(self.style.WARNING(f'Se deja {path} para la próxima ejecución'))
+        if not pending:
+            self.stdout.write('No hay eventos pendientes.')
+            return
+
+        for source in pending:
+            total, skipped = self.replay(source, rejected, options['batch_size'])
+            source.unlink()
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} eventos reinyectados desde {source}'))
+            if skipped:
+                self.stdout.write(self.style.WARNING(f'{skipped} líneas inválidas guardadas en {rejected}'))
+
+    def replay(self, source, rejected, batch_size):
+        """Reinyectar `source` en una transacción; las líneas inválidas se apartan a `rejected`."""
+        total = skipped = 0
+        batch = []
+        bad_lines = []
+        with open(source, encoding='utf-8', errors='replace') as fh, transaction.atomic():
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict):
+                        raise ValueError('se esperaba un objeto')
+                    if 'created_at' in entry:
+                        entry['created_at'] = parse_datetime(entry['created_at'])
+                        if entry['created_at'] is None:
+                            raise ValueError('fecha inválida')
+                except (TypeError, ValueError):
+                    # Línea truncada (caída a mitad de escritura) o corrupta: no debe tumbar el resto
+                    bad_lines.append(line)
+                    continue
+                # Los volcados anteriores a `occurrences` o `created_at` no los traen: se quedan
+                # los valores por defecto (1 y el momento de la reinyección)
+                batch.append({k: entry[k] for k in ENTRY_FIELDS if k in entry})
+                if len(batch) >= batch_size:
+                    total += self.write_batch(batch)
+                    batch = []
+            if batch:
+                total += self.write_batch(batch)
+        if bad_lines:
+            with open(rejected, 'a', encoding='utf-8') as fh:
+                fh.write('\n'.join(bad_lines) + '\n')
+            skipped = len(bad_lines)
+        return total, skipped
+
+    def write_batch(self, entries):
+        """Insertar un lote, desvinculando usuarios que ya no existen."""
+        user_ids = {e['user_id'] for e in entries if e.get('user_id')}
+        existing = set(get_user_model().objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        logs = []
+        for entry in entries:
+            if entry.get('user_id') not in existing:
+                entry['user_id'] = None
+            logs.append(SystemLog(**entry))
+        SystemLog.objects.bulk_create(logs)
+        return len(logs)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from requests.document_jobs import DocumentWorker
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de vistas previas de documentos (texto, páginas y miniatura)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=None,
+                            help='Procesos del pool (por defecto DOCUMENT_WORKER_PROCESSES; 0 = sin pool)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Trabajos reclamados por lote (por defecto 4 por proceso)')
+        parser.add_argument('--once', action='store_true',
+                            help='Vaciar la cola y terminar (cron) en lugar de quedarse esperando')
+
+    def handle(self, *args, **options):
+        processed = 0
+        with DocumentWorker(options['processes'], options['batch_size']) as worker:
+            try:
+                while True:
+                    claimed = worker.run_once()
+                    processed += claimed
+                    if not claimed:
+                        if options['once']:
+                            break
+                        time.sleep(settings.DOCUMENT_WORKER_POLL_INTERVAL)
+                        # Proceso de larga duración: respetar CONN_MAX_AGE y reconectar si se cayó
+                        close_old_connections()
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(self.style.SUCCESS(f'{processed} trabajos de vista previa procesados'))
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """Cargar los contadores a partir de las filas existentes."""
+    sources = (
+        ("publication", "publications", "nivel", "COALESCE(tutor_id, 0)"),
+        ("ece_request", "ece_requests", "''", "0"),
+    )
+    with schema_editor.connection.cursor() as cursor:
+        for entity, table, nivel_expr, tutor_expr in sources:
+            cursor.execute(
+                "INSERT INTO status_counters (entity, status, nivel, student_id, tutor_id, month, count) "
+                f"SELECT %s, status, {nivel_expr}, student_id, {tutor_expr}, "
+                "date_trunc('month', created_at AT TIME ZONE %s)::date, COUNT(*) "
+                f"FROM {table} GROUP BY 2, 3, 4, 5, 6",
+                [entity, settings.TIME_ZONE],
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0005_activesession_adminnotification"),
+        ("publications", "0003_alter_publication_file"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StatusCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("publication", "Publicación"),
+                            ("ece_request", "Solicitud ECE"),
+                        ],
+                        max_length=20,
+                        verbose_name="Entidad",
+                    ),
+                ),
+                ("status", models.CharField(max_length=20, verbose_name="Estado")),
+                (
+                    "nivel",
+                    models.CharField(
+                        blank=True, default="", max_length=1, verbose_name="Nivel"
+                    ),
+                ),
+                ("student_id", models.BigIntegerField(verbose_name="Estudiante")),
+                ("tutor_id", models.BigIntegerField(default=0, verbose_name="Tutor")),
+                ("month", models.DateField(verbose_name="Mes")),
+                ("count", models.IntegerField(default=0, verbose_name="Cantidad")),
+            ],
+            options={
+                "verbose_name": "Contador de Estados",
+                "verbose_name_plural": "Contadores de Estados",
+                "db_table": "status_counters",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "entity",
+                            "status",
+                            "nivel",
+                            "student_id",
+                            "tutor_id",
+                            "month",
+                        ),
+                        name="status_counters_key",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+ECE_REQUEST_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION ece_requests_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('spanish_unaccent', coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER ece_requests_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF description ON ece_requests
+    FOR EACH ROW EXECUTE FUNCTION ece_requests_search_vector_update();
+
+UPDATE ece_requests SET description = description;
+"""
+
+DROP_ECE_REQUEST_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS ece_requests_search_vector_trigger ON ece_requests;
+DROP FUNCTION IF EXISTS ece_requests_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0006_statuscounter"),
+        # La configuración `spanish_unaccent` se crea allí
+        ("publications", "0004_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ecerequest",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ecerequest",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="ece_requests_search_gin"
+            ),
+        ),
+        migrations.RunSQL(ECE_REQUEST_TRIGGER_SQL, DROP_ECE_REQUEST_TRIGGER_SQL),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:16
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY no bloquea escrituras pero no admite transacción
+    atomic = False
+
+    dependencies = [
+        ("requests", "0007_ecerequest_search_vector"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="adminnotification",
+            index=models.Index(fields=["-created_at", "-id"], name="notif_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="adminnotification",
+            index=models.Index(
+                condition=models.Q(("is_read", False)),
+                fields=["-created_at"],
+                name="notif_unread_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ecerequest",
+            index=models.Index(fields=["-created_at", "-id"], name="ece_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="ecerequest",
+            index=models.Index(
+                fields=["student", "-created_at", "-id"], name="ece_student_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ecerequest",
+            index=models.Index(
+                fields=["status", "-created_at"], name="ece_status_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ecerequest",
+            index=models.Index(
+                condition=models.Q(("status__in", ["en_proceso", "pendiente"])),
+                fields=["-created_at", "-id"],
+                name="ece_open_created_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="ecerequest",
+            index=models.Index(
+                fields=["reviewed_by", "-review_date"], name="ece_reviewer_date_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="statuscounter",
+            index=models.Index(
+                fields=["student_id", "entity"], name="counters_student_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="statuscounter",
+            index=models.Index(fields=["entity", "month"], name="counters_month_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="systemlog",
+            index=models.Index(fields=["-created_at", "-id"], name="log_created_idx"),
+        ),
+        AddIndexConcurrently(
+            model_name="systemlog",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="log_user_created_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="systemlog",
+            index=models.Index(
+                fields=["action", "-created_at"], name="log_action_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:20
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0008_role_scoped_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=255, verbose_name="Nombre del archivo"),
+                ),
+                ("size", models.BigIntegerField(verbose_name="Tamaño total")),
+                (
+                    "offset",
+                    models.BigIntegerField(default=0, verbose_name="Bytes recibidos"),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="Esperado (si lo envía el cliente) o calculado al completar",
+                        max_length=64,
+                        verbose_name="SHA-256",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("uploading", "Subiendo"),
+                            ("complete", "Completa"),
+                            ("failed", "Fallida"),
+                        ],
+                        default="uploading",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                ("expires_at", models.DateTimeField(verbose_name="Expira")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sessions",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Usuario",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sesión de Subida",
+                "verbose_name_plural": "Sesiones de Subida",
+                "db_table": "upload_sessions",
+                "indexes": [
+                    models.Index(fields=["expires_at"], name="upload_expires_idx")
+                ],
+            },
+        ),
+    ]
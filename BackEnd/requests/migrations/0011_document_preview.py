@@ -0,0 +1,198 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:33
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Descripción del estudiante por delante del texto extraído del documento
+ECE_REQUEST_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION ece_requests_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.description, '')), 'A') ||
+        setweight(to_tsvector('spanish_unaccent', coalesce(NEW.text_content, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ece_requests_search_vector_trigger ON ece_requests;
+CREATE TRIGGER ece_requests_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF description, text_content ON ece_requests
+    FOR EACH ROW EXECUTE FUNCTION ece_requests_search_vector_update();
+
+UPDATE ece_requests SET description = description;
+"""
+
+PREVIOUS_ECE_REQUEST_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION ece_requests_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('spanish_unaccent', coalesce(NEW.description, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS ece_requests_search_vector_trigger ON ece_requests;
+CREATE TRIGGER ece_requests_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF description ON ece_requests
+    FOR EACH ROW EXECUTE FUNCTION ece_requests_search_vector_update();
+
+UPDATE ece_requests SET description = description;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0010_file_sha256"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "entity",
+                    models.CharField(
+                        choices=[
+                            ("publication", "Publicación"),
+                            ("ece_request", "Solicitud ECE"),
+                        ],
+                        max_length=20,
+                        verbose_name="Entidad",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Id de la fila")),
+                (
+                    "file_sha256",
+                    models.CharField(max_length=64, verbose_name="SHA-256 del archivo"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pendiente"),
+                            ("running", "En ejecución"),
+                            ("done", "Terminado"),
+                            ("failed", "Fallido"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="Estado",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Intentos"
+                    ),
+                ),
+                (
+                    "run_after",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Ejecutar a partir de",
+                    ),
+                ),
+                (
+                    "locked_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Reclamado"
+                    ),
+                ),
+                (
+                    "locked_by",
+                    models.CharField(
+                        blank=True, default="", max_length=100, verbose_name="Worker"
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Último error"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Trabajo de Vista Previa",
+                "verbose_name_plural": "Trabajos de Vista Previa",
+                "db_table": "document_jobs",
+            },
+        ),
+        migrations.AddField(
+            model_name="ecerequest",
+            name="page_count",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Número de páginas"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ecerequest",
+            name="preview_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "Sin archivo"),
+                    ("pending", "Pendiente"),
+                    ("ready", "Lista"),
+                    ("unavailable", "No disponible"),
+                    ("failed", "Error"),
+                ],
+                default="",
+                editable=False,
+                max_length=20,
+                verbose_name="Estado de la vista previa",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ecerequest",
+            name="text_content",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="Texto extraído"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ecerequest",
+            name="thumbnail",
+            field=models.ImageField(
+                blank=True,
+                default="",
+                editable=False,
+                upload_to="previews/",
+                verbose_name="Miniatura",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ecerequest",
+            index=models.Index(
+                condition=models.Q(("file_sha256", ""), _negated=True),
+                fields=["file_sha256"],
+                name="ece_file_sha_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="documentjob",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "running"])),
+                fields=["run_after"],
+                name="document_jobs_queue_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="documentjob",
+            constraint=models.UniqueConstraint(
+                fields=("entity", "object_id", "file_sha256"), name="document_jobs_key"
+            ),
+        ),
+        migrations.RunSQL(ECE_REQUEST_TRIGGER_SQL, PREVIOUS_ECE_REQUEST_TRIGGER_SQL),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0011_document_preview"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SharedCounter",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=255,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Clave",
+                    ),
+                ),
+                ("value", models.BigIntegerField(default=0, verbose_name="Valor")),
+                (
+                    "expires_at",
+                    models.DateTimeField(blank=True, null=True, verbose_name="Caduca"),
+                ),
+            ],
+            options={
+                "verbose_name": "Contador Compartido",
+                "verbose_name_plural": "Contadores Compartidos",
+                "db_table": "shared_counters",
+                "indexes": [
+                    models.Index(
+                        fields=["expires_at"], name="shared_counters_expiry_idx"
+                    )
+                ],
+            },
+        ),
+        # Estado efímero: sin WAL (ni réplica); se vacía tras una caída
+        migrations.RunSQL(
+            "ALTER TABLE shared_counters SET UNLOGGED",
+            "ALTER TABLE shared_counters SET LOGGED",
+        ),
+    ]
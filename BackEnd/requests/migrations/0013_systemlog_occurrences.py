@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0012_shared_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="systemlog",
+            name="occurrences",
+            field=models.PositiveIntegerField(default=1, verbose_name="Ocurrencias"),
+        ),
+    ]
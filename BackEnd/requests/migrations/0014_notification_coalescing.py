@@ -0,0 +1,49 @@
+# Generated by Django 5.1.3 on 2026-10-17 20:56
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0013_systemlog_occurrences"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="adminnotification",
+            name="fingerprint",
+            field=models.CharField(
+                blank=True, default="", max_length=40, verbose_name="Huella"
+            ),
+        ),
+        migrations.AddField(
+            model_name="adminnotification",
+            name="last_seen",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Última ocurrencia"
+            ),
+        ),
+        migrations.AddField(
+            model_name="adminnotification",
+            name="occurrences",
+            field=models.PositiveIntegerField(default=1, verbose_name="Ocurrencias"),
+        ),
+        # Las notificaciones anteriores se vieron por última vez al crearse
+        migrations.RunSQL(
+            "UPDATE admin_notifications SET last_seen = created_at",
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddConstraint(
+            model_name="adminnotification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("is_resolved", False), models.Q(("fingerprint", ""), _negated=True)
+                ),
+                fields=("fingerprint",),
+                name="notif_open_fingerprint_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Nombres que Django generó para el FK y su índice (hash determinista de tabla y
+# columna): se conservan para que el estado de las migraciones siga coincidiendo
+USER_FK = "system_logs_user_id_77b716fd_fk_users_id"
+USER_INDEX = "system_logs_user_id_77b716fd"
+
+INDEXES_SQL = f"""
+ALTER TABLE system_logs ADD CONSTRAINT {USER_FK}
+    FOREIGN KEY (user_id) REFERENCES users (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX {USER_INDEX} ON system_logs (user_id);
+CREATE INDEX log_created_idx ON system_logs (created_at DESC, id DESC);
+CREATE INDEX log_user_created_idx ON system_logs (user_id, created_at DESC, id DESC);
+CREATE INDEX log_action_created_idx ON system_logs (action, created_at DESC);
+"""
+
+# Tabla particionada por mes (UTC) de `created_at`. PostgreSQL exige que la PK
+# incluya la clave de partición: (id, created_at); para Django `id` sigue
+# siendo la PK (lo asigna una secuencia, no se repite). Se crean las
+# particiones de los meses con datos hasta dos meses vista, y una partición
+# DEFAULT para lo que quede fuera (`archive_system_logs` la vacía).
+PARTITION_SQL = f"""
+ALTER TABLE system_logs RENAME TO system_logs_legacy;
+-- La secuencia de `id` pasa a la tabla nueva (columna identidad o, tras revertir, DEFAULT)
+ALTER TABLE system_logs_legacy ALTER COLUMN id DROP IDENTITY IF EXISTS;
+ALTER TABLE system_logs_legacy ALTER COLUMN id DROP DEFAULT;
+DROP SEQUENCE IF EXISTS system_logs_id_seq;
+ALTER TABLE system_logs_legacy RENAME CONSTRAINT system_logs_pkey TO system_logs_legacy_pkey;
+DROP INDEX {USER_INDEX}, log_created_idx, log_user_created_idx, log_action_created_idx;
+
+CREATE SEQUENCE system_logs_id_seq;
+CREATE TABLE system_logs (
+    LIKE system_logs_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+ALTER TABLE system_logs ALTER COLUMN id SET DEFAULT nextval('system_logs_id_seq');
+ALTER SEQUENCE system_logs_id_seq OWNED BY system_logs.id;
+{INDEXES_SQL}
+CREATE TABLE system_logs_default PARTITION OF system_logs DEFAULT;
+
+DO $$
+DECLARE
+    month timestamp;
+    last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '2 months';
+BEGIN
+    SELECT date_trunc('month', coalesce(min(created_at), now()) AT TIME ZONE 'UTC')
+        INTO month FROM system_logs_legacy;
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF system_logs FOR VALUES FROM (%L) TO (%L)',
+            'system_logs_p' || to_char(month, 'YYYYMM'),
+            month::text || '+00', (month + interval '1 month')::text || '+00'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END
+$$;
+
+INSERT INTO system_logs SELECT * FROM system_logs_legacy;
+SELECT setval('system_logs_id_seq', coalesce(max(id), 0) + 1, false) FROM system_logs_legacy;
+DROP TABLE system_logs_legacy;
+"""
+
+UNPARTITION_SQL = f"""
+CREATE TABLE system_logs_plain (
+    LIKE system_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE
+);
+INSERT INTO system_logs_plain SELECT * FROM system_logs;
+ALTER SEQUENCE system_logs_id_seq OWNED BY system_logs_plain.id;
+DROP TABLE system_logs;
+ALTER TABLE system_logs_plain RENAME TO system_logs;
+ALTER TABLE system_logs ADD CONSTRAINT system_logs_pkey PRIMARY KEY (id);
+{INDEXES_SQL}
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0014_notification_coalescing"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+        migrations.AddIndex(
+            model_name="adminnotification",
+            index=models.Index(
+                condition=models.Q(("is_resolved", True)),
+                fields=["resolved_at"],
+                name="notif_resolved_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.3 on 2026-10-17 23:10
+
+from django.db import migrations
+
+
+def create_username_index(apps, schema_editor):
+    """Índice trigram sobre `UPPER(users.username)` para `?search=` de solicitudes ECE."""
+    with schema_editor.connection.cursor() as cursor:
+        # `pg_trgm` se instala en publications 0004 si el servidor lo tiene
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS users_username_trgm "
+            "ON users USING gin (UPPER(username) gin_trgm_ops)"
+        )
+
+
+def drop_username_index(apps, schema_editor):
+    schema_editor.execute("DROP INDEX IF EXISTS users_username_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0015_partition_system_logs"),
+        ("publications", "0004_search_vector"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_username_index, drop_username_index),
+    ]
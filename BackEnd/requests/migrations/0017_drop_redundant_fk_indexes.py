@@ -0,0 +1,83 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_fk_index(name, table, column):
+    """
+    Quitar el índice propio de un FK que ya cubre un índice compuesto que empieza
+    por esa columna (ver `Meta.indexes`). Solo se toca el índice: `AlterField`
+    borraría y volvería a validar también la restricción del FK.
+    """
+    return migrations.RunSQL(
+        f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"',
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{name}" ON "{table}" ("{column}")',
+    )
+
+
+def drop_partitioned_fk_index(name, table, column):
+    """Igual, para una tabla particionada (no admite CONCURRENTLY)."""
+    return migrations.RunSQL(
+        f'DROP INDEX IF EXISTS "{name}"',
+        f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ("{column}")',
+    )
+
+
+class Migration(migrations.Migration):
+    # DROP/CREATE INDEX CONCURRENTLY no admiten transacción
+    atomic = False
+
+    dependencies = [
+        ("requests", "0016_username_trigram_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="ecerequest",
+                    name="reviewed_by",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        limit_choices_to={"role": "jefe"},
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ece_requests_reviewed",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="ecerequest",
+                    name="student",
+                    field=models.ForeignKey(
+                        db_index=False,
+                        limit_choices_to={"role": "estudiante"},
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ece_requests",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name="systemlog",
+                    name="user",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="system_logs",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            database_operations=[
+                drop_fk_index("ece_requests_reviewed_by_id_9ef25110", "ece_requests", "reviewed_by_id"),
+                drop_fk_index("ece_requests_student_id_f02af179", "ece_requests", "student_id"),
+                drop_partitioned_fk_index("system_logs_user_id_77b716fd", "system_logs", "user_id"),
+            ],
+        ),
+    ]
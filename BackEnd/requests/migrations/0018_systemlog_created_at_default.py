@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-17 21:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("requests", "0017_drop_redundant_fk_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="systemlog",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Fecha"
+            ),
+        ),
+    ]
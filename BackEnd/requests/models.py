@@ -1,9 +1,19 @@
+import uuid
+from pathlib import Path
+
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.core.files.storage import default_storage
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 
-class ECERequest(models.Model):
+from config.documents import PREVIEW_STATUS_CHOICES, DocumentPreviewMixin
+from config.search import SearchVectorDeferredManager
+from .counters import CountedModelMixin
+
+class ECERequest(CountedModelMixin, DocumentPreviewMixin, models.Model):
     """
     Modelo para solicitudes de modalidad ECE (Estancia de Colaboración Empresarial)
     """
@@ -18,6 +28,7 @@ class ECERequest(models.Model):
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
         related_name='ece_requests',
         limit_choices_to={'role': 'estudiante'}
     )
@@ -25,6 +36,7 @@ class ECERequest(models.Model):
     reviewed_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
+        db_index=False,
         null=True,
         blank=True,
         related_name='ece_requests_reviewed',
@@ -38,6 +50,16 @@ class ECERequest(models.Model):
         validators=[FileExtensionValidator(['pdf', 'doc', 'docx'])],
         help_text='Documento con la solicitud de modalidad ECE'
     )
+    # Huella del contenido (almacenamiento deduplicado, config/storage.py)
+    file_sha256 = models.CharField('SHA-256 del archivo', max_length=64, blank=True, default='', editable=False)
+
+    # Vista previa generada en segundo plano (requests/document_jobs.py): texto
+    # para la búsqueda, número de páginas y miniatura de la primera página
+    preview_status = models.CharField('Estado de la vista previa', max_length=20, choices=PREVIEW_STATUS_CHOICES,
+                                      blank=True, default='', editable=False)
+    page_count = models.PositiveIntegerField('Número de páginas', null=True, blank=True, editable=False)
+    thumbnail = models.ImageField('Miniatura', upload_to='previews/', blank=True, default='', editable=False)
+    text_content = models.TextField('Texto extraído', blank=True, default='', editable=False)
     
     description = models.TextField('Descripción', null=True, blank=True)
     
@@ -56,11 +78,29 @@ class ECERequest(models.Model):
     created_at = models.DateTimeField('Fecha de Solicitud', auto_now_add=True)
     updated_at = models.DateTimeField('Última Actualización', auto_now=True)
     
+    # Búsqueda de texto completo sobre la descripción y el texto extraído (migraciones 0007 y 0011)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    objects = SearchVectorDeferredManager()
+    
     class Meta:
         db_table = 'ece_requests'
         verbose_name = 'Solicitud ECE'
         verbose_name_plural = 'Solicitudes ECE'
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='ece_requests_search_gin'),
+            # Listados por rol y paginación por cursor (created_at, id). Los que
+            # empiezan por `student`/`reviewed_by` sirven también de índice del FK
+            models.Index(fields=['-created_at', '-id'], name='ece_created_idx'),
+            models.Index(fields=['student', '-created_at', '-id'], name='ece_student_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='ece_status_created_idx'),
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(status__in=['en_proceso', 'pendiente']),
+                         name='ece_open_created_idx'),
+            models.Index(fields=['reviewed_by', '-review_date'], name='ece_reviewer_date_idx'),
+            # Mismo contenido en otra fila (vista previa reutilizable, deduplicación)
+            models.Index(fields=['file_sha256'], condition=~models.Q(file_sha256=''), name='ece_file_sha_idx'),
+        ]
     
     def __str__(self):
         return f"Solicitud ECE - {self.student.get_full_name()} ({self.status})"
@@ -98,6 +138,7 @@ class SystemLog(models.Model):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
+        db_index=False,
         null=True,
         blank=True,
         related_name='system_logs'
@@ -109,14 +150,24 @@ class SystemLog(models.Model):
     description = models.TextField('Descripción')
     ip_address = models.GenericIPAddressField('Dirección IP', null=True, blank=True)
     user_agent = models.TextField('User Agent', null=True, blank=True)
+    # Eventos idénticos agrupados en esta fila (ráfagas de 401/403, ver `access_audit`)
+    occurrences = models.PositiveIntegerField('Ocurrencias', default=1)
     
-    created_at = models.DateTimeField('Fecha', auto_now_add=True)
+    # Momento del evento, no el de la escritura (la auditoría se escribe por lotes, ver `audit`)
+    created_at = models.DateTimeField('Fecha', default=timezone.now)
     
     class Meta:
+        # Tabla particionada por mes de `created_at` (migración 0015, `requests/partitions.py`)
         db_table = 'system_logs'
         verbose_name = 'Log del Sistema'
         verbose_name_plural = 'Logs del Sistema'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='log_created_idx'),
+            # También es el índice del FK `user`
+            models.Index(fields=['user', '-created_at', '-id'], name='log_user_created_idx'),
+            models.Index(fields=['action', '-created_at'], name='log_action_created_idx'),
+        ]
     
     def __str__(self):
         user_str = self.user.username if self.user else 'Sistema'
@@ -179,12 +230,29 @@ class AdminNotification(models.Model):
     resolved_at = models.DateTimeField('Resuelta en', null=True, blank=True)
     resolved_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_notifications')
     created_at = models.DateTimeField('Creada', auto_now_add=True)
+    # Agrupación de notificaciones repetidas (ver `requests/notifications.py`)
+    fingerprint = models.CharField('Huella', max_length=40, blank=True, default='')
+    occurrences = models.PositiveIntegerField('Ocurrencias', default=1)
+    last_seen = models.DateTimeField('Última ocurrencia', default=timezone.now)
     
     class Meta:
         db_table = 'admin_notifications'
         verbose_name = 'Notificación de Admin'
         verbose_name_plural = 'Notificaciones de Admin'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='notif_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_read=False), name='notif_unread_idx'),
+            # Purga de resueltas vencidas (`archive_system_logs`)
+            models.Index(fields=['resolved_at'], condition=models.Q(is_resolved=True), name='notif_resolved_idx'),
+        ]
+        constraints = [
+            # Una sola notificación abierta por huella: destino del `ON CONFLICT` de `create_notification`
+            models.UniqueConstraint(
+                fields=['fingerprint'], condition=models.Q(is_resolved=False) & ~models.Q(fingerprint=''),
+                name='notif_open_fingerprint_uniq',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.get_severity_display()} - {self.title}"
@@ -203,6 +271,72 @@ class AdminNotification(models.Model):
             self.save(update_fields=['is_resolved', 'resolved_at', 'resolved_by'])
 
 
+class StatusCounter(models.Model):
+    """
+    Contadores materializados de publicaciones y solicitudes ECE.
+
+    Una fila por (entidad, estado, nivel, estudiante, tutor, mes de creación).
+    Se mantienen de forma incremental desde las señales de `requests.counters`
+    y se reconstruyen con `manage.py rebuild_status_counters`. Los ids de
+    estudiante/tutor son enteros planos (0 = sin tutor) para que la clave
+    única funcione con `INSERT ... ON CONFLICT`.
+    """
+    ENTITY_CHOICES = (
+        ('publication', 'Publicación'),
+        ('ece_request', 'Solicitud ECE'),
+    )
+
+    entity = models.CharField('Entidad', max_length=20, choices=ENTITY_CHOICES)
+    status = models.CharField('Estado', max_length=20)
+    nivel = models.CharField('Nivel', max_length=1, blank=True, default='')
+    student_id = models.BigIntegerField('Estudiante')
+    tutor_id = models.BigIntegerField('Tutor', default=0)
+    month = models.DateField('Mes')
+    count = models.IntegerField('Cantidad', default=0)
+
+    class Meta:
+        db_table = 'status_counters'
+        verbose_name = 'Contador de Estados'
+        verbose_name_plural = 'Contadores de Estados'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['entity', 'status', 'nivel', 'student_id', 'tutor_id', 'month'],
+                name='status_counters_key',
+            ),
+        ]
+        indexes = [
+            # Lecturas por estudiante (perfil) y por mes (reporte mensual)
+            models.Index(fields=['student_id', 'entity'], name='counters_student_idx'),
+            models.Index(fields=['entity', 'month'], name='counters_month_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity}/{self.status} {self.month:%Y-%m}: {self.count}"
+
+
+class SharedCounter(models.Model):
+    """
+    Contadores de `config.counter_store.DatabaseCounterStore`.
+
+    Tabla `UNLOGGED` (no pasa por el WAL: se pierde tras una caída, como una
+    caché) que se actualiza solo con `INSERT ... ON CONFLICT ... RETURNING`.
+    """
+    key = models.CharField('Clave', max_length=255, primary_key=True)
+    value = models.BigIntegerField('Valor', default=0)
+    expires_at = models.DateTimeField('Caduca', null=True, blank=True)
+
+    class Meta:
+        db_table = 'shared_counters'
+        verbose_name = 'Contador Compartido'
+        verbose_name_plural = 'Contadores Compartidos'
+        indexes = [
+            models.Index(fields=['expires_at'], name='shared_counters_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
 class ActiveSession(models.Model):
     """Modelo para detectar accesos simultáneos"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='active_sessions')
@@ -220,3 +354,112 @@ class ActiveSession(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.ip_address}"
+
+
+class UploadSession(models.Model):
+    """
+    Subida reanudable por fragmentos (`/api/requests/uploads/`).
+
+    Los bytes se van añadiendo a `UPLOAD_SESSION_DIR/<id>.part`; `offset`
+    indica cuántos se han recibido para que el cliente pueda reanudar tras un
+    corte. Una sesión completa se consume al crear la publicación o la
+    solicitud ECE con `upload_id`.
+    """
+    STATUS_CHOICES = (
+        ('uploading', 'Subiendo'),
+        ('complete', 'Completa'),
+        ('failed', 'Fallida'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+        verbose_name='Usuario'
+    )
+    filename = models.CharField('Nombre del archivo', max_length=255)
+    size = models.BigIntegerField('Tamaño total')
+    offset = models.BigIntegerField('Bytes recibidos', default=0)
+    sha256 = models.CharField('SHA-256', max_length=64, blank=True, default='',
+                              help_text='Esperado (si lo envía el cliente) o calculado al completar')
+    status = models.CharField('Estado', max_length=20, choices=STATUS_CHOICES, default='uploading')
+    expires_at = models.DateTimeField('Expira')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        verbose_name = 'Sesión de Subida'
+        verbose_name_plural = 'Sesiones de Subida'
+        indexes = [
+            models.Index(fields=['expires_at'], name='upload_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size})"
+
+    @property
+    def path(self):
+        return Path(settings.UPLOAD_SESSION_DIR) / f"{self.pk}.part"
+
+    def source_path(self):
+        """Archivo recibido o, si se completó por deduplicación, el blob ya almacenado."""
+        if not self.path.exists() and self.status == 'complete' and self.sha256:
+            return default_storage.blob_path(self.sha256)
+        return self.path
+
+    def discard(self):
+        """Borrar el archivo parcial y la sesión."""
+        self.path.unlink(missing_ok=True)
+        self.delete()
+
+
+class DocumentJob(models.Model):
+    """
+    Trabajo de vista previa de un documento (cola local en la base de datos).
+
+    Se crea uno por (entidad, fila, contenido) al subir o sustituir el archivo
+    de una publicación o solicitud ECE; repetir el encolado no duplica trabajo.
+    `manage.py run_document_worker` los reclama con `SELECT ... FOR UPDATE SKIP
+    LOCKED`, extrae texto, páginas y miniatura en un pool de procesos y los
+    reintenta con espera exponencial hasta `DOCUMENT_JOB_MAX_ATTEMPTS`.
+    """
+    ENTITY_CHOICES = StatusCounter.ENTITY_CHOICES
+
+    STATUS_CHOICES = (
+        ('pending', 'Pendiente'),
+        ('running', 'En ejecución'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+    )
+
+    entity = models.CharField('Entidad', max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField('Id de la fila')
+    file_sha256 = models.CharField('SHA-256 del archivo', max_length=64)
+    status = models.CharField('Estado', max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField('Intentos', default=0)
+    run_after = models.DateTimeField('Ejecutar a partir de', default=timezone.now)
+    locked_at = models.DateTimeField('Reclamado', null=True, blank=True)
+    locked_by = models.CharField('Worker', max_length=100, blank=True, default='')
+    last_error = models.TextField('Último error', blank=True, default='')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'document_jobs'
+        verbose_name = 'Trabajo de Vista Previa'
+        verbose_name_plural = 'Trabajos de Vista Previa'
+        constraints = [
+            models.UniqueConstraint(fields=['entity', 'object_id', 'file_sha256'], name='document_jobs_key'),
+        ]
+        indexes = [
+            # Solo la cola viva: los terminados no engordan el índice
+            models.Index(fields=['run_after'], condition=models.Q(status__in=['pending', 'running']),
+                         name='document_jobs_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.entity} #{self.object_id} ({self.status})"
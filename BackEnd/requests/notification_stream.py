@@ -0,0 +1,208 @@
+"""
+Flujo de notificaciones de administración por Server-Sent Events (SSE).
+
+El panel de admin ya no sondea `notifications/stats/` cada 30 s: abre un
+`EventSource` contra `notifications/stream/` (vista asíncrona, requiere
+servir la aplicación con `config/asgi.py`) y recibe eventos:
+
+- `notification`: alta o nueva ocurrencia de una notificación (resumen de la
+  fila) con `unread_delta` (+1 si pasa a no leída, 0 si ya lo estaba).
+- `read` / `resolved`: cambios de estado desde el panel (`unread_delta`).
+- `resync`: el cliente se ha quedado atrás (cola llena); debe recargar.
+
+`create_notification` y las acciones del panel llaman a `publish()`. El
+reparto entre workers se elige con `NOTIFICATION_STREAM_BACKEND`:
+
+- `postgres`: `pg_notify` en la transacción de la escritura (se entrega al
+  confirmarla). Cada proceso con clientes conectados mantiene un hilo con una
+  conexión `LISTEN` propia que reparte los eventos a sus suscriptores.
+- `local`: reparto dentro del proceso en `transaction.on_commit` (un solo
+  worker, desarrollo y tests).
+
+Un admin conectado sin eventos no cuesta consultas: solo comentarios de
+latido cada `NOTIFICATION_STREAM_HEARTBEAT` segundos. El `EventSource` no
+puede enviar la cabecera `Authorization`, así que la conexión se autentica
+con un token firmado de vida corta (`notifications/stream_token/`).
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+BACKEND_POSTGRES = 'postgres'
+BACKEND_LOCAL = 'local'
+TOKEN_SALT = 'requests.notification_stream'
+# Eventos en cola por cliente; si se llena se sustituyen por un `resync`
+QUEUE_SIZE = 100
+
+
+def stream_token(user):
+    return signing.dumps({'user': user.pk}, salt=TOKEN_SALT)
+
+
+def token_user_id(token):
+    """ID del usuario del token, o None si es inválido o ha caducado."""
+    try:
+        return signing.loads(token, salt=TOKEN_SALT, max_age=settings.NOTIFICATION_STREAM_TOKEN_MAX_AGE)['user']
+    except (signing.BadSignature, KeyError, TypeError):
+        return None
+
+
+def notification_event(notification, unread_delta):
+    """Resumen de la fila para el evento (el payload de `pg_notify` admite 8000 bytes)."""
+    return {
+        'type': 'notification',
+        'unread_delta': unread_delta,
+        'notification': {
+            'id': notification.pk,
+            'notification_type': notification.notification_type,
+            'severity': notification.severity,
+            'title': notification.title,
+            'message': notification.message[:500],
+            'user': notification.user_id,
+            'ip_address': notification.ip_address,
+            'occurrences': notification.occurrences,
+            'is_read': False,
+            'is_resolved': False,
+            'created_at': notification.created_at.isoformat() if notification.created_at else None,
+            'last_seen': notification.last_seen.isoformat() if notification.last_seen else None,
+        },
+    }
+
+
+class Broker:
+    """Suscriptores (colas asyncio de las respuestas SSE abiertas) de este proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        if settings.NOTIFICATION_STREAM_BACKEND == BACKEND_POSTGRES:
+            listener.ensure_started()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def dispatch(self, event):
+        """Entregar `event` a todos los suscriptores (desde cualquier hilo)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, event)
+            except RuntimeError:
+                # Bucle ya cerrado: la respuesta terminó sin desuscribirse
+                self.unsubscribe((loop, queue))
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait({'type': 'resync'})
+
+
+class Listener:
+    """Hilo con una conexión `LISTEN` propia (solo en procesos con suscriptores)."""
+    RECONNECT_DELAY = 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-listener', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("[notification_stream] Conexión LISTEN perdida; reintentando")
+            time.sleep(self.RECONNECT_DELAY)
+
+    def _listen(self):
+        wrapper = connections['default']
+        raw = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f'LISTEN "{settings.NOTIFICATION_STREAM_CHANNEL}"')
+            while True:
+                if select.select([raw], [], [], 60) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    notify = raw.notifies.pop(0)
+                    broker.dispatch(json.loads(notify.payload))
+        finally:
+            raw.close()
+
+
+broker = Broker()
+listener = Listener()
+
+
+def publish(event, using='default'):
+    """Difundir `event` a los paneles conectados cuando se confirme la transacción actual."""
+    if settings.NOTIFICATION_STREAM_BACKEND == BACKEND_POSTGRES:
+        with connections[using].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [settings.NOTIFICATION_STREAM_CHANNEL, json.dumps(event)])
+    else:
+        transaction.on_commit(lambda: broker.dispatch(event), using=using)
+
+
+def format_event(event):
+    """Trama SSE de un evento."""
+    data = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+async def event_stream():
+    """Trama inicial, eventos y latidos hasta que el cliente se desconecta."""
+    # Suscribirse desde el bucle que itera la respuesta (el del servidor ASGI)
+    subscriber = broker.subscribe()
+    _, queue = subscriber
+    heartbeat = settings.NOTIFICATION_STREAM_HEARTBEAT
+    try:
+        # `retry`: espera del EventSource antes de reconectar
+        yield f'retry: {heartbeat * 1000}\n: conectado\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+def close_connection():
+    """Cerrar la conexión a la BD de este hilo: el flujo no la necesita mientras está abierto."""
+    if not connection.in_atomic_block:
+        connection.close()
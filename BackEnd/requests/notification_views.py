@@ -1,19 +1,27 @@
 """
 ViewSet para notificaciones del administrador
 """
+from asgiref.sync import sync_to_async
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
+from . import notification_stream
 from .models import AdminNotification
 from .serializers import AdminNotificationSerializer
+from config.incremental import IncrementalListMixin
+from config.pagination import CreatedAtKeysetPagination
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
-class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class AdminNotificationViewSet(IncrementalListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para notificaciones del administrador (solo lectura)
     Permite marcar como leído y resolver notificaciones
@@ -21,12 +29,13 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AdminNotification.objects.all()
     serializer_class = AdminNotificationSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['notification_type', 'severity', 'is_read', 'is_resolved']
     search_fields = ['title', 'message']
-    ordering_fields = ['created_at', 'severity']
-    ordering = ['-created_at']
-    pagination_class = None  # Desactivar paginación
+    # El orden lo fija la paginación por cursor: (created_at, id) descendente
+    pagination_class = CreatedAtKeysetPagination
+    # Una notificación cambia al repetirse, leerse o resolverse (ETag y `since`)
+    since_fields = ('created_at', 'last_seen', 'read_at', 'resolved_at')
     
     def get_queryset(self):
         """Solo admins pueden ver notificaciones"""
@@ -43,7 +52,11 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
             openapi.Parameter('severity', openapi.IN_QUERY, description="Filtrar por severidad", type=openapi.TYPE_STRING),
             openapi.Parameter('is_read', openapi.IN_QUERY, description="Filtrar por leídas", type=openapi.TYPE_BOOLEAN),
             openapi.Parameter('is_resolved', openapi.IN_QUERY, description="Filtrar por resueltas", type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING),
+            openapi.Parameter('since_id', openapi.IN_QUERY, description="Solo notificaciones con id mayor (delta)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('since', openapi.IN_QUERY, description="Solo notificaciones creadas o cambiadas después de esta fecha ISO 8601 (delta)", type=openapi.TYPE_STRING),
         ],
+        responses={304: "Sin cambios desde el ETag enviado en If-None-Match"},
         tags=['Notificaciones Admin']
     )
     def list(self, request, *args, **kwargs):
@@ -73,7 +86,10 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'error': 'Solo admins'}, status=status.HTTP_403_FORBIDDEN)
         
         notification = self.get_object()
+        was_unread = not notification.is_read
         notification.mark_as_read()
+        if was_unread:
+            notification_stream.publish({'type': 'read', 'id': notification.pk, 'unread_delta': -1})
         
         return Response({
             'message': 'Notificación marcada como leída',
@@ -104,13 +120,44 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
             return Response({'error': 'Solo admins'}, status=status.HTTP_403_FORBIDDEN)
         
         notification = self.get_object()
-        notification.resolve()
+        if not notification.is_resolved:
+            notification.resolve()
+            notification_stream.publish({'type': 'resolved', 'id': notification.pk, 'unread_delta': 0})
         
         return Response({
             'message': 'Notificación resuelta',
             'notification': AdminNotificationSerializer(notification).data
         })
     
+    @swagger_auto_schema(
+        operation_description=(
+            "Token firmado (caduca en NOTIFICATION_STREAM_TOKEN_MAX_AGE segundos) para abrir "
+            "`notifications/stream/?token=...` con EventSource, que no admite la cabecera Authorization"
+        ),
+        responses={
+            200: openapi.Response(
+                description="Token y URL del flujo SSE",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'token': openapi.Schema(type=openapi.TYPE_STRING),
+                        'url': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            ),
+            403: "No autorizado"
+        },
+        tags=['Notificaciones Admin']
+    )
+    @action(detail=False, methods=['post'])
+    def stream_token(self, request):
+        """Token para conectarse al flujo de notificaciones"""
+        if not request.user.is_authenticated or getattr(request.user, 'role', None) != 'admin':
+            return Response({'error': 'Solo admins'}, status=status.HTTP_403_FORBIDDEN)
+
+        token = notification_stream.stream_token(request.user)
+        return Response({'token': token, 'url': f"{reverse('notification-stream')}?token={token}"})
+
     @swagger_auto_schema(
         operation_description="Obtener estadísticas de notificaciones",
         responses={
@@ -127,6 +174,7 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
                     }
                 )
             ),
+            304: "Sin cambios desde el ETag enviado en If-None-Match",
             403: "No autorizado"
         },
         tags=['Notificaciones Admin']
@@ -139,15 +187,52 @@ class AdminNotificationViewSet(viewsets.ReadOnlyModelViewSet):
         
         queryset = self.get_queryset()
         
-        from django.db.models import Count
+        from django.db.models import Count, Q
+        
+        # Los contadores salen del mismo agregado que el ETag: un sondeo sin
+        # cambios cuesta una consulta y responde 304
+        response, etag, state = self.conditional_response(request, queryset, {
+            **self.etag_aggregates(),
+            'unread': Count('id', filter=Q(is_read=False)),
+            'pending': Count('id', filter=Q(is_read=True, is_resolved=False)),
+            'resolved': Count('id', filter=Q(is_resolved=True)),
+        })
+        if response is not None:
+            return response
         
         stats = {
-            'total': queryset.count(),
-            'unread': queryset.filter(is_read=False).count(),
-            'pending': queryset.filter(is_read=True, is_resolved=False).count(),
-            'resolved': queryset.filter(is_resolved=True).count(),
+            'total': state['count'],
+            'unread': state['unread'],
+            'pending': state['pending'],
+            'resolved': state['resolved'],
             'by_severity': dict(queryset.values('severity').annotate(count=Count('id')).values_list('severity', 'count')),
             'by_type': dict(queryset.values('notification_type').annotate(count=Count('id')).values_list('notification_type', 'count'))
         }
         
-        return Response(stats)
+        return Response(stats, headers={'ETag': etag})
+
+
+async def notification_stream_view(request):
+    """
+    Flujo SSE de notificaciones para admins (`requests/notification_stream.py`).
+
+    Autenticado con el token de `notifications/stream_token/`. Solo se
+    consulta la base de datos al conectar; después la conexión se cierra.
+    """
+    user_id = notification_stream.token_user_id(request.GET.get('token', ''))
+    if user_id is None:
+        return JsonResponse({'error': 'Token inválido o caducado'}, status=status.HTTP_401_UNAUTHORIZED)
+    is_admin = await get_user_model().objects.filter(pk=user_id, role='admin', is_active=True).aexists()
+    await sync_to_async(notification_stream.close_connection)()
+    if not is_admin:
+        return JsonResponse({'error': 'Solo admins'}, status=status.HTTP_403_FORBIDDEN)
+    if not isinstance(request, ASGIRequest):
+        # Bajo WSGI el flujo ocuparía un worker para siempre: el cliente sigue sondeando
+        return JsonResponse({'error': 'El flujo de notificaciones requiere el servidor ASGI'},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    response = StreamingHttpResponse(notification_stream.event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx: entregar cada evento sin acumularlo en el búfer del proxy
+    response['X-Accel-Buffering'] = 'no'
+    return response
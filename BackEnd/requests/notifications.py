@@ -0,0 +1,137 @@
+"""
+Agrupación y limitación de las notificaciones de administración.
+
+Un bucle de errores o una ráfaga de fuerza bruta llamaba a
+`create_notification` miles de veces con la misma notificación. Ahora cada
+evento tiene una huella (`fingerprint`) calculada con el tipo, el usuario, la
+IP y el título (con los números normalizados) y se guarda así:
+
+- Si ya hay una notificación abierta (sin resolver) con esa huella, se le
+  suman las ocurrencias y se actualizan `last_seen`, la severidad, el mensaje
+  y los metadatos; vuelve a quedar sin leer. Si no, se crea. Es un único
+  `INSERT ... ON CONFLICT DO UPDATE` contra el índice único parcial
+  `notif_open_fingerprint_uniq`, atómico con escrituras concurrentes.
+- Por huella se escriben como mucho `NOTIFICATION_RATE_BURST` veces cada
+  `NOTIFICATION_RATE_WINDOW` segundos (ventana fija en el almacén de
+  contadores compartido). Los eventos que superan el límite no tocan la base
+  de datos: se acumulan en el almacén y se suman en la siguiente escritura
+  permitida de esa huella o, si la ráfaga termina, al cerrarse la ventana
+  (`take_due`, lo vacía `utils.flush_held_notifications` desde el hilo de
+  `access_audit`), así que la fila acaba teniendo el total real.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from config.counter_store import get_store
+
+RATE_PREFIX = 'notif:rate:'
+PENDING_PREFIX = 'notif:pending:'
+# Ocurrencias retenidas por el límite que aún no se han sumado a la fila
+PENDING_TTL = 24 * 60 * 60
+
+_DIGITS = re.compile(r'\d+')
+
+# Huellas con eventos retenidos por este proceso: {huella: {'due': cierre de la
+# ventana (monotonic), 'event': último evento (argumentos de `upsert`)}}
+_held = {}
+_held_lock = threading.Lock()
+
+_UPSERT_SQL = (
+    # Estado previo de la fila abierta: ¿pasa de leída (o inexistente) a no leída?
+    "WITH prev AS (SELECT is_read FROM admin_notifications "
+    "WHERE fingerprint = %(fingerprint)s AND NOT is_resolved AND fingerprint <> '') "
+    "INSERT INTO admin_notifications (notification_type, severity, title, message, user_id, ip_address, "
+    "metadata, is_read, is_resolved, created_at, fingerprint, occurrences, last_seen) "
+    "VALUES (%(notification_type)s, %(severity)s, %(title)s, %(message)s, %(user_id)s, %(ip_address)s, "
+    "%(metadata)s::jsonb, false, false, %(now)s, %(fingerprint)s, %(occurrences)s, %(now)s) "
+    "ON CONFLICT (fingerprint) WHERE NOT is_resolved AND fingerprint <> '' DO UPDATE SET "
+    "occurrences = admin_notifications.occurrences + EXCLUDED.occurrences, "
+    "last_seen = EXCLUDED.last_seen, severity = EXCLUDED.severity, message = EXCLUDED.message, "
+    "metadata = EXCLUDED.metadata, is_read = false, read_at = NULL "
+    "RETURNING id, (SELECT coalesce(bool_or(is_read), true) FROM prev)"
+)
+
+
+def fingerprint(notification_type, user_id, ip_address, title):
+    """Huella de agrupación: tipo, usuario, IP y título sin números (IDs, contadores)."""
+    normalized = _DIGITS.sub('#', title.strip().lower())
+    raw = f'{notification_type}|{user_id or ""}|{ip_address or ""}|{normalized}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def admit(key, occurrences=1, event=None):
+    """
+    Anotar `occurrences` eventos de la huella `key`. Devuelve cuántos hay que
+    sumar ahora a la notificación, o 0 si el límite de escritura retiene el
+    evento (queda pendiente para la siguiente escritura o el cierre de la
+    ventana; `event` es lo que se escribirá entonces).
+    """
+    store = get_store()
+    if store.incr(RATE_PREFIX + key, ttl=settings.NOTIFICATION_RATE_WINDOW) > settings.NOTIFICATION_RATE_BURST:
+        if occurrences:
+            store.incr(PENDING_PREFIX + key, ttl=PENDING_TTL, delta=occurrences)
+        if event is not None:
+            hold(key, event)
+        return 0
+    return occurrences + take_pending(key)
+
+
+def take_pending(key):
+    """Recoger (restar del almacén) las ocurrencias retenidas de la huella `key`."""
+    store = get_store()
+    backlog = store.get(PENDING_PREFIX + key, 0)
+    if backlog > 0:
+        # Restar lo que se recoge (no borrar: puede llegar otro evento entretanto).
+        # Si otra escritura recogió lo mismo a la vez, el saldo queda negativo:
+        # se devuelve la diferencia y no se cuenta dos veces.
+        remaining = store.incr(PENDING_PREFIX + key, ttl=PENDING_TTL, delta=-backlog)
+        if remaining < 0:
+            store.incr(PENDING_PREFIX + key, ttl=PENDING_TTL, delta=-remaining)
+            backlog += remaining
+    return max(backlog, 0)
+
+
+def hold(key, event):
+    """Recordar `event` para sumar lo retenido de `key` cuando cierre la ventana actual."""
+    with _held_lock:
+        entry = _held.get(key)
+        # La ventana empezó antes del primer evento retenido: como tarde cierra entonces + ventana
+        due = entry['due'] if entry else time.monotonic() + settings.NOTIFICATION_RATE_WINDOW
+        _held[key] = {'due': due, 'event': event}
+
+
+def take_due(due_only=True):
+    """Sacar las huellas retenidas (solo aquellas cuya ventana ha cerrado con `due_only`): [(huella, evento)]."""
+    now = time.monotonic()
+    with _held_lock:
+        keys = [key for key, entry in _held.items() if not due_only or entry['due'] <= now]
+        return [(key, _held.pop(key)['event']) for key in keys]
+
+
+def upsert(notification_type, severity, title, message, user_id, ip_address, metadata, key, occurrences):
+    """
+    Crear la notificación abierta de `key` o sumarle `occurrences`. Devuelve
+    (id, pasa a no leída).
+    """
+    params = {
+        'notification_type': notification_type,
+        'severity': severity,
+        'title': title,
+        'message': message,
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'metadata': json.dumps(metadata, default=str),
+        'now': timezone.now(),
+        'fingerprint': key,
+        'occurrences': occurrences,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL, params)
+        return cursor.fetchone()
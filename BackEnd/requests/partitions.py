@@ -0,0 +1,188 @@
+"""
+Particiones mensuales de `system_logs` y su archivado.
+
+`system_logs` es una tabla particionada por rango de `created_at` (meses UTC,
+ver la migración 0015): `system_logs_pAAAAMM` por mes y `system_logs_default`
+para las filas que no caen en ninguna. Las consultas con `created_at` acotado
+(`month_bounds`) solo leen la partición del mes.
+
+`archive_system_logs` (diario, por cron) usa estas funciones para:
+
+- Crear por adelantado las particiones de los próximos meses
+  (`ensure_partitions`) y sacar de la partición DEFAULT las filas que hayan
+  caído allí (`adopt_default_rows`).
+- Archivar los meses vencidos: desconectar la partición (`DETACH`, bloqueo
+  breve de la tabla padre), volcarla a un archivo columnar comprimido en
+  `AUDIT_ARCHIVE_DIR` (`audit_archive`, se consulta con `query_audit_archive`)
+  y borrarla. Si el proceso se interrumpe, la tabla
+  desconectada se archiva en la siguiente ejecución (`detached_partitions`).
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.db import connection, transaction
+
+from . import audit_archive
+
+TABLE = 'system_logs'
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_RE = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+
+def month_start(moment):
+    """Primer instante (UTC) del mes de `moment`."""
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def month_bounds(moment):
+    """[inicio, fin) del mes de `moment`: el filtro que limita una consulta a su partición."""
+    start = month_start(moment)
+    return start, add_months(start, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def partition_month(name):
+    match = PARTITION_RE.match(name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=dt_timezone.utc)
+
+
+def attached_partitions():
+    """{mes: nombre} de las particiones mensuales conectadas a la tabla."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = inhparent "
+            "JOIN pg_class child ON child.oid = inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return {partition_month(name): name for name in names if partition_month(name)}
+
+
+def detached_partitions():
+    """Tablas `system_logs_pAAAAMM` desconectadas que quedaron sin archivar."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class "
+            "WHERE relkind = 'r' AND relname LIKE %s AND NOT relispartition "
+            "AND relnamespace = 'public'::regnamespace",
+            [f'{TABLE}\\_p%'],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    return sorted(name for name in names if partition_month(name))
+
+
+def create_partition(month):
+    """
+    Crear la partición de `month` y moverle las filas de ese mes que estuvieran
+    en la DEFAULT (si no, `ATTACH` fallaría al validar el rango).
+    """
+    name = partition_name(month)
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE "{name}" (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved',
+            [start, end],
+        )
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)',
+            [start, end],
+        )
+    return name
+
+
+def ensure_partitions(now, months_ahead):
+    """Particiones del mes de `now` y de los `months_ahead` siguientes. Devuelve las creadas."""
+    existing = attached_partitions()
+    current = month_start(now)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(create_partition(month))
+    return created
+
+
+def default_months():
+    """Meses con filas en la partición DEFAULT (normalmente ninguno)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC') FROM {DEFAULT_PARTITION}"
+        )
+        return sorted(row[0].replace(tzinfo=dt_timezone.utc) for row in cursor.fetchall())
+
+
+def adopt_default_rows():
+    """Crear la partición de cada mes con filas en la DEFAULT (las mueve a ella)."""
+    existing = attached_partitions()
+    return [create_partition(month) for month in default_months() if month not in existing]
+
+
+def expired_partitions(cutoff):
+    """Particiones conectadas cuyo mes termina antes de `cutoff`, de la más antigua a la más reciente."""
+    return [
+        name for month, name in sorted(attached_partitions().items())
+        if add_months(month, 1) <= cutoff
+    ]
+
+
+def detach_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION "{name}"')
+
+
+def export_partition(name, directory):
+    """
+    Volcar la tabla `name` a `<directory>/<name>.alog` (ver `audit_archive`);
+    si ese mes ya se archivó (filas tardías), a `<name>.1.alog`, `<name>.2.alog`...
+
+    Si ya hay un archivo con las mismas filas (mismo número y rango de `id`:
+    una ejecución anterior murió entre el volcado y el `DROP`), se devuelve ese
+    en lugar de volcarla otra vez, que duplicaría el mes en las consultas.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT count(*), min(id), max(id) FROM "{name}"')
+        rows, *id_range = cursor.fetchone()
+    existing = audit_archive.find_archive(directory, name, rows, id_range)
+    if existing is not None:
+        return existing
+    path = audit_archive.archive_path(directory, name)
+    columns = ', '.join(audit_archive.COLUMNS)
+    # Cursor de servidor: la partición se lee por bloques, no entera en memoria
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(f'SELECT {columns} FROM "{name}" ORDER BY created_at, id')
+        rows = (dict(zip(audit_archive.COLUMNS, row)) for row in cursor)
+        audit_archive.write_archive(path, rows)
+    return path
+
+
+def drop_partition(name):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+
+
+def archive_partition(name, directory, attached=True):
+    """Desconectar (si hace falta), volcar y borrar la partición `name`. Devuelve el archivo."""
+    if attached:
+        detach_partition(name)
+    path = export_partition(name, directory)
+    drop_partition(name)
+    return path
@@ -1,60 +1,116 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
-from .models import ECERequest, SystemLog, SystemConfiguration, AdminNotification
+from .models import ECERequest, SystemLog, SystemConfiguration, AdminNotification, UploadSession
 from authentication.serializers import UserListSerializer
+from config.documents import text_excerpt
+from config.downloads import download_url, thumbnail_url
+from config.serializers import DynamicFieldsMixin
+from config.uploads import ALLOWED_EXTENSIONS, size_label, validate_document
+
+
+class UploadSessionFileMixin(serializers.Serializer):
+    """
+    Permite adjuntar, en lugar del archivo, una subida por fragmentos ya
+    completa (`upload_id`). La sesión se consume al crear el objeto.
+    """
+    upload_id = serializers.UUIDField(write_only=True, required=False)
+    upload_max_size = settings.FILE_UPLOAD_MAX_SIZE
+    upload_file_fields = ('file',)
 
+    def validate_upload_id(self, value):
+        if any(self.initial_data.get(name) for name in self.upload_file_fields):
+            raise serializers.ValidationError("Envíe el archivo o upload_id, no ambos.")
+        request = self.context.get('request')
+        session = UploadSession.objects.filter(pk=value, user=request.user, status='complete').first()
+        if session is None:
+            raise serializers.ValidationError("La subida no existe o no está completa.")
+        try:
+            with open(session.source_path(), 'rb') as source:
+                validate_document(File(source, name=session.filename), self.upload_max_size)
+        except OSError:
+            raise serializers.ValidationError("La subida no existe o no está completa.")
+        return session
 
-class ECERequestSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        session = validated_data.pop('upload_id', None)
+        if session is None:
+            return super().create(validated_data)
+        path = session.path
+        with open(session.source_path(), 'rb') as source:
+            upload = File(source, name=session.filename)
+            upload.sha256 = session.sha256
+            validated_data['file'] = upload
+            instance = super().create(validated_data)
+        session.delete()
+        transaction.on_commit(lambda: path.unlink(missing_ok=True))
+        return instance
+
+
+class ECERequestSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer principal para solicitudes ECE
+    Serializer principal para solicitudes ECE (admite `?fields=` en lecturas)
     """
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     student_matricula = serializers.CharField(source='student.matricula', read_only=True)
     reviewed_by_name = serializers.CharField(source='reviewed_by.get_full_name', read_only=True, allow_null=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    file_name = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = ECERequest
         fields = [
-            'id', 'student', 'student_name', 'student_matricula', 'file',
-            'file_url', 'description', 'status', 'status_display',
+            'id', 'student', 'student_name', 'student_matricula', 'file', 'file_name',
+            'file_url', 'thumbnail_url', 'page_count', 'preview_status', 'description',
+            'status', 'status_display',
             'reviewed_by', 'reviewed_by_name', 'review_comments',
             'review_date', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'student', 'reviewed_by', 'review_date', 'created_at', 'updated_at']
+        # La ruta en /media/ no se publica: se descarga por `file_url`
+        extra_kwargs = {'file': {'write_only': True}}
     
+    def get_file_name(self, obj):
+        return os.path.basename(obj.file.name) if obj.file else None
+
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return download_url(obj, self.context.get('request'))
 
+    def get_thumbnail_url(self, obj):
+        return thumbnail_url(obj, self.context.get('request'))
 
-class ECERequestCreateSerializer(serializers.ModelSerializer):
+
+class ECERequestCreateSerializer(UploadSessionFileMixin, serializers.ModelSerializer):
     """
     Serializer para crear solicitudes ECE
     """
+    upload_max_size = 10 * 1024 * 1024
+
     class Meta:
         model = ECERequest
-        fields = ['file', 'description']
+        fields = ['file', 'description', 'upload_id']
+        extra_kwargs = {'file': {'required': False, 'write_only': True}}
     
     def validate_file(self, value):
         if value:
-            # Validar tamaño del archivo (max 10MB)
-            if value.size > 10 * 1024 * 1024:
-                raise serializers.ValidationError("El archivo no puede superar los 10MB.")
-            
-            # Validar extensión
-            allowed_extensions = ['.pdf', '.doc', '.docx']
-            file_ext = value.name.lower()[value.name.rfind('.'):]
-            if file_ext not in allowed_extensions:
-                raise serializers.ValidationError(
-                    "Solo se permiten archivos PDF, DOC o DOCX."
-                )
+            # Validar tamaño (max 10MB), extensión y contenido real del archivo
+            validate_document(value, self.upload_max_size)
         return value
     
+    def validate(self, attrs):
+        if not attrs.get('file') and not attrs.get('upload_id'):
+            raise serializers.ValidationError({'file': "Debe adjuntar un archivo o un upload_id."})
+        return attrs
+    
     def create(self, validated_data):
         # El estudiante se asigna automáticamente desde el request
         validated_data['student'] = self.context['request'].user
@@ -86,28 +142,36 @@ class ECERequestDetailSerializer(serializers.ModelSerializer):
     student = UserListSerializer(read_only=True)
     reviewed_by = UserListSerializer(read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    file_name = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    text_excerpt = serializers.SerializerMethodField()
     
     class Meta:
         model = ECERequest
         fields = [
-            'id', 'student', 'file', 'file_url', 'description',
+            'id', 'student', 'file_name', 'file_url', 'thumbnail_url', 'page_count',
+            'preview_status', 'text_excerpt', 'description',
             'status', 'status_display', 'reviewed_by', 'review_comments',
             'review_date', 'created_at', 'updated_at'
         ]
     
+    def get_file_name(self, obj):
+        return os.path.basename(obj.file.name) if obj.file else None
+
     def get_file_url(self, obj):
-        if obj.file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.file.url)
-            return obj.file.url
-        return None
+        return download_url(obj, self.context.get('request'))
 
+    def get_thumbnail_url(self, obj):
+        return thumbnail_url(obj, self.context.get('request'))
 
-class SystemLogSerializer(serializers.ModelSerializer):
+    def get_text_excerpt(self, obj):
+        return text_excerpt(obj)
+
+
+class SystemLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer para logs del sistema
+    Serializer para logs del sistema (admite `?fields=` en lecturas)
     """
     user_name = serializers.SerializerMethodField()
     action_display = serializers.CharField(source='get_action_display', read_only=True)
@@ -117,7 +181,7 @@ class SystemLogSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'user', 'user_name', 'action', 'action_display',
             'model_name', 'object_id', 'description', 'ip_address',
-            'user_agent', 'created_at'
+            'user_agent', 'occurrences', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
     
@@ -166,9 +230,9 @@ class SystemConfigurationSerializer(serializers.ModelSerializer):
         return value
 
 
-class AdminNotificationSerializer(serializers.ModelSerializer):
+class AdminNotificationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
-    Serializer para notificaciones del administrador
+    Serializer para notificaciones del administrador (admite `?fields=` en lecturas)
     """
     type_display = serializers.CharField(source='get_notification_type_display', read_only=True)
     severity_display = serializers.CharField(source='get_severity_display', read_only=True)
@@ -179,11 +243,11 @@ class AdminNotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'notification_type', 'type_display', 'severity', 'severity_display',
             'title', 'message', 'user', 'user_name', 'ip_address', 'metadata',
-            'is_read', 'is_resolved', 'created_at', 'read_at', 'resolved_at'
+            'is_read', 'is_resolved', 'occurrences', 'last_seen', 'created_at', 'read_at', 'resolved_at'
         ]
         read_only_fields = [
             'id', 'notification_type', 'severity', 'title', 'message', 'user',
-            'ip_address', 'metadata', 'created_at'
+            'ip_address', 'metadata', 'occurrences', 'last_seen', 'created_at'
         ]
     
     def get_user_name(self, obj):
@@ -191,3 +255,67 @@ class AdminNotificationSerializer(serializers.ModelSerializer):
         if obj.user:
             return obj.user.get_full_name() or obj.user.username
         return None
+
+
+def user_has_blob(user, digest, size):
+    """¿Hay en el almacenamiento un archivo de `user` con este SHA-256 y tamaño?
+
+    Solo se reutilizan contenidos que el propio usuario ya subió: conocer el
+    hash de un archivo ajeno no debe bastar para obtener una copia.
+    """
+    from publications.models import Publication
+    owned = (Publication.objects.filter(student=user, file_sha256=digest).exists()
+             or ECERequest.objects.filter(student=user, file_sha256=digest).exists())
+    if not owned or not hasattr(default_storage, 'blob_path'):
+        return False
+    try:
+        return os.path.getsize(default_storage.blob_path(digest)) == size
+    except OSError:
+        return False
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer para iniciar/consultar una subida reanudable por fragmentos
+    """
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'sha256', 'status', 'chunk_size', 'expires_at', 'created_at']
+        read_only_fields = ['id', 'offset', 'status', 'expires_at', 'created_at']
+        extra_kwargs = {'sha256': {'required': False}}
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_SESSION_CHUNK_SIZE
+
+    def validate_filename(self, value):
+        if not value.lower().endswith(ALLOWED_EXTENSIONS):
+            raise serializers.ValidationError("Solo se permiten archivos PDF, DOC o DOCX.")
+        return value
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("El tamaño debe ser mayor que 0.")
+        if value > settings.FILE_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"El archivo no puede superar los {size_label(settings.FILE_UPLOAD_MAX_SIZE)}."
+            )
+        return value
+
+    def validate_sha256(self, value):
+        value = value.lower()
+        if value and not re.fullmatch(r'[0-9a-f]{64}', value):
+            raise serializers.ValidationError("SHA-256 inválido (64 caracteres hexadecimales).")
+        return value
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        validated_data['user'] = user
+        validated_data['expires_at'] = timezone.now() + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        digest = validated_data.get('sha256')
+        if digest and user_has_blob(user, digest, validated_data['size']):
+            # El usuario ya subió este mismo contenido: no hace falta enviar bytes
+            validated_data['offset'] = validated_data['size']
+            validated_data['status'] = 'complete'
+        return super().create(validated_data)
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+
+from config import storage
+
+from . import counters, document_jobs
+
+for model_label in ('publications.Publication', 'requests.ECERequest'):
+    # Contadores materializados de estados (StatusCounter)
+    pre_save.connect(counters.lock_previous_key, sender=model_label, dispatch_uid=f'counters_pre_{model_label}')
+    post_save.connect(counters.update_on_save, sender=model_label, dispatch_uid=f'counters_save_{model_label}')
+    pre_delete.connect(counters.lock_deleted_key, sender=model_label, dispatch_uid=f'counters_pre_delete_{model_label}')
+    post_delete.connect(counters.update_on_delete, sender=model_label, dispatch_uid=f'counters_delete_{model_label}')
+
+    # Enlaces al almacenamiento deduplicado (file_sha256 y borrado de archivos)
+    post_init.connect(storage.remember_file, sender=model_label, dispatch_uid=f'storage_init_{model_label}')
+    pre_save.connect(storage.track_file_hash, sender=model_label, dispatch_uid=f'storage_pre_{model_label}')
+    post_save.connect(storage.release_replaced_file, sender=model_label, dispatch_uid=f'storage_save_{model_label}')
+    post_delete.connect(storage.release_deleted_file, sender=model_label, dispatch_uid=f'storage_delete_{model_label}')
+
+    # Vista previa en segundo plano (texto, páginas y miniatura)
+    pre_save.connect(document_jobs.mark_preview_pending, sender=model_label, dispatch_uid=f'preview_pre_{model_label}')
+    post_save.connect(document_jobs.queue_preview, sender=model_label, dispatch_uid=f'preview_save_{model_label}')
@@ -1,3 +1,1267 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+from io import StringIO
+from unittest import mock
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from authentication.models import User
+from config import openapi
+from config.counter_store import DatabaseCounterStore, LocalCounterStore, SQLiteCounterStore, get_store
+from publications.models import Publication
+from . import (
+    audit_archive, config_registry, document_jobs, notification_stream, notifications, partitions, upload_views,
+)
+from .access_audit import AccessEventAggregator
+from .audit import AuditLogWriter, OVERFLOW_DROP, OVERFLOW_SPILL
+from .counters import ECE_REQUEST, PUBLICATION, rebuild, set_status
+from .models import (
+    AdminNotification, DocumentJob, ECERequest, StatusCounter, SystemConfiguration, SystemLog, UploadSession,
+)
+from .utils import create_notification, flush_held_notifications
+from .views import ECERequestViewSet
+
+
+class PausedAuditLogWriter(AuditLogWriter):
+    """Escritor cuyo hilo consumidor espera a `release` antes de empezar."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+
+    def _run(self):
+        self.release.wait(5)
+        super()._run()
+
+
+def make_entry(i):
+    return {
+        'user_id': None, 'action': 'login_failed', 'model_name': 'User', 'object_id': None,
+        'description': f'evento {i}', 'ip_address': '127.0.0.1', 'user_agent': 'tests',
+    }
+
+
+class AuditLogWriterTests(TransactionTestCase):
+
+    def test_batches_are_flushed_with_bulk_create(self):
+        writer = AuditLogWriter(batch_size=10, flush_interval=0.05)
+        for i in range(25):
+            self.assertTrue(writer.enqueue(make_entry(i)))
+        self.assertTrue(writer.flush())
+        writer.shutdown()
+
+        self.assertEqual(SystemLog.objects.count(), 25)
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 25)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertGreaterEqual(stats['flushes'], 3)
+
+    def test_drop_policy_counts_overflow(self):
+        writer = PausedAuditLogWriter(max_queue_size=2, overflow_policy=OVERFLOW_DROP, flush_interval=0.05)
+        results = [writer.enqueue(make_entry(i)) for i in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(writer.stats()['dropped'], 1)
+
+        writer.release.set()
+        writer.flush()
+        writer.shutdown()
+        self.assertEqual(SystemLog.objects.count(), 2)
+
+    def test_spill_policy_writes_overflow_to_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spill = Path(tmp) / 'spill.jsonl'
+            writer = PausedAuditLogWriter(max_queue_size=1, overflow_policy=OVERFLOW_SPILL,
+                                          spill_path=spill, flush_interval=0.05)
+            self.assertTrue(writer.enqueue(make_entry(0)))
+            self.assertTrue(writer.enqueue(make_entry(1)))
+            self.assertEqual(writer.stats()['spilled'], 1)
+            spilled = [json.loads(line) for line in spill.read_text(encoding='utf-8').splitlines()]
+            self.assertEqual(spilled[0]['description'], 'evento 1')
+
+            writer.release.set()
+            writer.shutdown()
+        self.assertEqual(SystemLog.objects.count(), 1)
+
+
+class ReplayAuditSpillTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.spill = Path(tmp.name) / 'spill.jsonl'
+
+    def replay(self):
+        out = StringIO()
+        call_command('replay_audit_spill', path=str(self.spill), stdout=out)
+        return out.getvalue()
+
+    def test_interrupted_run_is_replayed_with_the_new_spill(self):
+        # `.processing` de una ejecución interrumpida y un volcado nuevo
+        self.spill.with_suffix('.jsonl.processing').write_text(json.dumps(make_entry(0)) + '\n', encoding='utf-8')
+        self.spill.write_text(json.dumps(make_entry(1)) + '\n', encoding='utf-8')
+
+        self.replay()
+
+        self.assertEqual(sorted(SystemLog.objects.values_list('description', flat=True)), ['evento 0', 'evento 1'])
+        self.assertEqual(list(self.spill.parent.iterdir()), [])
+
+    def test_replayed_events_keep_their_time(self):
+        # Volcado hace 40 días: la fila no debe llevar la fecha de la reinyección (ni caer en el mes actual)
+        moment = timezone.now() - timedelta(days=40)
+        AuditLogWriter(spill_path=self.spill)._spill(dict(make_entry(0), created_at=moment))
+        with open(self.spill, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(make_entry(1)) + '\n')  # volcado anterior a `created_at`
+
+        self.replay()
+
+        self.assertEqual(SystemLog.objects.get(description='evento 0').created_at, moment)
+        self.assertIsNotNone(SystemLog.objects.get(description='evento 1').created_at)
+
+    def test_malformed_lines_are_skipped_and_kept(self):
+        lines = [json.dumps(make_entry(0)), '{"user_id": nu', '[1, 2]', json.dumps(make_entry(1))]
+        self.spill.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+        output = self.replay()
+
+        self.assertEqual(SystemLog.objects.count(), 2)
+        self.assertIn('2 líneas inválidas', output)
+        rejected = self.spill.with_suffix('.jsonl.rejected').read_text(encoding='utf-8').splitlines()
+        self.assertEqual(rejected, lines[1:3])
+
+
+class AccessAuditTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno = User.objects.create_user(username='alumno', password=None, role='estudiante')
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        get_store().clear()
+
+    def make_request(self, path='/api/requests/', user=None):
+        request = self.factory.get(path, REMOTE_ADDR='10.0.0.1', HTTP_USER_AGENT='tests')
+        if user is not None:
+            request.user = user
+        return request
+
+    def access_logs(self):
+        return SystemLog.objects.filter(action='unauthorized_attempt').order_by('id')
+
+    def test_identical_events_are_grouped_off_the_request_path(self):
+        aggregator = AccessEventAggregator(window=60, background=False)
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                aggregator.record(self.make_request(), 401)
+            aggregator.record(self.make_request('/api/requests/notifications/'), 401)
+        self.assertEqual(aggregator.stats()['pending'], 2)
+
+        self.assertEqual(aggregator.flush(), 2)
+        self.assertEqual([log.occurrences for log in self.access_logs()], [5, 1])
+        log = self.access_logs().first()
+        self.assertIn('Ocurrencias: 5', log.description)
+        self.assertEqual((log.ip_address, log.user_agent), ('10.0.0.1', 'tests'))
+        stats = aggregator.stats()
+        self.assertEqual((stats['recorded'], stats['deduplicated'], stats['emitted'], stats['pending']), (6, 4, 2, 0))
+
+    def test_forbidden_burst_creates_a_single_notification(self):
+        aggregator = AccessEventAggregator(window=60, background=False)
+        for _ in range(3):
+            aggregator.record(self.make_request('/api/requests/system-logs/', user=self.alumno), 403)
+        aggregator.flush()
+
+        log = self.access_logs().get()
+        self.assertEqual((log.user, log.occurrences), (self.alumno, 3))
+        notification = AdminNotification.objects.get(notification_type='unauthorized_attempt')
+        self.assertEqual(notification.user, self.alumno)
+        self.assertEqual(notification.occurrences, 3)
+
+    def test_sampling_decides_new_keys_and_repeats_are_always_counted(self):
+        aggregator = AccessEventAggregator(window=60, sample_rates={401: 0.5, 403: 0.0}, background=False)
+        with mock.patch('requests.access_audit.random.random', return_value=0.1):
+            self.assertTrue(aggregator.record(self.make_request(), 401))
+        with mock.patch('requests.access_audit.random.random', return_value=0.9):
+            self.assertTrue(aggregator.record(self.make_request(), 401))
+            self.assertFalse(aggregator.record(self.make_request('/otra/'), 401))
+        self.assertFalse(aggregator.record(self.make_request(), 403))
+        aggregator.flush()
+
+        log = self.access_logs().get()
+        self.assertEqual(log.occurrences, 2)
+        self.assertIn('Muestreo: 50%', log.description)
+        self.assertEqual(aggregator.stats()['sampled_out'], 2)
+
+    def test_expired_window_and_key_limit_emit_without_flush(self):
+        aggregator = AccessEventAggregator(window=0.01, background=False)
+        aggregator.record(self.make_request(), 401)
+        time.sleep(0.02)
+        aggregator.record(self.make_request('/otra/'), 401)
+        # Solo la primera clave ha vencido; la nueva sigue abierta
+        self.assertEqual(self.access_logs().count(), 1)
+        self.assertEqual(aggregator.stats()['pending'], 1)
+
+        aggregator = AccessEventAggregator(window=60, max_keys=2, background=False)
+        aggregator.record(self.make_request('/a/'), 401)
+        self.assertEqual(self.access_logs().count(), 1)
+        aggregator.record(self.make_request('/b/'), 401)
+        self.assertEqual(self.access_logs().count(), 3)
+
+    def test_middleware_records_unauthenticated_responses(self):
+        # En los tests la ventana es 0: la fila se escribe en la misma respuesta
+        response = self.client.get('/api/requests/system-logs/')
+        self.assertEqual(response.status_code, 401)
+        log = self.access_logs().get()
+        self.assertEqual(log.occurrences, 1)
+        self.assertIn('Path: /api/requests/system-logs/', log.description)
+
+
+class NotificationCoalescingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno = User.objects.create_user(username='alumno', password=None, role='estudiante')
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+        self.addCleanup(notifications.take_due, due_only=False)
+
+    def notify(self, title='Acceso denegado: /api/requests/5/', ip='10.0.0.1', **kwargs):
+        return create_notification('unauthorized_attempt', 'warning', title, 'mensaje', user=self.alumno,
+                                   ip_address=ip, **kwargs)
+
+    def test_repeated_events_update_one_open_notification(self):
+        first = self.notify()
+        AdminNotification.objects.get(pk=first.pk).mark_as_read()
+        # Mismo título salvo los números: mismo grupo
+        second = self.notify(title='Acceso denegado: /api/requests/6/', occurrences=2)
+        self.notify(ip='10.0.0.2')
+
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(second.occurrences, 3)
+        notification = AdminNotification.objects.get(pk=first.pk)
+        self.assertEqual(notification.occurrences, 3)
+        self.assertFalse(notification.is_read)
+        self.assertGreater(notification.last_seen, notification.created_at)
+        self.assertEqual(AdminNotification.objects.count(), 2)
+
+    def test_returned_notification_is_the_stored_row(self):
+        self.notify()
+        returned = self.notify()
+        stored = AdminNotification.objects.get(pk=returned.pk)
+        fields = [field.attname for field in AdminNotification._meta.concrete_fields]
+        self.assertEqual([getattr(returned, name) for name in fields], [getattr(stored, name) for name in fields])
+        self.assertFalse(returned._state.adding)
+
+    def test_resolved_notification_is_not_reopened(self):
+        self.notify().resolve()
+        reopened = self.notify()
+        self.assertEqual(AdminNotification.objects.count(), 2)
+        self.assertEqual(reopened.occurrences, 1)
+
+    @override_settings(NOTIFICATION_RATE_BURST=2)
+    def test_rate_limit_defers_occurrences_to_the_next_allowed_write(self):
+        self.assertIsNotNone(self.notify())
+        self.assertIsNotNone(self.notify())
+        with self.assertNumQueries(0):
+            self.assertEqual([self.notify() for _ in range(3)], [None, None, None])
+        self.assertEqual(AdminNotification.objects.get().occurrences, 2)
+
+        # Nueva ventana: la siguiente escritura suma lo retenido
+        key = notifications.fingerprint('unauthorized_attempt', self.alumno.pk, '10.0.0.1',
+                                        'Acceso denegado: /api/requests/5/')
+        get_store().delete(notifications.RATE_PREFIX + key)
+        self.assertEqual(self.notify().occurrences, 6)
+
+    @override_settings(NOTIFICATION_RATE_BURST=1, NOTIFICATION_RATE_WINDOW=0.05)
+    def test_held_occurrences_are_flushed_when_the_window_closes(self):
+        self.notify()
+        self.assertEqual([self.notify(), self.notify(occurrences=2)], [None, None])
+        self.assertEqual(flush_held_notifications(), 0)  # ventana aún abierta
+        time.sleep(0.1)
+        # Sin más eventos de la huella: lo retenido llega igualmente a la fila
+        self.assertEqual(flush_held_notifications(), 1)
+        self.assertEqual(AdminNotification.objects.get().occurrences, 4)
+        self.assertEqual(flush_held_notifications(due_only=False), 0)
+
+
+class ConcurrentNotificationTests(TransactionTestCase):
+    PARALLEL = 8
+
+    def test_parallel_events_share_one_row(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+        barrier = threading.Barrier(self.PARALLEL)
+
+        def notify():
+            try:
+                barrier.wait()
+                create_notification('system_error', 'critical', 'Error crítico: KeyError', 'bucle de errores',
+                                    ip_address='10.0.0.1')
+            finally:
+                connection.close()
+
+        with override_settings(NOTIFICATION_RATE_BURST=1000), ThreadPoolExecutor(self.PARALLEL) as executor:
+            for future in [executor.submit(notify) for _ in range(self.PARALLEL)]:
+                future.result()
+        notification = AdminNotification.objects.get()
+        self.assertEqual(notification.occurrences, self.PARALLEL)
+
+
+class NotificationStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin_sse', password=None, role='admin')
+        cls.alumno = User.objects.create_user(username='alumno', password=None, role='estudiante')
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+
+    def stream_url(self, user):
+        return f'/api/requests/notifications/stream/?token={notification_stream.stream_token(user)}'
+
+    def test_token_is_issued_to_admins_only(self):
+        self.client.force_login(self.alumno)
+        self.assertEqual(self.client.post('/api/requests/notifications/stream_token/').status_code, 403)
+        self.client.force_login(self.admin)
+        response = self.client.post('/api/requests/notifications/stream_token/')
+        self.assertEqual(notification_stream.token_user_id(response.data['token']), self.admin.pk)
+        self.assertTrue(response.data['url'].startswith('/api/requests/notifications/stream/?token='))
+
+    def test_stream_rejects_bad_tokens_and_wsgi(self):
+        self.assertEqual(self.client.get('/api/requests/notifications/stream/?token=x').status_code, 401)
+        self.assertEqual(self.client.get(self.stream_url(self.alumno)).status_code, 403)
+        # El cliente de tests es WSGI: el flujo solo se sirve con ASGI
+        self.assertEqual(self.client.get(self.stream_url(self.admin)).status_code, 501)
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_notification('system_error', 'critical', 'Error crítico: KeyError', 'bucle de errores')
+
+    async def test_stream_pushes_notifications_and_unread_deltas(self):
+        response = await self.async_client.get(self.stream_url(self.admin))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertIn(b'retry:', await anext(stream))
+            self.assertEqual(len(notification_stream.broker), 1)
+
+            await sync_to_async(self.notify)()
+            await sync_to_async(self.notify)()
+            first = await asyncio.wait_for(anext(stream), 1)
+            second = await asyncio.wait_for(anext(stream), 1)
+        finally:
+            await stream.aclose()
+
+        self.assertTrue(first.startswith(b'event: notification\n'))
+        events = [json.loads(chunk.decode().split('data: ', 1)[1]) for chunk in (first, second)]
+        # La segunda es una nueva ocurrencia de una notificación que ya estaba sin leer
+        self.assertEqual([event['unread_delta'] for event in events], [1, 0])
+        self.assertEqual(events[1]['notification']['occurrences'], 2)
+
+    def test_panel_actions_publish_read_and_resolved(self):
+        notification = create_notification('system_error', 'critical', 'Error crítico: KeyError', 'bucle')
+        self.client.force_login(self.admin)
+        with mock.patch.object(notification_stream.broker, 'dispatch') as dispatch:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(f'/api/requests/notifications/{notification.pk}/mark_read/')
+                self.client.post(f'/api/requests/notifications/{notification.pk}/mark_read/')
+                self.client.post(f'/api/requests/notifications/{notification.pk}/resolve/')
+        self.assertEqual([call.args[0]['type'] for call in dispatch.call_args_list], ['read', 'resolved'])
+        self.assertEqual(dispatch.call_args_list[0].args[0]['unread_delta'], -1)
+
+
+class IncrementalQueryTests(TestCase):
+    """ETag/304, HEAD y consultas `since_id`/`since` de notificaciones y logs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin_delta', password=None, role='admin')
+
+    def setUp(self):
+        get_store().clear()
+        self.addCleanup(get_store().clear)
+        self.client.force_login(self.admin)
+
+    def notify(self, title):
+        return create_notification('system_error', 'high', title, 'detalle')
+
+    def test_unchanged_collection_returns_304_without_reading_rows(self):
+        self.notify('Error A')
+        response = self.client.get('/api/requests/notifications/')
+        etag = response['ETag']
+        self.assertEqual(len(response.data['results']), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/requests/notifications/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+        notification_queries = [q['sql'] for q in queries if 'admin_notifications' in q['sql']]
+        self.assertEqual(len(notification_queries), 1)
+        self.assertIn('MAX', notification_queries[0])
+
+        head = self.client.head('/api/requests/notifications/')
+        self.assertEqual((head.status_code, head['ETag'], head.content), (200, etag, b''))
+
+    def test_etag_changes_with_new_rows_occurrences_and_state(self):
+        notification = self.notify('Error A')
+        etags = [self.client.get('/api/requests/notifications/')['ETag']]
+        # Misma huella: suma una ocurrencia sin crear fila
+        self.notify('Error A')
+        etags.append(self.client.get('/api/requests/notifications/')['ETag'])
+        self.client.post(f'/api/requests/notifications/{notification.pk}/mark_read/')
+        etags.append(self.client.get('/api/requests/notifications/')['ETag'])
+        self.notify('Error B')
+        etags.append(self.client.get('/api/requests/notifications/')['ETag'])
+        self.assertEqual(len(set(etags)), 4)
+        # Otra URL (filtros) es otra representación
+        self.assertNotEqual(self.client.get('/api/requests/notifications/?is_read=false')['ETag'], etags[-1])
+
+    def test_stats_honours_if_none_match(self):
+        self.notify('Error A')
+        response = self.client.get('/api/requests/notifications/stats/')
+        self.assertEqual((response.data['total'], response.data['unread']), (1, 1))
+        self.assertEqual(
+            self.client.get('/api/requests/notifications/stats/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+        self.notify('Error B')
+        response = self.client.get('/api/requests/notifications/stats/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual((response.status_code, response.data['total']), (200, 2))
+
+    def test_since_id_and_since_return_deltas(self):
+        first = self.notify('Error A')
+        response = self.client.get('/api/requests/notifications/', {'since_id': 0})
+        self.assertEqual([row['id'] for row in response.data['results']], [first.pk])
+        next_since = response.data['next_since']
+
+        second = self.notify('Error B')
+        response = self.client.get('/api/requests/notifications/', {'since_id': first.pk})
+        self.assertEqual([row['id'] for row in response.data['results']], [second.pk])
+
+        # `since` también trae las filas cambiadas (aquí, marcada como leída)
+        AdminNotification.objects.filter(pk=first.pk).update(
+            created_at=timezone.now() - timedelta(hours=1), last_seen=timezone.now() - timedelta(hours=1),
+        )
+        AdminNotification.objects.filter(pk=second.pk).update(
+            created_at=timezone.now() - timedelta(hours=1), last_seen=timezone.now() - timedelta(hours=1),
+        )
+        self.client.post(f'/api/requests/notifications/{first.pk}/mark_read/')
+        response = self.client.get('/api/requests/notifications/', {'since': next_since})
+        self.assertEqual([row['id'] for row in response.data['results']], [first.pk])
+        self.assertTrue(response.data['results'][0]['is_read'])
+
+    def test_delta_is_paginated_by_id(self):
+        rows = [self.notify(f'Error {chr(65 + i)}') for i in range(3)]
+        with mock.patch('requests.notification_views.AdminNotificationViewSet.max_delta_size', 2):
+            response = self.client.get('/api/requests/notifications/', {'since_id': 0})
+            self.assertEqual([row['id'] for row in response.data['results']], [rows[0].pk, rows[1].pk])
+            response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [rows[2].pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_invalid_since_params_are_rejected(self):
+        self.assertEqual(self.client.get('/api/requests/notifications/', {'since_id': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/requests/notifications/', {'since': 'ayer'}).status_code, 400)
+
+    def test_recent_logs_support_etag_and_since_id(self):
+        log = SystemLog.objects.create(action='create', model_name='ECERequest', description='alta')
+        response = self.client.get('/api/requests/system-logs/recent/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get('/api/requests/system-logs/recent/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+        new = SystemLog.objects.create(action='update', model_name='ECERequest', description='cambio')
+        response = self.client.get('/api/requests/system-logs/recent/', {'since_id': log.pk})
+        self.assertEqual([row['id'] for row in response.data['results']], [new.pk])
+
+    def test_recent_logs_etag_covers_older_months(self):
+        # El mes en curso tiene menos de 50 logs: se completan con los de meses anteriores
+        old = SystemLog.objects.create(action='create', model_name='ECERequest', description='antiguo')
+        SystemLog.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=70))
+        SystemLog.objects.create(action='create', model_name='ECERequest', description='reciente')
+        response = self.client.get('/api/requests/system-logs/recent/')
+        self.assertIn(old.pk, [row['id'] for row in response.data])
+
+        # La retención borra el antiguo: la lista devuelta cambia y el ETag también
+        SystemLog.objects.filter(pk=old.pk).delete()
+        response = self.client.get('/api/requests/system-logs/recent/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(old.pk, [row['id'] for row in response.data])
+
+
+class LogPartitionTests(TestCase):
+    """Particiones mensuales de `system_logs` y `archive_system_logs`."""
+
+    def setUp(self):
+        cache.clear()
+        config_registry.registry.reset()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = Path(tmp.name)
+        self.current = partitions.month_start(timezone.now())
+
+    def archive(self, **options):
+        out = StringIO()
+        call_command('archive_system_logs', output_dir=str(self.archive_dir), stdout=out, **options)
+        return out.getvalue()
+
+    def log_at(self, moment, description):
+        log = SystemLog.objects.create(action='create', model_name='ECERequest', description=description)
+        # Cambiar `created_at` mueve la fila de partición (a la DEFAULT si su mes no tiene)
+        SystemLog.objects.filter(pk=log.pk).update(created_at=moment)
+        return log
+
+    def test_recent_logs_only_scan_the_current_partition(self):
+        start, end = partitions.month_bounds(timezone.now())
+        plan = SystemLog.objects.filter(created_at__gte=start, created_at__lt=end).order_by('-created_at')[:50].explain()
+        self.assertIn(partitions.partition_name(self.current), plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+        self.assertEqual(plan.count(' on system_logs_p'), 1)
+
+    def test_expired_months_are_archived_and_dropped(self):
+        old_month = partitions.add_months(self.current, -14)
+        old = self.log_at(old_month + timedelta(days=3), 'alta antigua')
+        recent = SystemLog.objects.create(action='create', model_name='ECERequest', description='alta reciente')
+
+        output = self.archive(retention_months=12)
+
+        old_name = partitions.partition_name(old_month)
+        self.assertIn(f'{old_name} archivada', output)
+        self.assertEqual(list(SystemLog.objects.values_list('pk', flat=True)), [recent.pk])
+        attached = partitions.attached_partitions()
+        self.assertNotIn(old_month, attached)
+        self.assertIn(partitions.add_months(self.current, 2), attached)
+        with audit_archive.ArchiveReader(self.archive_dir / f'{old_name}.alog') as reader:
+            rows = list(reader.query())
+        self.assertEqual([(row['id'], row['description']) for row in rows], [(old.pk, 'alta antigua')])
+        self.assertEqual(rows[0]['created_at'], old_month + timedelta(days=3))
+
+    def test_interrupted_archive_is_resumed(self):
+        old_month = partitions.add_months(self.current, -3)
+        self.log_at(old_month, 'alta')
+        partitions.adopt_default_rows()
+        partitions.detach_partition(partitions.partition_name(old_month))
+
+        self.archive(retention_months=0)
+        self.assertEqual(partitions.detached_partitions(), [partitions.partition_name(old_month)])
+        self.archive()
+        self.assertEqual(partitions.detached_partitions(), [])
+        self.assertTrue((self.archive_dir / f'{partitions.partition_name(old_month)}.alog').exists())
+
+    def test_archive_written_before_a_crash_is_not_duplicated(self):
+        old_month = partitions.add_months(self.current, -3)
+        log = self.log_at(old_month, 'alta')
+        partitions.adopt_default_rows()
+        name = partitions.partition_name(old_month)
+        # Caída entre el volcado y el DROP: la tabla desconectada sigue ahí
+        partitions.detach_partition(name)
+        partitions.export_partition(name, self.archive_dir)
+
+        self.archive()
+
+        self.assertEqual(partitions.detached_partitions(), [])
+        self.assertEqual([path.name for path in self.archive_dir.glob('*.alog')], [f'{name}.alog'])
+        self.assertEqual([row['id'] for row in audit_archive.query_archives(self.archive_dir)], [log.pk])
+
+    def test_late_rows_do_not_overwrite_the_archive(self):
+        old_month = partitions.add_months(self.current, -14)
+        first = self.log_at(old_month + timedelta(days=1), 'alta')
+        self.archive(retention_months=12)
+        # Fila tardía del mes ya archivado: vuelve a crear su partición desde la DEFAULT
+        late = self.log_at(old_month + timedelta(days=2), 'alta tardía')
+        self.archive(retention_months=12)
+
+        name = partitions.partition_name(old_month)
+        self.assertEqual(sorted(path.name for path in self.archive_dir.glob('*.alog')),
+                         [f'{name}.1.alog', f'{name}.alog'])
+        rows = audit_archive.query_archives(self.archive_dir)
+        self.assertEqual([row['id'] for row in rows], [first.pk, late.pk])
+        with self.assertRaises(FileExistsError):
+            audit_archive.write_archive(self.archive_dir / f'{name}.alog', [])
+
+    def test_retention_comes_from_system_configuration(self):
+        SystemConfiguration.objects.create(key='SYSTEM_LOG_RETENTION_MONTHS', value='2')
+        SystemConfiguration.objects.create(key='NOTIFICATION_RETENTION_DAYS', value='0')
+        old_month = partitions.add_months(self.current, -2)
+        self.log_at(old_month, 'alta')
+
+        self.assertIn('Se archivaría', self.archive(dry_run=True))
+        self.assertEqual(SystemLog.objects.count(), 1)
+        self.archive()
+        self.assertFalse(SystemLog.objects.exists())
+
+    def test_old_resolved_notifications_are_archived_and_purged(self):
+        old = AdminNotification.objects.create(notification_type='system_error', title='Error viejo', message='m')
+        old.resolve()
+        AdminNotification.objects.filter(pk=old.pk).update(resolved_at=timezone.now() - timedelta(days=200))
+        kept = AdminNotification.objects.create(notification_type='system_error', title='Error abierto', message='m')
+
+        self.assertIn('1 notificaciones resueltas archivadas', self.archive(notification_retention_days=180))
+        self.assertEqual(list(AdminNotification.objects.values_list('pk', flat=True)), [kept.pk])
+        [path] = self.archive_dir.glob('admin_notifications_*.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as fh:
+            self.assertEqual([json.loads(line)['title'] for line in fh], ['Error viejo'])
+
+
+class AuditArchiveTests(TestCase):
+    """Archivo columnar de logs (`audit_archive`) y `query_audit_archive`."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.start = datetime(2025, 3, 1, tzinfo=dt_timezone.utc)
+        # 4 grupos de 50 filas: usuario 1 solo en el primero, 10.1.x solo en el último
+        self.rows = [
+            {
+                'id': i + 1, 'created_at': self.start + timedelta(hours=i), 'user_id': 1 if i < 50 else 2 + i % 3,
+                'action': 'login_failed' if i % 10 == 0 else 'create', 'model_name': 'User', 'object_id': None,
+                'description': f'evento {i}', 'ip_address': f'10.1.0.{i % 50}' if i >= 150 else '192.168.0.1',
+                'user_agent': 'tests', 'occurrences': 1,
+            }
+            for i in range(200)
+        ]
+        self.path = self.dir / 'system_logs_p202503.alog'
+        audit_archive.write_archive(self.path, self.rows, group_rows=50)
+
+    def query(self, **filters):
+        with audit_archive.ArchiveReader(self.path) as reader:
+            ids = [row['id'] for row in reader.query(audit_archive.LogFilter(**filters))]
+            return ids, (reader.groups_read, reader.groups_skipped)
+
+    def test_round_trip_keeps_values_and_nulls(self):
+        with audit_archive.ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.rows, 200)
+            self.assertEqual(list(reader.query()), self.rows)
+
+    def test_filters_prune_groups_before_reading_them(self):
+        ids, groups = self.query(user_id=1, actions=['login_failed'])
+        self.assertEqual(ids, [1, 11, 21, 31, 41])
+        self.assertEqual(groups, (1, 3))
+
+        ids, groups = self.query(ip='10.1.0.0/16')
+        self.assertEqual(ids, list(range(151, 201)))
+        self.assertEqual(groups, (1, 3))
+
+        ids, groups = self.query(start=self.start + timedelta(hours=60), end=self.start + timedelta(hours=62))
+        self.assertEqual(ids, [61, 62])
+        self.assertEqual(groups, (1, 3))
+
+        self.assertEqual(self.query(actions=['delete']), ([], (0, 4)))
+
+    def test_query_command_filters_across_files(self):
+        audit_archive.write_archive(self.dir / 'system_logs_p202504.alog', [
+            dict(self.rows[0], id=500, created_at=datetime(2025, 4, 2, tzinfo=dt_timezone.utc)),
+        ])
+        out, err = StringIO(), StringIO()
+        call_command(
+            'query_audit_archive', dir=str(self.dir), user=1, action=['login_failed'], since='2025-03-02',
+            stdout=out, stderr=err,
+        )
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [31, 41, 500])
+        self.assertEqual(rows[0]['created_at'], '2025-03-02T06:00:00+00:00')
+        self.assertIn('3 filas en 2 archivos', err.getvalue())
+
+        out = StringIO()
+        call_command('query_audit_archive', dir=str(self.dir), until='2025-04-01', limit=2, format='csv',
+                     stdout=out, stderr=StringIO())
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+
+    def test_truncated_file_is_rejected(self):
+        self.path.write_bytes(self.path.read_bytes()[:-5])
+        with self.assertRaises(audit_archive.ArchiveError):
+            audit_archive.ArchiveReader(self.path)
+
+
+def counter_values(entity):
+    return {
+        (row.status, row.nivel): row.count
+        for row in StatusCounter.objects.filter(entity=entity, count__gt=0)
+    }
+
+
+class StatusCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jefe = User.objects.create_user(username='jefe', password=None, role='jefe')
+        cls.alumno = User.objects.create_user(username='alumno', password=None, role='estudiante')
+
+    def make_publication(self, status='en_proceso', nivel='1'):
+        return Publication.objects.create(student=self.alumno, title='T', authors='A', nivel=nivel, status=status)
+
+    def make_request(self, status='en_proceso'):
+        return ECERequest.objects.create(student=self.alumno, status=status, file='ece_requests/s.pdf')
+
+    def test_create_and_transition_move_the_unit(self):
+        publication = self.make_publication()
+        self.assertEqual(counter_values(PUBLICATION), {('en_proceso', '1'): 1})
+
+        publication.status = 'pending'
+        publication.save()
+        publication = Publication.objects.get(pk=publication.pk)
+        publication.status = 'approved'
+        publication.nivel = '2'
+        publication.save()
+        self.assertEqual(counter_values(PUBLICATION), {('approved', '2'): 1})
+
+    def test_deferred_instance_resolves_previous_key(self):
+        publication = self.make_publication(status='pending')
+        deferred = Publication.objects.only('id', 'title').get(pk=publication.pk)
+        deferred.status = 'rejected'
+        deferred.save()
+        self.assertEqual(counter_values(PUBLICATION), {('rejected', '1'): 1})
+
+    def test_stale_instances_read_the_current_key(self):
+        publication = self.make_publication()
+        first = Publication.objects.get(pk=publication.pk)
+        second = Publication.objects.get(pk=publication.pk)
+        first.status = 'approved'
+        first.save()
+        second.status = 'rejected'
+        second.save()
+        self.assertEqual(counter_values(PUBLICATION), {('rejected', '1'): 1})
+
+    def test_set_status_applies_deltas(self):
+        self.make_publication()
+        self.make_publication(status='pending', nivel='2')
+        self.make_publication(status='approved', nivel='2')
+        with mock.patch('requests.counters.rebuild') as full_rebuild:
+            updated = set_status(Publication.objects.filter(nivel='2'), 'approved')
+        full_rebuild.assert_not_called()
+        self.assertEqual(updated, 2)
+        self.assertEqual(counter_values(PUBLICATION), {('en_proceso', '1'): 1, ('approved', '2'): 2})
+
+    def test_delete_decrements(self):
+        self.make_request()
+        solicitud = self.make_request(status='pendiente')
+        solicitud.delete()
+        self.assertEqual(counter_values(ECE_REQUEST), {('en_proceso', ''): 1})
+
+    def test_rebuild_matches_incremental_counters(self):
+        self.make_publication()
+        self.make_publication(status='approved', nivel='3')
+        self.make_request(status='aprobada')
+        Publication.objects.update(status='pending')  # no dispara señales
+        rebuild()
+        self.assertEqual(counter_values(PUBLICATION), {('pending', '1'): 1, ('pending', '3'): 1})
+        self.assertEqual(counter_values(ECE_REQUEST), {('aprobada', ''): 1})
+
+    def test_ece_stats_read_counters(self):
+        self.make_request()
+        self.make_request(status='aprobada')
+        self.make_request(status='rechazada')
+        header = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.jefe)}'}
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/requests/stats/', **header)
+        data = response.json()
+        self.assertEqual((data['total'], data['pendientes'], data['aprobadas']), (3, 1, 1))
+        self.assertEqual(data['estudiantes_activos'], 1)
+
+        response = self.client.get('/api/requests/monthly_report/', **header)
+        self.assertEqual(response.json()[0]['solicitudes'], 3)
+
+
+class ExplainQueriesCommandTests(TestCase):
+
+    def test_catalogue_is_index_covered(self):
+        # Con enable_seqscan = off solo quedan los Seq Scan sin índice utilizable
+        out = StringIO()
+        call_command('explain_queries', '--disable-seqscan', '--fail-on-seq-scan', stdout=out)
+        self.assertIn('Todas las consultas usan índices', out.getvalue())
+
+
+class OpenAPISchemaTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(OPENAPI_SCHEMA_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        openapi.schema_cache.clear()
+        self.addCleanup(openapi.schema_cache.clear)
+        call_command('build_api_schema', stdout=StringIO())
+        self.schema = Path(tmp.name, 'openapi.json').read_bytes()
+
+    def test_prebuilt_schema_is_served_with_etag(self):
+        with mock.patch.object(openapi, 'generate_schema') as generate:
+            response = self.client.get('/swagger.json/')
+            self.assertEqual(self.client.get('/swagger.yaml/').status_code, 200)
+            for page in ('/', '/swagger/', '/redoc/'):
+                self.assertContains(self.client.get(page), '/swagger.json/')
+        generate.assert_not_called()
+
+        self.assertEqual(response.content, self.schema)
+        self.assertIn('/publications/', json.loads(response.content)['paths'])
+        self.assertEqual(self.client.get('/swagger.json/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_system_log_list_documents_delta_params(self):
+        paths = json.loads(self.schema)['paths']
+        for path in [path for path in paths if path.endswith('/system-logs/')]:
+            names = {param['name'] for param in paths[path]['get']['parameters']}
+            self.assertLessEqual({'since_id', 'since', 'action'}, names)
+
+
+class ConfigRegistryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password=None, role='admin')
+        cls.config = SystemConfiguration.objects.create(key='AUTH_LOCKOUT_THRESHOLD', value='2')
+        SystemConfiguration.objects.create(key='FLAGS', value='{"beta": true}')
+        SystemConfiguration.objects.create(key='SESSION_TTL', value='15m')
+        SystemConfiguration.objects.create(key='MAINTENANCE', value='sí')
+        SystemConfiguration.objects.create(key='BROKEN', value='abc')
+
+    def setUp(self):
+        cache.clear()
+        get_store().clear()
+        config_registry.registry.reset()
+
+    def test_typed_reads_come_from_the_snapshot(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(config_registry.get_int('AUTH_LOCKOUT_THRESHOLD'), 2)
+            self.assertEqual(config_registry.get_json('FLAGS'), {'beta': True})
+            self.assertEqual(config_registry.get_duration('SESSION_TTL').total_seconds(), 900)
+            self.assertIs(config_registry.get_bool('MAINTENANCE'), True)
+            with self.assertLogs('requests.config_registry', 'WARNING'):
+                self.assertEqual(config_registry.get_int('BROKEN', 7), 7)
+            self.assertEqual(config_registry.get_int('MISSING', 3), 3)
+
+    def test_toggle_active_bumps_the_version(self):
+        self.assertEqual(config_registry.get_int('AUTH_LOCKOUT_THRESHOLD'), 2)
+        header = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.admin)}'}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/requests/system-config/{self.config.pk}/toggle_active/', **header)
+        self.assertIsNone(config_registry.get_int('AUTH_LOCKOUT_THRESHOLD'))
+
+        # Otro worker sin señal local: basta con que cambie la versión compartida
+        SystemConfiguration.objects.filter(pk=self.config.pk).update(is_active=True, value='4')
+        self.assertIsNone(config_registry.get_int('AUTH_LOCKOUT_THRESHOLD'))
+        config_registry.registry.bump_version()
+        self.assertEqual(config_registry.get_int('AUTH_LOCKOUT_THRESHOLD'), 4)
+
+    def test_lockout_threshold_is_read_at_runtime(self):
+        user = User.objects.create_user(username='alumno', password='Correcta.123', role='estudiante')
+        for _ in range(2):
+            authenticate(username='alumno', password='incorrecta')
+        user.refresh_from_db()
+        self.assertIsNotNone(user.locked_until)
+
+
+class CounterStoreTests(TestCase):
+
+    def stores(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = f'{tmp.name}/counters.sqlite3'
+        # Dos instancias sobre el mismo archivo hacen de dos workers
+        return [
+            ('local', LocalCounterStore(), LocalCounterStore),
+            ('sqlite', SQLiteCounterStore(path), lambda: SQLiteCounterStore(path)),
+            ('database', DatabaseCounterStore(), DatabaseCounterStore),
+        ]
+
+    def test_concurrent_increments_are_not_lost(self):
+        # La base de datos, con conexiones concurrentes reales, en ConcurrentLoginFailureTests
+        for name, store, factory in self.stores()[:2]:
+            with self.subTest(name):
+                workers = [store] * 4 if name == 'local' else [factory() for _ in range(4)]
+
+                def hammer(worker):
+                    for _ in range(50):
+                        worker.incr('k', ttl=60)
+
+                threads = [threading.Thread(target=hammer, args=(worker,)) for worker in workers]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(store.get('k'), 200)
+                self.assertEqual(workers[-1].incr('k', ttl=60), 201)
+
+    def test_keys_expire(self):
+        for name, store, _ in self.stores():
+            with self.subTest(name):
+                store.incr('corto', ttl=0.05)
+                store.set('fijo', 7)
+                self.assertEqual(store.get_many(['corto', 'fijo', 'otro']), {'corto': 1, 'fijo': 7})
+                time.sleep(0.1)
+                self.assertIsNone(store.get('corto'))
+                # Una clave caducada vuelve a empezar desde cero
+                self.assertEqual(store.incr('corto', ttl=60), 1)
+                store.delete('corto', 'fijo')
+                self.assertEqual(store.get_many(['corto', 'fijo']), {})
+
+    def test_incr_or_lock(self):
+        for name, store, _ in self.stores():
+            with self.subTest(name):
+                args = ('fallos', 'bloqueo', 3, 99)
+                self.assertEqual([store.incr_or_lock(*args, ttl=60, lock_ttl=60) for _ in range(4)],
+                                 [(1, None), (2, None), (3, 99), (None, 99)])
+                self.assertEqual(store.get_many(['fallos', 'bloqueo']), {'bloqueo': 99})
+                store.delete('bloqueo')
+                self.assertEqual(store.incr_or_lock(*args, ttl=60, lock_ttl=60), (1, None))
+                self.assertEqual(store.incr_or_lock('otro', 'otro-bloqueo', 1, 5), (1, 5))
+
+    def test_lowered_threshold_locks_past_it(self):
+        for name, store, _ in self.stores():
+            with self.subTest(name):
+                for _ in range(4):
+                    store.incr_or_lock('fallos', 'bloqueo', 10, 99, ttl=60, lock_ttl=60)
+                # El umbral baja a 3 con el contador ya en 4
+                self.assertEqual(store.incr_or_lock('fallos', 'bloqueo', 3, 99, ttl=60, lock_ttl=60), (5, 99))
+                self.assertEqual(store.incr_or_lock('fallos', 'bloqueo', 3, 99, ttl=60, lock_ttl=60), (None, 99))
+                # Umbral 0: el primer fallo bloquea
+                self.assertEqual(store.incr_or_lock('cero', 'cero-bloqueo', 0, 7, ttl=60, lock_ttl=60), (1, 7))
+                self.assertTrue(store.add('nueva', 1, ttl=60))
+                self.assertFalse(store.add('nueva', 2, ttl=60))
+                self.assertEqual(store.get('nueva'), 1)
+
+    def test_database_incr_or_lock_is_one_statement(self):
+        store = DatabaseCounterStore()
+        for expected in [(1, None), (2, 7), (None, 7)]:
+            with self.assertNumQueries(1):
+                self.assertEqual(store.incr_or_lock('fallos', 'bloqueo', 2, 7, ttl=60, lock_ttl=60), expected)
+
+
+PDF = b'%PDF-1.7\n' + b'x' * 3000
+
+
+class MediaTestCase(TestCase):
+    """MEDIA_ROOT y UPLOAD_SESSION_DIR temporales y un estudiante autenticado."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alumno = User.objects.create_user(username='alumno', password=None, role='estudiante')
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmp.name, UPLOAD_SESSION_DIR=f'{tmp.name}/sessions')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.header = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.alumno)}'}
+
+    def post_file(self, name, content):
+        return self.client.post('/api/requests/', {'file': SimpleUploadedFile(name, content), 'description': 'd'},
+                                **self.header)
+
+    def send_chunk(self, session_id, offset, data):
+        return self.client.patch(f'/api/requests/uploads/{session_id}/', data,
+                                 content_type='application/offset+octet-stream',
+                                 HTTP_UPLOAD_OFFSET=str(offset), **self.header)
+
+
+class UploadTests(MediaTestCase):
+
+    def test_multipart_upload_is_checked_while_streaming(self):
+        response = self.post_file('solicitud.pdf', PDF)
+        self.assertEqual(response.status_code, 201, response.content)
+
+        response = self.post_file('falso.pdf', b'MZ\x90\x00' + b'x' * 100)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('contenido', response.json()['detail'])
+
+        with mock.patch.object(ECERequestViewSet, 'upload_max_size', 1024):
+            response = self.post_file('grande.pdf', PDF)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('no puede superar', response.json()['detail'])
+        self.assertEqual(ECERequest.objects.count(), 1)
+
+    def test_chunked_upload_can_resume_and_be_attached(self):
+        response = self.client.post('/api/requests/uploads/', {
+            'filename': 'solicitud.pdf', 'size': len(PDF), 'sha256': hashlib.sha256(PDF).hexdigest(),
+        }, content_type='application/json', **self.header)
+        self.assertEqual(response.status_code, 201, response.content)
+        session_id = response.json()['id']
+
+        self.assertEqual(self.send_chunk(session_id, 0, PDF[:1000]).json()['offset'], 1000)
+        # Reintento de un fragmento ya recibido: el servidor indica dónde reanudar
+        conflict = self.send_chunk(session_id, 0, PDF[:1000])
+        self.assertEqual((conflict.status_code, conflict.json()['offset']), (409, 1000))
+        self.assertEqual(self.client.get(f'/api/requests/uploads/{session_id}/', **self.header)['Upload-Offset'], '1000')
+
+        response = self.send_chunk(session_id, 1000, PDF[1000:])
+        self.assertEqual(response.json()['status'], 'complete')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/requests/', {'upload_id': session_id, 'description': 'd'},
+                                        content_type='application/json', **self.header)
+        self.assertEqual(response.status_code, 201, response.content)
+        request = ECERequest.objects.get()
+        with request.file.open('rb') as stored:
+            self.assertEqual(stored.read(), PDF)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_received_while_another_wrote_the_offset_conflicts(self):
+        session = UploadSession.objects.create(user=self.alumno, filename='a.pdf', size=len(PDF),
+                                               expires_at=timezone.now() + timedelta(hours=1))
+        original = upload_views.receive_chunk
+
+        def concurrent_write(*args):
+            # Otra petición completa el mismo offset mientras este cuerpo se recibe
+            result = original(*args)
+            UploadSession.objects.filter(pk=session.pk).update(offset=1000)
+            return result
+
+        with mock.patch.object(upload_views, 'receive_chunk', side_effect=concurrent_write):
+            response = self.send_chunk(session.pk, 0, PDF[:1000])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 1000))
+        self.assertEqual(list(session.path.parent.glob('*.chunk')), [])
+
+    def test_chunked_upload_rejects_content_by_magic_bytes(self):
+        session = UploadSession.objects.create(user=self.alumno, filename='a.pdf', size=10,
+                                               expires_at=timezone.now() + timedelta(hours=1))
+        response = self.send_chunk(session.pk, 0, b'PK\x03\x04abcdef')
+        self.assertEqual(response.status_code, 400)
+        session.refresh_from_db()
+        self.assertEqual(session.status, 'failed')
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+
+    def test_identical_uploads_share_one_blob(self):
+        digest = hashlib.sha256(PDF).hexdigest()
+        first = Publication.objects.create(student=self.alumno, title='A', authors='A', nivel='1',
+                                           file=SimpleUploadedFile('a.pdf', PDF))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post_file('b.pdf', PDF).status_code, 201)
+        second = ECERequest.objects.get()
+
+        self.assertEqual((first.file_sha256, second.file_sha256), (digest, digest))
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(default_storage.refcount(digest), 2)
+
+        # Con el hash conocido la subida por fragmentos se completa sin enviar bytes
+        response = self.client.post('/api/requests/uploads/', {'filename': 'c.pdf', 'size': len(PDF), 'sha256': digest},
+                                    content_type='application/json', **self.header)
+        self.assertEqual((response.json()['status'], response.json()['offset']), ('complete', len(PDF)))
+        response = self.client.post('/api/publications/', {'titulo': 'C', 'autores': 'A', 'nivel': '1',
+                                                           'upload_id': response.json()['id']},
+                                    content_type='application/json', **self.header)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(default_storage.refcount(digest), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for publication in Publication.objects.all():
+                publication.delete()
+            second.delete()
+        self.assertEqual(default_storage.refcount(digest), 0)
+        self.assertTrue(default_storage.has_blob(digest))
+
+        # Blob antiguo recién enlazado (y desenlazado): el ctime cuenta, no el mtime
+        old = time.time() - 2 * 60 * 60
+        os.utime(default_storage.blob_path(digest), (old, old))
+        call_command('gc_media_blobs', stdout=StringIO())
+        self.assertTrue(default_storage.has_blob(digest))
+
+        call_command('gc_media_blobs', '--grace-minutes=0', stdout=StringIO())
+        self.assertFalse(default_storage.has_blob(digest))
+
+    def test_other_users_content_is_not_reused(self):
+        otro = User.objects.create_user(username='otro', password=None, role='estudiante')
+        Publication.objects.create(student=otro, title='A', authors='A', nivel='1', file=SimpleUploadedFile('a.pdf', PDF))
+        response = self.client.post('/api/requests/uploads/', {
+            'filename': 'c.pdf', 'size': len(PDF), 'sha256': hashlib.sha256(PDF).hexdigest(),
+        }, content_type='application/json', **self.header)
+        self.assertEqual((response.json()['status'], response.json()['offset']), ('uploading', 0))
+
+
+class ProtectedDownloadTests(MediaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.assertEqual(self.post_file('solicitud.pdf', PDF).status_code, 201)
+        self.ece = ECERequest.objects.get()
+        self.file_url = self.client.get(f'/api/requests/{self.ece.pk}/', **self.header).json()['file_url']
+
+    def test_signed_url_serves_ranges_and_revalidates(self):
+        self.assertIn(f'/api/requests/{self.ece.pk}/download/?token=', self.file_url)
+        response = self.client.get(self.file_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(PDF).hexdigest()}"')
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        partial = self.client.get(self.file_url, HTTP_RANGE='bytes=0-7')
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(b''.join(partial.streaming_content), PDF[:8])
+        self.assertEqual(partial['Content-Range'], f'bytes 0-7/{len(PDF)}')
+        self.assertEqual(self.client.get(self.file_url, HTTP_RANGE='bytes=99999-').status_code, 416)
+
+        self.assertEqual(self.client.get(self.file_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_access_is_scoped_without_token(self):
+        download = f'/api/requests/{self.ece.pk}/download/'
+        self.assertEqual(self.client.get(download).status_code, 401)
+        self.assertEqual(self.client.get(download, **self.header).status_code, 200)
+        self.assertEqual(self.client.get(download + '?token=manipulado').status_code, 403)
+
+        otro = User.objects.create_user(username='otro', password=None, role='estudiante')
+        header = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(otro)}'}
+        self.assertEqual(self.client.get(download, **header).status_code, 404)
+
+    def test_token_is_bound_to_its_user(self):
+        detail = self.client.get(f'/api/requests/{self.ece.pk}/', **self.header).json()
+        self.assertNotIn('file', detail)
+        self.assertEqual(detail['file_name'], Path(self.ece.file.name).name)
+
+        # Un token válido para otra fila no sirve para esta
+        other = ECERequest.objects.create(student=self.alumno, file=self.ece.file.name)
+        token = self.file_url.split('token=')[1]
+        self.assertEqual(self.client.get(f'/api/requests/{other.pk}/download/?token={token}').status_code, 403)
+
+        # El enlace deja de valer cuando su usuario ya no puede ver la fila
+        self.alumno.is_active = False
+        self.alumno.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(self.file_url).status_code, 403)
+
+    @override_settings(FILE_DOWNLOAD_BACKEND='x-accel-redirect')
+    def test_transfer_is_delegated_to_the_proxy(self):
+        response = self.client.get(self.file_url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.ece.file.name}')
+        self.assertEqual(response.content, b'')
+
+
+def text_pdf(*pages):
+    """PDF mínimo con una línea de texto (Helvetica) por página."""
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode('latin-1')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (len(objects)))
+        kids.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    output, offsets = io.BytesIO(), []
+    output.write(b'%PDF-1.4\n')
+    for number, body in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = output.tell()
+    output.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b'%010d 00000 n \n' % offset)
+    output.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+def scanned_pdf():
+    """PDF de una página que solo contiene una imagen (como un escaneo)."""
+    from PIL import Image
+    output = io.BytesIO()
+    Image.new('RGB', (600, 800), (200, 30, 30)).save(output, 'PDF')
+    return output.getvalue()
+
+
+class DocumentPreviewTests(MediaTestCase):
+
+    def run_worker(self, *args):
+        call_command('run_document_worker', '--once', '--processes=0', *args, stdout=StringIO())
+
+    def test_upload_is_processed_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.post_file('solicitud.pdf', text_pdf('Estancia en empresa', 'Plan de trabajo')).status_code, 201)
+        ece = ECERequest.objects.get()
+        self.assertEqual(ece.preview_status, 'pending')
+        self.assertEqual(DocumentJob.objects.get().status, 'pending')
+
+        stale = ECERequest.objects.get()
+        self.run_worker()
+        ece.refresh_from_db()
+        self.assertEqual((ece.preview_status, ece.page_count), ('ready', 2))
+        self.assertIn('Plan de trabajo', ece.text_content)
+        self.assertEqual(DocumentJob.objects.get().status, 'done')
+
+        # El texto extraído entra en la búsqueda de texto completo
+        response = self.client.get('/api/requests/', {'search': 'trabajo'}, **self.header)
+        self.assertEqual([row['id'] for row in response.json()['results']], [ece.pk])
+        # El username del estudiante se busca aparte (UNION de ids)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/requests/', {'search': ece.student.username}, **self.header)
+        self.assertEqual([row['id'] for row in response.json()['results']], [ece.pk])
+        self.assertTrue(any(' UNION ' in query['sql'] for query in queries))
+        detail = self.client.get(f'/api/requests/{ece.pk}/', **self.header).json()
+        self.assertEqual(detail['page_count'], 2)
+
+        # Guardar una instancia leída antes del worker no pisa la vista previa
+        stale.status = 'pendiente'
+        stale.save()
+        ece.refresh_from_db()
+        self.assertEqual((ece.status, ece.preview_status, ece.page_count), ('pendiente', 'ready', 2))
+
+        # Encolar de nuevo el mismo contenido no duplica el trabajo
+        document_jobs.enqueue(ECE_REQUEST, ece.pk, ece.file_sha256)
+        self.assertEqual(DocumentJob.objects.count(), 1)
+
+    def test_thumbnail_is_shared_between_rows_with_same_content(self):
+        content = scanned_pdf()
+        with self.captureOnCommitCallbacks(execute=True):
+            for title in ('A', 'B'):
+                Publication.objects.create(student=self.alumno, title=title, authors='A', nivel='1',
+                                           file=SimpleUploadedFile(f'{title}.pdf', content))
+
+        with mock.patch.object(document_jobs, 'extract_document', wraps=document_jobs.extract_document) as extract:
+            self.run_worker()
+        self.assertEqual(extract.call_count, 1)
+        self.assertEqual(set(Publication.objects.values_list('preview_status', 'page_count')), {('ready', 1)})
+        self.assertEqual(len(set(Publication.objects.values_list('thumbnail', flat=True))), 1)
+
+        rows = self.client.get('/api/publications/', {'view': 'compact'}, **self.header).json()['results']
+        response = self.client.get(rows[0]['thumbnail_url'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content)[:2], b'\xff\xd8')  # JPEG
+
+    @override_settings(DOCUMENT_JOB_MAX_ATTEMPTS=2)
+    def test_failures_are_retried_with_backoff(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_file('roto.pdf', PDF)
+        self.run_worker()
+        job = DocumentJob.objects.get()
+        self.assertEqual((job.status, job.attempts), ('pending', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertTrue(job.last_error)
+
+        DocumentJob.objects.update(run_after=timezone.now())
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+        self.assertEqual(ECERequest.objects.get().preview_status, 'failed')
+
+    def test_unsupported_format_and_process_pool(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_file('antiguo.doc', b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'x' * 100)
+            self.post_file('solicitud.pdf', text_pdf('Convenio firmado'))
+        call_command('run_document_worker', '--once', '--processes=1', stdout=StringIO())
+        statuses = {ece.file.name.rsplit('.', 1)[1]: ece.preview_status for ece in ECERequest.objects.all()}
+        self.assertEqual(statuses, {'doc': 'unavailable', 'pdf': 'ready'})
+        self.assertEqual(set(DocumentJob.objects.values_list('status', flat=True)), {'done'})
@@ -0,0 +1,212 @@
+"""
+Subidas reanudables por fragmentos para documentos grandes (conexiones lentas).
+
+1. POST  /api/requests/uploads/       {filename, size, sha256?} -> 201 {id, offset: 0, chunk_size}
+2. PATCH /api/requests/uploads/<id>/  cuerpo binario + cabecera `Upload-Offset`
+   -> 200 {offset, status}; 409 con el `offset` real si no coincide
+3. GET   /api/requests/uploads/<id>/  offset actual para reanudar tras un corte
+4. Crear la publicación o la solicitud ECE con `upload_id=<id>`.
+
+Cada fragmento se escribe en disco a medida que se lee del socket, así que un
+worker nunca tiene en memoria más de `READ_BLOCK` bytes por subida. Se recibe
+en un archivo temporal sin bloquear la sesión (un cliente lento no retiene la
+fila ni una transacción abierta); solo la comprobación del offset y el volcado
+al archivo parcial, ya en disco local, se hacen con `SELECT ... FOR UPDATE`.
+"""
+import hashlib
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import mixins, viewsets, status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from config.uploads import SIGNATURE_LENGTH, signature_error
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+
+READ_BLOCK = 64 * 1024
+
+
+class IncompleteChunk(Exception):
+    pass
+
+
+def receive_chunk(session, offset, stream, length):
+    """Leer `length` bytes de `stream` en un archivo temporal junto al parcial.
+
+    Devuelve `(ruta, None)`, o `(None, mensaje)` si el primer fragmento no es
+    un documento permitido (no se guarda nada en ese caso).
+    """
+    session.path.parent.mkdir(parents=True, exist_ok=True)
+    remaining = length
+    error = None
+    with tempfile.NamedTemporaryFile(dir=session.path.parent, prefix=f'{session.pk}.',
+                                     suffix='.chunk', delete=False) as target:
+        chunk_path = Path(target.name)
+        try:
+            while remaining:
+                block = stream.read(min(READ_BLOCK, remaining))
+                if not block:
+                    raise IncompleteChunk()
+                if offset == 0 and target.tell() == 0:
+                    error = signature_error(session.filename, block[:SIGNATURE_LENGTH])
+                    if error:
+                        break
+                target.write(block)
+                remaining -= len(block)
+        except BaseException:
+            chunk_path.unlink(missing_ok=True)
+            raise
+    if error:
+        chunk_path.unlink(missing_ok=True)
+        return None, error
+    return chunk_path, None
+
+
+def append_chunk(session, chunk_path):
+    """Copiar el fragmento recibido al archivo parcial a partir de `session.offset`."""
+    mode = 'r+b' if session.offset and session.path.exists() else 'wb'
+    with open(session.path, mode) as target, open(chunk_path, 'rb') as source:
+        target.seek(session.offset)
+        shutil.copyfileobj(source, target, READ_BLOCK)
+        # Descartar restos de un intento anterior interrumpido
+        target.truncate()
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet para subidas reanudables por fragmentos
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Generación del esquema OpenAPI (build_api_schema): sin usuario real
+        if getattr(self, 'swagger_fake_view', False):
+            return UploadSession.objects.none()
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def check_chunk(self, session, offset, length):
+        """Respuesta de error si el fragmento no encaja en la sesión (o None)."""
+        if session.status != 'uploading' or session.expires_at <= timezone.now():
+            return Response({'error': 'La subida ya no admite fragmentos', 'status': session.status},
+                            status=status.HTTP_409_CONFLICT)
+        if offset != session.offset:
+            return Response({'error': 'Offset incorrecto', 'offset': session.offset},
+                            status=status.HTTP_409_CONFLICT)
+        if offset + length > session.size:
+            return Response({'error': 'El fragmento excede el tamaño declarado', 'offset': session.offset},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return None
+
+    @swagger_auto_schema(
+        operation_description="Iniciar una subida por fragmentos (PDF, DOC o DOCX)",
+        responses={201: UploadSessionSerializer, 400: "Datos inválidos"},
+        tags=['Subidas']
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Estado de la subida: `offset` indica desde dónde reanudar",
+        responses={200: UploadSessionSerializer},
+        tags=['Subidas']
+    )
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        return Response(self.get_serializer(session).data, headers={'Upload-Offset': str(session.offset)})
+
+    @swagger_auto_schema(
+        operation_description="Enviar el siguiente fragmento (cuerpo binario, application/offset+octet-stream)",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, description="Posición del fragmento (debe coincidir con `offset`)", type=openapi.TYPE_INTEGER, required=True),
+        ],
+        request_body=None,
+        responses={
+            200: UploadSessionSerializer,
+            400: "Fragmento vacío, incompleto o contenido no permitido",
+            409: "Offset incorrecto o subida ya cerrada",
+            413: "Fragmento demasiado grande",
+        },
+        tags=['Subidas']
+    )
+    def partial_update(self, request, pk=None):
+        """Añadir un fragmento a la subida"""
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response({'error': 'Falta la cabecera Upload-Offset'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return Response({'error': 'Fragmento vacío'}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_SESSION_CHUNK_SIZE:
+            return Response({'error': f'Los fragmentos no pueden superar {settings.UPLOAD_SESSION_CHUNK_SIZE} bytes'},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # Comprobación previa sin bloqueo: rechazar antes de leer el cuerpo
+        session = get_object_or_404(self.get_queryset(), pk=pk)
+        error_response = self.check_chunk(session, offset, length)
+        if error_response:
+            return error_response
+
+        try:
+            chunk_path, error = receive_chunk(session, offset, request.stream, length)
+        except IncompleteChunk:
+            return Response({'error': 'Fragmento incompleto', 'offset': session.offset},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if error:
+            self.get_queryset().filter(pk=pk, status='uploading').update(status='failed', updated_at=timezone.now())
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                # Otra petición pudo escribir este offset mientras se recibía el fragmento
+                session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+                error_response = self.check_chunk(session, offset, length)
+                if error_response:
+                    return error_response
+
+                append_chunk(session, chunk_path)
+                session.offset += length
+                if session.offset == session.size:
+                    digest = file_sha256(session.path)
+                    if session.sha256 and session.sha256 != digest:
+                        session.status = 'failed'
+                        session.save(update_fields=['offset', 'status', 'updated_at'])
+                        session.path.unlink(missing_ok=True)
+                        return Response({'error': 'El SHA-256 del archivo no coincide'},
+                                        status=status.HTTP_400_BAD_REQUEST)
+                    session.sha256 = digest
+                    session.status = 'complete'
+                session.save(update_fields=['offset', 'sha256', 'status', 'updated_at'])
+        finally:
+            chunk_path.unlink(missing_ok=True)
+
+        return Response(self.get_serializer(session).data, headers={'Upload-Offset': str(session.offset)})
+
+    @swagger_auto_schema(
+        operation_description="Cancelar la subida y borrar lo recibido",
+        tags=['Subidas']
+    )
+    def destroy(self, request, *args, **kwargs):
+        self.get_object().discard()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ECERequestViewSet, SystemLogViewSet, SystemConfigurationViewSet
 )
-from .notification_views import AdminNotificationViewSet
+from .notification_views import AdminNotificationViewSet, notification_stream_view
+from .upload_views import UploadSessionViewSet
 
 router = DefaultRouter()
 # IMPORTANTE: Registrar las rutas más específicas PRIMERO (system-logs, system-config)
@@ -12,9 +13,13 @@ router = DefaultRouter()
 router.register(r'system-logs', SystemLogViewSet, basename='system-log')
 router.register(r'system-config', SystemConfigurationViewSet, basename='system-config')
 router.register(r'notifications', AdminNotificationViewSet, basename='notification')
+router.register(r'uploads', UploadSessionViewSet, basename='upload-session')
 # Register the ECERequest viewset at the app root so when included under
 # `/api/requests/` it exposes `/api/requests/` for list/create and
 # `/api/requests/{pk}/` for detail.
 router.register(r'', ECERequestViewSet, basename='ece-request')
 
-urlpatterns = router.urls
\ No newline at end of file
+urlpatterns = [
+    # Antes que el router: 'stream' no debe tomarse como pk de una notificación
+    path('notifications/stream/', notification_stream_view, name='notification-stream'),
+] + router.urls
\ No newline at end of file
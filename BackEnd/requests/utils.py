@@ -1,47 +1,77 @@
+import logging
+
 from django.apps import apps
 from django.utils import timezone
 
+from . import notification_stream, notifications
+from .access_audit import get_aggregator
+from .audit import get_writer, is_async_enabled
+
+logger = logging.getLogger(__name__)
+
 
-def log_event(user=None, request=None, action='', model_name='', object_id=None, description=''):
+def log_event(user=None, request=None, action='', model_name='', object_id=None, description='',
+              ip_address=None, user_agent=None, occurrences=1, created_at=None):
     """Helper central para crear entradas en SystemLog.
 
-    Usa `apps.get_model` para evitar importaciones circulares. Devuelve la instancia creada
-    o None en caso de error.
+    Usa `apps.get_model` para evitar importaciones circulares. Con
+    `settings.AUDIT_LOG_ASYNC` activo el evento se encola en el escritor por
+    lotes (`requests.audit`) y se devuelve una instancia aún no persistida;
+    en modo síncrono se devuelve la instancia creada. Devuelve None en caso
+    de error o si el evento se descartó por desbordamiento de la cola.
+
+    Sin `request` (eventos emitidos fuera de la petición) la IP y el user
+    agent se pasan en `ip_address` / `user_agent`; `occurrences` es el número
+    de eventos idénticos que representa la fila (`requests.access_audit`)
+    y `created_at` el momento del primero (por defecto, ahora).
     """
     try:
         SystemLog = apps.get_model('requests', 'SystemLog')
-    except Exception as e:
-        print(f"[log_event] Error obteniendo modelo SystemLog: {e}")
+    except Exception:
+        logger.exception("[log_event] Error obteniendo modelo SystemLog")
         return None
 
-    ip = None
-    ua = None
+    ip = ip_address
+    ua = user_agent
     if request is not None:
         xff = request.META.get('HTTP_X_FORWARDED_FOR')
         ip = xff.split(',')[0].strip() if xff else request.META.get('REMOTE_ADDR')
         ua = request.META.get('HTTP_USER_AGENT')
 
+    entry = {
+        'user_id': getattr(user, 'pk', None),
+        'action': action,
+        'model_name': model_name,
+        'object_id': object_id,
+        'description': description,
+        'ip_address': ip,
+        'user_agent': ua,
+        'occurrences': occurrences,
+        # Se fija aquí: el escritor por lotes o la reinyección del volcado pueden escribir mucho después
+        'created_at': created_at or timezone.now(),
+    }
+
+    if is_async_enabled():
+        if not get_writer().enqueue(entry):
+            logger.warning("[log_event] Evento descartado por cola llena: action=%s", action)
+            return None
+        return SystemLog(**entry)
+
     try:
-        log_entry = SystemLog.objects.create(
-            user=user,
-            action=action,
-            model_name=model_name,
-            object_id=object_id,
-            description=description,
-            ip_address=ip,
-            user_agent=ua,
-        )
-        print(f"[log_event] Log creado: action={action}, user={user}, model={model_name}")
-        return log_entry
-    except Exception as e:
-        print(f"[log_event] Error creando log: {e}")
-        import traceback
-        traceback.print_exc()
+        return SystemLog.objects.create(**entry)
+    except Exception:
+        logger.exception("[log_event] Error creando log: action=%s", action)
         return None
 
 
-def create_notification(notification_type, severity, title, message, user=None, ip_address=None, metadata=None, request=None):
+def create_notification(notification_type, severity, title, message, user=None, ip_address=None, metadata=None,
+                        request=None, occurrences=1):
     """Helper para crear notificaciones administrativas.
+
+    Las notificaciones repetidas se agrupan (`requests.notifications`): si ya
+    hay una abierta con el mismo tipo, usuario, IP y título se le suman las
+    ocurrencias en lugar de crear otra fila, y cada grupo tiene un límite de
+    escrituras por ventana de tiempo.
     
     Args:
         notification_type: Tipo de notificación (failed_login, simultaneous_access, etc.)
@@ -52,9 +82,11 @@ def create_notification(notification_type, severity, title, message, user=None,
         ip_address: IP relacionada (opcional)
         metadata: Diccionario con datos adicionales (opcional)
         request: Request object para extraer IP y UA (opcional)
+        occurrences: Eventos que representa esta llamada (por defecto 1)
     
     Returns:
-        AdminNotification instance o None en caso de error
+        AdminNotification instance (creada o agrupada), o None en caso de error
+        o si el límite de escritura retuvo el evento
     """
     try:
         AdminNotification = apps.get_model('requests', 'AdminNotification')
@@ -75,23 +107,65 @@ def create_notification(notification_type, severity, title, message, user=None,
     if request and 'user_agent' not in metadata:
         metadata['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
     
+    event = {
+        'notification_type': notification_type,
+        'severity': severity,
+        'title': title,
+        'message': message,
+        'user_id': getattr(user, 'pk', None),
+        'ip_address': ip_address,
+        'metadata': metadata,
+    }
     try:
-        notification = AdminNotification.objects.create(
-            notification_type=notification_type,
-            severity=severity,
-            title=title,
-            message=message,
-            user=user,
-            ip_address=ip_address,
-            metadata=metadata
-        )
-        print(f"[create_notification] Notificación creada: type={notification_type}, severity={severity}")
-        return notification
-    except Exception as e:
-        print(f"[create_notification] Error creando notificación: {e}")
-        import traceback
-        traceback.print_exc()
+        if not is_async_enabled():
+            # Sin hilo de `access_audit`: lo retenido se vuelca en la siguiente llamada
+            flush_held_notifications()
+        key = notifications.fingerprint(notification_type, event['user_id'], ip_address, title)
+        occurrences = notifications.admit(key, occurrences, event)
+        if not occurrences:
+            if is_async_enabled():
+                # Su hilo suma lo retenido al cerrar la ventana
+                get_aggregator().ensure_started()
+            return None
+        notification = write_notification(AdminNotification, event, key, occurrences)
+    except Exception:
+        logger.exception("[create_notification] Error creando notificación: type=%s", notification_type)
         return None
+    return notification
+
+
+def write_notification(AdminNotification, event, key, occurrences):
+    """Crear o agrupar la notificación (`notifications.upsert`) y publicarla por SSE."""
+    pk, became_unread = notifications.upsert(key=key, occurrences=occurrences, **event)
+    # La fila tal como quedó: una instancia construida aquí pisaría con sus
+    # valores por defecto (lectura, resolución...) la real al guardarla
+    notification = AdminNotification.objects.get(pk=pk)
+    # Paneles de admin conectados por SSE
+    notification_stream.publish(notification_stream.notification_event(notification, int(became_unread)))
+    return notification
+
+
+def flush_held_notifications(due_only=True):
+    """
+    Sumar a su notificación las ocurrencias que retuvo el límite de escritura
+    en las huellas cuya ventana ha cerrado (si la ráfaga terminó, ninguna
+    escritura posterior las recogería). Devuelve las notificaciones escritas.
+    """
+    held = notifications.take_due(due_only)
+    if not held:
+        return 0
+    AdminNotification = apps.get_model('requests', 'AdminNotification')
+    written = 0
+    for key, event in held:
+        try:
+            # Pasa por el límite como un evento más: si se vuelve a superar, sigue retenido
+            occurrences = notifications.admit(key, 0, event)
+            if occurrences:
+                write_notification(AdminNotification, event, key, occurrences)
+                written += 1
+        except Exception:
+            logger.exception("[flush_held_notifications] Error volcando la huella %s", key)
+    return written
 
 
 def check_simultaneous_access(user, request):
@@ -2,7 +2,8 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import FormParser, JSONParser
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from .models import ECERequest, SystemLog, SystemConfiguration, AdminNotification
@@ -11,24 +12,34 @@ from .serializers import (
     ECERequestDetailSerializer, SystemLogSerializer, SystemLogCreateSerializer,
     SystemConfigurationSerializer, AdminNotificationSerializer
 )
+from . import config_registry, partitions
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from config.downloads import FileDownloadMixin
+from config.incremental import IncrementalListMixin, parse_since
+from config.pagination import CreatedAtKeysetPagination
+from config.uploads import DocumentMultiPartParser
+from config.search import FullTextSearchFilter, ranked_search
 try:
     from .utils import log_event
 except Exception:
     log_event = None
 
 
-class ECERequestViewSet(viewsets.ModelViewSet):
+class ECERequestViewSet(FileDownloadMixin, viewsets.ModelViewSet):
     """
     ViewSet para CRUD de solicitudes ECE
     """
     queryset = ECERequest.objects.all()
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    parser_classes = [DocumentMultiPartParser, FormParser, JSONParser]
+    # Los archivos de más de 10MB se cortan mientras se reciben
+    upload_max_size = 10 * 1024 * 1024
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_fields = ['status', 'student', 'reviewed_by']
-    search_fields = ['description', 'student__username', 'student__matricula']
+    # `?search=` usa el índice de texto completo de la descripción y del texto del documento
+    search_vector_field = 'search_vector'
+    search_trigram_lookups = ('student__username__icontains',)
     ordering_fields = ['created_at', 'review_date']
     ordering = ['-created_at']
     
@@ -45,7 +56,7 @@ class ECERequestViewSet(viewsets.ModelViewSet):
             openapi.Parameter('status', openapi.IN_QUERY, description="Filtrar por estado", type=openapi.TYPE_STRING),
             openapi.Parameter('student', openapi.IN_QUERY, description="Filtrar por estudiante", type=openapi.TYPE_INTEGER),
             openapi.Parameter('reviewed_by', openapi.IN_QUERY, description="Filtrar por revisor", type=openapi.TYPE_INTEGER),
-            openapi.Parameter('search', openapi.IN_QUERY, description="Búsqueda en descripción, username o matrícula", type=openapi.TYPE_STRING),
+            openapi.Parameter('search', openapi.IN_QUERY, description="Búsqueda de texto completo en descripción, texto del documento o username", type=openapi.TYPE_STRING),
         ],
         tags=['Solicitudes ECE']
     )
@@ -63,34 +74,60 @@ class ECERequestViewSet(viewsets.ModelViewSet):
         return queryset
     
     @swagger_auto_schema(
-        operation_description="Obtener solicitudes del estudiante actual",
+        operation_description="Búsqueda de texto completo en la descripción y el texto del documento, ordenada por relevancia",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Términos de búsqueda (admite \"frase\", -excluir, or)", type=openapi.TYPE_STRING, required=True),
+        ],
+        responses={200: ECERequestSerializer(many=True), 400: "Falta el parámetro q"},
+        tags=['Solicitudes ECE']
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Buscar solicitudes visibles para el usuario, ordenadas por relevancia"""
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            return Response({'error': 'El parámetro q es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Solo los filtros de campo: el orden lo fija la relevancia
+        queryset = DjangoFilterBackend().filter_queryset(request, self.get_queryset(), self)
+        queryset = ranked_search(queryset, terms, lookups=self.search_trigram_lookups)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @swagger_auto_schema(
+        operation_description="Obtener solicitudes del estudiante actual (paginación por cursor)",
+        manual_parameters=[openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING)],
         responses={200: ECERequestSerializer(many=True)},
         tags=['Solicitudes ECE - Estudiantes']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def my_requests(self, request):
         """Obtener solicitudes del estudiante actual"""
         if request.user.role != 'estudiante':
             return Response({'error': 'Solo estudiantes pueden acceder'}, status=status.HTTP_403_FORBIDDEN)
         
-        requests_qs = self.get_queryset().filter(student=request.user)
+        requests_qs = self.paginate_queryset(self.get_queryset().filter(student=request.user))
         serializer = ECERequestSerializer(requests_qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
-        operation_description="Obtener solicitudes pendientes de revisión (para jefe)",
+        operation_description="Obtener solicitudes pendientes de revisión (para jefe, paginación por cursor)",
+        manual_parameters=[openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING)],
         responses={200: ECERequestSerializer(many=True)},
         tags=['Solicitudes ECE - Jefes']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def pending_review(self, request):
         """Obtener solicitudes pendientes de revisión (para jefe)"""
         if request.user.role != 'jefe':
             return Response({'error': 'Solo jefes pueden acceder'}, status=status.HTTP_403_FORBIDDEN)
         
-        requests_qs = ECERequest.objects.filter(status__in=['en_proceso', 'pendiente'])
+        requests_qs = self.paginate_queryset(
+            self.get_queryset().filter(status__in=['en_proceso', 'pendiente'])
+        )
         serializer = ECERequestSerializer(requests_qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        return self.get_paginated_response(serializer.data)
     
     @swagger_auto_schema(
         operation_description="Revisar una solicitud ECE (para jefe de departamento)",
@@ -204,25 +241,25 @@ class ECERequestViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Obtener estadísticas de solicitudes ECE"""
-        from django.db.models import Count
-        from authentication.models import User
-        
-        # Estadísticas generales
-        total = ECERequest.objects.count()
-        pendientes = ECERequest.objects.filter(status__in=['en_proceso', 'pendiente']).count()
-        aprobadas = ECERequest.objects.filter(status='aprobada').count()
-        rechazadas = ECERequest.objects.filter(status='rechazada').count()
+        """Obtener estadísticas de solicitudes ECE (desde los contadores materializados)"""
+        from .counters import ECE_REQUEST, scoped_counters, students_with_rows, total as counter_total
         
-        # Estudiantes con solicitudes
-        estudiantes_con_solicitudes = ECERequest.objects.values('student').distinct().count()
+        row = scoped_counters(ECE_REQUEST).aggregate(
+            total=counter_total(),
+            pendientes=counter_total(status__in=['en_proceso', 'pendiente']),
+            aprobadas=counter_total(status='aprobada'),
+            rechazadas=counter_total(status='rechazada'),
+            estudiantes_activos=students_with_rows(),
+        )
+        total = row['total']
+        aprobadas = row['aprobadas']
         
         return Response({
             'total': total,
-            'pendientes': pendientes,
+            'pendientes': row['pendientes'],
             'aprobadas': aprobadas,
-            'rechazadas': rechazadas,
-            'estudiantes_activos': estudiantes_con_solicitudes,
+            'rechazadas': row['rechazadas'],
+            'estudiantes_activos': row['estudiantes_activos'],
             'tasa_aprobacion': round((aprobadas / total * 100) if total > 0 else 0, 2)
         })
     
@@ -253,31 +290,28 @@ class ECERequestViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def monthly_report(self, request):
-        """Obtener reporte mensual de solicitudes"""
-        from django.db.models import Count, Q
-        from django.db.models.functions import TruncMonth
+        """Obtener reporte mensual de solicitudes (desde los contadores materializados)"""
+        from .counters import ECE_REQUEST, scoped_counters, total as counter_total
         import datetime
         
         # Parámetros opcionales
         year = request.query_params.get('year', datetime.datetime.now().year)
         
-        # Agrupar por mes
-        solicitudes_por_mes = ECERequest.objects.filter(
-            created_at__year=year
-        ).annotate(
-            mes=TruncMonth('created_at')
-        ).values('mes').annotate(
-            total=Count('id'),
-            aprobadas=Count('id', filter=Q(status='aprobada')),
-            rechazadas=Count('id', filter=Q(status='rechazada')),
-            pendientes=Count('id', filter=Q(status__in=['en_proceso', 'pendiente']))
-        ).order_by('mes')
+        # Agrupar por mes: como mucho 12 grupos sobre filas ya agregadas
+        solicitudes_por_mes = scoped_counters(ECE_REQUEST).filter(
+            month__year=year
+        ).values('month').annotate(
+            total=counter_total(),
+            aprobadas=counter_total(status='aprobada'),
+            rechazadas=counter_total(status='rechazada'),
+            pendientes=counter_total(status__in=['en_proceso', 'pendiente'])
+        ).filter(total__gt=0).order_by('month')
         
         # Formatear respuesta
         meses_es = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
         data = []
         for item in solicitudes_por_mes:
-            mes_num = item['mes'].month
+            mes_num = item['month'].month
             data.append({
                 'mes': meses_es[mes_num - 1],
                 'solicitudes': item['total'],
@@ -298,7 +332,7 @@ class ECERequestViewSet(viewsets.ModelViewSet):
         return ip
 
 
-class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
+class SystemLogViewSet(IncrementalListMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para logs del sistema (solo lectura para admins)
     """
@@ -311,6 +345,12 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['created_at']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        # Solo admins y jefes pueden ver logs
+        if self.request.user.role not in ['admin', 'jefe']:
+            return SystemLog.objects.none()
+        return SystemLog.objects.select_related('user').all()
+    
     @swagger_auto_schema(
         operation_description="Obtener lista de logs del sistema (solo admins y jefes)",
         manual_parameters=[
@@ -318,45 +358,115 @@ class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
             openapi.Parameter('action', openapi.IN_QUERY, description="Filtrar por acción", type=openapi.TYPE_STRING),
             openapi.Parameter('model_name', openapi.IN_QUERY, description="Filtrar por modelo", type=openapi.TYPE_STRING),
             openapi.Parameter('search', openapi.IN_QUERY, description="Búsqueda en descripción o username", type=openapi.TYPE_STRING),
+            openapi.Parameter('since_id', openapi.IN_QUERY, description="Solo logs con id mayor (delta)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('since', openapi.IN_QUERY, description="Solo logs creados después de esta fecha ISO 8601 (delta)", type=openapi.TYPE_STRING),
         ],
+        responses={304: "Sin cambios desde el ETag enviado en If-None-Match"},
         tags=['Sistema - Logs']
     )
-    def get_queryset(self):
-        # Solo admins y jefes pueden ver logs
-        if self.request.user.role not in ['admin', 'jefe']:
-            return SystemLog.objects.none()
-        return SystemLog.objects.select_related('user').all()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @swagger_auto_schema(
-        operation_description="Obtener logs recientes (últimos 50)",
-        responses={200: SystemLogSerializer(many=True)},
+        operation_description="Obtener logs recientes (últimos 50), o solo los nuevos con since_id/since",
+        manual_parameters=[
+            openapi.Parameter('since_id', openapi.IN_QUERY, description="Solo logs con id mayor (delta)", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('since', openapi.IN_QUERY, description="Solo logs creados después de esta fecha ISO 8601 (delta)", type=openapi.TYPE_STRING),
+        ],
+        responses={200: SystemLogSerializer(many=True), 304: "Sin cambios desde el ETag enviado en If-None-Match"},
         tags=['Sistema - Logs']
     )
     @action(detail=False, methods=['get'])
     def recent(self, request):
         """Obtener logs recientes (últimos 50)"""
-        logs = self.get_queryset()[:50]
-        serializer = SystemLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        queryset = self.get_queryset()
+        since_id, since = parse_since(request)
+        if since_id is not None or since is not None:
+            # ETag de las mismas filas que devuelve el delta
+            response, etag, _ = self.conditional_response(request, self.delta_queryset(queryset, since_id, since))
+            if response is not None:
+                return response
+            response = self.delta_response(request, queryset, since_id, since)
+            response['ETag'] = etag
+            return response
+
+        # Acotado al mes en curso la consulta solo lee su partición; los meses
+        # anteriores solo se leen si este aún no tiene 50 logs
+        start, end = partitions.month_bounds(timezone.now())
+        logs = list(queryset.filter(created_at__gte=start, created_at__lt=end)[:50])
+        if len(logs) < 50:
+            logs += list(queryset.filter(created_at__lt=start)[:50 - len(logs)])
+        # ETag de las filas devueltas (también las de meses anteriores, que la
+        # retención puede archivar): con 304 se ahorra la serialización
+        ids = [log.pk for log in logs]
+        state = {'max_id': max(ids, default=None), 'min_id': min(ids, default=None), 'count': len(ids)}
+        response, etag = self.conditional_state(request, state)
+        if response is not None:
+            return response
+        response = Response(SystemLogSerializer(logs, many=True).data)
+        response['ETag'] = etag
+        return response
     
     @swagger_auto_schema(
         operation_description="Obtener logs por usuario específico",
         manual_parameters=[
             openapi.Parameter('user_id', openapi.IN_QUERY, description="ID del usuario", type=openapi.TYPE_INTEGER, required=True),
+            openapi.Parameter('fields', openapi.IN_QUERY, description="Campos a devolver separados por comas", type=openapi.TYPE_STRING),
         ],
         responses={200: SystemLogSerializer(many=True)},
         tags=['Sistema - Logs']
     )
-    @action(detail=False, methods=['get'])
+    @action(detail=False, methods=['get'], pagination_class=CreatedAtKeysetPagination)
     def by_user(self, request):
         """Obtener logs por usuario"""
         user_id = request.query_params.get('user_id')
         if not user_id:
             return Response({'error': 'user_id es requerido'}, status=status.HTTP_400_BAD_REQUEST)
         
-        logs = self.get_queryset().filter(user_id=user_id)
-        serializer = SystemLogSerializer(logs, many=True)
-        return Response(serializer.data)
+        logs = self.paginate_queryset(self.get_queryset().filter(user_id=user_id))
+        serializer = SystemLogSerializer(logs, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Estado de la tubería de escritura de logs (cola y latencia de volcado)",
+        responses={
+            200: openapi.Response(
+                description="Contadores del escritor asíncrono de auditoría",
+                schema=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'async': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'queue_depth': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'queue_capacity': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'enqueued': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'written': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'dropped': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'spilled': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'failed': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'flushes': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'last_flush_ms': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'avg_flush_ms': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'max_flush_ms': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'access': openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            description="Agregador de 401/403: eventos, agrupados, descartados por muestreo y pendientes",
+                        ),
+                    }
+                )
+            ),
+            403: "No autorizado"
+        },
+        tags=['Sistema - Logs']
+    )
+    @action(detail=False, methods=['get'])
+    def pipeline(self, request):
+        """Contadores del escritor de auditoría de este worker"""
+        if request.user.role != 'admin':
+            return Response({'error': 'Solo admins pueden acceder'}, status=status.HTTP_403_FORBIDDEN)
+
+        from .access_audit import get_aggregator
+        from .audit import get_writer, is_async_enabled
+        return Response({'async': is_async_enabled(), **get_writer().stats(), 'access': get_aggregator().stats()})
 
 
 class SystemConfigurationViewSet(viewsets.ModelViewSet):
@@ -373,6 +483,7 @@ class SystemConfigurationViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Log configuration creation"""
         config = serializer.save()
+        config_registry.invalidate()
         try:
             if log_event:
                 log_event(user=self.request.user, request=self.request, action='config_change',
@@ -384,6 +495,7 @@ class SystemConfigurationViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         """Log configuration update"""
         config = serializer.save()
+        config_registry.invalidate()
         try:
             if log_event:
                 log_event(user=self.request.user, request=self.request, action='config_change',
@@ -402,6 +514,7 @@ class SystemConfigurationViewSet(viewsets.ModelViewSet):
         except Exception:
             pass
         instance.delete()
+        config_registry.invalidate()
     
     @swagger_auto_schema(
         operation_description="Obtener lista de configuraciones del sistema",
@@ -440,6 +553,7 @@ class SystemConfigurationViewSet(viewsets.ModelViewSet):
         old_state = config.is_active
         config.is_active = not config.is_active
         config.save()
+        config_registry.invalidate()
         
         # Log toggle action
         try:
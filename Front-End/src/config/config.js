@@ -46,6 +46,9 @@ export const config = {
     ECE_REQUEST_REVIEW: (id) => `/requests/${id}/review/`,
     ECE_REQUEST_SUBMIT: (id) => `/requests/${id}/submit_for_review/`,
     
+    // Subidas por fragmentos (archivos grandes)
+    UPLOADS: '/requests/uploads/',
+    
     // System
     SYSTEM_LOGS: '/system-logs/',
     SYSTEM_CONFIG: '/system-config/',
@@ -1,9 +1,11 @@
 import { useState, useEffect } from 'react';
 import api from '../services/api';
+import { subscribeToNotifications } from '../services/notificationStream';
 
 /**
  * Hook personalizado para gestionar notificaciones
- * Obtiene el contador de notificaciones no leídas y actualiza automáticamente
+ * Obtiene el contador de notificaciones no leídas y lo actualiza con los
+ * eventos del flujo SSE (sin sondear el servidor)
  */
 export const useNotifications = () => {
   const [unreadCount, setUnreadCount] = useState(0);
@@ -21,13 +23,14 @@ export const useNotifications = () => {
   };
 
   useEffect(() => {
-    // Cargar inicial
-    fetchUnreadCount();
-
-    // Auto-refresh cada 30 segundos
-    const interval = setInterval(fetchUnreadCount, 30000);
-
-    return () => clearInterval(interval);
+    // El contador completo se pide al conectar (`resync`); después solo se suman los cambios
+    return subscribeToNotifications((event) => {
+      if (event.type === 'resync') {
+        fetchUnreadCount();
+      } else if (event.unread_delta) {
+        setUnreadCount((count) => Math.max(count + event.unread_delta, 0));
+      }
+    });
   }, []);
 
   return { unreadCount, loading, refresh: fetchUnreadCount };
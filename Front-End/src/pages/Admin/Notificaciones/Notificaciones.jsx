@@ -1,16 +1,23 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import './Notificaciones.css';
 import api from '../../../services/api';
+import { getNextCursor } from '../../../utils/helpers';
+import { subscribeToNotifications } from '../../../services/notificationStream';
 
 const Notificaciones = () => {
   const [notifications, setNotifications] = useState([]);
   const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
+  // Cursor de la siguiente página (null si no hay más notificaciones antiguas)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filters, setFilters] = useState({
     notification_type: '',
     severity: '',
     is_read: '',
   });
+  // Marca `since` de la siguiente consulta incremental (fechas del servidor)
+  const sinceRef = useRef(null);
 
   // Tipos y severidades con etiquetas en español
   const notificationTypes = {
@@ -31,24 +38,90 @@ const Notificaciones = () => {
     critical: { label: 'Crítico', class: 'severity-critical' }
   };
 
+  const buildParams = () => {
+    const params = {};
+    if (filters.notification_type) params.notification_type = filters.notification_type;
+    if (filters.severity) params.severity = filters.severity;
+    if (filters.is_read !== '') params.is_read = filters.is_read;
+    return params;
+  };
+
+  // Último cambio visto en las filas cargadas, menos el margen de 5 s del servidor
+  const latestChange = (rows) => {
+    const times = rows.flatMap((row) => [row.created_at, row.last_seen, row.read_at, row.resolved_at])
+      .filter(Boolean)
+      .map((value) => new Date(value).getTime());
+    return times.length ? new Date(Math.max(...times) - 5000).toISOString() : null;
+  };
+
   const fetchNotifications = useCallback(async () => {
     try {
       setLoading(true);
-      const params = {};
-      if (filters.notification_type) params.notification_type = filters.notification_type;
-      if (filters.severity) params.severity = filters.severity;
-      if (filters.is_read !== '') params.is_read = filters.is_read;
-
-      const response = await api.get('/requests/notifications/', { params });
-      setNotifications(response.data || []);
+      const response = await api.get('/requests/notifications/', { params: buildParams() });
+      // Respuesta paginada por cursor: { next, previous, results }
+      const rows = response.data?.results || response.data || [];
+      setNotifications(rows);
+      setNextCursor(getNextCursor(response.data));
+      sinceRef.current = latestChange(rows);
     } catch (error) {
       console.error('Error al cargar notificaciones:', error);
       setNotifications([]);
+      setNextCursor(null);
+      sinceRef.current = null;
     } finally {
       setLoading(false);
     }
   }, [filters]);
 
+  // Página siguiente (más antigua) añadida al final de la lista
+  const fetchMore = async () => {
+    try {
+      setLoadingMore(true);
+      const response = await api.get('/requests/notifications/', {
+        params: { ...buildParams(), cursor: nextCursor },
+      });
+      const known = new Set(notifications.map((row) => row.id));
+      setNotifications((current) => [
+        ...current,
+        ...response.data.results.filter((row) => !known.has(row.id)),
+      ]);
+      setNextCursor(getNextCursor(response.data));
+    } catch (error) {
+      console.error('Error al cargar más notificaciones:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Solo las filas creadas o cambiadas desde la última carga, fusionadas por id
+  const fetchChanges = async () => {
+    if (!sinceRef.current) {
+      fetchNotifications();
+      return;
+    }
+    try {
+      const response = await api.get('/requests/notifications/', {
+        params: { ...buildParams(), since: sinceRef.current },
+      });
+      const { results, next, next_since: nextSince } = response.data;
+      if (next) {
+        // Demasiados cambios para un delta: recargar la lista
+        fetchNotifications();
+        return;
+      }
+      sinceRef.current = nextSince;
+      setNotifications((current) => {
+        const byId = new Map(current.map((row) => [row.id, row]));
+        results.forEach((row) => byId.set(row.id, row));
+        return [...byId.values()].sort(
+          (a, b) => new Date(b.created_at) - new Date(a.created_at) || b.id - a.id
+        );
+      });
+    } catch (error) {
+      console.error('Error al actualizar notificaciones:', error);
+    }
+  };
+
   const fetchStats = async () => {
     try {
       const response = await api.get('/requests/notifications/stats/');
@@ -62,13 +135,17 @@ const Notificaciones = () => {
     fetchNotifications();
     fetchStats();
     
-    // Auto-refresh cada 30 segundos
-    const interval = setInterval(() => {
-      fetchNotifications();
-      fetchStats();
-    }, 30000);
-
-    return () => clearInterval(interval);
+    // Actualizar solo cuando el flujo SSE avisa de cambios (sin sondeo periódico):
+    // una notificación nueva o repetida trae solo el delta; `resync` recarga todo
+    return subscribeToNotifications((event) => {
+      if (event.type === 'notification') {
+        fetchChanges();
+        fetchStats();
+      } else if (event.type === 'resync') {
+        fetchNotifications();
+        fetchStats();
+      }
+    });
   }, [filters]);
 
   const handleMarkRead = async (id) => {
@@ -218,6 +295,12 @@ const Notificaciones = () => {
                     </div>
                   )}
 
+                  {notif.occurrences > 1 && (
+                    <div className="notification-occurrences">
+                      <strong>Repeticiones:</strong> {notif.occurrences} (última: {formatDate(notif.last_seen)})
+                    </div>
+                  )}
+
                   {notif.metadata && Object.keys(notif.metadata).length > 0 && (
                     <details className="notification-metadata">
                       <summary>Detalles adicionales</summary>
@@ -258,6 +341,11 @@ const Notificaciones = () => {
               </div>
             ))
           )}
+          {nextCursor && (
+            <button onClick={fetchMore} className="btn-load-more" disabled={loadingMore}>
+              {loadingMore ? 'Cargando...' : 'Cargar más'}
+            </button>
+          )}
         </div>
       )}
     </div>
@@ -3,8 +3,9 @@ import './Publicaciones.css';
 import React, { useState, useEffect } from 'react';
 import { toast } from 'react-toastify';
 import publicationService from '../../../services/publicationService';
+import uploadService, { CHUNKED_UPLOAD_THRESHOLD } from '../../../services/uploadService';
 import authService from '../../../services/authService';
-import { handleApiError, formatDateShort, getStatusLabel, getStatusColor, validateFile } from '../../../utils/helpers';
+import { handleApiError, formatDateShort, getStatusLabel, getStatusColor, validateFile, getNextCursor } from '../../../utils/helpers';
 import Footer from '../../../components/footer';
 
 function Publicaciones() {
@@ -28,6 +29,9 @@ function Publicaciones() {
   const [selectedPublicacion, setSelectedPublicacion] = useState(null);
   const [loading, setLoading] = useState(false);
   const [loadingList, setLoadingList] = useState(true);
+  // Cursor de la siguiente página de la lista (null si ya está completa)
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // CARGAR PUBLICACIONES DESDE EL BACKEND AL INICIAR
   useEffect(() => {
@@ -55,9 +59,10 @@ function Publicaciones() {
     try {
       setLoadingList(true);
       const data = await publicationService.getMyPublications();
-      // Some APIs return { results: [...] }
+      // Respuesta paginada por cursor: { next, previous, results }
       const items = data && data.results ? data.results : data;
       setPublicaciones(items || []);
+      setNextCursor(getNextCursor(data));
     } catch (error) {
       console.error('Error al cargar publicaciones:', error);
       if (error.response?.status === 401) {
@@ -72,6 +77,20 @@ function Publicaciones() {
     }
   };
 
+  const cargarMasPublicaciones = async () => {
+    try {
+      setLoadingMore(true);
+      const data = await publicationService.getMyPublications(nextCursor);
+      setPublicaciones(prev => [...prev, ...(data.results || [])]);
+      setNextCursor(getNextCursor(data));
+    } catch (error) {
+      console.error('Error al cargar más publicaciones:', error);
+      handleApiError(error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleInputChange = (e) => {
     const { name, value, files } = e.target;
     setPublicacionData(prev => ({
@@ -159,7 +178,12 @@ function Publicaciones() {
         if (publicacionData.doi) formData.append('doi', publicacionData.doi);
         if (publicacionData.resumen) formData.append('resumen', publicacionData.resumen);
         if (publicacionData.archivo && typeof publicacionData.archivo !== 'string') {
-          formData.append('archivo', publicacionData.archivo);
+          if (publicacionData.archivo.size > CHUNKED_UPLOAD_THRESHOLD) {
+            // Archivos grandes: subida reanudable por fragmentos
+            formData.append('upload_id', await uploadService.uploadInChunks(publicacionData.archivo));
+          } else {
+            formData.append('archivo', publicacionData.archivo);
+          }
         }
       }
 
@@ -504,7 +528,7 @@ function Publicaciones() {
         <div className="publicaciones-header">
           <h2>📚 Mis Publicaciones Registradas</h2>
           <div className="publicaciones-info">
-            <span>Total: {publicaciones.length}</span>
+            <span>Total: {publicaciones.length}{nextCursor ? '+' : ''}</span>
           </div>
         </div>
 
@@ -570,6 +594,11 @@ function Publicaciones() {
                 </div>
               </div>
             ))}
+            {nextCursor && (
+              <button className="btn-load-more" onClick={cargarMasPublicaciones} disabled={loadingMore}>
+                {loadingMore ? '⏳ Cargando...' : 'Cargar más'}
+              </button>
+            )}
           </div>
         )}
       </section>
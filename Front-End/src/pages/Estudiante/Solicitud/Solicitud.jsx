@@ -3,7 +3,8 @@ import './Solicitud.css';
 import React, { useState, useEffect } from 'react';
 import { toast } from 'react-toastify';
 import api from '../../../services/api';
-import { handleApiError } from '../../../utils/helpers';
+import requestService from '../../../services/requestService';
+import { handleApiError, getNextCursor } from '../../../utils/helpers';
 
 function Solicitud() {
   const [solicitud, setSolicitud] = useState(null);
@@ -20,21 +21,24 @@ function Solicitud() {
   const cargarSolicitud = async () => {
     try {
       setLoading(true);
-      // Obtener solo las solicitudes del usuario autenticado
-      const response = await api.get('/requests/my_requests/');
-      
-      // Si tiene solicitudes, mostrar la más reciente que esté activa
-      if (response.data && response.data.length > 0) {
-        // Buscar solicitud activa (en_proceso, pendiente o aprobada)
-        const solicitudActiva = response.data.find(s => 
+      // Obtener solo las solicitudes del usuario autenticado. La respuesta está
+      // paginada por cursor (más recientes primero): se siguen las páginas hasta
+      // encontrar la solicitud activa (en_proceso, pendiente o aprobada)
+      let cursor = null;
+      do {
+        const data = await requestService.getMyRequests(cursor);
+        const solicitudes = data?.results || data || [];
+        const solicitudActiva = solicitudes.find(s => 
           s.status === 'en_proceso' || s.status === 'pendiente' || s.status === 'aprobada'
         );
-        
+
         if (solicitudActiva) {
           setSolicitud(solicitudActiva);
           setDescripcion(solicitudActiva.description || '');
+          break;
         }
-      }
+        cursor = getNextCursor(data);
+      } while (cursor);
     } catch (error) {
       console.error('Error al cargar solicitud:', error);
       handleApiError(error);
@@ -317,7 +317,20 @@ function GestionPublicasiones() {
               </div>
 
               <div className="publicacion-details">
+                {publicacion.thumbnail_url && (
+                  <img
+                    src={publicacion.thumbnail_url}
+                    alt="Primera página del documento"
+                    className="documento-miniatura"
+                    loading="lazy"
+                  />
+                )}
                 <p className="resumen">{publicacion.summary}</p>
+                {publicacion.page_count && (
+                  <div className="detail-item">
+                    <strong>Páginas:</strong> {publicacion.page_count}
+                  </div>
+                )}
                 {publicacion.doi && (
                   <div className="detail-item">
                     <strong>DOI:</strong> {publicacion.doi}
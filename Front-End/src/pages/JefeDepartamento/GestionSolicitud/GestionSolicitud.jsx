@@ -324,9 +324,18 @@ function GestionSolicitud() {
                 )}
                 {solicitud.file_url && (
                   <div className="detail-item">
-                    <strong>Archivo:</strong> {solicitud.file_url.split('/').pop()}
+                    <strong>Archivo:</strong> {solicitud.file_name}
+                    {solicitud.page_count && ` (${solicitud.page_count} páginas)`}
                   </div>
                 )}
+                {solicitud.thumbnail_url && (
+                  <img
+                    src={solicitud.thumbnail_url}
+                    alt="Primera página del documento"
+                    className="documento-miniatura"
+                    loading="lazy"
+                  />
+                )}
                 {solicitud.review_comments && (
                   <div className="detail-item">
                     <strong>Comentario:</strong> 
@@ -414,7 +423,7 @@ function GestionSolicitud() {
                   </div>
                   {solicitudSeleccionada.file_url && (
                     <div className="detalle-item">
-                      <strong>Archivo:</strong> {solicitudSeleccionada.file_url.split('/').pop()}
+                      <strong>Archivo:</strong> {solicitudSeleccionada.file_name}
                     </div>
                   )}
                   <div className="detalle-item">
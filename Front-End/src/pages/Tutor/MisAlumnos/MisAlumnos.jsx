@@ -22,46 +22,23 @@ function MisAlumnos() {
       const tutorStudentsUrl = `${config.endpoints.PUBLICATIONS.replace(/\/$/, '')}/${config.endpoints.TUTOR_STUDENTS_MY.replace(/^\//, '')}`;
       const response = await api.get(tutorStudentsUrl);
       
-      // Transformar datos para incluir información adicional
-      const alumnosData = await Promise.all(
-        response.data.map(async (relation) => {
-          try {
-            // Obtener publicaciones del estudiante
-            const pubsResponse = await api.get(`/publications/?student=${relation.student.id}`);
-            
-            return {
-              id: relation.student.id,
-              nombre: relation.student.first_name && relation.student.last_name
-                ? `${relation.student.first_name} ${relation.student.last_name}`
-                : relation.student.username,
-              matricula: relation.student.matricula || 'N/A',
-              email: relation.student.email,
-              estado: relation.is_active ? 'Activo' : 'Inactivo',
-              fechaAsignacion: relation.assigned_date,
-              publicacionesEnviadas: pubsResponse.data.length,
-              ultimaActividad: pubsResponse.data.length > 0 
-                ? new Date(Math.max(...pubsResponse.data.map(p => new Date(p.created_at)))).toISOString().split('T')[0]
-                : 'Sin actividad',
-              progreso: Math.min(100, pubsResponse.data.length * 25) // 4 publicaciones = 100%
-            };
-          } catch (err) {
-            console.error(`Error al cargar datos del estudiante ${relation.student.id}:`, err);
-            return {
-              id: relation.student.id,
-              nombre: relation.student.first_name && relation.student.last_name
-                ? `${relation.student.first_name} ${relation.student.last_name}`
-                : relation.student.username,
-              matricula: relation.student.matricula || 'N/A',
-              email: relation.student.email,
-              estado: relation.is_active ? 'Activo' : 'Inactivo',
-              fechaAsignacion: relation.assigned_date,
-              publicacionesEnviadas: 0,
-              ultimaActividad: 'Sin actividad',
-              progreso: 0
-            };
-          }
-        })
-      );
+      // Los contadores de publicaciones vienen anotados en la misma respuesta
+      const alumnosData = response.data.map((relation) => {
+        const publicacionesEnviadas = relation.total_publications || 0;
+        return {
+          id: relation.student,
+          nombre: relation.student_name || `Estudiante ${relation.student}`,
+          matricula: relation.student_matricula || 'N/A',
+          email: relation.student_email,
+          estado: relation.is_active ? 'Activo' : 'Inactivo',
+          fechaAsignacion: relation.assigned_date,
+          publicacionesEnviadas,
+          ultimaActividad: relation.last_publication_at
+            ? new Date(relation.last_publication_at).toISOString().split('T')[0]
+            : 'Sin actividad',
+          progreso: Math.min(100, publicacionesEnviadas * 25) // 4 publicaciones = 100%
+        };
+      });
       
       setAlumnos(alumnosData);
     } catch (err) {
@@ -0,0 +1,89 @@
+import api from './api';
+import { config } from '../config/config';
+
+/**
+ * Flujo de notificaciones de administración (Server-Sent Events)
+ *
+ * Una sola conexión EventSource compartida por todos los componentes
+ * suscritos. EventSource no admite la cabecera Authorization, así que antes de
+ * conectar se pide un token firmado de vida corta. Si el servidor no sirve el
+ * flujo (WSGI, proxy sin soporte) o la conexión cae, cada intento fallido
+ * (uno cada RETRY_MS) avisa a los suscriptores con un evento `resync` para que
+ * recarguen por su cuenta, como el sondeo de antes, hasta que vuelva a conectar.
+ */
+const RETRY_MS = 30000;
+const EVENT_TYPES = ['notification', 'read', 'resolved', 'resync'];
+
+const listeners = new Set();
+let source = null;
+let connecting = false;
+let retryTimer = null;
+
+const emit = (event) => {
+  listeners.forEach((listener) => listener(event));
+};
+
+const scheduleRetry = () => {
+  if (retryTimer || listeners.size === 0) return;
+  retryTimer = setTimeout(() => {
+    retryTimer = null;
+    connect();
+  }, RETRY_MS);
+};
+
+const connect = async () => {
+  if (source || connecting || listeners.size === 0) return;
+  connecting = true;
+  try {
+    const response = await api.post('/requests/notifications/stream_token/');
+    if (listeners.size === 0) return;
+    source = new EventSource(`${config.API_URL}${response.data.url}`);
+  } catch (error) {
+    console.error('Error al conectar el flujo de notificaciones:', error);
+    emit({ type: 'resync' });
+    scheduleRetry();
+    return;
+  } finally {
+    connecting = false;
+  }
+
+  // Al (re)conectar el contador puede haber cambiado mientras no había conexión
+  source.onopen = () => emit({ type: 'resync' });
+  EVENT_TYPES.forEach((type) => {
+    source.addEventListener(type, (message) => emit(JSON.parse(message.data)));
+  });
+  source.onerror = () => {
+    // El token ya puede haber caducado: cerrar y pedir uno nuevo más tarde
+    source.close();
+    source = null;
+    emit({ type: 'resync' });
+    scheduleRetry();
+  };
+};
+
+const disconnect = () => {
+  if (source) {
+    source.close();
+    source = null;
+  }
+  clearTimeout(retryTimer);
+  retryTimer = null;
+};
+
+/**
+ * Suscribirse a los eventos del flujo. Devuelve la función para anular la suscripción.
+ */
+export const subscribeToNotifications = (listener) => {
+  listeners.add(listener);
+  if (source && source.readyState === EventSource.OPEN) {
+    // Conexión ya abierta por otro componente: cargar el estado actual
+    listener({ type: 'resync' });
+  }
+  connect();
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) disconnect();
+  };
+};
+
+export default subscribeToNotifications;
@@ -13,18 +13,18 @@ export const publicationService = {
   },
 
   /**
-   * Obtener publicaciones del usuario actual
+   * Obtener publicaciones del usuario actual (una página; `cursor` pide la siguiente)
    */
-  getMyPublications: async () => {
-    const response = await api.get(config.endpoints.PUBLICATIONS_MY);
+  getMyPublications: async (cursor = null) => {
+    const response = await api.get(config.endpoints.PUBLICATIONS_MY, { params: cursor ? { cursor } : {} });
     return response.data;
   },
 
   /**
-   * Obtener publicaciones pendientes de revisión (para jefe)
+   * Obtener publicaciones pendientes de revisión (para jefe; una página por `cursor`)
    */
-  getPendingReview: async () => {
-    const response = await api.get(config.endpoints.PUBLICATIONS_PENDING);
+  getPendingReview: async (cursor = null) => {
+    const response = await api.get(config.endpoints.PUBLICATIONS_PENDING, { params: cursor ? { cursor } : {} });
     return response.data;
   },
 
@@ -13,18 +13,18 @@ export const requestService = {
   },
 
   /**
-   * Obtener solicitudes del usuario actual
+   * Obtener solicitudes del usuario actual (una página; `cursor` pide la siguiente)
    */
-  getMyRequests: async () => {
-    const response = await api.get(config.endpoints.ECE_REQUESTS_MY);
+  getMyRequests: async (cursor = null) => {
+    const response = await api.get(config.endpoints.ECE_REQUESTS_MY, { params: cursor ? { cursor } : {} });
     return response.data;
   },
 
   /**
-   * Obtener solicitudes pendientes de revisión (para jefe)
+   * Obtener solicitudes pendientes de revisión (para jefe; una página por `cursor`)
    */
-  getPendingReview: async () => {
-    const response = await api.get(config.endpoints.ECE_REQUESTS_PENDING);
+  getPendingReview: async (cursor = null) => {
+    const response = await api.get(config.endpoints.ECE_REQUESTS_PENDING, { params: cursor ? { cursor } : {} });
     return response.data;
   },
 
@@ -0,0 +1,64 @@
+import api from './api';
+import { config } from '../config/config';
+
+// A partir de este tamaño los archivos se suben por fragmentos reanudables
+export const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+const sendChunk = (id, offset, blob) =>
+  api.patch(`${config.endpoints.UPLOADS}${id}/`, blob, {
+    headers: {
+      'Content-Type': 'application/offset+octet-stream',
+      'Upload-Offset': String(offset),
+    },
+    timeout: 120000,
+  });
+
+export const uploadService = {
+  /**
+   * Subir un archivo por fragmentos. Tras un corte de red se consulta el
+   * offset que tiene el servidor y se continúa desde ahí.
+   * Devuelve el id de la subida para enviarlo como `upload_id`.
+   */
+  uploadInChunks: async (file, onProgress) => {
+    const { data: session } = await api.post(config.endpoints.UPLOADS, {
+      filename: file.name,
+      size: file.size,
+    });
+
+    let offset = session.offset;
+    let retries = 0;
+    while (offset < file.size) {
+      const end = Math.min(offset + session.chunk_size, file.size);
+      try {
+        const { data } = await sendChunk(session.id, offset, file.slice(offset, end));
+        offset = data.offset;
+        retries = 0;
+        if (onProgress) onProgress(Math.round((offset / file.size) * 100));
+      } catch (error) {
+        const status = error.response?.status;
+        if (status === 409 && error.response.data?.offset !== undefined) {
+          offset = error.response.data.offset;
+        } else if (!error.response && retries < MAX_RETRIES) {
+          // Error de red: esperar y preguntar al servidor desde dónde seguir
+          retries += 1;
+          await new Promise((resolve) => setTimeout(resolve, 1000 * retries));
+          const { data } = await api.get(`${config.endpoints.UPLOADS}${session.id}/`);
+          offset = data.offset;
+        } else {
+          throw error;
+        }
+      }
+    }
+    return session.id;
+  },
+
+  /**
+   * Cancelar una subida y borrar lo recibido
+   */
+  cancel: async (id) => {
+    await api.delete(`${config.endpoints.UPLOADS}${id}/`);
+  },
+};
+
+export default uploadService;
@@ -143,6 +143,14 @@ export const downloadFile = (url, filename) => {
   document.body.removeChild(link);
 };
 
+/**
+ * Cursor de la página siguiente de una lista paginada ({ next, results }), o null
+ */
+export const getNextCursor = (data) => {
+  if (!data?.next) return null;
+  return new URL(data.next, window.location.origin).searchParams.get('cursor');
+};
+
 export default {
   handleApiError,
   formatDate,
@@ -150,5 +158,6 @@ export default {
   getStatusColor,
   getStatusLabel,
   validateFile,
-  downloadFile
+  downloadFile,
+  getNextCursor
 };